@@ -38,6 +38,7 @@ from extensions import (
     ext_mail,
     ext_migrate,
     ext_redis,
+    ext_retrieval_log,
     ext_sentry,
     ext_storage,
 )
@@ -126,6 +127,7 @@ def initialize_extensions(app):
     ext_mail.init_app(app)
     ext_hosting_provider.init_app(app)
     ext_sentry.init_app(app)
+    ext_retrieval_log.init_app(app)
 
 
 # Flask-Login configuration
@@ -13,7 +13,7 @@ from libs.helper import email as email_validate
 from libs.password import hash_password, password_pattern, valid_password
 from libs.rsa import generate_key_pair
 from models.account import Tenant
-from models.dataset import Dataset, DatasetCollectionBinding, DocumentSegment
+from models.dataset import Dataset, DatasetCollectionBinding, DatasetKeywordTable, DocumentSegment
 from models.dataset import Document as DatasetDocument
 from models.model import Account, App, AppAnnotationSetting, AppMode, Conversation, MessageAnnotation
 from models.provider import Provider, ProviderModel
@@ -501,6 +501,139 @@ def add_qdrant_doc_id_index(field: str):
                     fg='green'))
 
 
+@click.command('keyword-migrate', help='migrate keyword tables to keyword inverted index.')
+def keyword_migrate():
+    """
+    Migrate dataset keyword tables to per keyword postings of keyword inverted index.
+    """
+    click.echo(click.style('Start migrate keyword tables.', fg='green'))
+    from core.rag.datasource.keyword.jieba_inverted_index.jieba_inverted_index import JiebaInvertedIndex
+
+    migrated_count = 0
+    skipped_count = 0
+    posting_count = 0
+    page = 1
+    while True:
+        try:
+            keyword_tables = db.session.query(DatasetKeywordTable) \
+                .order_by(DatasetKeywordTable.id).paginate(page=page, per_page=50)
+        except NotFound:
+            break
+
+        page += 1
+        for keyword_table in keyword_tables:
+            try:
+                dataset = db.session.query(Dataset).filter(Dataset.id == keyword_table.dataset_id).first()
+                keyword_table_dict = keyword_table.keyword_table_dict
+                if not dataset or not keyword_table_dict:
+                    skipped_count += 1
+                    continue
+
+                count = JiebaInvertedIndex(dataset).add_keyword_table(keyword_table_dict['__data__']['table'])
+                posting_count += count
+                migrated_count += 1
+                click.echo(f'Migrated {count} keyword postings of dataset {dataset.id}.')
+            except Exception as e:
+                db.session.rollback()
+                click.echo(
+                    click.style(f'Failed to migrate keyword table of dataset {keyword_table.dataset_id}: {str(e)}',
+                                fg='red'))
+                continue
+
+    click.echo(
+        click.style(f'Congratulations! Migrated {migrated_count} keyword tables with {posting_count} postings, '
+                    f'{skipped_count} skipped.', fg='green'))
+
+
+@click.command('pgvector-create-index', help='create ANN indexes of existing pgvector collections.')
+@click.option('--rebuild', is_flag=True, default=False, help='drop and recreate existing indexes.')
+def pgvector_create_index(rebuild: bool):
+    """
+    Create HNSW or IVFFlat indexes of pgvector collections created before indexes were managed.
+    """
+    click.echo(click.style('Start create pgvector indexes.', fg='green'))
+    config = current_app.config
+    if config.get('PGVECTOR_INDEX_TYPE') == 'none':
+        click.echo(click.style('Sorry, PGVECTOR_INDEX_TYPE is none.', fg='red'))
+        return
+
+    from core.rag.datasource.vdb.pgvector.pgvector import PGVector, PGVectorConfig
+    pgvector_config = PGVectorConfig(
+        host=config.get('PGVECTOR_HOST'),
+        port=config.get('PGVECTOR_PORT'),
+        user=config.get('PGVECTOR_USER'),
+        password=config.get('PGVECTOR_PASSWORD'),
+        database=config.get('PGVECTOR_DATABASE'),
+        min_connection=int(config.get('PGVECTOR_MIN_CONNECTION', 1)),
+        max_connection=int(config.get('PGVECTOR_MAX_CONNECTION', 20)),
+        pool_timeout=float(config.get('PGVECTOR_POOL_TIMEOUT', 30)),
+        index_type=config.get('PGVECTOR_INDEX_TYPE', 'hnsw'),
+        hnsw_m=int(config.get('PGVECTOR_HNSW_M', 16)),
+        hnsw_ef_construction=int(config.get('PGVECTOR_HNSW_EF_CONSTRUCTION', 64)),
+        hnsw_ef_search=int(config.get('PGVECTOR_HNSW_EF_SEARCH', 40)),
+        ivfflat_lists=int(config.get('PGVECTOR_IVFFLAT_LISTS', 100)),
+        ivfflat_probes=int(config.get('PGVECTOR_IVFFLAT_PROBES', 1)),
+        text_search_config=config.get('PGVECTOR_TEXT_SEARCH_CONFIG', 'simple'),
+    )
+
+    collection_names = set()
+    datasets = db.session.query(Dataset).filter(Dataset.index_struct.isnot(None)).all()
+    for dataset in datasets:
+        index_struct_dict = dataset.index_struct_dict
+        if index_struct_dict and index_struct_dict['type'] == 'pgvector':
+            collection_names.add(index_struct_dict['vector_store']['class_prefix'])
+    if config.get('VECTOR_STORE') == 'pgvector':
+        bindings = db.session.query(DatasetCollectionBinding).all()
+        collection_names.update(binding.collection_name for binding in bindings)
+
+    create_count = 0
+    for collection_name in sorted(collection_names):
+        try:
+            vector = PGVector(collection_name=collection_name, config=pgvector_config)
+            if not vector.collection_exists():
+                continue
+            vector.create_index(rebuild=rebuild)
+            create_count += 1
+            click.echo(f'Created index of collection {collection_name}.')
+        except Exception as e:
+            click.echo(
+                click.style(f'Failed to create index of collection {collection_name}: {str(e)}', fg='red'))
+
+    click.echo(click.style(f'Congratulations! Create {create_count} pgvector indexes.', fg='green'))
+
+
+@click.command('vdb-create-full-text-index', help='create full text indexes of existing pgvector and pgvecto_rs collections.')
+def vdb_create_full_text_index():
+    """
+    Add generated tsvector columns and GIN indexes to pgvector and pgvecto_rs collections created before
+    full text search was supported.
+    """
+    click.echo(click.style('Start create full text indexes.', fg='green'))
+    create_count = 0
+    page = 1
+    while True:
+        try:
+            datasets = db.session.query(Dataset).filter(Dataset.index_struct.isnot(None)) \
+                .order_by(Dataset.created_at.desc()).paginate(page=page, per_page=50)
+        except NotFound:
+            break
+
+        page += 1
+        for dataset in datasets:
+            index_struct_dict = dataset.index_struct_dict
+            if not index_struct_dict or index_struct_dict['type'] not in ('pgvector', 'pgvecto_rs'):
+                continue
+            try:
+                Vector(dataset).create_full_text_index()
+                create_count += 1
+                click.echo(f'Created full text index of dataset {dataset.id}.')
+            except Exception as e:
+                click.echo(
+                    click.style(f'Failed to create full text index of dataset {dataset.id}: {str(e)}', fg='red'))
+
+    click.echo(click.style(f'Congratulations! Create {create_count} full text indexes.', fg='green'))
+
+
 def register_commands(app):
     app.cli.add_command(reset_password)
     app.cli.add_command(reset_email)
@@ -508,4 +641,7 @@ def register_commands(app):
     app.cli.add_command(vdb_migrate)
     app.cli.add_command(convert_to_agent_apps)
     app.cli.add_command(add_qdrant_doc_id_index)
+    app.cli.add_command(keyword_migrate)
+    app.cli.add_command(pgvector_create_index)
+    app.cli.add_command(vdb_create_full_text_index)
 
@@ -71,6 +71,10 @@ DEFAULTS = {
     'BILLING_ENABLED': 'False',
     'CAN_REPLACE_LOGO': 'False',
     'ETL_TYPE': 'dify',
+    'EXTRACT_CACHE_ENABLED': 'True',
+    'EXTRACT_CACHE_MAX_BYTES': 10485760,
+    'PDF_EXTRACT_MAX_WORKERS': 1,
+    'PDF_EXTRACT_BATCH_PAGES': 32,
     'KEYWORD_STORE': 'jieba',
     'BATCH_UPLOAD_LIMIT': 20,
     'CODE_EXECUTION_ENDPOINT': 'http://sandbox:8194',
@@ -81,9 +85,52 @@ DEFAULTS = {
     'INNER_API': 'False',
     'ENTERPRISE_ENABLED': 'False',
     'INDEXING_MAX_SEGMENTATION_TOKENS_LENGTH': 1000,
+    'INDEXING_PIPELINE_ENABLED': 'False',
+    'INDEXING_PIPELINE_QUEUE_SIZE': 16,
+    'INDEXING_PIPELINE_EXTRACT_WORKERS': 2,
+    'INDEXING_PIPELINE_TRANSFORM_WORKERS': 2,
+    'INDEXING_PIPELINE_EMBEDDING_WORKERS': 10,
+    'INDEXING_PIPELINE_UPSERT_WORKERS': 2,
     'WORKFLOW_MAX_EXECUTION_STEPS': 50,
     'WORKFLOW_MAX_EXECUTION_TIME': 600,
     'WORKFLOW_CALL_MAX_DEPTH': 5,
+    'WORKFLOW_PARALLEL_MODE_ENABLED': 'False',
+    'WORKFLOW_MAX_PARALLELISM': 5,
+    'WORKFLOW_NODE_EXECUTION_WRITE_BEHIND_ENABLED': 'False',
+    'WORKFLOW_NODE_EXECUTION_FLUSH_INTERVAL_MS': 500,
+    'APP_STREAM_COALESCE_INTERVAL_MS': 0,
+    'APP_STREAM_COALESCE_MAX_BYTES': 1024,
+    'PGVECTOR_MIN_CONNECTION': 1,
+    'PGVECTOR_MAX_CONNECTION': 20,
+    'PGVECTOR_POOL_TIMEOUT': 30,
+    'PGVECTOR_INDEX_TYPE': 'hnsw',
+    'PGVECTOR_HNSW_M': 16,
+    'PGVECTOR_HNSW_EF_CONSTRUCTION': 64,
+    'PGVECTOR_HNSW_EF_SEARCH': 40,
+    'PGVECTOR_IVFFLAT_LISTS': 100,
+    'PGVECTOR_IVFFLAT_PROBES': 1,
+    'PGVECTOR_TEXT_SEARCH_CONFIG': 'simple',
+    'PGVECTO_RS_TEXT_SEARCH_CONFIG': 'simple',
+    'EMBEDDING_CACHE_REDIS_ENABLED': 'False',
+    'EMBEDDING_CACHE_REDIS_TTL': 600,
+    'EMBEDDING_CACHE_LOOKUP_BATCH_SIZE': 1000,
+    'EMBEDDING_CACHE_STORAGE_DTYPE': 'float32',
+    'EMBEDDING_MAX_CONCURRENCY': 4,
+    'RERANK_CACHE_ENABLED': 'False',
+    'RERANK_CACHE_TTL': 3600,
+    'RERANK_CACHE_MAX_MEMORY_MB': 16,
+    'SEMANTIC_CACHE_TTL': 3600,
+    'SEMANTIC_CACHE_MAX_ENTRIES': 200,
+    'SEGMENT_HIT_COUNT_FLUSH_INTERVAL': 60,
+    'SEGMENT_HIT_COUNT_FLUSH_BATCH_SIZE': 500,
+    'RETRIEVAL_LOG_ASYNC_ENABLED': 'True',
+    'RETRIEVAL_LOG_QUEUE_SIZE': 10000,
+    'RETRIEVAL_LOG_BATCH_SIZE': 500,
+    'RETRIEVAL_LOG_FLUSH_INTERVAL': 1,
+    'RETRIEVAL_LOG_FULL_POLICY': 'drop',
+    'RETRIEVAL_LOG_BLOCK_TIMEOUT': 0.1,
+    'EMBEDDING_TOKENS_PER_MINUTE': 0,
+    'EMBEDDING_MAX_RETRIES': 3,
 }
 
 
@@ -239,6 +286,7 @@ class Config:
         # Currently, only support: qdrant, milvus, zilliz, weaviate, relyt, pgvector
         # ------------------------
         self.VECTOR_STORE = get_env('VECTOR_STORE')
+        # keyword store, jieba or jieba_inverted_index
         self.KEYWORD_STORE = get_env('KEYWORD_STORE')
         # qdrant settings
         self.QDRANT_URL = get_env('QDRANT_URL')
@@ -274,6 +322,7 @@ class Config:
         self.PGVECTO_RS_USER = get_env('PGVECTO_RS_USER')
         self.PGVECTO_RS_PASSWORD = get_env('PGVECTO_RS_PASSWORD')
         self.PGVECTO_RS_DATABASE = get_env('PGVECTO_RS_DATABASE')
+        self.PGVECTO_RS_TEXT_SEARCH_CONFIG = get_env('PGVECTO_RS_TEXT_SEARCH_CONFIG')
 
         # pgvector settings
         self.PGVECTOR_HOST = get_env('PGVECTOR_HOST')
@@ -281,6 +330,18 @@ class Config:
         self.PGVECTOR_USER = get_env('PGVECTOR_USER')
         self.PGVECTOR_PASSWORD = get_env('PGVECTOR_PASSWORD')
         self.PGVECTOR_DATABASE = get_env('PGVECTOR_DATABASE')
+        self.PGVECTOR_MIN_CONNECTION = int(get_env('PGVECTOR_MIN_CONNECTION'))
+        # the pool is shared by all collections of the process, requests wait up to PGVECTOR_POOL_TIMEOUT seconds
+        # for a connection when all of them are checked out
+        self.PGVECTOR_MAX_CONNECTION = int(get_env('PGVECTOR_MAX_CONNECTION'))
+        self.PGVECTOR_POOL_TIMEOUT = float(get_env('PGVECTOR_POOL_TIMEOUT'))
+        self.PGVECTOR_INDEX_TYPE = get_env('PGVECTOR_INDEX_TYPE')
+        self.PGVECTOR_HNSW_M = int(get_env('PGVECTOR_HNSW_M'))
+        self.PGVECTOR_HNSW_EF_CONSTRUCTION = int(get_env('PGVECTOR_HNSW_EF_CONSTRUCTION'))
+        self.PGVECTOR_HNSW_EF_SEARCH = int(get_env('PGVECTOR_HNSW_EF_SEARCH'))
+        self.PGVECTOR_IVFFLAT_LISTS = int(get_env('PGVECTOR_IVFFLAT_LISTS'))
+        self.PGVECTOR_IVFFLAT_PROBES = int(get_env('PGVECTOR_IVFFLAT_PROBES'))
+        self.PGVECTOR_TEXT_SEARCH_CONFIG = get_env('PGVECTOR_TEXT_SEARCH_CONFIG')
 
         # ------------------------
         # Mail Configurations.
@@ -317,6 +378,17 @@ class Config:
 
         # Dataset Configurations.
         self.CLEAN_DAY_SETTING = get_env('CLEAN_DAY_SETTING')
+        # hit counts of retrieved segments are coalesced in redis and flushed every interval seconds
+        self.SEGMENT_HIT_COUNT_FLUSH_INTERVAL = int(get_env('SEGMENT_HIT_COUNT_FLUSH_INTERVAL'))
+        self.SEGMENT_HIT_COUNT_FLUSH_BATCH_SIZE = int(get_env('SEGMENT_HIT_COUNT_FLUSH_BATCH_SIZE'))
+        # dataset query logs and segment hits of apps are buffered in process and written in batches,
+        # events over queue size are dropped, or wait up to block timeout seconds with the `block` policy
+        self.RETRIEVAL_LOG_ASYNC_ENABLED = get_bool_env('RETRIEVAL_LOG_ASYNC_ENABLED')
+        self.RETRIEVAL_LOG_QUEUE_SIZE = int(get_env('RETRIEVAL_LOG_QUEUE_SIZE'))
+        self.RETRIEVAL_LOG_BATCH_SIZE = int(get_env('RETRIEVAL_LOG_BATCH_SIZE'))
+        self.RETRIEVAL_LOG_FLUSH_INTERVAL = float(get_env('RETRIEVAL_LOG_FLUSH_INTERVAL'))
+        self.RETRIEVAL_LOG_FULL_POLICY = get_env('RETRIEVAL_LOG_FULL_POLICY')
+        self.RETRIEVAL_LOG_BLOCK_TIMEOUT = float(get_env('RETRIEVAL_LOG_BLOCK_TIMEOUT'))
 
         # File upload Configurations.
         self.UPLOAD_FILE_SIZE_LIMIT = int(get_env('UPLOAD_FILE_SIZE_LIMIT'))
@@ -326,6 +398,17 @@ class Config:
         self.WORKFLOW_MAX_EXECUTION_STEPS = int(get_env('WORKFLOW_MAX_EXECUTION_STEPS'))
         self.WORKFLOW_MAX_EXECUTION_TIME = int(get_env('WORKFLOW_MAX_EXECUTION_TIME'))
         self.WORKFLOW_CALL_MAX_DEPTH = int(get_env('WORKFLOW_CALL_MAX_DEPTH'))
+        # run parallel branches of workflow concurrently, at most WORKFLOW_MAX_PARALLELISM nodes per run
+        self.WORKFLOW_PARALLEL_MODE_ENABLED = get_bool_env('WORKFLOW_PARALLEL_MODE_ENABLED')
+        self.WORKFLOW_MAX_PARALLELISM = int(get_env('WORKFLOW_MAX_PARALLELISM'))
+        # keep node executions of app runs in memory and write them in bulk every flush interval,
+        # and before the final state of the run is saved
+        self.WORKFLOW_NODE_EXECUTION_WRITE_BEHIND_ENABLED = get_bool_env('WORKFLOW_NODE_EXECUTION_WRITE_BEHIND_ENABLED')
+        self.WORKFLOW_NODE_EXECUTION_FLUSH_INTERVAL_MS = int(get_env('WORKFLOW_NODE_EXECUTION_FLUSH_INTERVAL_MS'))
+
+        # merge consecutive text chunks of app streams for up to the interval or max bytes, 0 to send each chunk
+        self.APP_STREAM_COALESCE_INTERVAL_MS = int(get_env('APP_STREAM_COALESCE_INTERVAL_MS'))
+        self.APP_STREAM_COALESCE_MAX_BYTES = int(get_env('APP_STREAM_COALESCE_MAX_BYTES'))
 
         # Moderation in app Configurations.
         self.OUTPUT_MODERATION_BUFFER_SIZE = int(get_env('OUTPUT_MODERATION_BUFFER_SIZE'))
@@ -380,6 +463,14 @@ class Config:
         self.ETL_TYPE = get_env('ETL_TYPE')
         self.UNSTRUCTURED_API_URL = get_env('UNSTRUCTURED_API_URL')
         self.UNSTRUCTURED_API_KEY = get_env('UNSTRUCTURED_API_KEY')
+        # cache extracted text of upload files in storage, by file hash and extractor version
+        self.EXTRACT_CACHE_ENABLED = get_bool_env('EXTRACT_CACHE_ENABLED')
+        # files with more extracted text are not cached, so their pages are not kept in memory while streamed
+        self.EXTRACT_CACHE_MAX_BYTES = int(get_env('EXTRACT_CACHE_MAX_BYTES'))
+        # parse pdfs of more than PDF_EXTRACT_BATCH_PAGES pages in page ranges on a process pool shared by
+        # the process, opt-in, 1 parses in the calling worker
+        self.PDF_EXTRACT_MAX_WORKERS = int(get_env('PDF_EXTRACT_MAX_WORKERS'))
+        self.PDF_EXTRACT_BATCH_PAGES = int(get_env('PDF_EXTRACT_BATCH_PAGES'))
         self.BILLING_ENABLED = get_bool_env('BILLING_ENABLED')
         self.CAN_REPLACE_LOGO = get_bool_env('CAN_REPLACE_LOGO')
 
@@ -398,3 +489,52 @@ class Config:
         # Indexing Configurations.
         # ------------------------
         self.INDEXING_MAX_SEGMENTATION_TOKENS_LENGTH = get_env('INDEXING_MAX_SEGMENTATION_TOKENS_LENGTH')
+        # index documents in a staged pipeline, with bounded queues of INDEXING_PIPELINE_QUEUE_SIZE items
+        # between the stages and the worker threads of each stage
+        self.INDEXING_PIPELINE_ENABLED = get_bool_env('INDEXING_PIPELINE_ENABLED')
+        self.INDEXING_PIPELINE_QUEUE_SIZE = int(get_env('INDEXING_PIPELINE_QUEUE_SIZE'))
+        self.INDEXING_PIPELINE_EXTRACT_WORKERS = int(get_env('INDEXING_PIPELINE_EXTRACT_WORKERS'))
+        self.INDEXING_PIPELINE_TRANSFORM_WORKERS = int(get_env('INDEXING_PIPELINE_TRANSFORM_WORKERS'))
+        self.INDEXING_PIPELINE_EMBEDDING_WORKERS = int(get_env('INDEXING_PIPELINE_EMBEDDING_WORKERS'))
+        self.INDEXING_PIPELINE_UPSERT_WORKERS = int(get_env('INDEXING_PIPELINE_UPSERT_WORKERS'))
+
+        # ------------------------
+        # Embedding Cache Configurations.
+        # ------------------------
+        # cache document embeddings in redis in front of the embeddings table
+        self.EMBEDDING_CACHE_REDIS_ENABLED = get_bool_env('EMBEDDING_CACHE_REDIS_ENABLED')
+        self.EMBEDDING_CACHE_REDIS_TTL = int(get_env('EMBEDDING_CACHE_REDIS_TTL'))
+        # number of text hashes looked up per query
+        self.EMBEDDING_CACHE_LOOKUP_BATCH_SIZE = int(get_env('EMBEDDING_CACHE_LOOKUP_BATCH_SIZE'))
+        # storage dtype of cached embeddings, float32, float16 or int8
+        self.EMBEDDING_CACHE_STORAGE_DTYPE = get_env('EMBEDDING_CACHE_STORAGE_DTYPE')
+
+        # ------------------------
+        # Embedding Dispatch Configurations.
+        # ------------------------
+        # concurrent embedding requests per provider in each process
+        self.EMBEDDING_MAX_CONCURRENCY = int(get_env('EMBEDDING_MAX_CONCURRENCY'))
+        # estimated tokens per minute budget per provider in each process, 0 means unlimited
+        self.EMBEDDING_TOKENS_PER_MINUTE = int(get_env('EMBEDDING_TOKENS_PER_MINUTE'))
+        # per provider overrides, e.g. `openai:8,cohere:2`
+        self.EMBEDDING_PROVIDER_MAX_CONCURRENCY = get_env('EMBEDDING_PROVIDER_MAX_CONCURRENCY')
+        self.EMBEDDING_PROVIDER_TOKENS_PER_MINUTE = get_env('EMBEDDING_PROVIDER_TOKENS_PER_MINUTE')
+        # retries of rate limited embedding requests
+        self.EMBEDDING_MAX_RETRIES = int(get_env('EMBEDDING_MAX_RETRIES'))
+
+        # ------------------------
+        # Rerank Cache Configurations.
+        # ------------------------
+        # cache rerank results in an in-process LRU in front of redis
+        self.RERANK_CACHE_ENABLED = get_bool_env('RERANK_CACHE_ENABLED')
+        self.RERANK_CACHE_TTL = int(get_env('RERANK_CACHE_TTL'))
+        # size limit of the in-process LRU of each process
+        self.RERANK_CACHE_MAX_MEMORY_MB = int(get_env('RERANK_CACHE_MAX_MEMORY_MB'))
+
+        # ------------------------
+        # Semantic Cache Configurations.
+        # ------------------------
+        # answers of chat apps with semantic cache enabled are kept for TTL seconds,
+        # up to max entries per app config, inputs and dataset versions
+        self.SEMANTIC_CACHE_TTL = int(get_env('SEMANTIC_CACHE_TTL'))
+        self.SEMANTIC_CACHE_MAX_ENTRIES = int(get_env('SEMANTIC_CACHE_MAX_ENTRIES'))
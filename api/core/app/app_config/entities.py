@@ -183,6 +183,14 @@ class TextToSpeechEntity(BaseModel):
     language: Optional[str] = None
 
 
+class SemanticCacheEntity(BaseModel):
+    """
+    Semantic Cache Entity.
+    """
+    enabled: bool
+    score_threshold: float = 0.95
+
+
 class FileExtraConfig(BaseModel):
     """
     File Upload Entity.
@@ -199,6 +207,7 @@ class AppAdditionalFeatures(BaseModel):
     more_like_this: bool = False
     speech_to_text: bool = False
     text_to_speech: Optional[TextToSpeechEntity] = None
+    semantic_cache: Optional[SemanticCacheEntity] = None
 
 
 class AppConfig(BaseModel):
@@ -0,0 +1,54 @@
+from typing import Optional
+
+from core.app.app_config.entities import SemanticCacheEntity
+
+
+class SemanticCacheConfigManager:
+    @classmethod
+    def convert(cls, config: dict) -> Optional[SemanticCacheEntity]:
+        """
+        Convert model config to model config
+
+        :param config: model config args
+        """
+        semantic_cache = None
+        semantic_cache_dict = config.get('semantic_cache')
+        if semantic_cache_dict:
+            if semantic_cache_dict.get('enabled'):
+                semantic_cache = SemanticCacheEntity(
+                    enabled=semantic_cache_dict.get('enabled'),
+                    score_threshold=semantic_cache_dict.get('score_threshold', 0.95),
+                )
+
+        return semantic_cache
+
+    @classmethod
+    def validate_and_set_defaults(cls, config: dict) -> tuple[dict, list[str]]:
+        """
+        Validate and set defaults for semantic cache feature
+
+        :param config: app model config args
+        """
+        if not config.get("semantic_cache"):
+            config["semantic_cache"] = {
+                "enabled": False,
+                "score_threshold": 0.95
+            }
+
+        if not isinstance(config["semantic_cache"], dict):
+            raise ValueError("semantic_cache must be of dict type")
+
+        if "enabled" not in config["semantic_cache"] or not config["semantic_cache"]["enabled"]:
+            config["semantic_cache"]["enabled"] = False
+
+        if not isinstance(config["semantic_cache"]["enabled"], bool):
+            raise ValueError("enabled in semantic_cache must be of boolean type")
+
+        if "score_threshold" not in config["semantic_cache"]:
+            config["semantic_cache"]["score_threshold"] = 0.95
+
+        score_threshold = config["semantic_cache"]["score_threshold"]
+        if not isinstance(score_threshold, int | float) or not 0 < score_threshold <= 1:
+            raise ValueError("score_threshold in semantic_cache must be a number in (0, 1]")
+
+        return config, ["semantic_cache"]
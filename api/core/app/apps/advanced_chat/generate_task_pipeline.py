@@ -51,7 +51,6 @@ from models.account import Account
 from models.model import Conversation, EndUser, Message
 from models.workflow import (
     Workflow,
-    WorkflowNodeExecution,
     WorkflowRunStatus,
 )
 
@@ -126,7 +125,7 @@ class AdvancedChatAppGenerateTaskPipeline(BasedGenerateTaskPipeline, WorkflowCyc
             self._application_generate_entity.query
         )
 
-        generator = self._process_stream_response()
+        generator = self._close_node_execution_writer_on_exit(self._process_stream_response())
         if self._stream:
             return self._to_stream_response(generator)
         else:
@@ -541,8 +540,8 @@ class AdvancedChatAppGenerateTaskPipeline(BasedGenerateTaskPipeline, WorkflowCyc
                         continue
 
                     # get route chunk node execution
-                    route_chunk_node_execution = db.session.query(WorkflowNodeExecution).filter(
-                        WorkflowNodeExecution.id == route_chunk_node_execution_info.workflow_node_execution_id).first()
+                    route_chunk_node_execution = self._get_workflow_node_execution(
+                        route_chunk_node_execution_info.workflow_node_execution_id)
 
                     outputs = route_chunk_node_execution.outputs_dict
 
@@ -1,8 +1,11 @@
 import logging
 from abc import ABC, abstractmethod
-from collections.abc import Generator
+from collections.abc import Callable, Generator, Iterable
 from typing import Union
 
+from flask import current_app, has_app_context
+
+from core.app.apps.stream_event_serializer import StreamEventSerializer, coalesce_stream_responses
 from core.app.entities.app_invoke_entities import InvokeFrom
 from core.app.entities.task_entities import AppBlockingResponse, AppStreamResponse
 from core.errors.error import ModelCurrentlyNotSupportError, ProviderTokenNotInitError, QuotaExceededError
@@ -20,30 +23,44 @@ class AppGenerateResponseConverter(ABC):
         dict,
         Generator[str, None, None]
     ]:
+        if not isinstance(response, cls._blocking_response_type):
+            response = cls._coalesce_stream_response(response)
+
         if invoke_from in [InvokeFrom.DEBUGGER, InvokeFrom.SERVICE_API]:
             if isinstance(response, cls._blocking_response_type):
                 return cls.convert_blocking_full_response(response)
             else:
-                def _generate():
-                    for chunk in cls.convert_stream_full_response(response):
-                        if chunk == 'ping':
-                            yield f'event: {chunk}\n\n'
-                        else:
-                            yield f'data: {chunk}\n\n'
-
-                return _generate()
+                return cls._generate_stream_events(response, cls.convert_stream_full_response)
         else:
             if isinstance(response, cls._blocking_response_type):
                 return cls.convert_blocking_simple_response(response)
             else:
-                def _generate():
-                    for chunk in cls.convert_stream_simple_response(response):
-                        if chunk == 'ping':
-                            yield f'event: {chunk}\n\n'
-                        else:
-                            yield f'data: {chunk}\n\n'
+                return cls._generate_stream_events(response, cls.convert_stream_simple_response)
 
-                return _generate()
+    @classmethod
+    def _generate_stream_events(cls, stream_response: Generator[AppStreamResponse, None, None],
+                                convert_stream_response: Callable[[Iterable[AppStreamResponse]],
+                                                                  Generator[str, None, None]]) \
+            -> Generator[str, None, None]:
+        """
+        Generate server-sent events of stream response.
+        Hot text events are serialized from precompiled templates, other events by the app converter.
+        :param stream_response: stream response
+        :param convert_stream_response: full or simple stream response converter of the app
+        :return:
+        """
+        serializer = StreamEventSerializer()
+        for chunk in stream_response:
+            event = serializer.serialize(chunk)
+            if event is not None:
+                yield f'data: {event}\n\n'
+                continue
+
+            for event in convert_stream_response((chunk,)):
+                if event == 'ping':
+                    yield f'event: {event}\n\n'
+                else:
+                    yield f'data: {event}\n\n'
 
     @classmethod
     @abstractmethod
@@ -67,6 +84,24 @@ class AppGenerateResponseConverter(ABC):
             -> Generator[str, None, None]:
         raise NotImplementedError
 
+    @classmethod
+    def _coalesce_stream_response(cls, stream_response: Generator[AppStreamResponse, None, None]) \
+            -> Generator[AppStreamResponse, None, None]:
+        """
+        Merge consecutive text chunks when APP_STREAM_COALESCE_INTERVAL_MS is set.
+        :param stream_response: stream response
+        :return:
+        """
+        if not has_app_context():
+            return stream_response
+
+        interval_ms = int(current_app.config.get('APP_STREAM_COALESCE_INTERVAL_MS', 0))
+        if interval_ms <= 0:
+            return stream_response
+
+        max_bytes = int(current_app.config.get('APP_STREAM_COALESCE_MAX_BYTES', 1024))
+        return coalesce_stream_responses(stream_response, interval_ms, max_bytes)
+
     @classmethod
     def _get_simple_metadata(cls, metadata: dict) -> dict:
         """
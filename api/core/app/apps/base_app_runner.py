@@ -244,25 +244,69 @@ class AppRunner:
             ), PublishFrom.APPLICATION_MANAGER
         )
 
+    def replay_output(self, queue_manager: AppQueueManager,
+                      app_generate_entity: EasyUIBasedAppGenerateEntity,
+                      prompt_messages: list,
+                      text: str,
+                      stream: bool,
+                      chunk_size: int = 512) -> None:
+        """
+        Output a stored answer, e.g. from the semantic cache, at once instead of typing it out like direct_output
+        :param queue_manager: application queue manager
+        :param app_generate_entity: app generate entity
+        :param prompt_messages: prompt messages
+        :param text: text
+        :param stream: stream
+        :param chunk_size: max characters of a streamed chunk
+        :return:
+        """
+        if stream:
+            for index, start in enumerate(range(0, len(text), chunk_size)):
+                chunk = LLMResultChunk(
+                    model=app_generate_entity.model_config.model,
+                    prompt_messages=prompt_messages,
+                    delta=LLMResultChunkDelta(
+                        index=index,
+                        message=AssistantPromptMessage(content=text[start:start + chunk_size])
+                    )
+                )
+
+                queue_manager.publish(
+                    QueueLLMChunkEvent(
+                        chunk=chunk
+                    ), PublishFrom.APPLICATION_MANAGER
+                )
+
+        queue_manager.publish(
+            QueueMessageEndEvent(
+                llm_result=LLMResult(
+                    model=app_generate_entity.model_config.model,
+                    prompt_messages=prompt_messages,
+                    message=AssistantPromptMessage(content=text),
+                    usage=LLMUsage.empty_usage()
+                ),
+            ), PublishFrom.APPLICATION_MANAGER
+        )
+
     def _handle_invoke_result(self, invoke_result: Union[LLMResult, Generator],
                               queue_manager: AppQueueManager,
                               stream: bool,
-                              agent: bool = False) -> None:
+                              agent: bool = False) -> LLMResult:
         """
         Handle invoke result
         :param invoke_result: invoke result
         :param queue_manager: application queue manager
         :param stream: stream
-        :return:
+        :return: llm result
         """
         if not stream:
-            self._handle_invoke_result_direct(
+            return self._handle_invoke_result_direct(
                 invoke_result=invoke_result,
                 queue_manager=queue_manager,
                 agent=agent
             )
         else:
-            self._handle_invoke_result_stream(
+            return self._handle_invoke_result_stream(
                 invoke_result=invoke_result,
                 queue_manager=queue_manager,
                 agent=agent
@@ -270,12 +314,12 @@ class AppRunner:
 
     def _handle_invoke_result_direct(self, invoke_result: LLMResult,
                                      queue_manager: AppQueueManager,
-                                     agent: bool) -> None:
+                                     agent: bool) -> LLMResult:
         """
         Handle invoke result direct
         :param invoke_result: invoke result
         :param queue_manager: application queue manager
-        :return:
+        :return: llm result
         """
         queue_manager.publish(
             QueueMessageEndEvent(
@@ -283,14 +327,16 @@ class AppRunner:
             ), PublishFrom.APPLICATION_MANAGER
         )
 
+        return invoke_result
+
     def _handle_invoke_result_stream(self, invoke_result: Generator,
                                      queue_manager: AppQueueManager,
-                                     agent: bool) -> None:
+                                     agent: bool) -> LLMResult:
         """
         Handle invoke result
         :param invoke_result: invoke result
         :param queue_manager: application queue manager
-        :return:
+        :return: llm result
         """
         model = None
         prompt_messages = []
@@ -337,6 +383,8 @@ class AppRunner:
             ), PublishFrom.APPLICATION_MANAGER
         )
 
+        return llm_result
+
     def moderation_for_inputs(self, app_id: str,
                               tenant_id: str,
                               app_generate_entity: AppGenerateEntity,
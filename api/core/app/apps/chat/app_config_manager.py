@@ -10,6 +10,7 @@ from core.app.app_config.entities import EasyUIBasedAppConfig, EasyUIBasedAppMod
 from core.app.app_config.features.file_upload.manager import FileUploadConfigManager
 from core.app.app_config.features.opening_statement.manager import OpeningStatementConfigManager
 from core.app.app_config.features.retrieval_resource.manager import RetrievalResourceConfigManager
+from core.app.app_config.features.semantic_cache.manager import SemanticCacheConfigManager
 from core.app.app_config.features.speech_to_text.manager import SpeechToTextConfigManager
 from core.app.app_config.features.suggested_questions_after_answer.manager import (
     SuggestedQuestionsAfterAnswerConfigManager,
@@ -135,6 +136,10 @@ class ChatAppConfigManager(BaseAppConfigManager):
         config, current_related_config_keys = RetrievalResourceConfigManager.validate_and_set_defaults(config)
         related_config_keys.extend(current_related_config_keys)
 
+        # semantic_cache
+        config, current_related_config_keys = SemanticCacheConfigManager.validate_and_set_defaults(config)
+        related_config_keys.extend(current_related_config_keys)
+
         # moderation validation
         config, current_related_config_keys = SensitiveWordAvoidanceConfigManager.validate_and_set_defaults(tenant_id,
                                                                                                             config)
@@ -8,6 +8,7 @@ from core.app.entities.app_invoke_entities import (
     ChatAppGenerateEntity,
 )
 from core.app.entities.queue_entities import QueueAnnotationReplyEvent
+from core.app.features.semantic_cache.semantic_cache import SemanticCacheFeature
 from core.callback_handler.index_tool_callback_handler import DatasetIndexToolCallbackHandler
 from core.memory.token_buffer_memory import TokenBufferMemory
 from core.model_manager import ModelInstance
@@ -134,6 +135,36 @@ class ChatAppRunner(AppRunner):
 
         # fill in variable inputs from external data tools if exists
         external_data_tools = app_config.external_data_variables
+
+        # semantic cache, only for the first turn of conversations, whose answer depends on query and inputs only
+        semantic_cache = None
+        if query and app_config.additional_features.semantic_cache \
+                and not application_generate_entity.conversation_id and not files and not external_data_tools:
+            semantic_cache = SemanticCacheFeature(
+                app_config=app_config,
+                inputs=inputs,
+                user_id=application_generate_entity.user_id
+            )
+
+            cached_answer = semantic_cache.query(query)
+            if cached_answer:
+                # the answer was cached for a similar query, this query has not been checked by hosting moderation
+                hosting_moderation_result = self.check_hosting_moderation(
+                    application_generate_entity=application_generate_entity,
+                    queue_manager=queue_manager,
+                    prompt_messages=prompt_messages
+                )
+
+                if not hosting_moderation_result:
+                    self.replay_output(
+                        queue_manager=queue_manager,
+                        app_generate_entity=application_generate_entity,
+                        prompt_messages=prompt_messages,
+                        text=cached_answer,
+                        stream=application_generate_entity.stream
+                    )
+                return
+
         if external_data_tools:
             inputs = self.fill_in_inputs_from_external_data_tools(
                 tenant_id=app_record.tenant_id,
@@ -215,8 +246,11 @@ class ChatAppRunner(AppRunner):
         )
 
         # handle invoke result
-        self._handle_invoke_result(
+        llm_result = self._handle_invoke_result(
             invoke_result=invoke_result,
             queue_manager=queue_manager,
             stream=application_generate_entity.stream
         )
+
+        if semantic_cache:
+            semantic_cache.save(query, llm_result.message.content)
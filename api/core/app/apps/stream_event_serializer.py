@@ -0,0 +1,202 @@
+import json
+import queue
+import threading
+import time
+from collections.abc import Generator
+from contextlib import nullcontext
+from json.encoder import encode_basestring_ascii
+from typing import Optional
+
+from flask import Flask, current_app, has_app_context
+
+from core.app.entities.task_entities import (
+    AgentMessageStreamResponse,
+    AppStreamResponse,
+    MessageStreamResponse,
+    StreamResponse,
+    TextChunkStreamResponse,
+)
+
+# placeholder of the streamed text in event templates
+_TEXT_PLACEHOLDER = '\x00text\x00'
+
+
+def _get_text(stream_response: StreamResponse) -> str:
+    if isinstance(stream_response, TextChunkStreamResponse):
+        return stream_response.data.text
+    return stream_response.answer
+
+
+def _with_text(stream_response: StreamResponse, text: str) -> StreamResponse:
+    if isinstance(stream_response, TextChunkStreamResponse):
+        return stream_response.copy(update={'data': stream_response.data.copy(update={'text': text})})
+    return stream_response.copy(update={'answer': text})
+
+
+class StreamEventSerializer:
+    """
+    Serializer of the hot text events of a stream, message, agent_message and text_chunk.
+
+    The JSON of an event is built once per stream, event type and static fields like task_id, message_id and
+    conversation_id, and split around the text. Serializing a token then only encodes its text, and the output
+    is identical to `json.dumps` of the event dict built by the response converters.
+    """
+    hot_stream_response_types = (MessageStreamResponse, AgentMessageStreamResponse, TextChunkStreamResponse)
+
+    def __init__(self):
+        self._templates: dict[tuple, tuple[str, str]] = {}
+
+    def serialize(self, chunk: AppStreamResponse) -> Optional[str]:
+        """
+        Serialize hot text event
+
+        :param chunk: app stream response
+        :return: event JSON, None if the event is not a hot text event
+        """
+        stream_response = chunk.stream_response
+        if type(stream_response) not in self.hot_stream_response_types:
+            return None
+
+        key = self._get_template_key(chunk)
+        template = self._templates.get(key)
+        if template is None:
+            template = self._build_template(chunk)
+            self._templates[key] = template
+
+        prefix, suffix = template
+        return prefix + encode_basestring_ascii(_get_text(stream_response)) + suffix
+
+    @staticmethod
+    def _get_template_key(chunk: AppStreamResponse) -> tuple:
+        stream_response = chunk.stream_response
+        return (
+            type(chunk),
+            type(stream_response),
+            stream_response.task_id,
+            getattr(stream_response, 'id', None),
+            *(getattr(chunk, name) for name in chunk.__fields__ if name != 'stream_response')
+        )
+
+    @staticmethod
+    def _build_template(chunk: AppStreamResponse) -> tuple[str, str]:
+        stream_response = chunk.stream_response
+        response_chunk = {'event': stream_response.event.value}
+        for name in chunk.__fields__:
+            if name != 'stream_response':
+                response_chunk[name] = getattr(chunk, name)
+        response_chunk.update(_with_text(stream_response, _TEXT_PLACEHOLDER).to_dict())
+
+        prefix, suffix = json.dumps(response_chunk).split(json.dumps(_TEXT_PLACEHOLDER))
+        return prefix, suffix
+
+
+class _StreamEnd:
+    """
+    Marks the end of the upstream stream in the coalescing queue, with the error it raised if any
+    """
+
+    def __init__(self, error: Optional[BaseException] = None):
+        self.error = error
+
+
+def _read_stream_responses(stream_response: Generator[AppStreamResponse, None, None],
+                           chunks: queue.Queue,
+                           stopped: threading.Event,
+                           flask_app: Optional[Flask]) -> None:
+    """
+    Read upstream stream responses into the queue, run in a reader thread
+    """
+    with flask_app.app_context() if flask_app else nullcontext():
+        try:
+            for chunk in stream_response:
+                if stopped.is_set():
+                    # the client went away
+                    if hasattr(stream_response, 'close'):
+                        stream_response.close()
+                    break
+                chunks.put(chunk)
+        except BaseException as e:
+            chunks.put(_StreamEnd(e))
+            return
+
+        chunks.put(_StreamEnd())
+
+
+def coalesce_stream_responses(stream_response: Generator[AppStreamResponse, None, None],
+                              interval_ms: int,
+                              max_bytes: int) -> Generator[AppStreamResponse, None, None]:
+    """
+    Merge consecutive text events of the same message into one event.
+
+    Merged text is sent `interval_ms` after the first buffered text even when no other event arrives,
+    e.g. while the model pauses for a tool call, when it reaches `max_bytes`, or before any other event.
+    Upstream is read in a reader thread, so buffered text is flushed on time while it blocks.
+
+    :param stream_response: app stream responses
+    :param interval_ms: max milliseconds to buffer text for
+    :param max_bytes: max bytes of buffered text
+    :return: app stream responses
+    """
+    interval = interval_ms / 1000
+    buffered_chunk: Optional[AppStreamResponse] = None
+    buffered_key = None
+    buffered_texts: list[str] = []
+    buffered_bytes = 0
+    buffered_at = 0.0
+
+    def flush() -> AppStreamResponse:
+        return buffered_chunk.copy(update={
+            'stream_response': _with_text(buffered_chunk.stream_response, ''.join(buffered_texts))
+        })
+
+    chunks = queue.Queue()
+    stopped = threading.Event()
+    reader = threading.Thread(
+        target=_read_stream_responses,
+        args=(stream_response, chunks, stopped, current_app._get_current_object() if has_app_context() else None),
+        daemon=True
+    )
+    reader.start()
+
+    try:
+        while True:
+            try:
+                # wait for the next chunk only until the buffered text is due
+                timeout = max(buffered_at + interval - time.monotonic(), 0) if buffered_chunk else None
+                chunk = chunks.get(timeout=timeout)
+            except queue.Empty:
+                yield flush()
+                buffered_chunk = None
+                continue
+
+            if isinstance(chunk, _StreamEnd):
+                if buffered_chunk:
+                    yield flush()
+                if chunk.error:
+                    raise chunk.error
+                return
+
+            if type(chunk.stream_response) not in StreamEventSerializer.hot_stream_response_types:
+                if buffered_chunk:
+                    yield flush()
+                    buffered_chunk = None
+                yield chunk
+                continue
+
+            key = StreamEventSerializer._get_template_key(chunk)
+            if buffered_chunk and key != buffered_key:
+                yield flush()
+                buffered_chunk = None
+
+            text = _get_text(chunk.stream_response)
+            if not buffered_chunk:
+                buffered_chunk, buffered_key = chunk, key
+                buffered_texts, buffered_bytes, buffered_at = [], 0, time.monotonic()
+
+            buffered_texts.append(text)
+            buffered_bytes += len(text.encode('utf-8'))
+            if buffered_bytes >= max_bytes or time.monotonic() - buffered_at >= interval:
+                yield flush()
+                buffered_chunk = None
+    finally:
+        stopped.set()
@@ -45,7 +45,6 @@ from models.workflow import (
     Workflow,
     WorkflowAppLog,
     WorkflowAppLogCreatedFrom,
-    WorkflowNodeExecution,
     WorkflowRun,
 )
 
@@ -104,7 +103,7 @@ class WorkflowAppGenerateTaskPipeline(BasedGenerateTaskPipeline, WorkflowCycleMa
         db.session.refresh(self._user)
         db.session.close()
 
-        generator = self._process_stream_response()
+        generator = self._close_node_execution_writer_on_exit(self._process_stream_response())
         if self._stream:
             return self._to_stream_response(generator)
         else:
@@ -392,8 +391,8 @@ class WorkflowAppGenerateTaskPipeline(BasedGenerateTaskPipeline, WorkflowCycleMa
                 node_execution_info = self._task_state.ran_node_execution_infos[node_id]
 
                 # get chunk node execution
-                route_chunk_node_execution = db.session.query(WorkflowNodeExecution).filter(
-                    WorkflowNodeExecution.id == node_execution_info.workflow_node_execution_id).first()
+                route_chunk_node_execution = self._get_workflow_node_execution(
+                    node_execution_info.workflow_node_execution_id)
 
                 if not route_chunk_node_execution:
                     continue
@@ -0,0 +1,154 @@
+import base64
+import hashlib
+import json
+import logging
+import time
+from typing import Optional
+
+import numpy as np
+from flask import current_app
+from prometheus_client import Counter
+
+from core.app.app_config.entities import EasyUIBasedAppConfig
+from core.embedding.cached_embedding import CacheEmbedding
+from core.embedding.embedding_codec import EmbeddingCodec, EmbeddingStorageDtype
+from core.helper.dataset_index_version import DatasetIndexVersion
+from core.model_manager import ModelInstance, ModelManager
+from core.model_runtime.entities.model_entities import ModelType
+from extensions.ext_redis import redis_client
+
+logger = logging.getLogger(__name__)
+
+semantic_cache_lookups = Counter(
+    'semantic_cache_lookups_total',
+    'Semantic answer cache lookups of chat apps, by result',
+    ['result']
+)
+
+
+class SemanticCacheFeature:
+    """
+    Cache of recent answers of an app, looked up by the similarity of query embeddings.
+
+    Answers are scoped by the app model config, the inputs, the embedding model and the index versions
+    of the app datasets, so that changing the app config or any of its datasets starts a new scope.
+    Each scope keeps the latest `SEMANTIC_CACHE_MAX_ENTRIES` answers for `SEMANTIC_CACHE_TTL` seconds.
+    """
+
+    def __init__(self, app_config: EasyUIBasedAppConfig, inputs: dict, user_id: Optional[str] = None):
+        self._app_config = app_config
+        self._inputs = inputs
+        self._user_id = user_id
+        self._ttl = int(current_app.config.get('SEMANTIC_CACHE_TTL', 3600))
+        self._max_entries = int(current_app.config.get('SEMANTIC_CACHE_MAX_ENTRIES', 200))
+        self._embedding_model_instance = None
+        self._cache_key = None
+
+    def query(self, query: str) -> Optional[str]:
+        """
+        Query cached answer of the most similar answered query
+
+        :param query: query
+        :return: cached answer if similarity reaches the app score threshold
+        """
+        try:
+            cache_key = self._get_cache_key()
+            if not cache_key:
+                return None
+
+            entries = redis_client.lrange(cache_key, 0, -1)
+            if not entries:
+                semantic_cache_lookups.labels('miss').inc()
+                return None
+
+            now = time.time()
+            entries = [json.loads(entry) for entry in entries]
+            entries = [entry for entry in entries if now - entry['created_at'] < self._ttl]
+            if not entries:
+                semantic_cache_lookups.labels('miss').inc()
+                return None
+
+            query_embedding = np.array(self._embed_query(query), dtype=np.float32)
+            cached_embeddings = np.array([
+                EmbeddingCodec.decode(base64.b64decode(entry['embedding'])) for entry in entries
+            ], dtype=np.float32)
+            # embeddings are normalized, dot product is cosine similarity
+            similarities = cached_embeddings @ query_embedding
+            index = int(np.argmax(similarities))
+            if similarities[index] < self._app_config.additional_features.semantic_cache.score_threshold:
+                semantic_cache_lookups.labels('miss').inc()
+                return None
+
+            semantic_cache_lookups.labels('hit').inc()
+            return entries[index]['answer']
+        except Exception as e:
+            logger.warning(f'Query semantic cache failed, exception: {str(e)}.')
+            return None
+
+    def save(self, query: str, answer: str) -> None:
+        """
+        Save answer of query, evicting the oldest answers of the scope over max entries
+
+        :param query: query
+        :param answer: answer
+        :return:
+        """
+        if not answer:
+            return
+
+        try:
+            cache_key = self._get_cache_key()
+            if not cache_key:
+                return
+
+            embedding = EmbeddingCodec.encode(self._embed_query(query), EmbeddingStorageDtype.FLOAT16)
+            entry = json.dumps({
+                'embedding': base64.b64encode(embedding).decode('utf-8'),
+                'answer': answer,
+                'created_at': time.time()
+            })
+
+            pipeline = redis_client.pipeline()
+            pipeline.lpush(cache_key, entry)
+            pipeline.ltrim(cache_key, 0, self._max_entries - 1)
+            pipeline.expire(cache_key, self._ttl)
+            pipeline.execute()
+        except Exception as e:
+            logger.warning(f'Save semantic cache failed, exception: {str(e)}.')
+
+    def _embed_query(self, query: str) -> list[float]:
+        return CacheEmbedding(self._get_embedding_model_instance(), self._user_id).embed_query(query)
+
+    def _get_embedding_model_instance(self) -> Optional[ModelInstance]:
+        if not self._embedding_model_instance:
+            try:
+                self._embedding_model_instance = ModelManager().get_default_model_instance(
+                    tenant_id=self._app_config.tenant_id,
+                    model_type=ModelType.TEXT_EMBEDDING
+                )
+            except Exception as e:
+                logger.info(f'No default embedding model for semantic cache, exception: {str(e)}.')
+                return None
+        return self._embedding_model_instance
+
+    def _get_cache_key(self) -> Optional[str]:
+        """
+        Get cache key of the answers scope, None if no embedding model is available
+        """
+        if self._cache_key:
+            return self._cache_key
+
+        embedding_model_instance = self._get_embedding_model_instance()
+        if not embedding_model_instance:
+            return None
+
+        dataset_ids = sorted(self._app_config.dataset.dataset_ids) if self._app_config.dataset else []
+        scope = json.dumps({
+            'app_model_config': self._app_config.app_model_config_dict,
+            'inputs': self._inputs,
+            'embedding_model': [embedding_model_instance.provider, embedding_model_instance.model],
+            'dataset_versions': DatasetIndexVersion.get_many(dataset_ids),
+        }, sort_keys=True, default=str)
+        scope_hash = hashlib.sha256(scope.encode()).hexdigest()
+        self._cache_key = f'semantic_cache:{self._app_config.app_id}:{scope_hash}'
+        return self._cache_key
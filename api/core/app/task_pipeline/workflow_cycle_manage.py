@@ -3,6 +3,8 @@ import time
 from datetime import datetime, timezone
 from typing import Optional, Union, cast
 
+from flask import current_app
+
 from core.app.entities.app_invoke_entities import InvokeFrom
 from core.app.entities.queue_entities import (
     QueueNodeFailedEvent,
@@ -20,6 +22,7 @@ from core.app.entities.task_entities import (
     WorkflowStartStreamResponse,
 )
 from core.app.task_pipeline.workflow_iteration_cycle_manage import WorkflowIterationCycleManage
+from core.app.task_pipeline.workflow_node_execution_writer import WorkflowNodeExecutionWriter
 from core.file.file_obj import FileVar
 from core.model_runtime.utils.encoders import jsonable_encoder
 from core.tools.tool_manager import ToolManager
@@ -183,10 +186,7 @@ class WorkflowCycleManage(WorkflowIterationCycleManage):
             created_by=workflow_run.created_by
         )
 
-        db.session.add(workflow_node_execution)
-        db.session.commit()
-        db.session.refresh(workflow_node_execution)
-        db.session.close()
+        self._save_workflow_node_execution(workflow_node_execution)
 
         return workflow_node_execution
 
@@ -218,9 +218,7 @@ class WorkflowCycleManage(WorkflowIterationCycleManage):
             if execution_metadata else None
         workflow_node_execution.finished_at = datetime.now(timezone.utc).replace(tzinfo=None)
 
-        db.session.commit()
-        db.session.refresh(workflow_node_execution)
-        db.session.close()
+        self._save_workflow_node_execution(workflow_node_execution)
 
         return workflow_node_execution
 
@@ -252,9 +250,7 @@ class WorkflowCycleManage(WorkflowIterationCycleManage):
         workflow_node_execution.execution_metadata = json.dumps(jsonable_encoder(execution_metadata)) \
             if execution_metadata else None
 
-        db.session.commit()
-        db.session.refresh(workflow_node_execution)
-        db.session.close()
+        self._save_workflow_node_execution(workflow_node_execution)
 
         return workflow_node_execution
 
@@ -406,12 +402,16 @@ class WorkflowCycleManage(WorkflowIterationCycleManage):
 
         self._task_state.workflow_run_id = workflow_run.id
 
+        if current_app.config.get('WORKFLOW_NODE_EXECUTION_WRITE_BEHIND_ENABLED'):
+            self._workflow_run = workflow_run
+            self._node_execution_writer = WorkflowNodeExecutionWriter()
+
         db.session.close()
 
         return workflow_run
 
     def _handle_node_start(self, event: QueueNodeStartedEvent) -> WorkflowNodeExecution:
-        workflow_run = db.session.query(WorkflowRun).filter(WorkflowRun.id == self._task_state.workflow_run_id).first()
+        workflow_run = self._get_workflow_run()
         workflow_node_execution = self._init_node_execution_from_workflow_run(
             workflow_run=workflow_run,
             node_id=event.node_id,
@@ -438,8 +438,8 @@ class WorkflowCycleManage(WorkflowIterationCycleManage):
 
     def _handle_node_finished(self, event: QueueNodeSucceededEvent | QueueNodeFailedEvent) -> WorkflowNodeExecution:
         current_node_execution = self._task_state.ran_node_execution_infos[event.node_id]
-        workflow_node_execution = db.session.query(WorkflowNodeExecution).filter(
-            WorkflowNodeExecution.id == current_node_execution.workflow_node_execution_id).first()
+        workflow_node_execution = self._get_workflow_node_execution(
+            current_node_execution.workflow_node_execution_id)
         
         execution_metadata = event.execution_metadata if isinstance(event, QueueNodeSucceededEvent) else None
         
@@ -498,6 +498,22 @@ class WorkflowCycleManage(WorkflowIterationCycleManage):
 
     def _handle_workflow_finished(self, event: QueueStopEvent | QueueWorkflowSucceededEvent | QueueWorkflowFailedEvent) \
             -> Optional[WorkflowRun]:
+        if isinstance(event, QueueStopEvent):
+            latest_node_execution_info = self._task_state.latest_node_execution_info
+            if latest_node_execution_info:
+                workflow_node_execution = self._get_workflow_node_execution(
+                    latest_node_execution_info.workflow_node_execution_id)
+                if (workflow_node_execution
+                        and workflow_node_execution.status == WorkflowNodeExecutionStatus.RUNNING.value):
+                    self._workflow_node_execution_failed(
+                        workflow_node_execution=workflow_node_execution,
+                        start_at=latest_node_execution_info.start_at,
+                        error='Workflow stopped.'
+                    )
+
+        # node executions are persisted before the final state of run
+        self._close_node_execution_writer()
+
         workflow_run = db.session.query(WorkflowRun).filter(
             WorkflowRun.id == self._task_state.workflow_run_id).first()
         if not workflow_run:
@@ -512,18 +528,6 @@ class WorkflowCycleManage(WorkflowIterationCycleManage):
                 status=WorkflowRunStatus.STOPPED,
                 error='Workflow stopped.'
             )
-
-            latest_node_execution_info = self._task_state.latest_node_execution_info
-            if latest_node_execution_info:
-                workflow_node_execution = db.session.query(WorkflowNodeExecution).filter(
-                    WorkflowNodeExecution.id == latest_node_execution_info.workflow_node_execution_id).first()
-                if (workflow_node_execution
-                        and workflow_node_execution.status == WorkflowNodeExecutionStatus.RUNNING.value):
-                    self._workflow_node_execution_failed(
-                        workflow_node_execution=workflow_node_execution,
-                        start_at=latest_node_execution_info.start_at,
-                        error='Workflow stopped.'
-                    )
         elif isinstance(event, QueueWorkflowFailedEvent):
             workflow_run = self._workflow_run_failed(
                 workflow_run=workflow_run,
@@ -535,8 +539,8 @@ class WorkflowCycleManage(WorkflowIterationCycleManage):
             )
         else:
             if self._task_state.latest_node_execution_info:
-                workflow_node_execution = db.session.query(WorkflowNodeExecution).filter(
-                    WorkflowNodeExecution.id == self._task_state.latest_node_execution_info.workflow_node_execution_id).first()
+                workflow_node_execution = self._get_workflow_node_execution(
+                    self._task_state.latest_node_execution_info.workflow_node_execution_id)
                 outputs = workflow_node_execution.outputs
             else:
                 outputs = None
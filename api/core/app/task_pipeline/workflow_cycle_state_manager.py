@@ -1,11 +1,16 @@
-from typing import Any, Union
+import uuid
+from collections.abc import Generator
+from datetime import datetime, timezone
+from typing import Any, Optional, Union
 
 from core.app.entities.app_invoke_entities import AdvancedChatAppGenerateEntity, WorkflowAppGenerateEntity
 from core.app.entities.task_entities import AdvancedChatTaskState, WorkflowTaskState
+from core.app.task_pipeline.workflow_node_execution_writer import WorkflowNodeExecutionWriter
 from core.workflow.entities.node_entities import SystemVariable
+from extensions.ext_database import db
 from models.account import Account
 from models.model import EndUser
-from models.workflow import Workflow
+from models.workflow import Workflow, WorkflowNodeExecution, WorkflowRun
 
 
 class WorkflowCycleStateManager:
@@ -13,4 +18,66 @@ class WorkflowCycleStateManager:
     _workflow: Workflow
     _user: Union[Account, EndUser]
     _task_state: Union[AdvancedChatTaskState, WorkflowTaskState]
-    _workflow_system_variables: dict[SystemVariable, Any]
\ No newline at end of file
+    _workflow_system_variables: dict[SystemVariable, Any]
+    # write-behind mode only
+    _node_execution_writer: Optional[WorkflowNodeExecutionWriter] = None
+    _workflow_run: Optional[WorkflowRun] = None
+
+    def _get_workflow_run(self) -> Optional[WorkflowRun]:
+        """
+        Get workflow run of the task, the detached run started by this task in write-behind mode
+        :return:
+        """
+        if self._node_execution_writer:
+            return self._workflow_run
+
+        return db.session.query(WorkflowRun).filter(WorkflowRun.id == self._task_state.workflow_run_id).first()
+
+    def _get_workflow_node_execution(self, workflow_node_execution_id: str) -> Optional[WorkflowNodeExecution]:
+        """
+        Get workflow node execution, from memory in write-behind mode
+        :param workflow_node_execution_id: workflow node execution id
+        :return:
+        """
+        if self._node_execution_writer:
+            return self._node_execution_writer.get(workflow_node_execution_id)
+
+        return db.session.query(WorkflowNodeExecution).filter(
+            WorkflowNodeExecution.id == workflow_node_execution_id).first()
+
+    def _save_workflow_node_execution(self, workflow_node_execution: WorkflowNodeExecution) -> None:
+        """
+        Save new or changed workflow node execution, written by the background writer in write-behind mode
+        :param workflow_node_execution: workflow node execution
+        :return:
+        """
+        if self._node_execution_writer:
+            if not workflow_node_execution.id:
+                # defaults generated by database otherwise
+                workflow_node_execution.id = str(uuid.uuid4())
+                workflow_node_execution.created_at = datetime.now(timezone.utc).replace(tzinfo=None)
+                workflow_node_execution.elapsed_time = workflow_node_execution.elapsed_time or 0
+
+            self._node_execution_writer.save(workflow_node_execution)
+            return
+
+        db.session.add(workflow_node_execution)
+        db.session.commit()
+        db.session.refresh(workflow_node_execution)
+        db.session.close()
+
+    def _close_node_execution_writer(self) -> None:
+        """
+        Flush node executions of write-behind mode
+        """
+        if self._node_execution_writer:
+            self._node_execution_writer.close()
+
+    def _close_node_execution_writer_on_exit(self, generator: Generator) -> Generator:
+        """
+        Flush node executions of write-behind mode when the stream ends, including client disconnects
+        """
+        try:
+            yield from generator
+        finally:
+            self._close_node_execution_writer()
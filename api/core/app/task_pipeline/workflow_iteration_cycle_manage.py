@@ -130,10 +130,7 @@ class WorkflowIterationCycleManage(WorkflowCycleStateManager):
             })
         )
 
-        db.session.add(workflow_node_execution)
-        db.session.commit()
-        db.session.refresh(workflow_node_execution)
-        db.session.close()
+        self._save_workflow_node_execution(workflow_node_execution)
 
         return workflow_node_execution
     
@@ -148,7 +145,7 @@ class WorkflowIterationCycleManage(WorkflowCycleStateManager):
     def _handle_iteration_started(self, event: QueueIterationStartEvent) -> WorkflowNodeExecution:
         self._init_iteration_state()
 
-        workflow_run = db.session.query(WorkflowRun).filter(WorkflowRun.id == self._task_state.workflow_run_id).first()
+        workflow_run = self._get_workflow_run()
         workflow_node_execution = self._init_iteration_execution_from_workflow_run(
             workflow_run=workflow_run,
             node_id=event.node_id,
@@ -190,9 +187,7 @@ class WorkflowIterationCycleManage(WorkflowCycleStateManager):
         current_iteration = self._iteration_state.current_iterations[event.node_id]
         current_iteration.current_index = event.index
         current_iteration.iteration_steps_boundary.append(event.node_run_index)
-        workflow_node_execution: WorkflowNodeExecution = db.session.query(WorkflowNodeExecution).filter(
-            WorkflowNodeExecution.id == current_iteration.node_execution_id
-        ).first()
+        workflow_node_execution = self._get_workflow_node_execution(current_iteration.node_execution_id)
 
         original_node_execution_metadata = workflow_node_execution.execution_metadata_dict
         if original_node_execution_metadata:
@@ -201,7 +196,7 @@ class WorkflowIterationCycleManage(WorkflowCycleStateManager):
             original_node_execution_metadata['total_tokens'] = current_iteration.total_tokens
             workflow_node_execution.execution_metadata = json.dumps(original_node_execution_metadata)
 
-            db.session.commit()
+            self._save_workflow_node_execution(workflow_node_execution)
 
         db.session.close()
 
@@ -210,9 +205,7 @@ class WorkflowIterationCycleManage(WorkflowCycleStateManager):
             return
         
         current_iteration = self._iteration_state.current_iterations[event.node_id]
-        workflow_node_execution: WorkflowNodeExecution = db.session.query(WorkflowNodeExecution).filter(
-            WorkflowNodeExecution.id == current_iteration.node_execution_id
-        ).first()
+        workflow_node_execution = self._get_workflow_node_execution(current_iteration.node_execution_id)
 
         workflow_node_execution.status = WorkflowNodeExecutionStatus.SUCCEEDED.value
         workflow_node_execution.outputs = json.dumps(event.outputs) if event.outputs else None
@@ -224,7 +217,7 @@ class WorkflowIterationCycleManage(WorkflowCycleStateManager):
             original_node_execution_metadata['total_tokens'] = current_iteration.total_tokens
             workflow_node_execution.execution_metadata = json.dumps(original_node_execution_metadata)
 
-        db.session.commit()
+        self._save_workflow_node_execution(workflow_node_execution)
 
         # remove current iteration
         self._iteration_state.current_iterations.pop(event.node_id, None)
@@ -248,16 +241,13 @@ class WorkflowIterationCycleManage(WorkflowCycleStateManager):
             return
         
         for node_id, current_iteration in self._iteration_state.current_iterations.items():
-            workflow_node_execution: WorkflowNodeExecution = db.session.query(WorkflowNodeExecution).filter(
-                WorkflowNodeExecution.id == current_iteration.node_execution_id
-            ).first()
+            workflow_node_execution = self._get_workflow_node_execution(current_iteration.node_execution_id)
 
             workflow_node_execution.status = WorkflowNodeExecutionStatus.FAILED.value
             workflow_node_execution.error = error
             workflow_node_execution.elapsed_time = time.perf_counter() - current_iteration.started_at
 
-            db.session.commit()
-            db.session.close()
+            self._save_workflow_node_execution(workflow_node_execution)
 
             yield IterationNodeCompletedStreamResponse(
                 task_id=task_id,
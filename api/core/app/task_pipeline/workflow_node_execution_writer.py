@@ -0,0 +1,115 @@
+import logging
+import threading
+from typing import Optional
+
+from flask import Flask, current_app
+from sqlalchemy.dialects.postgresql import insert
+
+from extensions.ext_database import db
+from models.workflow import WorkflowNodeExecution
+
+logger = logging.getLogger(__name__)
+
+
+class WorkflowNodeExecutionWriter:
+    """
+    Write-behind persistence of the node executions of a workflow run.
+
+    Node executions are kept in memory and upserted in bulk by a background writer every
+    `WORKFLOW_NODE_EXECUTION_FLUSH_INTERVAL_MS` milliseconds, so that streaming node events does not wait for
+    the database. `close` flushes the remaining changes synchronously, and is called before the final state
+    of the workflow run is saved.
+    """
+
+    def __init__(self, flush_interval_ms: Optional[int] = None):
+        if flush_interval_ms is None:
+            flush_interval_ms = int(current_app.config.get('WORKFLOW_NODE_EXECUTION_FLUSH_INTERVAL_MS', 500))
+
+        self._flush_interval = flush_interval_ms / 1000
+        self._executions: dict[str, WorkflowNodeExecution] = {}
+        self._dirty_ids: set[str] = set()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._closed = threading.Event()
+        self._thread = threading.Thread(target=self._run, kwargs={
+            'flask_app': current_app._get_current_object()
+        }, daemon=True)
+        self._thread.start()
+
+    def get(self, workflow_node_execution_id: str) -> Optional[WorkflowNodeExecution]:
+        """
+        Get node execution of the run
+
+        :param workflow_node_execution_id: workflow node execution id
+        :return:
+        """
+        return self._executions.get(workflow_node_execution_id)
+
+    def save(self, workflow_node_execution: WorkflowNodeExecution) -> None:
+        """
+        Save node execution in memory, to be written by the next flush
+
+        :param workflow_node_execution: workflow node execution with id and created_at set
+        :return:
+        """
+        with self._lock:
+            self._executions[workflow_node_execution.id] = workflow_node_execution
+            self._dirty_ids.add(workflow_node_execution.id)
+
+        if self._closed.is_set():
+            # saved after close, e.g. node failed after workflow finished
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Upsert changed node executions in one statement
+        """
+        with self._flush_lock:
+            with self._lock:
+                dirty_ids, self._dirty_ids = self._dirty_ids, set()
+                rows = [self._to_row(self._executions[dirty_id]) for dirty_id in dirty_ids]
+
+            if not rows:
+                return
+
+            try:
+                stmt = insert(WorkflowNodeExecution).values(rows)
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[WorkflowNodeExecution.id],
+                    set_={column: stmt.excluded[column] for column in rows[0] if column != 'id'}
+                )
+                db.session.execute(stmt)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                # retry with the next flush
+                with self._lock:
+                    self._dirty_ids.update(dirty_ids)
+                raise
+            finally:
+                db.session.close()
+
+    def close(self) -> None:
+        """
+        Stop background writer and flush remaining changes
+        """
+        if not self._closed.is_set():
+            self._closed.set()
+            self._thread.join()
+        self.flush()
+
+    def _run(self, flask_app: Flask) -> None:
+        with flask_app.app_context():
+            while not self._closed.wait(self._flush_interval):
+                try:
+                    self.flush()
+                except Exception:
+                    logger.exception('Failed to flush workflow node executions')
+            db.session.remove()
+
+    @staticmethod
+    def _to_row(workflow_node_execution: WorkflowNodeExecution) -> dict:
+        return {
+            column.name: getattr(workflow_node_execution, column.key)
+            for column in WorkflowNodeExecution.__table__.columns
+        }
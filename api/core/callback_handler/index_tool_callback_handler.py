@@ -4,7 +4,7 @@ from core.app.entities.app_invoke_entities import InvokeFrom
 from core.app.entities.queue_entities import QueueRetrieverResourcesEvent
 from core.rag.models.document import Document
 from extensions.ext_database import db
-from models.dataset import DatasetQuery, DocumentSegment
+from extensions.ext_retrieval_log import retrieval_log
 from models.model import DatasetRetrieverResource
 
 
@@ -26,37 +26,15 @@ class DatasetIndexToolCallbackHandler:
         """
         Handle query.
         """
-        dataset_query = DatasetQuery(
-            dataset_id=dataset_id,
-            content=query,
-            source='app',
-            source_app_id=self._app_id,
-            created_by_role=('account'
-                             if self._invoke_from in [InvokeFrom.EXPLORE, InvokeFrom.DEBUGGER] else 'end_user'),
-            created_by=self._user_id
+        retrieval_log.add_queries(
+            query, [dataset_id], self._app_id,
+            'account' if self._invoke_from in [InvokeFrom.EXPLORE, InvokeFrom.DEBUGGER] else 'end_user',
+            self._user_id
         )
 
-        db.session.add(dataset_query)
-        db.session.commit()
-
     def on_tool_end(self, documents: list[Document]) -> None:
         """Handle tool end."""
-        for document in documents:
-            query = db.session.query(DocumentSegment).filter(
-                DocumentSegment.index_node_id == document.metadata['doc_id']
-            )
-
-            # if 'dataset_id' in document.metadata:
-            if 'dataset_id' in document.metadata:
-                query = query.filter(DocumentSegment.dataset_id == document.metadata['dataset_id'])
-
-            # add hit count to document segment
-            query.update(
-                {DocumentSegment.hit_count: DocumentSegment.hit_count + 1},
-                synchronize_session=False
-            )
-
-            db.session.commit()
+        retrieval_log.add_hits(documents)
 
     def return_retriever_resource_info(self, resource: list):
         """Handle return_retriever_resource_info."""
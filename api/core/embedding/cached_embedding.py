@@ -1,10 +1,16 @@
 import base64
 import logging
+import threading
 from typing import Optional, cast
 
 import numpy as np
+from flask import current_app
+from prometheus_client import Counter, Gauge
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.exc import IntegrityError
 
+from core.embedding.embedding_codec import EmbeddingCodec, EmbeddingStorageDtype
+from core.embedding.embedding_dispatcher import EmbeddingDispatcher
 from core.model_manager import ModelInstance
 from core.model_runtime.entities.model_entities import ModelPropertyKey
 from core.model_runtime.model_providers.__base.text_embedding_model import TextEmbeddingModel
@@ -17,6 +23,32 @@ from models.dataset import Embedding
 logger = logging.getLogger(__name__)
 
 
+embedding_cache_lookups = Counter(
+    'embedding_cache_lookups_total',
+    'Document embedding cache lookups, by tier and result',
+    ['provider', 'model', 'tier', 'result']
+)
+embedding_cache_hit_ratio = Gauge(
+    'embedding_cache_hit_ratio',
+    'Document embedding cache hit ratio since process start, by tier',
+    ['provider', 'model', 'tier']
+)
+
+_embedding_cache_lookup_totals: dict[tuple[str, str, str], list[int]] = {}
+_embedding_cache_lookup_totals_lock = threading.Lock()
+
+
+def _record_embedding_cache_lookups(provider: str, model: str, tier: str, hits: int, misses: int) -> None:
+    embedding_cache_lookups.labels(provider, model, tier, 'hit').inc(hits)
+    embedding_cache_lookups.labels(provider, model, tier, 'miss').inc(misses)
+    with _embedding_cache_lookup_totals_lock:
+        totals = _embedding_cache_lookup_totals.setdefault((provider, model, tier), [0, 0])
+        totals[0] += hits
+        totals[1] += hits + misses
+        if totals[1]:
+            embedding_cache_hit_ratio.labels(provider, model, tier).set(totals[0] / totals[1])
+
+
 class CacheEmbedding(Embeddings):
     def __init__(self, model_instance: ModelInstance, user: Optional[str] = None) -> None:
         self._model_instance = model_instance
@@ -26,56 +58,44 @@ class CacheEmbedding(Embeddings):
         """Embed search docs in batches of 10."""
         # use doc embedding cache or store if not exists
         text_embeddings = [None for _ in range(len(texts))]
+        text_hashes = [helper.generate_text_hash(text) for text in texts]
+        cached_embeddings = self._get_cached_embeddings(list(dict.fromkeys(text_hashes)))
+
         embedding_queue_indices = []
-        for i, text in enumerate(texts):
-            hash = helper.generate_text_hash(text)
-            embedding = db.session.query(Embedding).filter_by(model_name=self._model_instance.model,
-                                                              hash=hash,
-                                                              provider_name=self._model_instance.provider).first()
-            if embedding:
-                text_embeddings[i] = embedding.get_embedding()
-            else:
+        queued_hashes = set()
+        for i, hash in enumerate(text_hashes):
+            embedding = cached_embeddings.get(hash)
+            if embedding is not None:
+                text_embeddings[i] = embedding
+            elif hash not in queued_hashes:
+                # embed duplicated texts only once
                 embedding_queue_indices.append(i)
+                queued_hashes.add(hash)
         if embedding_queue_indices:
             embedding_queue_texts = [texts[i] for i in embedding_queue_indices]
-            embedding_queue_embeddings = []
             try:
                 model_type_instance = cast(TextEmbeddingModel, self._model_instance.model_type_instance)
                 model_schema = model_type_instance.get_model_schema(self._model_instance.model,
                                                                     self._model_instance.credentials)
                 max_chunks = model_schema.model_properties[ModelPropertyKey.MAX_CHUNKS] \
                     if model_schema and ModelPropertyKey.MAX_CHUNKS in model_schema.model_properties else 1
-                for i in range(0, len(embedding_queue_texts), max_chunks):
-                    batch_texts = embedding_queue_texts[i:i + max_chunks]
+                batches = [embedding_queue_texts[i:i + max_chunks]
+                           for i in range(0, len(embedding_queue_texts), max_chunks)]
 
-                    embedding_result = self._model_instance.invoke_text_embedding(
-                        texts=batch_texts,
-                        user=self._user
-                    )
+                # embed batches concurrently within provider limits, results keep batch order
+                dispatcher = EmbeddingDispatcher(self._model_instance, user=self._user)
+                embedding_queue_embeddings = [embedding for batch_embeddings in dispatcher.embed(batches)
+                                              for embedding in batch_embeddings]
 
-                    for vector in embedding_result.embeddings:
-                        try:
-                            normalized_embedding = (vector / np.linalg.norm(vector)).tolist()
-                            embedding_queue_embeddings.append(normalized_embedding)
-                        except IntegrityError:
-                            db.session.rollback()
-                        except Exception as e:
-                            logging.exception('Failed transform embedding: ', e)
-                cache_embeddings = []
-                try:
-                    for i, embedding in zip(embedding_queue_indices, embedding_queue_embeddings):
-                        text_embeddings[i] = embedding
-                        hash = helper.generate_text_hash(texts[i])
-                        if hash not in cache_embeddings:
-                            embedding_cache = Embedding(model_name=self._model_instance.model,
-                                                        hash=hash,
-                                                        provider_name=self._model_instance.provider)
-                            embedding_cache.set_embedding(embedding)
-                            db.session.add(embedding_cache)
-                            cache_embeddings.append(hash)
-                    db.session.commit()
-                except IntegrityError:
-                    db.session.rollback()
+                new_embeddings = {}
+                for i, embedding in zip(embedding_queue_indices, embedding_queue_embeddings):
+                    new_embeddings[text_hashes[i]] = embedding
+
+                for i, hash in enumerate(text_hashes):
+                    if text_embeddings[i] is None:
+                        text_embeddings[i] = new_embeddings.get(hash)
+
+                self._save_embeddings(new_embeddings)
             except Exception as ex:
                 db.session.rollback()
                 logger.error('Failed to embed documents: ', ex)
@@ -83,6 +103,122 @@ class CacheEmbedding(Embeddings):
 
         return text_embeddings
 
+    def _get_cached_embeddings(self, hashes: list[str]) -> dict[str, list[float]]:
+        """
+        Get cached embeddings of text hashes, from redis first if enabled and then from database,
+        with one bulk lookup per batch
+        :param hashes: unique text hashes
+        :return: text hash -> embedding, missed hashes are omitted
+        """
+        provider_name = self._model_instance.provider
+        model_name = self._model_instance.model
+        batch_size = int(current_app.config.get('EMBEDDING_CACHE_LOOKUP_BATCH_SIZE', 1000))
+        redis_enabled = current_app.config.get('EMBEDDING_CACHE_REDIS_ENABLED', False)
+
+        cached_embeddings = {}
+        missed_hashes = hashes
+        if redis_enabled and hashes:
+            missed_hashes = []
+            for i in range(0, len(hashes), batch_size):
+                batch_hashes = hashes[i:i + batch_size]
+                try:
+                    cached_values = redis_client.mget(
+                        [self._embedding_cache_key(hash) for hash in batch_hashes]
+                    )
+                except Exception:
+                    logging.exception('Failed to get embeddings from redis')
+                    cached_values = [None] * len(batch_hashes)
+
+                for hash, cached_value in zip(batch_hashes, cached_values):
+                    if cached_value:
+                        cached_embeddings[hash] = EmbeddingCodec.decode(cached_value)
+                    else:
+                        missed_hashes.append(hash)
+
+            _record_embedding_cache_lookups(provider_name, model_name, 'redis',
+                                            hits=len(cached_embeddings), misses=len(missed_hashes))
+
+        database_embeddings = {}
+        for i in range(0, len(missed_hashes), batch_size):
+            batch_hashes = missed_hashes[i:i + batch_size]
+            embeddings = db.session.query(Embedding).filter(
+                Embedding.model_name == model_name,
+                Embedding.provider_name == provider_name,
+                Embedding.hash.in_(batch_hashes)
+            ).all()
+            for embedding in embeddings:
+                database_embeddings[embedding.hash] = embedding.get_embedding()
+
+        if missed_hashes:
+            _record_embedding_cache_lookups(provider_name, model_name, 'database',
+                                            hits=len(database_embeddings),
+                                            misses=len(missed_hashes) - len(database_embeddings))
+
+        if redis_enabled and database_embeddings:
+            # read through, warm up redis with embeddings found in database
+            self._set_redis_embeddings(database_embeddings)
+
+        cached_embeddings.update(database_embeddings)
+        return cached_embeddings
+
+    def _save_embeddings(self, embeddings: dict[str, list[float]]) -> None:
+        """
+        Save embeddings into cache with one bulk insert, rows stored concurrently are skipped
+        :param embeddings: text hash -> embedding
+        :return:
+        """
+        if not embeddings:
+            return
+
+        storage_dtype = self._get_storage_dtype()
+        values = []
+        for hash, embedding in embeddings.items():
+            embedding_cache = Embedding(model_name=self._model_instance.model,
+                                        hash=hash,
+                                        provider_name=self._model_instance.provider)
+            embedding_cache.set_embedding(embedding, storage_dtype)
+            values.append({
+                'model_name': embedding_cache.model_name,
+                'hash': embedding_cache.hash,
+                'provider_name': embedding_cache.provider_name,
+                'embedding': embedding_cache.embedding
+            })
+
+        try:
+            db.session.execute(
+                insert(Embedding).values(values).on_conflict_do_nothing(
+                    index_elements=['model_name', 'hash', 'provider_name']
+                )
+            )
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+
+        if current_app.config.get('EMBEDDING_CACHE_REDIS_ENABLED', False):
+            self._set_redis_embeddings(embeddings)
+
+    def _set_redis_embeddings(self, embeddings: dict[str, list[float]]) -> None:
+        """
+        Set embeddings into redis cache
+        :param embeddings: text hash -> embedding
+        :return:
+        """
+        ttl = int(current_app.config.get('EMBEDDING_CACHE_REDIS_TTL', 600))
+        storage_dtype = self._get_storage_dtype()
+        try:
+            pipeline = redis_client.pipeline(transaction=False)
+            for hash, embedding in embeddings.items():
+                pipeline.setex(self._embedding_cache_key(hash), ttl, EmbeddingCodec.encode(embedding, storage_dtype))
+            pipeline.execute()
+        except Exception:
+            logging.exception('Failed to add embeddings to redis')
+
+    def _get_storage_dtype(self) -> EmbeddingStorageDtype:
+        return EmbeddingStorageDtype.value_of(current_app.config.get('EMBEDDING_CACHE_STORAGE_DTYPE', 'float32'))
+
+    def _embedding_cache_key(self, hash: str) -> str:
+        return f'embedding_cache:{self._model_instance.provider}:{self._model_instance.model}:{hash}'
+
     def embed_query(self, text: str) -> list[float]:
         """Embed query text."""
         # use doc embedding cache or store if not exists
@@ -91,6 +227,10 @@ class CacheEmbedding(Embeddings):
         embedding = redis_client.get(embedding_cache_key)
         if embedding:
             redis_client.expire(embedding_cache_key, 600)
+            if EmbeddingCodec.is_encoded(embedding):
+                return EmbeddingCodec.decode(embedding)
+
+            # legacy base64 encoded float64 embedding
             return list(np.frombuffer(base64.b64decode(embedding), dtype="float"))
         try:
             embedding_result = self._model_instance.invoke_text_embedding(
@@ -104,14 +244,9 @@ class CacheEmbedding(Embeddings):
             raise ex
 
         try:
-            # encode embedding to base64
-            embedding_vector = np.array(embedding_results)
-            vector_bytes = embedding_vector.tobytes()
-            # Transform to Base64
-            encoded_vector = base64.b64encode(vector_bytes)
-            # Transform to string
-            encoded_str = encoded_vector.decode("utf-8")
-            redis_client.setex(embedding_cache_key, 600, encoded_str)
+            # encode embedding to compact bytes
+            encoded_vector = EmbeddingCodec.encode(embedding_results, self._get_storage_dtype())
+            redis_client.setex(embedding_cache_key, 600, encoded_vector)
 
         except IntegrityError:
             db.session.rollback()
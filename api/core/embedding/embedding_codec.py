@@ -0,0 +1,115 @@
+import pickle
+import struct
+from enum import Enum
+
+import numpy as np
+
+
+class EmbeddingStorageDtype(Enum):
+    """
+    Embedding Storage Dtype Enum
+    """
+    FLOAT32 = 'float32'
+    FLOAT16 = 'float16'
+    INT8 = 'int8'
+
+    @classmethod
+    def value_of(cls, value: str) -> 'EmbeddingStorageDtype':
+        """
+        Get value of given dtype.
+
+        :param value: dtype value
+        :return: dtype
+        """
+        for dtype in cls:
+            if dtype.value == value:
+                return dtype
+        raise ValueError(f'invalid embedding storage dtype value {value}')
+
+
+class EmbeddingCodec:
+    """
+    Versioned compact binary format of embeddings.
+
+    Layout: magic (4 bytes) | version (1 byte) | dtype code (1 byte) | [scale (float32), int8 only] | vector,
+    all little-endian. Data without the magic prefix is decoded as one of the legacy formats,
+    pickled lists from the embeddings table or raw float64 bytes from redis.
+    """
+    MAGIC = b'EMBC'
+    VERSION = 1
+
+    _header = struct.Struct('<4sBB')
+    _scale = struct.Struct('<f')
+    _dtype_codes = {
+        EmbeddingStorageDtype.FLOAT32: 1,
+        EmbeddingStorageDtype.FLOAT16: 2,
+        EmbeddingStorageDtype.INT8: 3,
+    }
+    _numpy_dtypes = {
+        EmbeddingStorageDtype.FLOAT32: np.dtype('<f4'),
+        EmbeddingStorageDtype.FLOAT16: np.dtype('<f2'),
+        EmbeddingStorageDtype.INT8: np.dtype('i1'),
+    }
+
+    @classmethod
+    def encode(cls, embedding: list[float],
+               dtype: EmbeddingStorageDtype = EmbeddingStorageDtype.FLOAT32) -> bytes:
+        """
+        Encode embedding to bytes
+
+        :param embedding: embedding
+        :param dtype: storage dtype
+        :return:
+        """
+        vector = np.asarray(embedding, dtype=np.float32)
+        header = cls._header.pack(cls.MAGIC, cls.VERSION, cls._dtype_codes[dtype])
+        if dtype == EmbeddingStorageDtype.INT8:
+            max_value = float(np.max(np.abs(vector))) if vector.size else 0.0
+            scale = max_value / 127 if max_value else 1.0
+            quantized = np.clip(np.rint(vector / scale), -127, 127).astype(cls._numpy_dtypes[dtype])
+            return header + cls._scale.pack(scale) + quantized.tobytes()
+
+        return header + vector.astype(cls._numpy_dtypes[dtype]).tobytes()
+
+    @classmethod
+    def decode(cls, data: bytes) -> list[float]:
+        """
+        Decode embedding from bytes, legacy formats included
+
+        :param data: encoded embedding
+        :return:
+        """
+        if not cls.is_encoded(data):
+            if data[:1] == b'\x80':
+                # legacy pickled list of embeddings table
+                return pickle.loads(data)
+
+            # legacy raw float64 bytes
+            return np.frombuffer(data, dtype='<f8').tolist()
+
+        _, version, dtype_code = cls._header.unpack_from(data)
+        if version != cls.VERSION:
+            raise ValueError(f'unsupported embedding codec version {version}')
+
+        dtype = next((dtype for dtype, code in cls._dtype_codes.items() if code == dtype_code), None)
+        if dtype is None:
+            raise ValueError(f'unsupported embedding codec dtype {dtype_code}')
+
+        offset = cls._header.size
+        if dtype == EmbeddingStorageDtype.INT8:
+            scale, = cls._scale.unpack_from(data, offset)
+            offset += cls._scale.size
+            vector = np.frombuffer(data, dtype=cls._numpy_dtypes[dtype], offset=offset).astype(np.float32) * scale
+            return vector.tolist()
+
+        return np.frombuffer(data, dtype=cls._numpy_dtypes[dtype], offset=offset).astype(np.float32).tolist()
+
+    @classmethod
+    def is_encoded(cls, data: bytes) -> bool:
+        """
+        Check whether data is encoded by this codec
+
+        :param data: data
+        :return:
+        """
+        return data[:len(cls.MAGIC)] == cls.MAGIC
@@ -0,0 +1,188 @@
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import numpy as np
+from flask import Flask, current_app
+
+from core.model_manager import ModelInstance
+from core.model_runtime.errors.invoke import InvokeRateLimitError
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously up to `tokens_per_minute`, shared by all requests of a provider.
+    """
+
+    def __init__(self, tokens_per_minute: int):
+        self.capacity = tokens_per_minute
+        self.tokens = float(tokens_per_minute)
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: int) -> None:
+        """
+        Block until `tokens` are available and consume them
+
+        :param tokens: number of tokens, capped at bucket capacity
+        :return:
+        """
+        tokens = min(tokens, self.capacity)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.capacity / 60)
+                self.updated_at = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+
+                wait_seconds = (tokens - self.tokens) * 60 / self.capacity
+
+            time.sleep(wait_seconds)
+
+
+class EmbeddingDispatcher:
+    """
+    Dispatch embedding batches concurrently, bounded per provider by a concurrency limit
+    and a tokens per minute budget shared across the process.
+    Rate limited batches are retried with jittered exponential backoff.
+    """
+    _semaphores: dict[str, threading.BoundedSemaphore] = {}
+    _token_buckets: dict[str, TokenBucket] = {}
+    _lock = threading.Lock()
+
+    def __init__(self, model_instance: ModelInstance, user: Optional[str] = None,
+                 max_concurrency: Optional[int] = None,
+                 tokens_per_minute: Optional[int] = None,
+                 max_retries: Optional[int] = None,
+                 retry_base_delay: float = 1.0,
+                 retry_max_delay: float = 30.0) -> None:
+        config = current_app.config
+        provider = model_instance.provider
+
+        self._model_instance = model_instance
+        self._user = user
+        self._max_concurrency = max_concurrency or self._get_provider_setting(
+            config.get('EMBEDDING_PROVIDER_MAX_CONCURRENCY'), provider,
+            int(config.get('EMBEDDING_MAX_CONCURRENCY', 1))
+        )
+        self._tokens_per_minute = tokens_per_minute if tokens_per_minute is not None else self._get_provider_setting(
+            config.get('EMBEDDING_PROVIDER_TOKENS_PER_MINUTE'), provider,
+            int(config.get('EMBEDDING_TOKENS_PER_MINUTE', 0))
+        )
+        self._max_retries = max_retries if max_retries is not None \
+            else int(config.get('EMBEDDING_MAX_RETRIES', 3))
+        self._retry_base_delay = retry_base_delay
+        self._retry_max_delay = retry_max_delay
+
+    def embed(self, batches: list[list[str]]) -> list[list[list[float]]]:
+        """
+        Embed batches of texts, results are returned in batch order
+
+        :param batches: batches of texts
+        :return: normalized embeddings of each batch
+        """
+        if not batches:
+            return []
+
+        if self._max_concurrency <= 1 or len(batches) == 1:
+            return [self._embed_batch(batch) for batch in batches]
+
+        flask_app = current_app._get_current_object()
+        with ThreadPoolExecutor(max_workers=min(self._max_concurrency, len(batches))) as executor:
+            futures = [executor.submit(self._embed_batch_in_thread, flask_app, batch) for batch in batches]
+            return [future.result() for future in futures]
+
+    def _embed_batch_in_thread(self, flask_app: Flask, batch: list[str]) -> list[list[float]]:
+        with flask_app.app_context():
+            return self._embed_batch(batch)
+
+    def _embed_batch(self, batch: list[str]) -> list[list[float]]:
+        """
+        Embed one batch of texts within the provider limits
+
+        :param batch: texts
+        :return: normalized embeddings
+        """
+        provider = self._model_instance.provider
+        semaphore = self._get_semaphore(provider, self._max_concurrency)
+        token_bucket = self._get_token_bucket(provider, self._tokens_per_minute)
+
+        attempt = 0
+        while True:
+            if token_bucket:
+                token_bucket.acquire(self._estimate_tokens(batch))
+
+            with semaphore:
+                try:
+                    embedding_result = self._model_instance.invoke_text_embedding(
+                        texts=batch,
+                        user=self._user
+                    )
+                    break
+                except InvokeRateLimitError:
+                    if attempt >= self._max_retries:
+                        raise
+
+            # full jitter backoff, sleep outside of the semaphore
+            delay = random.uniform(0, min(self._retry_max_delay, self._retry_base_delay * (2 ** attempt)))
+            attempt += 1
+            logger.warning(f'Embedding rate limited by provider {provider}, retry {attempt} in {delay:.2f}s')
+            time.sleep(delay)
+
+        embeddings = []
+        for vector in embedding_result.embeddings:
+            try:
+                embeddings.append((vector / np.linalg.norm(vector)).tolist())
+            except Exception as e:
+                logging.exception('Failed transform embedding: ', e)
+
+        return embeddings
+
+    @staticmethod
+    def _estimate_tokens(texts: list[str]) -> int:
+        # rough estimation, about 4 characters per token
+        return sum(len(text) // 4 + 1 for text in texts)
+
+    @staticmethod
+    def _get_provider_setting(value: Optional[str], provider: str, default: int) -> int:
+        """
+        Get setting of provider from `provider:value` pairs separated by comma
+
+        :param value: setting value, e.g. `openai:8,cohere:2`
+        :param provider: provider name
+        :param default: default setting
+        :return:
+        """
+        if value:
+            for item in value.split(','):
+                name, _, setting = item.strip().partition(':')
+                if name == provider and setting:
+                    return int(setting)
+
+        return default
+
+    @classmethod
+    def _get_semaphore(cls, provider: str, max_concurrency: int) -> threading.BoundedSemaphore:
+        key = f'{provider}:{max_concurrency}'
+        with cls._lock:
+            if key not in cls._semaphores:
+                cls._semaphores[key] = threading.BoundedSemaphore(max(1, max_concurrency))
+            return cls._semaphores[key]
+
+    @classmethod
+    def _get_token_bucket(cls, provider: str, tokens_per_minute: int) -> Optional[TokenBucket]:
+        if tokens_per_minute <= 0:
+            return None
+
+        key = f'{provider}:{tokens_per_minute}'
+        with cls._lock:
+            if key not in cls._token_buckets:
+                cls._token_buckets[key] = TokenBucket(tokens_per_minute)
+            return cls._token_buckets[key]
@@ -0,0 +1,49 @@
+import logging
+
+from extensions.ext_redis import redis_client
+
+logger = logging.getLogger(__name__)
+
+
+class DatasetIndexVersion:
+    """
+    Version of the index of a dataset, increased whenever segments are indexed or removed,
+    so that caches derived from retrieval results can be scoped by it.
+    """
+    # longer than any cache scoped by the version
+    ttl = 30 * 24 * 3600
+
+    @staticmethod
+    def _cache_key(dataset_id: str) -> str:
+        return f"dataset_index_version:{dataset_id}"
+
+    @classmethod
+    def increase(cls, dataset_id: str) -> None:
+        """
+        Increase version of dataset index
+
+        :param dataset_id: dataset id
+        :return:
+        """
+        try:
+            cache_key = cls._cache_key(dataset_id)
+            pipeline = redis_client.pipeline()
+            pipeline.incr(cache_key)
+            pipeline.expire(cache_key, cls.ttl)
+            pipeline.execute()
+        except Exception:
+            logger.exception(f"Failed to increase index version of dataset {dataset_id}")
+
+    @classmethod
+    def get_many(cls, dataset_ids: list[str]) -> dict[str, int]:
+        """
+        Get versions of dataset indexes
+
+        :param dataset_ids: dataset ids
+        :return: dataset id -> version, 0 if never changed
+        """
+        if not dataset_ids:
+            return {}
+
+        versions = redis_client.mget([cls._cache_key(dataset_id) for dataset_id in dataset_ids])
+        return {dataset_id: int(version) if version else 0 for dataset_id, version in zip(dataset_ids, versions)}
@@ -0,0 +1,68 @@
+import json
+from json import JSONDecodeError
+from typing import Optional
+
+from extensions.ext_redis import redis_client
+
+
+class DocumentFileCache:
+    """
+    Cache of document -> upload file resolution, scoped by tenant and keyed by document id.
+    """
+    ttl = 600
+
+    def __init__(self, tenant_id: str):
+        self.tenant_id = tenant_id
+
+    def _cache_key(self, document_id: str) -> str:
+        return f"document_file:tenant_id:{self.tenant_id}:document_id:{document_id}"
+
+    def get_many(self, document_ids: list[str]) -> dict[str, Optional[dict]]:
+        """
+        Get cached upload files of documents.
+
+        :param document_ids: document ids
+        :return: document id -> file info, documents not cached are omitted
+        """
+        if not document_ids:
+            return {}
+
+        cached_values = redis_client.mget([self._cache_key(document_id) for document_id in document_ids])
+        result = {}
+        for document_id, cached_value in zip(document_ids, cached_values):
+            if cached_value is None:
+                continue
+
+            try:
+                result[document_id] = json.loads(cached_value.decode('utf-8'))
+            except (JSONDecodeError, UnicodeDecodeError):
+                continue
+
+        return result
+
+    def set_many(self, files: dict[str, Optional[dict]]) -> None:
+        """
+        Cache upload files of documents.
+
+        :param files: document id -> file info, None for documents without upload file
+        :return:
+        """
+        if not files:
+            return
+
+        pipeline = redis_client.pipeline(transaction=False)
+        for document_id, file in files.items():
+            pipeline.setex(self._cache_key(document_id), self.ttl, json.dumps(file))
+        pipeline.execute()
+
+    def delete(self, document_ids: list[str]) -> None:
+        """
+        Delete cached upload files of documents.
+
+        :param document_ids: document ids
+        :return:
+        """
+        if not document_ids:
+            return
+
+        redis_client.delete(*[self._cache_key(document_id) for document_id in document_ids])
@@ -0,0 +1,206 @@
+import queue
+import threading
+import time
+from collections.abc import Callable, Iterable
+from typing import Any, Optional
+
+from flask import Flask
+from prometheus_client import Counter, Gauge
+
+from extensions.ext_database import db
+
+indexing_pipeline_items = Counter(
+    'indexing_pipeline_items_total',
+    'Items processed by indexing pipeline stages',
+    ['stage']
+)
+indexing_pipeline_busy_seconds = Counter(
+    'indexing_pipeline_busy_seconds_total',
+    'Seconds indexing pipeline stages spent processing items, excluding waits on full queues',
+    ['stage']
+)
+indexing_pipeline_queue_size = Gauge(
+    'indexing_pipeline_queue_size',
+    'Items waiting in the input queues of indexing pipeline stages',
+    ['stage']
+)
+
+_END = object()
+
+# seconds between checks of pipeline stop while waiting on queues
+_POLL_INTERVAL = 0.1
+
+
+class PipelineStage:
+    """
+    Stage of an indexing pipeline.
+
+    `process` is called with each input item and returns the items for the next stage, an iterable that may
+    be a generator so that items are passed on as they are produced, or None.
+    """
+
+    def __init__(self, name: str, process: Callable[[Any], Optional[Iterable]], workers: int = 1):
+        if workers < 1:
+            raise ValueError(f'workers of indexing pipeline stage {name} must be at least 1')
+
+        self.name = name
+        self.process = process
+        self.workers = workers
+
+
+class IndexingPipeline:
+    """
+    Staged streaming pipeline with bounded queues between stages.
+
+    Each stage runs `workers` threads in an app context, taking items from its input queue. Stages block when
+    the queue of the next stage is full, so a slow stage holds back the stages before it and items in flight
+    stay bounded by the queue sizes. An exception raised by a stage stops the pipeline and is raised by `run`
+    once all workers stopped, stages handle the errors that should not stop other items themselves.
+
+    Items, busy seconds and queue sizes of stages are exported as metrics, and kept per run in `stats`.
+    """
+
+    def __init__(self, flask_app: Flask, stages: list[PipelineStage], queue_size: int = 16):
+        if not stages:
+            raise ValueError('indexing pipeline has no stages')
+
+        self._flask_app = flask_app
+        self._stages = stages
+        self._queues = [queue.Queue(maxsize=queue_size) for _ in stages]
+        self._finished_workers = [0] * len(stages)
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._error: Optional[BaseException] = None
+        self.stats = {
+            stage.name: {'items': 0, 'busy_seconds': 0.0, 'max_queue_size': 0} for stage in stages
+        }
+
+    def run(self, items: Iterable) -> None:
+        """
+        Run items through all stages, return when all items are processed
+
+        :param items: input items of the first stage
+        :return:
+        """
+        threads = [
+            threading.Thread(target=self._work, args=(index,), daemon=True)
+            for index, stage in enumerate(self._stages)
+            for _ in range(stage.workers)
+        ]
+        for thread in threads:
+            thread.start()
+
+        try:
+            for item in items:
+                if not self._put(0, item):
+                    break
+            for _ in range(self._stages[0].workers):
+                self._put(0, _END)
+        except BaseException as e:
+            self._stop(e)
+
+        for thread in threads:
+            thread.join()
+
+        if self._error:
+            raise self._error
+
+    def _work(self, index: int) -> None:
+        stage = self._stages[index]
+        with self._flask_app.app_context():
+            try:
+                while True:
+                    item = self._get(index)
+                    if item is _END:
+                        break
+
+                    started_at = time.perf_counter()
+                    outputs = iter(stage.process(item) or ())
+                    try:
+                        while True:
+                            try:
+                                output = next(outputs)
+                            except StopIteration:
+                                break
+                            finally:
+                                self._add_busy_seconds(stage.name, time.perf_counter() - started_at)
+
+                            if index + 1 < len(self._stages) and not self._put(index + 1, output):
+                                return
+                            started_at = time.perf_counter()
+                    finally:
+                        if hasattr(outputs, 'close'):
+                            outputs.close()
+
+                    with self._lock:
+                        self.stats[stage.name]['items'] += 1
+                    indexing_pipeline_items.labels(stage.name).inc()
+            except BaseException as e:
+                self._stop(e)
+            finally:
+                db.session.remove()
+                self._finish_worker(index)
+
+    def _add_busy_seconds(self, stage_name: str, busy_seconds: float) -> None:
+        with self._lock:
+            self.stats[stage_name]['busy_seconds'] += busy_seconds
+        indexing_pipeline_busy_seconds.labels(stage_name).inc(busy_seconds)
+
+    def _finish_worker(self, index: int) -> None:
+        with self._lock:
+            self._finished_workers[index] += 1
+            last_worker = self._finished_workers[index] == self._stages[index].workers
+
+        # the last worker of a stage ends the workers of the next stage
+        if last_worker and index + 1 < len(self._stages):
+            for _ in range(self._stages[index + 1].workers):
+                self._put(index + 1, _END)
+
+    def _put(self, index: int, item: Any) -> bool:
+        stage_name = self._stages[index].name
+        if item is not _END:
+            indexing_pipeline_queue_size.labels(stage_name).inc()
+
+        while not self._stopped.is_set():
+            try:
+                self._queues[index].put(item, timeout=_POLL_INTERVAL)
+            except queue.Full:
+                continue
+
+            if item is not _END:
+                with self._lock:
+                    stats = self.stats[stage_name]
+                    stats['max_queue_size'] = max(stats['max_queue_size'], self._queues[index].qsize())
+            return True
+
+        if item is not _END:
+            indexing_pipeline_queue_size.labels(stage_name).dec()
+        return False
+
+    def _get(self, index: int) -> Any:
+        while not self._stopped.is_set():
+            try:
+                item = self._queues[index].get(timeout=_POLL_INTERVAL)
+            except queue.Empty:
+                continue
+
+            if item is not _END:
+                indexing_pipeline_queue_size.labels(self._stages[index].name).dec()
+            return item
+        return _END
+
+    def _stop(self, error: BaseException) -> None:
+        with self._lock:
+            if self._error is None:
+                self._error = error
+        self._stopped.set()
+
+        # items left in queues are dropped
+        for index, item_queue in enumerate(self._queues):
+            while True:
+                try:
+                    item = item_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is not _END:
+                    indexing_pipeline_queue_size.labels(self._stages[index].name).dec()
@@ -1,11 +1,13 @@
 import concurrent.futures
 import datetime
+import itertools
 import json
 import logging
 import re
 import threading
 import time
 import uuid
+from collections.abc import Iterator
 from typing import Optional, cast
 
 from flask import Flask, current_app
@@ -14,12 +16,14 @@ from sqlalchemy.orm.exc import ObjectDeletedError
 
 from core.docstore.dataset_docstore import DatasetDocumentStore
 from core.errors.error import ProviderTokenNotInitError
+from core.indexing_pipeline import IndexingPipeline, PipelineStage
 from core.llm_generator.llm_generator import LLMGenerator
 from core.model_manager import ModelInstance, ModelManager
 from core.model_runtime.entities.model_entities import ModelType, PriceType
 from core.model_runtime.model_providers.__base.large_language_model import LargeLanguageModel
 from core.model_runtime.model_providers.__base.text_embedding_model import TextEmbeddingModel
 from core.rag.datasource.keyword.keyword_factory import Keyword
+from core.rag.datasource.vdb.vector_factory import Vector
 from core.rag.extractor.entity.extract_setting import ExtractSetting
 from core.rag.index_processor.index_processor_base import BaseIndexProcessor
 from core.rag.index_processor.index_processor_factory import IndexProcessorFactory
@@ -37,6 +41,12 @@ from services.feature_service import FeatureService
 
 
 class IndexingRunner:
+    # text documents per extracted batch of the indexing pipeline
+    pipeline_extract_batch_size = 10
+    # segments per embedding chunk of the indexing pipeline
+    pipeline_chunk_size = 10
+    # segments per keyword index update of the indexing pipeline
+    pipeline_keyword_batch_size = 1000
 
     def __init__(self):
         self.storage = storage
@@ -44,6 +54,10 @@ class IndexingRunner:
 
     def run(self, dataset_documents: list[DatasetDocument]):
         """Run the indexing process."""
+        if current_app.config.get('INDEXING_PIPELINE_ENABLED'):
+            self._run_pipeline(dataset_documents)
+            return
+
         for dataset_document in dataset_documents:
             try:
                 # get dataset
@@ -211,6 +225,326 @@ class IndexingRunner:
             dataset_document.stopped_at = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
             db.session.commit()
 
+    def _run_pipeline(self, dataset_documents: list[DatasetDocument]) -> dict:
+        """
+        Run the indexing process as a staged pipeline.
+
+        Extraction, cleaning and splitting, segment saving, embedding and vector upsert of documents run
+        concurrently with bounded queues between the stages, so embedding of early pages starts while later
+        pages are still parsed. A failed document is set to error and dropped, a paused document stops
+        the run.
+        :return: stats of the pipeline stages
+        """
+        config = current_app.config
+        pipeline = IndexingPipeline(current_app._get_current_object(), [
+            PipelineStage('extract', self._pipeline_extract,
+                          workers=int(config.get('INDEXING_PIPELINE_EXTRACT_WORKERS', 2))),
+            PipelineStage('transform', self._pipeline_transform,
+                          workers=int(config.get('INDEXING_PIPELINE_TRANSFORM_WORKERS', 2))),
+            # segment positions follow the order of batches, segments are saved by one worker
+            PipelineStage('segment', self._pipeline_save_segments),
+            PipelineStage('embedding', self._pipeline_embed,
+                          workers=int(config.get('INDEXING_PIPELINE_EMBEDDING_WORKERS', 10))),
+            PipelineStage('upsert', self._pipeline_upsert,
+                          workers=int(config.get('INDEXING_PIPELINE_UPSERT_WORKERS', 2))),
+        ], queue_size=int(config.get('INDEXING_PIPELINE_QUEUE_SIZE', 16)))
+
+        pipeline.run([DocumentIndexingState(dataset_document.id) for dataset_document in dataset_documents])
+        return pipeline.stats
+
+    def _pipeline_extract(self, state: 'DocumentIndexingState') -> Iterator[tuple]:
+        """
+        Extract stage, yields batches of text documents of a document as they are parsed
+        """
+        try:
+            dataset_document = self._prepare_pipeline_document(state)
+            if not dataset_document:
+                return
+
+            text_docs = iter(())
+            if dataset_document.data_source_type in ["upload_file", "notion_import"]:
+                extract_setting = self._get_extract_setting(dataset_document)
+                if extract_setting:
+                    text_docs = state.index_processor.extract_iter(
+                        extract_setting, process_rule_mode=state.process_rule['mode']
+                    )
+
+            word_count = 0
+            batch = []
+            batch_index = 0
+            for text_doc in itertools.chain(text_docs, [None]):
+                if text_doc is not None:
+                    # replace doc id to document model id
+                    text_doc.metadata['document_id'] = state.document_id
+                    text_doc.metadata['dataset_id'] = state.dataset.id
+                    word_count += len(text_doc.page_content)
+                    batch.append(text_doc)
+                if batch and (len(batch) >= self.pipeline_extract_batch_size or text_doc is None):
+                    if batch_index == 0:
+                        # update document status to splitting
+                        self._update_document_index_status(state.document_id, after_indexing_status="splitting")
+                    state.add_pending()
+                    yield state, batch_index, batch
+                    batch = []
+                    batch_index += 1
+
+            if batch_index == 0:
+                self._update_document_index_status(state.document_id, after_indexing_status="splitting")
+            self._update_document_index_status(
+                document_id=state.document_id,
+                after_indexing_status=None,
+                extra_update_params={
+                    DatasetDocument.word_count: word_count,
+                    DatasetDocument.parsing_completed_at: datetime.datetime.now(datetime.timezone.utc).replace(
+                        tzinfo=None)
+                }
+            )
+        except Exception as e:
+            self._handle_pipeline_error(state, e)
+            return
+
+        if state.finish_extraction():
+            self._complete_pipeline_document(state)
+
+    def _prepare_pipeline_document(self, state: 'DocumentIndexingState') -> Optional[DatasetDocument]:
+        """
+        Load dataset, process rule and index processor of document into its state
+        :return: document, None if deleted
+        """
+        dataset_document = db.session.query(DatasetDocument).filter(DatasetDocument.id == state.document_id).first()
+        if not dataset_document:
+            logging.warning('Document deleted, document id: {}'.format(state.document_id))
+            state.failed = True
+            return None
+
+        dataset = Dataset.query.filter_by(
+            id=dataset_document.dataset_id
+        ).first()
+        if not dataset:
+            raise ValueError("no dataset found")
+
+        processing_rule = db.session.query(DatasetProcessRule). \
+            filter(DatasetProcessRule.id == dataset_document.dataset_process_rule_id). \
+            first()
+        state.process_rule = processing_rule.to_dict()
+        state.doc_language = dataset_document.doc_language
+        state.index_processor = IndexProcessorFactory(dataset_document.doc_form).init_index_processor()
+
+        if dataset.indexing_technique == 'high_quality':
+            if dataset.embedding_model_provider:
+                state.embedding_model_instance = self.model_manager.get_model_instance(
+                    tenant_id=dataset.tenant_id,
+                    provider=dataset.embedding_model_provider,
+                    model_type=ModelType.TEXT_EMBEDDING,
+                    model=dataset.embedding_model
+                )
+            else:
+                state.embedding_model_instance = self.model_manager.get_default_model_instance(
+                    tenant_id=dataset.tenant_id,
+                    model_type=ModelType.TEXT_EMBEDDING,
+                )
+            state.vector = Vector(dataset)
+            # save index struct set by the vector of a new dataset
+            db.session.commit()
+
+        # dataset is shared by the stage workers, detached from the session of this worker
+        db.session.refresh(dataset)
+        db.session.expunge(dataset)
+        state.dataset = dataset
+        state.doc_store = DatasetDocumentStore(
+            dataset=dataset,
+            user_id=dataset_document.created_by,
+            document_id=dataset_document.id
+        )
+        return dataset_document
+
+    def _pipeline_transform(self, item: tuple) -> Iterator[tuple]:
+        """
+        Transform stage, cleans and splits a batch of text documents
+        """
+        state, batch_index, text_docs = item
+        if state.failed:
+            return
+
+        try:
+            documents = state.index_processor.transform(text_docs,
+                                                        embedding_model_instance=state.embedding_model_instance,
+                                                        process_rule=state.process_rule,
+                                                        tenant_id=state.dataset.tenant_id,
+                                                        doc_language=state.doc_language)
+        except Exception as e:
+            self._handle_pipeline_error(state, e)
+            return
+        state.splitting_completed_at = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+
+        state.add_pending()
+        yield state, batch_index, documents
+        self._pipeline_item_done(state)
+
+    def _pipeline_save_segments(self, item: tuple) -> Iterator[tuple]:
+        """
+        Segment stage, saves segments of transformed batches in order and yields chunks to embed
+        """
+        state, batch_index, documents = item
+        state.transformed_batches[batch_index] = documents
+        while not state.failed and state.next_batch_index in state.transformed_batches:
+            documents = state.transformed_batches.pop(state.next_batch_index)
+            state.next_batch_index += 1
+            try:
+                if state.indexing_started_at is None:
+                    # update document status to indexing
+                    self._update_document_index_status(state.document_id, after_indexing_status="indexing")
+                    state.indexing_started_at = time.perf_counter()
+
+                state.doc_store.add_documents(documents)
+                self._update_pipeline_segments(state.document_id, documents, {
+                    DocumentSegment.status: "indexing",
+                    DocumentSegment.indexing_at: datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+                })
+            except Exception as e:
+                self._handle_pipeline_error(state, e)
+                break
+
+            for i in range(0, len(documents), self.pipeline_chunk_size):
+                state.add_pending()
+                yield state, documents[i:i + self.pipeline_chunk_size]
+            self._pipeline_item_done(state)
+
+        if state.failed:
+            state.transformed_batches.clear()
+
+    def _pipeline_embed(self, item: tuple) -> Iterator[tuple]:
+        """
+        Embedding stage, counts tokens and embeds a chunk of segments
+        """
+        state, documents = item
+        if state.failed:
+            return
+
+        tokens = 0
+        embeddings = None
+        try:
+            # check document is paused
+            self._check_document_paused_status(state.document_id)
+
+            if state.embedding_model_instance:
+                embedding_model_type_instance = cast(TextEmbeddingModel,
+                                                     state.embedding_model_instance.model_type_instance)
+                tokens = embedding_model_type_instance.get_num_tokens(
+                    state.embedding_model_instance.model,
+                    state.embedding_model_instance.credentials,
+                    [document.page_content for document in documents]
+                )
+                embeddings = state.vector.embed_documents(documents)
+        except Exception as e:
+            self._handle_pipeline_error(state, e)
+            return
+
+        state.add_pending()
+        yield state, documents, tokens, embeddings
+        self._pipeline_item_done(state)
+
+    def _pipeline_upsert(self, item: tuple) -> None:
+        """
+        Upsert stage, writes embeddings of a chunk of segments to the vector store and completes the segments
+        """
+        state, documents, tokens, embeddings = item
+        if state.failed:
+            return
+
+        try:
+            if embeddings is not None:
+                state.vector.create_with_embeddings(documents, embeddings)
+
+            self._update_pipeline_segments(state.document_id, documents, {
+                DocumentSegment.status: "completed",
+                DocumentSegment.enabled: True,
+                DocumentSegment.completed_at: datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+            })
+
+            keyword_documents = state.add_indexed(documents, tokens, self.pipeline_keyword_batch_size)
+            if keyword_documents:
+                self._create_pipeline_keyword_index(state, keyword_documents)
+        except Exception as e:
+            self._handle_pipeline_error(state, e)
+            return
+
+        self._pipeline_item_done(state)
+
+    def _pipeline_item_done(self, state: 'DocumentIndexingState') -> None:
+        if state.done():
+            self._complete_pipeline_document(state)
+
+    def _complete_pipeline_document(self, state: 'DocumentIndexingState') -> None:
+        """
+        Create keyword index of remaining segments and update document status to completed
+        """
+        try:
+            keyword_documents = state.add_indexed([], 0, 0)
+            if keyword_documents:
+                self._create_pipeline_keyword_index(state, keyword_documents)
+
+            cur_time = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+            indexing_latency = time.perf_counter() - state.indexing_started_at if state.indexing_started_at else 0
+            self._update_document_index_status(
+                document_id=state.document_id,
+                after_indexing_status="completed",
+                extra_update_params={
+                    DatasetDocument.cleaning_completed_at: state.splitting_completed_at or cur_time,
+                    DatasetDocument.splitting_completed_at: state.splitting_completed_at or cur_time,
+                    DatasetDocument.tokens: state.tokens,
+                    DatasetDocument.completed_at: cur_time,
+                    DatasetDocument.indexing_latency: indexing_latency,
+                }
+            )
+        except Exception as e:
+            self._handle_pipeline_error(state, e)
+
+    def _create_pipeline_keyword_index(self, state: 'DocumentIndexingState', documents: list[Document]) -> None:
+        keyword = Keyword(state.dataset)
+        keyword.create(documents)
+
+    def _update_pipeline_segments(self, document_id: str, documents: list[Document], update_params: dict) -> None:
+        """
+        Update segments of documents
+        """
+        if not documents:
+            return
+
+        db.session.query(DocumentSegment).filter(
+            DocumentSegment.document_id == document_id,
+            DocumentSegment.index_node_id.in_([document.metadata['doc_id'] for document in documents])
+        ).update(update_params, synchronize_session=False)
+        db.session.commit()
+
+    def _handle_pipeline_error(self, state: 'DocumentIndexingState', e: Exception) -> None:
+        """
+        Set document to error and drop its items in the pipeline, raise to stop the pipeline if paused
+        """
+        if isinstance(e, DocumentIsPausedException):
+            raise DocumentIsPausedException('Document paused, document id: {}'.format(state.document_id))
+
+        state.failed = True
+        if isinstance(e, ObjectDeletedError):
+            logging.warning('Document deleted, document id: {}'.format(state.document_id))
+            return
+
+        if isinstance(e, ProviderTokenNotInitError):
+            error = str(e.description)
+        else:
+            logging.exception("consume document failed")
+            error = str(e)
+        self._update_document_error(state.document_id, error)
+
+    def _update_document_error(self, document_id: str, error: str) -> None:
+        db.session.rollback()
+        DatasetDocument.query.filter_by(id=document_id).update({
+            DatasetDocument.indexing_status: 'error',
+            DatasetDocument.error: error,
+            DatasetDocument.stopped_at: datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+        })
+        db.session.commit()
+
     def indexing_estimate(self, tenant_id: str, extract_settings: list[ExtractSetting], tmp_processing_rule: dict,
                           doc_form: str = None, doc_language: str = 'English', dataset_id: str = None,
                           indexing_technique: str = 'economy') -> dict:
@@ -343,8 +677,33 @@ class IndexingRunner:
         if dataset_document.data_source_type not in ["upload_file", "notion_import"]:
             return []
 
-        data_source_info = dataset_document.data_source_info_dict
+        extract_setting = self._get_extract_setting(dataset_document)
         text_docs = []
+        if extract_setting:
+            text_docs = index_processor.extract(extract_setting, process_rule_mode=process_rule['mode'])
+        # update document status to splitting
+        self._update_document_index_status(
+            document_id=dataset_document.id,
+            after_indexing_status="splitting",
+            extra_update_params={
+                DatasetDocument.word_count: sum([len(text_doc.page_content) for text_doc in text_docs]),
+                DatasetDocument.parsing_completed_at: datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+            }
+        )
+
+        # replace doc id to document model id
+        text_docs = cast(list[Document], text_docs)
+        for text_doc in text_docs:
+            text_doc.metadata['document_id'] = dataset_document.id
+            text_doc.metadata['dataset_id'] = dataset_document.dataset_id
+
+        return text_docs
+
+    def _get_extract_setting(self, dataset_document: DatasetDocument) -> Optional[ExtractSetting]:
+        """
+        Get extract setting of document, None if the upload file is not found
+        """
+        data_source_info = dataset_document.data_source_info_dict
         if dataset_document.data_source_type == 'upload_file':
             if not data_source_info or 'upload_file_id' not in data_source_info:
                 raise ValueError("no upload file found")
@@ -354,17 +713,16 @@ class IndexingRunner:
                 one_or_none()
 
             if file_detail:
-                extract_setting = ExtractSetting(
+                return ExtractSetting(
                     datasource_type="upload_file",
                     upload_file=file_detail,
                     document_model=dataset_document.doc_form
                 )
-                text_docs = index_processor.extract(extract_setting, process_rule_mode=process_rule['mode'])
         elif dataset_document.data_source_type == 'notion_import':
             if (not data_source_info or 'notion_workspace_id' not in data_source_info
                     or 'notion_page_id' not in data_source_info):
                 raise ValueError("no notion import info found")
-            extract_setting = ExtractSetting(
+            return ExtractSetting(
                 datasource_type="notion_import",
                 notion_info={
                     "notion_workspace_id": data_source_info['notion_workspace_id'],
@@ -375,24 +733,7 @@ class IndexingRunner:
                 },
                 document_model=dataset_document.doc_form
             )
-            text_docs = index_processor.extract(extract_setting, process_rule_mode=process_rule['mode'])
-        # update document status to splitting
-        self._update_document_index_status(
-            document_id=dataset_document.id,
-            after_indexing_status="splitting",
-            extra_update_params={
-                DatasetDocument.word_count: sum([len(text_doc.page_content) for text_doc in text_docs]),
-                DatasetDocument.parsing_completed_at: datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
-            }
-        )
-
-        # replace doc id to document model id
-        text_docs = cast(list[Document], text_docs)
-        for text_doc in text_docs:
-            text_doc.metadata['document_id'] = dataset_document.id
-            text_doc.metadata['dataset_id'] = dataset_document.dataset_id
-
-        return text_docs
+        return None
 
     def filter_string(self, text):
         text = re.sub(r'<\|', '<', text)
@@ -720,13 +1061,10 @@ class IndexingRunner:
 
             tokens = 0
             if dataset.indexing_technique == 'high_quality' or embedding_model_type_instance:
-                tokens += sum(
-                    embedding_model_type_instance.get_num_tokens(
-                        embedding_model_instance.model,
-                        embedding_model_instance.credentials,
-                        [document.page_content]
-                    )
-                    for document in chunk_documents
+                tokens += embedding_model_type_instance.get_num_tokens(
+                    embedding_model_instance.model,
+                    embedding_model_instance.credentials,
+                    [document.page_content for document in chunk_documents]
                 )
 
             # load index
@@ -753,10 +1091,10 @@ class IndexingRunner:
         if result:
             raise DocumentIsPausedException()
 
-    def _update_document_index_status(self, document_id: str, after_indexing_status: str,
+    def _update_document_index_status(self, document_id: str, after_indexing_status: Optional[str],
                                       extra_update_params: Optional[dict] = None) -> None:
         """
-        Update the document indexing status.
+        Update the document indexing status, only the extra params if after_indexing_status is None.
         """
         count = DatasetDocument.query.filter_by(id=document_id, is_paused=True).count()
         if count > 0:
@@ -765,9 +1103,9 @@ class IndexingRunner:
         if not document:
             raise DocumentIsDeletedPausedException()
 
-        update_params = {
-            DatasetDocument.indexing_status: after_indexing_status
-        }
+        update_params = {}
+        if after_indexing_status:
+            update_params[DatasetDocument.indexing_status] = after_indexing_status
 
         if extra_update_params:
             update_params.update(extra_update_params)
@@ -860,6 +1198,78 @@ class IndexingRunner:
         pass
 
 
+class DocumentIndexingState:
+    """
+    State of a document in the indexing pipeline, shared by the stage workers.
+
+    Pending counts the items of the document in the pipeline, the document is completed once it is
+    extracted and has no pending items.
+    """
+
+    def __init__(self, document_id: str):
+        self.document_id = document_id
+        self.dataset: Optional[Dataset] = None
+        self.process_rule: Optional[dict] = None
+        self.doc_language: Optional[str] = None
+        self.index_processor: Optional[BaseIndexProcessor] = None
+        self.embedding_model_instance: Optional[ModelInstance] = None
+        self.vector: Optional[Vector] = None
+        self.doc_store: Optional[DatasetDocumentStore] = None
+        self.failed = False
+        self.splitting_completed_at: Optional[datetime.datetime] = None
+        self.indexing_started_at: Optional[float] = None
+        # transformed batches waiting for the segments of earlier batches, segment stage only
+        self.transformed_batches: dict[int, list[Document]] = {}
+        self.next_batch_index = 0
+        self.tokens = 0
+        self._keyword_documents: list[Document] = []
+        self._pending = 0
+        self._extracted = False
+        self._completed = False
+        self._lock = threading.Lock()
+
+    def add_pending(self) -> None:
+        with self._lock:
+            self._pending += 1
+
+    def done(self) -> bool:
+        """
+        Mark an item as processed
+        :return: whether the document is to be completed
+        """
+        with self._lock:
+            self._pending -= 1
+            return self._complete()
+
+    def finish_extraction(self) -> bool:
+        """
+        Mark document as extracted
+        :return: whether the document is to be completed
+        """
+        with self._lock:
+            self._extracted = True
+            return self._complete()
+
+    def add_indexed(self, documents: list[Document], tokens: int, keyword_batch_size: int) -> list[Document]:
+        """
+        Add indexed segments
+        :return: segments to add to keyword index, when at least keyword_batch_size are waiting
+        """
+        with self._lock:
+            self.tokens += tokens
+            self._keyword_documents.extend(documents)
+            if len(self._keyword_documents) < keyword_batch_size:
+                return []
+            keyword_documents, self._keyword_documents = self._keyword_documents, []
+            return keyword_documents
+
+    def _complete(self) -> bool:
+        if self._extracted and self._pending == 0 and not self.failed and not self._completed:
+            self._completed = True
+            return True
+        return False
+
+
 class DocumentIsPausedException(Exception):
     pass
 
@@ -1,5 +1,8 @@
+import threading
+
 from core.app.app_config.features.file_upload.manager import FileUploadConfigManager
 from core.file.message_file_parser import MessageFileParser
+from core.helper.lru_cache import LRUCache
 from core.model_manager import ModelInstance
 from core.model_runtime.entities.message_entities import (
     AssistantPromptMessage,
@@ -16,6 +19,10 @@ from models.model import AppMode, Conversation, Message
 
 
 class TokenBufferMemory:
+    # token counts of history prompt messages, keyed by provider, model, message id and role
+    _message_tokens_cache = LRUCache(capacity=10000)
+    _message_tokens_cache_lock = threading.Lock()
+
     def __init__(self, conversation: Conversation, model_instance: ModelInstance) -> None:
         self.conversation = conversation
         self.model_instance = model_instance
@@ -42,6 +49,7 @@ class TokenBufferMemory:
         )
 
         prompt_messages = []
+        prompt_message_keys = []
         for message in messages:
             files = message.message_files
             if files:
@@ -73,31 +81,56 @@ class TokenBufferMemory:
                 prompt_messages.append(UserPromptMessage(content=message.query))
 
             prompt_messages.append(AssistantPromptMessage(content=message.answer))
+            prompt_message_keys.extend([
+                (message.id, PromptMessageRole.USER),
+                (message.id, PromptMessageRole.ASSISTANT)
+            ])
 
         if not prompt_messages:
             return []
 
         # prune the chat message if it exceeds the max token limit
+        message_tokens = self._get_message_tokens(prompt_message_keys, prompt_messages)
+        curr_message_tokens = sum(message_tokens)
+
+        while curr_message_tokens > max_token_limit and prompt_messages:
+            prompt_messages.pop(0)
+            curr_message_tokens -= message_tokens.pop(0)
+
+        return prompt_messages
+
+    def _get_message_tokens(self, keys: list[tuple[str, PromptMessageRole]],
+                            prompt_messages: list[PromptMessage]) -> list[int]:
+        """
+        Get token counts of each prompt message, counted once per message and model and then cached.
+        Each count includes the per message overhead of the model, so that the sum is a slight overestimate
+        of counting the messages together.
+
+        :param keys: message id and role of prompt messages
+        :param prompt_messages: prompt messages
+        :return: token counts
+        """
         provider_instance = model_provider_factory.get_provider_instance(self.model_instance.provider)
         model_type_instance = provider_instance.get_model_instance(ModelType.LLM)
 
-        curr_message_tokens = model_type_instance.get_num_tokens(
-            self.model_instance.model,
-            self.model_instance.credentials,
-            prompt_messages
-        )
+        message_tokens = []
+        for (message_id, role), prompt_message in zip(keys, prompt_messages):
+            cache_key = (self.model_instance.provider, self.model_instance.model, message_id, role)
+            with self._message_tokens_cache_lock:
+                tokens = self._message_tokens_cache.get(cache_key)
 
-        if curr_message_tokens > max_token_limit:
-            pruned_memory = []
-            while curr_message_tokens > max_token_limit and prompt_messages:
-                pruned_memory.append(prompt_messages.pop(0))
-                curr_message_tokens = model_type_instance.get_num_tokens(
+            if tokens is None:
+                tokens = model_type_instance.get_num_tokens(
                     self.model_instance.model,
                     self.model_instance.credentials,
-                    prompt_messages
+                    [prompt_message]
                 )
+                with self._message_tokens_cache_lock:
+                    self._message_tokens_cache.put(cache_key, tokens)
 
-        return prompt_messages
+            message_tokens.append(tokens)
+
+        return message_tokens
 
     def get_history_prompt_text(self, human_prefix: str = "Human",
                                 ai_prefix: str = "Assistant",
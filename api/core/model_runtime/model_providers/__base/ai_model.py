@@ -313,4 +313,13 @@ class AIModel(ABC):
         :param text: plain text of prompt. You need to convert the original message to plain text
         :return: number of tokens
         """
-        return GPT2Tokenizer.get_num_tokens(text)
\ No newline at end of file
+        return GPT2Tokenizer.get_num_tokens(text)
+
+    def _get_num_tokens_by_gpt2_many(self, texts: list[str]) -> int:
+        """
+        Get total number of tokens for given texts by gpt2, texts are tokenized in parallel
+
+        :param texts: plain texts
+        :return: number of tokens
+        """
+        return sum(GPT2Tokenizer.count_many(texts))
\ No newline at end of file
@@ -1,33 +1,115 @@
+import json
 from os.path import abspath, dirname, join
 from threading import Lock
 from typing import Any
 
-from transformers import GPT2Tokenizer as TransformerGPT2Tokenizer
+from core.helper.lru_cache import LRUCache
 
 _tokenizer = None
 _lock = Lock()
 
+# gpt2 pre-tokenization pattern
+_GPT2_PATTERN = r"""'(?:[sdmt]|ll|ve|re)| ?\p{L}+| ?\p{N}+| ?[^\s\p{L}\p{N}]+|\s+(?!\S)|\s+"""
+_END_OF_TEXT = '<|endoftext|>'
+
+# num tokens of short texts, longer texts are rarely counted twice
+_CACHED_TEXT_MAX_LENGTH = 4096
+_cache = LRUCache(capacity=8192)
+_cache_lock = Lock()
+
+
 class GPT2Tokenizer:
+    """
+    GPT2 token counting with the bundled gpt2 vocab, available offline.
+
+    Uses the BPE implementation of `tiktoken` with ranks of the bundled vocab, loaded on first use.
+    Encoding is thread safe and releases the GIL, so concurrent counts are not serialized, and `count_many`
+    encodes in parallel.
+    """
+
     @staticmethod
     def _get_num_tokens_by_gpt2(text: str) -> int:
         """
             use gpt2 tokenizer to get num tokens
         """
-        _tokenizer = GPT2Tokenizer.get_encoder()
-        tokens = _tokenizer.encode(text, verbose=False)
-        return len(tokens)
-    
+        return GPT2Tokenizer.count_many([text])[0]
+
     @staticmethod
     def get_num_tokens(text: str) -> int:
         return GPT2Tokenizer._get_num_tokens_by_gpt2(text)
-    
+
+    @staticmethod
+    def count_many(texts: list[str]) -> list[int]:
+        """
+        Get num tokens of texts, texts not cached are encoded in parallel
+
+        :param texts: texts
+        :return: num tokens of each text
+        """
+        counts = [None] * len(texts)
+        with _cache_lock:
+            for i, text in enumerate(texts):
+                if len(text) <= _CACHED_TEXT_MAX_LENGTH:
+                    counts[i] = _cache.get(text)
+
+        uncached_indices = [i for i, count in enumerate(counts) if count is None]
+        if not uncached_indices:
+            return counts
+
+        encoder = GPT2Tokenizer.get_encoder()
+        if len(uncached_indices) == 1:
+            encodings = [encoder.encode(texts[uncached_indices[0]], allowed_special='all')]
+        else:
+            encodings = encoder.encode_batch([texts[i] for i in uncached_indices], allowed_special='all')
+
+        with _cache_lock:
+            for i, tokens in zip(uncached_indices, encodings):
+                counts[i] = len(tokens)
+                if len(texts[i]) <= _CACHED_TEXT_MAX_LENGTH:
+                    _cache.put(texts[i], counts[i])
+
+        return counts
+
     @staticmethod
     def get_encoder() -> Any:
         global _tokenizer, _lock
+        if _tokenizer is not None:
+            return _tokenizer
+
         with _lock:
             if _tokenizer is None:
-                base_path = abspath(__file__)
-                gpt2_tokenizer_path = join(dirname(base_path), 'gpt2')
-                _tokenizer = TransformerGPT2Tokenizer.from_pretrained(gpt2_tokenizer_path)
+                import tiktoken
+
+                with open(join(dirname(abspath(__file__)), 'gpt2', 'vocab.json'), encoding='utf-8') as f:
+                    vocab = json.load(f)
+                _tokenizer = tiktoken.Encoding(
+                    name='gpt2',
+                    pat_str=_GPT2_PATTERN,
+                    mergeable_ranks={
+                        _decode_vocab_token(token): rank for token, rank in vocab.items() if token != _END_OF_TEXT
+                    },
+                    special_tokens={_END_OF_TEXT: vocab[_END_OF_TEXT]}
+                )
+
+            return _tokenizer
+
+
+def _decode_vocab_token(token: str) -> bytes:
+    """
+    Decode token of the byte level gpt2 vocab, where bytes are mapped to printable unicode characters
+    """
+    return bytes(_UNICODE_TO_BYTE[char] for char in token)
+
+
+def _unicode_to_byte() -> dict[str, int]:
+    printable_bytes = [b for b in range(2 ** 8) if chr(b).isprintable() and chr(b) != ' ']
+    unicode_to_byte = {chr(b): b for b in printable_bytes}
+    n = 0
+    for b in range(2 ** 8):
+        if b not in printable_bytes:
+            unicode_to_byte[chr(2 ** 8 + n)] = b
+            n += 1
+    return unicode_to_byte
+
 
-            return _tokenizer
\ No newline at end of file
+_UNICODE_TO_BYTE = _unicode_to_byte()
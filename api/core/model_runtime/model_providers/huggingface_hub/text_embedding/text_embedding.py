@@ -49,10 +49,8 @@ class HuggingfaceHubTextEmbeddingModel(_CommonHuggingfaceHub, TextEmbeddingModel
         )
 
     def get_num_tokens(self, model: str, credentials: dict, texts: list[str]) -> int:
-        num_tokens = 0
-        for text in texts:
-            num_tokens += self._get_num_tokens_by_gpt2(text)
-        return num_tokens
+        # use GPT2Tokenizer to get num tokens
+        return self._get_num_tokens_by_gpt2_many(texts)
 
     def validate_credentials(self, model: str, credentials: dict) -> None:
         try:
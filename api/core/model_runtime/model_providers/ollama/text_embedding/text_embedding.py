@@ -127,7 +127,7 @@ class OllamaEmbeddingModel(TextEmbeddingModel):
         :param texts: texts to embed
         :return:
         """
-        return sum(self._get_num_tokens_by_gpt2(text) for text in texts)
+        return self._get_num_tokens_by_gpt2_many(texts)
 
     def validate_credentials(self, model: str, credentials: dict) -> None:
         """
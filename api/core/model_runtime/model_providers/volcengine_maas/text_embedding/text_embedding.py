@@ -74,11 +74,8 @@ class VolcengineMaaSTextEmbeddingModel(TextEmbeddingModel):
         :param texts: texts to embed
         :return:
         """
-        num_tokens = 0
-        for text in texts:
-            # use GPT2Tokenizer to get num tokens
-            num_tokens += self._get_num_tokens_by_gpt2(text)
-        return num_tokens
+        # use GPT2Tokenizer to get num tokens
+        return self._get_num_tokens_by_gpt2_many(texts)
 
     def validate_credentials(self, model: str, credentials: dict) -> None:
         """
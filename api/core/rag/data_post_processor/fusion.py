@@ -0,0 +1,106 @@
+from collections import defaultdict
+from enum import Enum
+from typing import Optional
+
+from core.rag.models.document import Document
+
+
+class FusionMethod(Enum):
+    """
+    Fusion Method Enum
+    """
+    RRF = 'rrf'
+    WEIGHTED_SCORE = 'weighted_score'
+
+    @classmethod
+    def value_of(cls, value: str) -> 'FusionMethod':
+        """
+        Get value of given mode.
+
+        :param value: mode value
+        :return: mode
+        """
+        for mode in cls:
+            if mode.value == value:
+                return mode
+        raise ValueError(f'invalid fusion method value {value}')
+
+
+class FusionRunner:
+    """
+    Merge ranked result lists of different retrieval methods in process, deduplicated by doc_id.
+
+    - rrf: reciprocal rank fusion, sum of weight / (rrf_k + rank) of each list, only ranks are used
+    - weighted_score: sum of weight * min-max normalized score of each list
+    Fused scores are scaled into [0, 1] and set as document score.
+    """
+
+    def __init__(self, fusion: Optional[dict] = None):
+        fusion = fusion or {}
+        self.method = FusionMethod.value_of(fusion.get('method') or FusionMethod.RRF.value)
+        self.rrf_k = int(fusion.get('rrf_k') or 60)
+        self.weights = fusion.get('weights') or {}
+
+    def run(self, ranked_documents: dict[str, list[Document]], top_n: Optional[int] = None) -> list[Document]:
+        """
+        Fuse ranked documents
+
+        :param ranked_documents: retrieval method -> documents ranked by the method
+        :param top_n: number of documents to return
+        :return: deduplicated documents sorted by fused score desc
+        """
+        scores: dict[str, float] = defaultdict(float)
+        documents: dict[str, Document] = {}
+        total_weight = 0.0
+        for retrieval_method, method_documents in ranked_documents.items():
+            method_documents = self._deduplicate(method_documents)
+            if not method_documents:
+                continue
+
+            weight = float(self.weights.get(retrieval_method, 1.0))
+            total_weight += weight
+            if self.method == FusionMethod.RRF:
+                method_scores = [1 / (self.rrf_k + rank) for rank in range(1, len(method_documents) + 1)]
+                # scale so that a document ranked first by every method scores 1
+                method_scores = [score * (self.rrf_k + 1) for score in method_scores]
+            else:
+                method_scores = self._normalize_scores(method_documents)
+
+            for document, score in zip(method_documents, method_scores):
+                doc_id = document.metadata['doc_id']
+                documents.setdefault(doc_id, document)
+                scores[doc_id] += weight * score
+
+        fused_documents = []
+        for doc_id, score in sorted(scores.items(), key=lambda item: item[1], reverse=True):
+            document = documents[doc_id]
+            fused_documents.append(Document(
+                page_content=document.page_content,
+                metadata={**document.metadata, 'score': score / total_weight if total_weight else 0.0}
+            ))
+
+        return fused_documents[:top_n] if top_n else fused_documents
+
+    @staticmethod
+    def _deduplicate(documents: list[Document]) -> list[Document]:
+        doc_ids = set()
+        unique_documents = []
+        for document in documents:
+            if document.metadata['doc_id'] not in doc_ids:
+                doc_ids.add(document.metadata['doc_id'])
+                unique_documents.append(document)
+        return unique_documents
+
+    @staticmethod
+    def _normalize_scores(documents: list[Document]) -> list[float]:
+        """
+        Min-max normalize scores of a ranked list, fall back to ranks if any score is missing
+        """
+        scores = [document.metadata.get('score') for document in documents]
+        if any(score is None for score in scores):
+            return [1 - rank / len(documents) for rank in range(len(documents))]
+
+        max_score, min_score = max(scores), min(scores)
+        if max_score == min_score:
+            return [1.0] * len(scores)
+        return [(score - min_score) / (max_score - min_score) for score in scores]
@@ -0,0 +1,57 @@
+import heapq
+import math
+from collections import defaultdict
+from collections.abc import Iterable
+
+
+class BM25Scorer:
+    """
+    Okapi BM25 over keyword postings.
+
+    Keywords are extracted as a set per segment, so term frequency is always 1
+    and the segment length is its number of keywords.
+    """
+
+    def __init__(self, segment_count: int, avg_segment_length: float, k1: float = 1.2, b: float = 0.75):
+        self.segment_count = max(segment_count, 1)
+        self.avg_segment_length = avg_segment_length if avg_segment_length > 0 else 1.0
+        self.k1 = k1
+        self.b = b
+
+    def idf(self, document_frequency: int) -> float:
+        """
+        Inverse document frequency of keyword, always positive
+        :param document_frequency: number of segments containing the keyword
+        :return:
+        """
+        return math.log(1 + (self.segment_count - document_frequency + 0.5) / (document_frequency + 0.5))
+
+    def score(self, document_frequency: int, segment_length: float, term_frequency: int = 1) -> float:
+        """
+        Score of one keyword in one segment
+        :param document_frequency: number of segments containing the keyword
+        :param segment_length: number of keywords of the segment
+        :param term_frequency: frequency of the keyword in the segment
+        :return:
+        """
+        length_norm = 1 - self.b + self.b * segment_length / self.avg_segment_length
+        return self.idf(document_frequency) * term_frequency * (self.k1 + 1) \
+            / (term_frequency + self.k1 * length_norm)
+
+    def top_k(self, postings: Iterable[tuple[str, str, float]], k: int) -> list[tuple[str, float]]:
+        """
+        Score segments of query keyword postings and select the top k with a heap
+        :param postings: (keyword, segment index node id, segment length) of query keywords
+        :param k: number of segments to return
+        :return: (segment index node id, score) sorted by score desc
+        """
+        postings = list(postings)
+        document_frequencies: dict[str, int] = defaultdict(int)
+        for keyword, _, _ in postings:
+            document_frequencies[keyword] += 1
+
+        scores: dict[str, float] = defaultdict(float)
+        for keyword, node_id, segment_length in postings:
+            scores[node_id] += self.score(document_frequencies[keyword], segment_length)
+
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
@@ -1,17 +1,18 @@
 import json
-from collections import defaultdict
 from typing import Any, Optional
 
 from flask import current_app
 from pydantic import BaseModel
+from sqlalchemy.dialects.postgresql import insert
 
+from core.rag.datasource.keyword.bm25 import BM25Scorer
 from core.rag.datasource.keyword.jieba.jieba_keyword_table_handler import JiebaKeywordTableHandler
 from core.rag.datasource.keyword.keyword_base import BaseKeyword
 from core.rag.models.document import Document
 from extensions.ext_database import db
 from extensions.ext_redis import redis_client
 from extensions.ext_storage import storage
-from models.dataset import Dataset, DatasetKeywordTable, DocumentSegment
+from models.dataset import Dataset, DatasetKeywordStats, DatasetKeywordTable, DocumentSegment
 
 
 class KeywordTableConfig(BaseModel):
@@ -94,15 +95,19 @@ class Jieba(BaseKeyword):
 
         k = kwargs.get('top_k', 4)
 
-        sorted_chunk_indices = self._retrieve_ids_by_query(keyword_table, query, k)
+        scored_chunk_indices = self._retrieve_ids_by_query(keyword_table, query, k)
+        if not scored_chunk_indices:
+            return []
 
-        documents = []
-        for chunk_index in sorted_chunk_indices:
-            segment = db.session.query(DocumentSegment).filter(
-                DocumentSegment.dataset_id == self.dataset.id,
-                DocumentSegment.index_node_id == chunk_index
-            ).first()
+        segments = db.session.query(DocumentSegment).filter(
+            DocumentSegment.dataset_id == self.dataset.id,
+            DocumentSegment.index_node_id.in_([chunk_index for chunk_index, _ in scored_chunk_indices])
+        ).all()
+        segment_map = {segment.index_node_id: segment for segment in segments}
 
+        documents = []
+        for chunk_index, score in scored_chunk_indices:
+            segment = segment_map.get(chunk_index)
             if segment:
                 documents.append(Document(
                     page_content=segment.content,
@@ -111,6 +116,7 @@ class Jieba(BaseKeyword):
                         "doc_hash": segment.index_node_hash,
                         "document_id": segment.document_id,
                         "dataset_id": segment.dataset_id,
+                        "score": score,
                     }
                 ))
 
@@ -138,15 +144,57 @@ class Jieba(BaseKeyword):
         }
         dataset_keyword_table = self.dataset.dataset_keyword_table
         keyword_data_source_type = dataset_keyword_table.data_source_type
+        self._update_stats(keyword_table)
         if keyword_data_source_type == 'database':
             dataset_keyword_table.keyword_table = json.dumps(keyword_table_dict, cls=SetEncoder)
             db.session.commit()
         else:
+            db.session.commit()
             file_key = 'keyword_files/' + self.dataset.tenant_id + '/' + self.dataset.id + '.txt'
             if storage.exists(file_key):
                 storage.delete(file_key)
             storage.save(file_key, json.dumps(keyword_table_dict, cls=SetEncoder).encode('utf-8'))
 
+    def _update_stats(self, keyword_table: dict) -> None:
+        """
+        Keep segment count and total keyword count of the keyword table in dataset keyword stats,
+        counted when the table is saved so that searches do not scan the table
+        :param keyword_table: keyword table
+        :return:
+        """
+        segment_count = len(set().union(*keyword_table.values()))
+        total_segment_length = sum(len(node_idxs) for node_idxs in keyword_table.values())
+        db.session.execute(
+            insert(DatasetKeywordStats).values(
+                dataset_id=self.dataset.id,
+                segment_count=segment_count,
+                total_segment_length=total_segment_length
+            ).on_conflict_do_update(
+                index_elements=['dataset_id'],
+                set_={
+                    'segment_count': segment_count,
+                    'total_segment_length': total_segment_length,
+                    'updated_at': db.func.current_timestamp()
+                }
+            )
+        )
+
+    def _get_segment_count(self, keyword_table: dict) -> int:
+        """
+        Get segment count of the keyword table, counted once for tables saved before it was kept
+        :param keyword_table: keyword table
+        :return: segment count
+        """
+        segment_count = db.session.query(DatasetKeywordStats.segment_count).filter(
+            DatasetKeywordStats.dataset_id == self.dataset.id
+        ).scalar()
+        if segment_count is None:
+            self._update_stats(keyword_table)
+            db.session.commit()
+            segment_count = len(set().union(*keyword_table.values()))
+
+        return segment_count
+
     def _get_dataset_keyword_table(self) -> Optional[dict]:
         dataset_keyword_table = self.dataset.dataset_keyword_table
         if dataset_keyword_table:
@@ -200,24 +248,20 @@ class Jieba(BaseKeyword):
 
         return keyword_table
 
-    def _retrieve_ids_by_query(self, keyword_table: dict, query: str, k: int = 4):
+    def _retrieve_ids_by_query(self, keyword_table: dict, query: str, k: int = 4) -> list[tuple[str, float]]:
         keyword_table_handler = JiebaKeywordTableHandler()
         keywords = keyword_table_handler.extract_keywords(query)
 
-        # go through text chunks in order of most matching keywords
-        chunk_indices_count: dict[str, int] = defaultdict(int)
-        keywords = [keyword for keyword in keywords if keyword in set(keyword_table.keys())]
-        for keyword in keywords:
-            for node_id in keyword_table[keyword]:
-                chunk_indices_count[node_id] += 1
+        keywords = [keyword for keyword in keywords if keyword in keyword_table]
+        if not keywords:
+            return []
 
-        sorted_chunk_indices = sorted(
-            list(chunk_indices_count.keys()),
-            key=lambda x: chunk_indices_count[x],
-            reverse=True,
-        )
+        # segment lengths are not kept in the keyword table, rank by BM25 without length normalization
+        segment_count = self._get_segment_count(keyword_table)
+        scorer = BM25Scorer(segment_count, avg_segment_length=1.0, b=0)
+        postings = ((keyword, node_id, 1) for keyword in keywords for node_id in keyword_table[keyword])
 
-        return sorted_chunk_indices[: k]
+        return scorer.top_k(postings, k)
 
     def _update_segment_keywords(self, dataset_id: str, node_id: str, keywords: list[str]):
         document_segment = db.session.query(DocumentSegment).filter(
@@ -0,0 +1,282 @@
+from collections import defaultdict
+from typing import Any
+
+from pydantic import BaseModel
+from sqlalchemy.dialects.postgresql import insert
+
+from core.rag.datasource.keyword.bm25 import BM25Scorer
+from core.rag.datasource.keyword.jieba.jieba_keyword_table_handler import JiebaKeywordTableHandler
+from core.rag.datasource.keyword.keyword_base import BaseKeyword
+from core.rag.models.document import Document
+from extensions.ext_database import db
+from models.dataset import Dataset, DatasetKeywordPosting, DatasetKeywordStats, DocumentSegment
+
+
+class InvertedIndexConfig(BaseModel):
+    max_keywords_per_chunk: int = 10
+    batch_size: int = 1000
+
+
+class JiebaInvertedIndex(BaseKeyword):
+    """
+    Jieba keyword index persisted as one posting row per (keyword, segment),
+    so that searches only load the postings of query keywords and edits only touch changed segments.
+    Segments are ranked by BM25, with segment count and total segment length of the dataset
+    maintained incrementally in dataset keyword stats.
+    """
+
+    def __init__(self, dataset: Dataset):
+        super().__init__(dataset)
+        self._config = InvertedIndexConfig()
+
+    def create(self, texts: list[Document], **kwargs) -> BaseKeyword:
+        self.add_texts(texts, **kwargs)
+        return self
+
+    def add_texts(self, texts: list[Document], **kwargs):
+        keyword_table_handler = JiebaKeywordTableHandler()
+        keywords_list = kwargs.get('keywords_list', None)
+
+        node_keywords = {}
+        for i, text in enumerate(texts):
+            keywords = keywords_list[i] if keywords_list else None
+            if not keywords:
+                keywords = keyword_table_handler.extract_keywords(text.page_content,
+                                                                  self._config.max_keywords_per_chunk)
+            node_keywords[text.metadata['doc_id']] = list(keywords)
+
+        self._update_segment_keywords(node_keywords)
+        self._add_postings(node_keywords)
+
+    def text_exists(self, id: str) -> bool:
+        return db.session.query(
+            db.session.query(DatasetKeywordPosting.id).filter(
+                DatasetKeywordPosting.dataset_id == self.dataset.id,
+                DatasetKeywordPosting.index_node_id == id
+            ).exists()
+        ).scalar()
+
+    def delete_by_ids(self, ids: list[str]) -> None:
+        # make sure stats exist before applying deltas
+        self._get_stats()
+        for i in range(0, len(ids), self._config.batch_size):
+            self._delete_postings(ids[i:i + self._config.batch_size])
+        db.session.commit()
+
+    def delete_by_document_id(self, document_id: str) -> None:
+        segments = db.session.query(DocumentSegment.index_node_id).filter(
+            DocumentSegment.dataset_id == self.dataset.id,
+            DocumentSegment.document_id == document_id
+        ).all()
+        self.delete_by_ids([segment.index_node_id for segment in segments])
+
+    def delete(self) -> None:
+        db.session.query(DatasetKeywordPosting).filter(
+            DatasetKeywordPosting.dataset_id == self.dataset.id
+        ).delete(synchronize_session=False)
+        db.session.query(DatasetKeywordStats).filter(
+            DatasetKeywordStats.dataset_id == self.dataset.id
+        ).delete(synchronize_session=False)
+        db.session.commit()
+
+    def search(
+            self, query: str,
+            **kwargs: Any
+    ) -> list[Document]:
+        k = kwargs.get('top_k', 4)
+
+        keyword_table_handler = JiebaKeywordTableHandler()
+        keywords = list(keyword_table_handler.extract_keywords(query))
+        if not keywords:
+            return []
+
+        postings = db.session.query(
+            DatasetKeywordPosting.keyword,
+            DatasetKeywordPosting.index_node_id,
+            DatasetKeywordPosting.segment_length
+        ).filter(
+            DatasetKeywordPosting.dataset_id == self.dataset.id,
+            DatasetKeywordPosting.keyword.in_(keywords)
+        ).all()
+        if not postings:
+            return []
+
+        segment_count, total_segment_length = self._get_stats()
+        scorer = BM25Scorer(segment_count, total_segment_length / segment_count if segment_count else 0)
+        scored_chunk_indices = scorer.top_k(postings, k)
+
+        segments = db.session.query(DocumentSegment).filter(
+            DocumentSegment.dataset_id == self.dataset.id,
+            DocumentSegment.index_node_id.in_([chunk_index for chunk_index, _ in scored_chunk_indices])
+        ).all()
+        segment_map = {segment.index_node_id: segment for segment in segments}
+
+        documents = []
+        for chunk_index, score in scored_chunk_indices:
+            segment = segment_map.get(chunk_index)
+            if segment:
+                documents.append(Document(
+                    page_content=segment.content,
+                    metadata={
+                        "doc_id": chunk_index,
+                        "doc_hash": segment.index_node_hash,
+                        "document_id": segment.document_id,
+                        "dataset_id": segment.dataset_id,
+                        "score": score,
+                    }
+                ))
+
+        return documents
+
+    def add_keyword_table(self, keyword_table: dict[str, set[str]]) -> int:
+        """
+        Add postings of a legacy keyword table, used to migrate from the single JSON keyword table
+        :param keyword_table: keyword -> segment index node ids
+        :return: number of postings
+        """
+        node_keywords = defaultdict(list)
+        for keyword, node_ids in keyword_table.items():
+            for node_id in node_ids:
+                node_keywords[node_id].append(keyword)
+
+        # stats may have been kept by the keyword table, rebuild them from postings before applying deltas
+        db.session.query(DatasetKeywordStats).filter(
+            DatasetKeywordStats.dataset_id == self.dataset.id
+        ).delete(synchronize_session=False)
+
+        return self._add_postings(node_keywords)
+
+    def update_segment_keywords_index(self, node_id: str, keywords: list[str]):
+        """
+        Replace postings of a segment with its new keywords
+        :param node_id: segment index node id
+        :param keywords: keywords
+        :return:
+        """
+        self._add_postings({node_id: keywords})
+
+    def _add_postings(self, node_keywords: dict[str, list[str]]) -> int:
+        """
+        Replace postings of segments in batches, and keep dataset stats up to date
+        :param node_keywords: segment index node id -> keywords
+        :return: number of postings
+        """
+        node_keywords = {node_id: list(dict.fromkeys(keywords)) for node_id, keywords in node_keywords.items()}
+        node_ids = list(node_keywords.keys())
+
+        # make sure stats exist before applying deltas
+        self._get_stats()
+
+        posting_count = 0
+        for i in range(0, len(node_ids), self._config.batch_size):
+            batch_node_ids = node_ids[i:i + self._config.batch_size]
+            self._delete_postings(batch_node_ids)
+
+            values = [
+                {
+                    'dataset_id': self.dataset.id,
+                    'keyword': keyword,
+                    'index_node_id': node_id,
+                    'segment_length': len(node_keywords[node_id])
+                }
+                for node_id in batch_node_ids
+                for keyword in node_keywords[node_id]
+            ]
+            if values:
+                db.session.execute(
+                    insert(DatasetKeywordPosting).values(values).on_conflict_do_nothing(
+                        index_elements=['dataset_id', 'keyword', 'index_node_id']
+                    )
+                )
+
+            indexed_node_ids = [node_id for node_id in batch_node_ids if node_keywords[node_id]]
+            self._update_stats(len(indexed_node_ids),
+                               sum(len(node_keywords[node_id]) for node_id in indexed_node_ids))
+            posting_count += len(values)
+        db.session.commit()
+
+        return posting_count
+
+    def _delete_postings(self, node_ids: list[str]) -> None:
+        """
+        Delete postings of segments, and keep dataset stats up to date
+        :param node_ids: segment index node ids
+        :return:
+        """
+        if not node_ids:
+            return
+
+        deleted_segments = db.session.query(
+            DatasetKeywordPosting.index_node_id,
+            DatasetKeywordPosting.segment_length
+        ).filter(
+            DatasetKeywordPosting.dataset_id == self.dataset.id,
+            DatasetKeywordPosting.index_node_id.in_(node_ids)
+        ).distinct().all()
+        if not deleted_segments:
+            return
+
+        db.session.query(DatasetKeywordPosting).filter(
+            DatasetKeywordPosting.dataset_id == self.dataset.id,
+            DatasetKeywordPosting.index_node_id.in_(node_ids)
+        ).delete(synchronize_session=False)
+
+        self._update_stats(-len(deleted_segments), -sum(segment.segment_length for segment in deleted_segments))
+
+    def _update_stats(self, segment_count_delta: int, segment_length_delta: int) -> None:
+        if not segment_count_delta and not segment_length_delta:
+            return
+
+        db.session.execute(
+            insert(DatasetKeywordStats).values(
+                dataset_id=self.dataset.id,
+                segment_count=max(segment_count_delta, 0),
+                total_segment_length=max(segment_length_delta, 0)
+            ).on_conflict_do_update(
+                index_elements=['dataset_id'],
+                set_={
+                    'segment_count': DatasetKeywordStats.segment_count + segment_count_delta,
+                    'total_segment_length': DatasetKeywordStats.total_segment_length + segment_length_delta,
+                    'updated_at': db.func.current_timestamp()
+                }
+            )
+        )
+
+    def _get_stats(self) -> tuple[int, int]:
+        """
+        Get segment count and total segment length of dataset, rebuilt from postings if missing
+        :return:
+        """
+        stats = db.session.query(DatasetKeywordStats).filter(
+            DatasetKeywordStats.dataset_id == self.dataset.id
+        ).first()
+        if stats:
+            return stats.segment_count, stats.total_segment_length
+
+        segments = db.session.query(
+            DatasetKeywordPosting.index_node_id,
+            DatasetKeywordPosting.segment_length
+        ).filter(
+            DatasetKeywordPosting.dataset_id == self.dataset.id
+        ).distinct().subquery()
+        segment_count, total_segment_length = db.session.query(
+            db.func.count(segments.c.index_node_id),
+            db.func.coalesce(db.func.sum(segments.c.segment_length), 0)
+        ).one()
+
+        self._update_stats(segment_count, total_segment_length)
+        db.session.commit()
+
+        return segment_count, total_segment_length
+
+    def _update_segment_keywords(self, node_keywords: dict[str, list[str]]):
+        node_ids = list(node_keywords.keys())
+        for i in range(0, len(node_ids), self._config.batch_size):
+            document_segments = db.session.query(DocumentSegment).filter(
+                DocumentSegment.dataset_id == self.dataset.id,
+                DocumentSegment.index_node_id.in_(node_ids[i:i + self._config.batch_size])
+            ).all()
+            for document_segment in document_segments:
+                document_segment.keywords = node_keywords[document_segment.index_node_id]
+                db.session.add(document_segment)
+        db.session.commit()
@@ -2,6 +2,7 @@ from typing import Any
 
 from flask import current_app
 
+from core.helper.dataset_index_version import DatasetIndexVersion
 from core.rag.datasource.keyword.jieba.jieba import Jieba
 from core.rag.datasource.keyword.keyword_base import BaseKeyword
 from core.rag.models.document import Document
@@ -24,26 +25,37 @@ class Keyword:
             return Jieba(
                 dataset=self._dataset
             )
+        elif keyword_type == "jieba_inverted_index":
+            from core.rag.datasource.keyword.jieba_inverted_index.jieba_inverted_index import JiebaInvertedIndex
+
+            return JiebaInvertedIndex(
+                dataset=self._dataset
+            )
         else:
             raise ValueError(f"Keyword store {keyword_type} is not supported.")
 
     def create(self, texts: list[Document], **kwargs):
         self._keyword_processor.create(texts, **kwargs)
+        DatasetIndexVersion.increase(self._dataset.id)
 
     def add_texts(self, texts: list[Document], **kwargs):
         self._keyword_processor.add_texts(texts, **kwargs)
+        DatasetIndexVersion.increase(self._dataset.id)
 
     def text_exists(self, id: str) -> bool:
         return self._keyword_processor.text_exists(id)
 
     def delete_by_ids(self, ids: list[str]) -> None:
         self._keyword_processor.delete_by_ids(ids)
+        DatasetIndexVersion.increase(self._dataset.id)
 
     def delete_by_document_id(self, document_id: str) -> None:
         self._keyword_processor.delete_by_document_id(document_id)
+        DatasetIndexVersion.increase(self._dataset.id)
 
     def delete(self) -> None:
         self._keyword_processor.delete()
+        DatasetIndexVersion.increase(self._dataset.id)
 
     def search(
             self, query: str,
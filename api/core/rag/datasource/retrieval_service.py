@@ -4,6 +4,7 @@ from typing import Optional
 from flask import Flask, current_app
 
 from core.rag.data_post_processor.data_post_processor import DataPostProcessor
+from core.rag.data_post_processor.fusion import FusionRunner
 from core.rag.datasource.keyword.keyword_factory import Keyword
 from core.rag.datasource.vdb.vector_factory import Vector
 from extensions.ext_database import db
@@ -25,13 +26,19 @@ class RetrievalService:
 
     @classmethod
     def retrieve(cls, retrival_method: str, dataset_id: str, query: str,
-                 top_k: int, score_threshold: Optional[float] = .0, reranking_model: Optional[dict] = None):
+                 top_k: int, score_threshold: Optional[float] = .0, reranking_model: Optional[dict] = None,
+                 fusion: Optional[dict] = None):
         dataset = db.session.query(Dataset).filter(
             Dataset.id == dataset_id
         ).first()
         if not dataset or dataset.available_document_count == 0 or dataset.available_segment_count == 0:
             return []
-        all_documents = []
+        # documents of each retrieval method, kept apart so that hybrid results can be fused by rank
+        ranked_documents = {
+            'keyword_search': [],
+            'semantic_search': [],
+            'full_text_search': []
+        }
         threads = []
         exceptions = []
         # retrieval_model source with keyword
@@ -41,7 +48,7 @@ class RetrievalService:
                 'dataset_id': dataset_id,
                 'query': query,
                 'top_k': top_k,
-                'all_documents': all_documents,
+                'all_documents': ranked_documents['keyword_search'],
                 'exceptions': exceptions,
             })
             threads.append(keyword_thread)
@@ -55,7 +62,7 @@ class RetrievalService:
                 'top_k': top_k,
                 'score_threshold': score_threshold,
                 'reranking_model': reranking_model,
-                'all_documents': all_documents,
+                'all_documents': ranked_documents['semantic_search'],
                 'retrival_method': retrival_method,
                 'exceptions': exceptions,
             })
@@ -72,7 +79,7 @@ class RetrievalService:
                 'score_threshold': score_threshold,
                 'top_k': top_k,
                 'reranking_model': reranking_model,
-                'all_documents': all_documents,
+                'all_documents': ranked_documents['full_text_search'],
                 'exceptions': exceptions,
             })
             threads.append(full_text_index_thread)
@@ -85,14 +92,19 @@ class RetrievalService:
             exception_message = ';\n'.join(exceptions)
             raise Exception(exception_message)
 
+        all_documents = [document for documents in ranked_documents.values() for document in documents]
         if retrival_method == 'hybrid_search':
-            data_post_processor = DataPostProcessor(str(dataset.tenant_id), reranking_model, False)
-            all_documents = data_post_processor.invoke(
-                query=query,
-                documents=all_documents,
-                score_threshold=score_threshold,
-                top_n=top_k
-            )
+            if reranking_model:
+                data_post_processor = DataPostProcessor(str(dataset.tenant_id), reranking_model, False)
+                all_documents = data_post_processor.invoke(
+                    query=query,
+                    documents=all_documents,
+                    score_threshold=score_threshold,
+                    top_n=top_k
+                )
+            else:
+                # fuse in process when no rerank model is configured
+                all_documents = FusionRunner(fusion).run(ranked_documents, top_n=top_k)
         return all_documents
 
     @classmethod
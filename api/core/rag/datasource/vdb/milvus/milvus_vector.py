@@ -1,12 +1,12 @@
 import logging
 from typing import Any, Optional
-from uuid import uuid4
 
 from pydantic import BaseModel, root_validator
-from pymilvus import MilvusClient, MilvusException, connections
+from pymilvus import MilvusClient, MilvusException
 
 from core.rag.datasource.vdb.field import Field
 from core.rag.datasource.vdb.vector_base import BaseVector
+from core.rag.datasource.vdb.vector_client_registry import VectorClientRegistry
 from core.rag.models.document import Document
 from extensions.ext_redis import redis_client
 
@@ -50,7 +50,12 @@ class MilvusVector(BaseVector):
     def __init__(self, collection_name: str, config: MilvusConfig):
         super().__init__(collection_name)
         self._client_config = config
-        self._client = self._init_client(config)
+        # client is shared by all collections of the same server in the process
+        self._client = VectorClientRegistry.get(
+            backend='milvus',
+            key=tuple(sorted(config.dict().items())),
+            factory=lambda: self._init_client(config)
+        )
         self._consistency_level = 'Session'
         self._fields = []
 
@@ -110,12 +115,8 @@ class MilvusVector(BaseVector):
             return None
 
     def delete_by_metadata_field(self, key: str, value: str):
-        alias = uuid4().hex
-        if self._client_config.secure:
-            uri = "https://" + str(self._client_config.host) + ":" + str(self._client_config.port)
-        else:
-            uri = "http://" + str(self._client_config.host) + ":" + str(self._client_config.port)
-        connections.connect(alias=alias, uri=uri, user=self._client_config.user, password=self._client_config.password)
+        # reuse the connection of the shared client
+        alias = self._client._using
 
         from pymilvus import utility
         if utility.has_collection(self._collection_name, using=alias):
@@ -125,12 +126,8 @@ class MilvusVector(BaseVector):
                 self._client.delete(collection_name=self._collection_name, pks=ids)
 
     def delete_by_ids(self, ids: list[str]) -> None:
-        alias = uuid4().hex
-        if self._client_config.secure:
-            uri = "https://" + str(self._client_config.host) + ":" + str(self._client_config.port)
-        else:
-            uri = "http://" + str(self._client_config.host) + ":" + str(self._client_config.port)
-        connections.connect(alias=alias, uri=uri, user=self._client_config.user, password=self._client_config.password)
+        # reuse the connection of the shared client
+        alias = self._client._using
 
         from pymilvus import utility
         if utility.has_collection(self._collection_name, using=alias):
@@ -143,26 +140,16 @@ class MilvusVector(BaseVector):
                 self._client.delete(collection_name=self._collection_name, pks=ids)
 
     def delete(self) -> None:
-        alias = uuid4().hex
-        if self._client_config.secure:
-            uri = "https://" + str(self._client_config.host) + ":" + str(self._client_config.port)
-        else:
-            uri = "http://" + str(self._client_config.host) + ":" + str(self._client_config.port)
-        connections.connect(alias=alias, uri=uri, user=self._client_config.user, password=self._client_config.password,
-                            db_name=self._client_config.database)
+        # reuse the connection of the shared client
+        alias = self._client._using
 
         from pymilvus import utility
         if utility.has_collection(self._collection_name, using=alias):
             utility.drop_collection(self._collection_name, None, using=alias)
 
     def text_exists(self, id: str) -> bool:
-        alias = uuid4().hex
-        if self._client_config.secure:
-            uri = "https://" + str(self._client_config.host) + ":" + str(self._client_config.port)
-        else:
-            uri = "http://" + str(self._client_config.host) + ":" + str(self._client_config.port)
-        connections.connect(alias=alias, uri=uri, user=self._client_config.user, password=self._client_config.password,
-                            db_name=self._client_config.database)
+        # reuse the connection of the shared client
+        alias = self._client._using
 
         from pymilvus import utility
         if not utility.has_collection(self._collection_name, using=alias):
@@ -208,13 +195,8 @@ class MilvusVector(BaseVector):
                 return
             # Grab the existing collection if it exists
             from pymilvus import utility
-            alias = uuid4().hex
-            if self._client_config.secure:
-                uri = "https://" + str(self._client_config.host) + ":" + str(self._client_config.port)
-            else:
-                uri = "http://" + str(self._client_config.host) + ":" + str(self._client_config.port)
-            connections.connect(alias=alias, uri=uri, user=self._client_config.user,
-                                password=self._client_config.password, db_name=self._client_config.database)
+            # reuse the connection of the shared client
+            alias = self._client._using
             if not utility.has_collection(self._collection_name, using=alias):
                 from pymilvus import CollectionSchema, DataType, FieldSchema
                 from pymilvus.orm.types import infer_dtype_bydata
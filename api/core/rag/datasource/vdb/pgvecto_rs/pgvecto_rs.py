@@ -1,17 +1,23 @@
+import hashlib
 import logging
+import re
 from typing import Any
 from uuid import UUID, uuid4
 
+import psycopg2.errors
 from numpy import ndarray
 from pgvecto_rs.sqlalchemy import Vector
 from pydantic import BaseModel, root_validator
-from sqlalchemy import Float, String, create_engine, insert, select, text
+from sqlalchemy import Engine, Float, String, create_engine, insert, select, text
 from sqlalchemy import text as sql_text
 from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import ProgrammingError
 from sqlalchemy.orm import Mapped, Session, mapped_column
 
 from core.rag.datasource.vdb.pgvecto_rs.collection import CollectionORM
+from core.rag.datasource.vdb.pgvector.pgvector import build_tsquery
 from core.rag.datasource.vdb.vector_base import BaseVector
+from core.rag.datasource.vdb.vector_client_registry import VectorClientRegistry
 from core.rag.models.document import Document
 from extensions.ext_redis import redis_client
 
@@ -24,6 +30,7 @@ class PgvectoRSConfig(BaseModel):
     user: str
     password: str
     database: str
+    text_search_config: str = 'simple'
 
     @root_validator()
     def validate_config(cls, values: dict) -> dict:
@@ -37,6 +44,8 @@ class PgvectoRSConfig(BaseModel):
             raise ValueError("config PGVECTO_RS_PASSWORD is required")
         if not values['database']:
             raise ValueError("config PGVECTO_RS_DATABASE is required")
+        if not re.fullmatch(r'[a-z_][a-z0-9_.]*', values['text_search_config'] or ''):
+            raise ValueError("config PGVECTO_RS_TEXT_SEARCH_CONFIG is invalid")
         return values
 
 
@@ -46,10 +55,13 @@ class PGVectoRS(BaseVector):
         super().__init__(collection_name)
         self._client_config = config
         self._url = f"postgresql+psycopg2://{config.user}:{config.password}@{config.host}:{config.port}/{config.database}"
-        self._client = create_engine(self._url)
-        with Session(self._client) as session:
-            session.execute(text("CREATE EXTENSION IF NOT EXISTS vectors"))
-            session.commit()
+        # engine is shared by all collections of the same database in the process
+        self._client = VectorClientRegistry.get(
+            backend='pgvecto_rs',
+            key=(self._url,),
+            factory=lambda: self._create_engine(self._url),
+            close=lambda engine: engine.dispose()
+        )
         self._fields = []
 
         class _Table(CollectionORM):
@@ -65,6 +77,15 @@ class PGVectoRS(BaseVector):
 
         self._table = _Table
         self._distance_op = "<=>"
+        self._text_index_name = f"text_idx_{hashlib.md5(collection_name.encode()).hexdigest()}"
+
+    @staticmethod
+    def _create_engine(url: str) -> Engine:
+        engine = create_engine(url, pool_pre_ping=True)
+        with Session(engine) as session:
+            session.execute(text("CREATE EXTENSION IF NOT EXISTS vectors"))
+            session.commit()
+        return engine
 
     def get_type(self) -> str:
         return 'pgvecto-rs'
@@ -86,10 +107,16 @@ class PGVectoRS(BaseVector):
                         id UUID PRIMARY KEY,
                         text TEXT NOT NULL,
                         meta JSONB NOT NULL,
-                        vector vector({dimension}) NOT NULL
+                        vector vector({dimension}) NOT NULL,
+                        text_tsv tsvector GENERATED ALWAYS AS
+                            (to_tsvector('{self._client_config.text_search_config}', text)) STORED
                     ) using heap; 
                 """)
                 session.execute(create_statement)
+                session.execute(sql_text(
+                    f"CREATE INDEX IF NOT EXISTS {self._text_index_name} "
+                    f"ON {self._collection_name} USING gin (text_tsv)"
+                ))
                 index_statement = sql_text(f"""
                         CREATE INDEX IF NOT EXISTS {index_name}
                         ON {self._collection_name} USING vectors(vector vector_l2_ops)
@@ -209,16 +236,54 @@ class PGVectoRS(BaseVector):
         return docs
 
     def search_by_full_text(self, query: str, **kwargs: Any) -> list[Document]:
-        # with Session(self._client) as session:
-        #     select_statement = sql_text(
-        #         f"SELECT text, meta FROM {self._collection_name} WHERE to_tsvector(text) @@ '{query}'::tsquery"
-        #     )
-        #     results = session.execute(select_statement).fetchall()
-        # if results:
-        #     docs = []
-        #     for result in results:
-        #         doc = Document(page_content=result[0],
-        #                        metadata=result[1])
-        #         docs.append(doc)
-        #     return docs
-        return []
+        """
+        Search segments matching any term of the query, ranked by ts_rank_cd.
+
+        :param query: The query text.
+        :param top_k: The number of segments to return, default is 5.
+        :return: List of Documents, with rank normalized into [0, 1) as score.
+        """
+        top_k = kwargs.get('top_k', 5)
+        tsquery = build_tsquery(query)
+        if not tsquery:
+            return []
+
+        try:
+            with Session(self._client) as session:
+                select_statement = sql_text(
+                    f"SELECT text, meta, ts_rank_cd(text_tsv, query, 32) AS score "
+                    f"FROM {self._collection_name}, "
+                    f"to_tsquery('{self._client_config.text_search_config}', :query) query "
+                    f"WHERE text_tsv @@ query ORDER BY score DESC LIMIT :top_k"
+                )
+                results = session.execute(
+                    select_statement, {'query': tsquery, 'top_k': top_k}
+                ).fetchall()
+        except ProgrammingError as e:
+            if not isinstance(e.orig, psycopg2.errors.UndefinedColumn):
+                raise
+            logger.warning(f"Full text search is not enabled for {self._collection_name}, "
+                           f"run the vdb-create-full-text-index command to enable it")
+            return []
+
+        docs = []
+        for content, metadata, score in results:
+            metadata['score'] = score
+            docs.append(Document(page_content=content, metadata=metadata))
+        return docs
+
+    def create_full_text_index(self) -> None:
+        """
+        Add the generated tsvector column and its GIN index to a collection created without them.
+        Adding the stored column rewrites the table.
+        """
+        with Session(self._client) as session:
+            session.execute(sql_text(
+                f"ALTER TABLE {self._collection_name} ADD COLUMN IF NOT EXISTS text_tsv tsvector "
+                f"GENERATED ALWAYS AS (to_tsvector('{self._client_config.text_search_config}', text)) STORED"
+            ))
+            session.execute(sql_text(
+                f"CREATE INDEX IF NOT EXISTS {self._text_index_name} "
+                f"ON {self._collection_name} USING gin (text_tsv)"
+            ))
+            session.commit()
@@ -1,16 +1,25 @@
+import hashlib
 import json
+import logging
+import re
+import threading
 import uuid
 from contextlib import contextmanager
-from typing import Any
+from typing import Any, Optional
 
+import psycopg2.errors
 import psycopg2.extras
 import psycopg2.pool
+from prometheus_client import Gauge
 from pydantic import BaseModel, root_validator
 
 from core.rag.datasource.vdb.vector_base import BaseVector
+from core.rag.datasource.vdb.vector_client_registry import VectorClientRegistry
 from core.rag.models.document import Document
 from extensions.ext_redis import redis_client
 
+logger = logging.getLogger(__name__)
+
 
 class PGVectorConfig(BaseModel):
     host: str
@@ -18,6 +27,17 @@ class PGVectorConfig(BaseModel):
     user: str
     password: str
     database: str
+    min_connection: int = 1
+    max_connection: int = 20
+    # seconds to wait for a connection when all connections of the pool are checked out
+    pool_timeout: float = 30
+    index_type: str = "hnsw"
+    hnsw_m: int = 16
+    hnsw_ef_construction: int = 64
+    hnsw_ef_search: int = 40
+    ivfflat_lists: int = 100
+    ivfflat_probes: int = 1
+    text_search_config: str = "simple"
 
     @root_validator()
     def validate_config(cls, values: dict) -> dict:
@@ -31,49 +51,165 @@ class PGVectorConfig(BaseModel):
             raise ValueError("config PGVECTOR_PASSWORD is required")
         if not values["database"]:
             raise ValueError("config PGVECTOR_DATABASE is required")
+        if values["min_connection"] > values["max_connection"]:
+            raise ValueError("config PGVECTOR_MIN_CONNECTION should less than PGVECTOR_MAX_CONNECTION")
+        if values["index_type"] not in ("hnsw", "ivfflat", "none"):
+            raise ValueError("config PGVECTOR_INDEX_TYPE should be one of hnsw, ivfflat, none")
+        if not re.fullmatch(r"[a-z_][a-z0-9_.]*", values["text_search_config"] or ""):
+            raise ValueError("config PGVECTOR_TEXT_SEARCH_CONFIG is invalid")
         return values
 
 
+class BlockingConnectionPool(psycopg2.pool.ThreadedConnectionPool):
+    """
+    Threaded connection pool waiting for a connection to be returned when all of them are checked out,
+    instead of raising PoolError at once.
+    """
+
+    def __init__(self, minconn: int, maxconn: int, *args, timeout: float = 30, **kwargs):
+        super().__init__(minconn, maxconn, *args, **kwargs)
+        self._semaphore = threading.BoundedSemaphore(maxconn)
+        self._timeout = timeout
+
+    def getconn(self, key=None, timeout: Optional[float] = None):
+        """
+        Get a connection, waiting up to timeout seconds for one to be returned
+        :param key: key of the connection
+        :param timeout: seconds to wait, the timeout of the pool by default
+        :return:
+        """
+        if not self._semaphore.acquire(timeout=self._timeout if timeout is None else timeout):
+            raise psycopg2.pool.PoolError("connection pool exhausted")
+        try:
+            return super().getconn(key)
+        except BaseException:
+            self._semaphore.release()
+            raise
+
+    def putconn(self, conn=None, key=None, close=False):
+        super().putconn(conn, key, close)
+        self._semaphore.release()
+
+
+pgvector_pool_connections = Gauge(
+    'pgvector_pool_connections',
+    'Connections of pooled pgvector connection pools, by state',
+    ['host', 'port', 'database', 'state']
+)
+
 SQL_CREATE_TABLE = """
 CREATE TABLE IF NOT EXISTS {table_name} (
     id UUID PRIMARY KEY,
     text TEXT NOT NULL,
     meta JSONB NOT NULL,
-    embedding vector({dimension}) NOT NULL
+    embedding vector({dimension}) NOT NULL,
+    text_tsv tsvector GENERATED ALWAYS AS (to_tsvector('{text_search_config}', text)) STORED
 ) using heap; 
 """
 
+SQL_ADD_TSVECTOR_COLUMN = """
+ALTER TABLE {table_name} ADD COLUMN IF NOT EXISTS
+text_tsv tsvector GENERATED ALWAYS AS (to_tsvector('{text_search_config}', text)) STORED;
+"""
+
+SQL_CREATE_GIN_INDEX = """
+CREATE INDEX IF NOT EXISTS {index_name} ON {table_name} USING gin (text_tsv);
+"""
+
+SQL_CREATE_HNSW_INDEX = """
+CREATE INDEX IF NOT EXISTS {index_name} ON {table_name}
+USING hnsw (embedding vector_cosine_ops) WITH (m = {m}, ef_construction = {ef_construction});
+"""
+
+SQL_CREATE_IVFFLAT_INDEX = """
+CREATE INDEX IF NOT EXISTS {index_name} ON {table_name}
+USING ivfflat (embedding vector_cosine_ops) WITH (lists = {lists});
+"""
+
 
 class PGVector(BaseVector):
     def __init__(self, collection_name: str, config: PGVectorConfig):
         super().__init__(collection_name)
-        self.pool = self._create_connection_pool(config)
+        self._config = config
         self.table_name = f"embedding_{collection_name}"
+        # table names of collections are close to the 63 bytes identifier limit, keep index names short
+        table_name_hash = hashlib.md5(self.table_name.encode()).hexdigest()
+        self.index_name = f"embedding_idx_{table_name_hash}"
+        self.text_index_name = f"embedding_text_idx_{table_name_hash}"
 
     def get_type(self) -> str:
         return "pgvector"
 
+    @property
+    def pool(self) -> BlockingConnectionPool:
+        # connection pool is shared by all collections of the same database in the process
+        return VectorClientRegistry.get(
+            backend=self.get_type(),
+            key=tuple(sorted(self._config.dict().items())),
+            factory=lambda: self._create_connection_pool(self._config),
+            health_check=self._check_connection_pool,
+            close=lambda pool: pool.closeall(),
+            # never close connections checked out by other threads
+            in_use=lambda pool: bool(pool._used)
+        )
+
     def _create_connection_pool(self, config: PGVectorConfig):
-        return psycopg2.pool.SimpleConnectionPool(
-            1,
-            5,
+        pool = BlockingConnectionPool(
+            config.min_connection,
+            config.max_connection,
+            timeout=config.pool_timeout,
             host=config.host,
             port=config.port,
             user=config.user,
             password=config.password,
             database=config.database,
         )
+        labels = (config.host, str(config.port), config.database)
+        pgvector_pool_connections.labels(*labels, 'in_use').set_function(lambda: len(pool._used))
+        pgvector_pool_connections.labels(*labels, 'idle').set_function(lambda: len(pool._pool))
+        return pool
+
+    @staticmethod
+    def _check_connection_pool(pool: BlockingConnectionPool) -> bool:
+        if not pool._pool:
+            # no idle connection, never make requests wait for the health check
+            return not pool.closed
+        try:
+            conn = pool.getconn(timeout=0)
+        except psycopg2.pool.PoolError:
+            # all connections are checked out, the pool is busy rather than broken
+            return not pool.closed
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+        except psycopg2.Error:
+            pool.putconn(conn, close=True)
+            return False
+        pool.putconn(conn)
+        return True
 
     @contextmanager
     def _get_cursor(self):
-        conn = self.pool.getconn()
-        cur = conn.cursor()
+        pool = self.pool
+        conn = pool.getconn()
+        discard = False
         try:
-            yield cur
-        finally:
-            cur.close()
+            cur = conn.cursor()
+            try:
+                yield cur
+            finally:
+                cur.close()
             conn.commit()
-            self.pool.putconn(conn)
+        except BaseException:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                discard = True
+            raise
+        finally:
+            # discard broken connections instead of returning them to the pool
+            pool.putconn(conn, close=discard or bool(conn.closed))
 
     def create(self, texts: list[Document], embeddings: list[list[float]], **kwargs):
         dimension = len(embeddings[0])
@@ -130,30 +266,89 @@ class PGVector(BaseVector):
         :return: List of Documents that are nearest to the query vector.
         """
         top_k = kwargs.get("top_k", 5)
+        score_threshold = kwargs.get("score_threshold") if kwargs.get("score_threshold") else 0.0
 
         with self._get_cursor() as cur:
+            self._set_search_params(cur, top_k)
+            # cosine distance is 1 - score, filter in sql so that only hits above threshold are returned
             cur.execute(
-                f"SELECT meta, text, embedding <=> %s AS distance FROM {self.table_name} ORDER BY distance LIMIT {top_k}",
-                (json.dumps(query_vector),),
+                f"SELECT meta, text, embedding <=> %s AS distance FROM {self.table_name}"
+                f" WHERE embedding <=> %s < %s ORDER BY distance LIMIT {int(top_k)}",
+                (json.dumps(query_vector), json.dumps(query_vector), 1 - score_threshold),
             )
             docs = []
-            score_threshold = kwargs.get("score_threshold") if kwargs.get("score_threshold") else 0.0
             for record in cur:
                 metadata, text, distance = record
-                score = 1 - distance
-                metadata["score"] = score
-                if score > score_threshold:
-                    docs.append(Document(page_content=text, metadata=metadata))
+                metadata["score"] = 1 - distance
+                docs.append(Document(page_content=text, metadata=metadata))
         return docs
 
+    def _set_search_params(self, cur, top_k: int) -> None:
+        """
+        Set ANN index search params of current transaction
+        :param cur: cursor
+        :param top_k: number of nearest neighbors to return
+        :return:
+        """
+        if self._config.index_type == "hnsw":
+            # hnsw returns at most ef_search rows
+            cur.execute("SET LOCAL hnsw.ef_search = %s", (max(self._config.hnsw_ef_search, int(top_k)),))
+        elif self._config.index_type == "ivfflat":
+            cur.execute("SET LOCAL ivfflat.probes = %s", (self._config.ivfflat_probes,))
+
     def search_by_full_text(self, query: str, **kwargs: Any) -> list[Document]:
-        # do not support bm25 search
-        return []
+        """
+        Search segments matching any term of the query, ranked by ts_rank_cd.
+
+        :param query: The query text.
+        :param top_k: The number of segments to return, default is 5.
+        :return: List of Documents, with rank normalized into [0, 1) as score.
+        """
+        top_k = kwargs.get("top_k", 5)
+        tsquery = build_tsquery(query)
+        if not tsquery:
+            return []
+
+        try:
+            with self._get_cursor() as cur:
+                cur.execute(
+                    f"SELECT meta, text, ts_rank_cd(text_tsv, query, 32) AS score"
+                    f" FROM {self.table_name}, to_tsquery('{self._config.text_search_config}', %s) query"
+                    f" WHERE text_tsv @@ query ORDER BY score DESC LIMIT {int(top_k)}",
+                    (tsquery,),
+                )
+                docs = []
+                for record in cur:
+                    metadata, text, score = record
+                    metadata["score"] = score
+                    docs.append(Document(page_content=text, metadata=metadata))
+        except psycopg2.errors.UndefinedColumn:
+            logger.warning(f"Full text search is not enabled for {self.table_name}, "
+                           f"run the vdb-create-full-text-index command to enable it")
+            return []
+        return docs
+
+    def create_full_text_index(self) -> None:
+        """
+        Add the generated tsvector column and its GIN index to a collection created without them.
+        Adding the stored column rewrites the table.
+        """
+        with self._get_cursor() as cur:
+            cur.execute(SQL_ADD_TSVECTOR_COLUMN.format(
+                table_name=self.table_name,
+                text_search_config=self._config.text_search_config
+            ))
+            cur.execute(SQL_CREATE_GIN_INDEX.format(index_name=self.text_index_name, table_name=self.table_name))
 
     def delete(self) -> None:
         with self._get_cursor() as cur:
             cur.execute(f"DROP TABLE IF EXISTS {self.table_name}")
 
+    def collection_exists(self) -> bool:
+        with self._get_cursor() as cur:
+            cur.execute("SELECT to_regclass(%s)", (self.table_name,))
+            return cur.fetchone()[0] is not None
+
     def _create_collection(self, dimension: int):
         cache_key = f"vector_indexing_{self._collection_name}"
         lock_name = f"{cache_key}_lock"
@@ -164,6 +359,52 @@ class PGVector(BaseVector):
 
             with self._get_cursor() as cur:
                 cur.execute("CREATE EXTENSION IF NOT EXISTS vector")
-                cur.execute(SQL_CREATE_TABLE.format(table_name=self.table_name, dimension=dimension))
-                # TODO: create index https://github.com/pgvector/pgvector?tab=readme-ov-file#indexing
+                cur.execute(SQL_CREATE_TABLE.format(
+                    table_name=self.table_name,
+                    dimension=dimension,
+                    text_search_config=self._config.text_search_config
+                ))
+                cur.execute(SQL_CREATE_GIN_INDEX.format(index_name=self.text_index_name, table_name=self.table_name))
+            self.create_index()
             redis_client.set(collection_exist_cache_key, 1, ex=3600)
+
+    def create_index(self, rebuild: bool = False) -> bool:
+        """
+        Create ANN index of embeddings if not exists.
+        IVFFlat lists are trained on existing rows, rebuild the index once the collection has data.
+
+        :param rebuild: drop and recreate the index
+        :return: whether an index is configured
+        """
+        if self._config.index_type == "hnsw":
+            sql = SQL_CREATE_HNSW_INDEX.format(
+                index_name=self.index_name,
+                table_name=self.table_name,
+                m=int(self._config.hnsw_m),
+                ef_construction=int(self._config.hnsw_ef_construction)
+            )
+        elif self._config.index_type == "ivfflat":
+            sql = SQL_CREATE_IVFFLAT_INDEX.format(
+                index_name=self.index_name,
+                table_name=self.table_name,
+                lists=int(self._config.ivfflat_lists)
+            )
+        else:
+            return False
+
+        with self._get_cursor() as cur:
+            if rebuild:
+                cur.execute(f"DROP INDEX IF EXISTS {self.index_name}")
+            cur.execute(sql)
+        logger.info(f"Created {self._config.index_type} index {self.index_name} of {self.table_name}")
+        return True
+
+
+def build_tsquery(query: str) -> str:
+    """
+    Build tsquery text matching any word of the query, so that ranking decides instead of requiring all words
+    :param query: query text
+    :return: tsquery text, empty if query has no words
+    """
+    words = dict.fromkeys(word.lower() for word in re.findall(r"\w+", query))
+    return " | ".join(f"'{word}'" for word in words)
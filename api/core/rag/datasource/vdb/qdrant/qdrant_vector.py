@@ -19,6 +19,7 @@ from qdrant_client.local.qdrant_local import QdrantLocal
 
 from core.rag.datasource.vdb.field import Field
 from core.rag.datasource.vdb.vector_base import BaseVector
+from core.rag.datasource.vdb.vector_client_registry import VectorClientRegistry
 from core.rag.models.document import Document
 from extensions.ext_redis import redis_client
 
@@ -64,7 +65,13 @@ class QdrantVector(BaseVector):
     def __init__(self, collection_name: str, group_id: str, config: QdrantConfig, distance_func: str = 'Cosine'):
         super().__init__(collection_name)
         self._client_config = config
-        self._client = qdrant_client.QdrantClient(**self._client_config.to_qdrant_params())
+        qdrant_params = self._client_config.to_qdrant_params()
+        # client is shared by all collections of the same endpoint in the process
+        self._client = VectorClientRegistry.get(
+            backend='qdrant',
+            key=tuple(sorted(qdrant_params.items())),
+            factory=lambda: qdrant_client.QdrantClient(**qdrant_params)
+        )
         self._distance_func = distance_func.upper()
         self._group_id = group_id
 
@@ -13,6 +13,7 @@ except ImportError:
     from sqlalchemy.ext.declarative import declarative_base
 
 from core.rag.datasource.vdb.vector_base import BaseVector
+from core.rag.datasource.vdb.vector_client_registry import VectorClientRegistry
 from core.rag.models.document import Document
 from extensions.ext_redis import redis_client
 
@@ -48,7 +49,13 @@ class RelytVector(BaseVector):
         self.embedding_dimension = 1536
         self._client_config = config
         self._url = f"postgresql+psycopg2://{config.user}:{config.password}@{config.host}:{config.port}/{config.database}"
-        self.client = create_engine(self._url)
+        # engine is shared by all collections of the same database in the process
+        self.client = VectorClientRegistry.get(
+            backend='relyt',
+            key=(self._url,),
+            factory=lambda: create_engine(self._url, pool_pre_ping=True),
+            close=lambda engine: engine.dispose()
+        )
         self._fields = []
         self._group_id = group_id
 
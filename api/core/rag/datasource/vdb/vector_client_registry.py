@@ -0,0 +1,192 @@
+import logging
+import threading
+import time
+from collections.abc import Callable
+from typing import Any, Optional
+
+from prometheus_client import Counter, Gauge
+
+logger = logging.getLogger(__name__)
+
+vector_client_count = Gauge(
+    'vector_store_clients',
+    'Pooled vector store clients alive in the process, by backend',
+    ['backend']
+)
+vector_client_events = Counter(
+    'vector_store_client_events_total',
+    'Pooled vector store client lifecycle events, by backend and event',
+    ['backend', 'event']
+)
+
+
+class _PooledClient:
+    def __init__(self, backend: str, client: Any, health_check: Optional[Callable[[Any], bool]],
+                 close: Optional[Callable[[Any], None]], in_use: Optional[Callable[[Any], bool]]):
+        self.backend = backend
+        self.client = client
+        self.health_check = health_check
+        self.close = close
+        self.in_use = in_use
+        self.created_at = time.monotonic()
+        self.last_used_at = self.created_at
+        self.last_checked_at = self.created_at
+
+
+class VectorClientRegistry:
+    """
+    Process-level registry of vector store clients, keyed by backend config.
+
+    Clients (connection pools, engines, SDK clients) are created once and shared by the
+    lightweight vector backend objects built per dataset. Shared clients are health checked
+    at most every `health_check_interval` seconds when handed out, and closed after being idle
+    for `idle_timeout` seconds. Removed clients still in use, e.g. pools with checked out connections,
+    are retired instead and closed once they are no longer in use.
+    """
+    health_check_interval = 30
+    idle_timeout = 600
+
+    _clients: dict[tuple, _PooledClient] = {}
+    _retired_clients: list[_PooledClient] = []
+    # guards the dicts and list above, never held while connecting
+    _lock = threading.Lock()
+    # serializes creation of the client of each key, so a slow connect only blocks lookups of that key
+    _creation_locks: dict[tuple, threading.Lock] = {}
+
+    @classmethod
+    def get(cls, backend: str, key: tuple, factory: Callable[[], Any],
+            health_check: Optional[Callable[[Any], bool]] = None,
+            close: Optional[Callable[[Any], None]] = None,
+            in_use: Optional[Callable[[Any], bool]] = None) -> Any:
+        """
+        Get shared client of backend config, create it if not exists or unhealthy
+
+        :param backend: backend type, e.g. pgvector
+        :param key: hashable backend config
+        :param factory: create a new client
+        :param health_check: return whether client is still usable
+        :param close: release resources of client
+        :param in_use: return whether client is still used, clients in use are closed once released
+        :return: client
+        """
+        registry_key = (backend, key)
+        now = time.monotonic()
+        cls._evict_idle(now)
+        cls._close_retired()
+
+        with cls._lock:
+            pooled_client = cls._clients.get(registry_key)
+
+        if pooled_client and pooled_client.health_check \
+                and now - pooled_client.last_checked_at >= cls.health_check_interval:
+            pooled_client.last_checked_at = now
+            if not cls._is_healthy(pooled_client):
+                cls._remove(registry_key, pooled_client, 'unhealthy')
+                pooled_client = None
+
+        if pooled_client:
+            pooled_client.last_used_at = now
+            vector_client_events.labels(backend, 'reused').inc()
+            return pooled_client.client
+
+        with cls._lock:
+            creation_lock = cls._creation_locks.setdefault(registry_key, threading.Lock())
+
+        with creation_lock:
+            with cls._lock:
+                # double check, another thread may have created the client
+                pooled_client = cls._clients.get(registry_key)
+
+            if not pooled_client:
+                new_client = _PooledClient(backend, factory(), health_check, close, in_use)
+                with cls._lock:
+                    pooled_client = cls._clients.setdefault(registry_key, new_client)
+
+                if pooled_client is new_client:
+                    vector_client_count.labels(backend).inc()
+                    vector_client_events.labels(backend, 'created').inc()
+                else:
+                    # created concurrently, e.g. while the key was cleared
+                    cls._close(new_client)
+
+        pooled_client.last_used_at = now
+        return pooled_client.client
+
+    @classmethod
+    def clear(cls) -> None:
+        """
+        Close and remove all clients
+        """
+        with cls._lock:
+            pooled_clients = list(cls._clients.items())
+
+        for registry_key, pooled_client in pooled_clients:
+            cls._remove(registry_key, pooled_client, 'cleared')
+        cls._close_retired()
+
+    @classmethod
+    def _evict_idle(cls, now: float) -> None:
+        with cls._lock:
+            idle_clients = [
+                (registry_key, pooled_client) for registry_key, pooled_client in cls._clients.items()
+                if now - pooled_client.last_used_at >= cls.idle_timeout
+            ]
+
+        for registry_key, pooled_client in idle_clients:
+            cls._remove(registry_key, pooled_client, 'evicted')
+
+    @classmethod
+    def _remove(cls, registry_key: tuple, pooled_client: _PooledClient, event: str) -> None:
+        with cls._lock:
+            if cls._clients.get(registry_key) is not pooled_client:
+                return
+            del cls._clients[registry_key]
+
+        vector_client_count.labels(pooled_client.backend).dec()
+        vector_client_events.labels(pooled_client.backend, event).inc()
+        if cls._is_in_use(pooled_client):
+            with cls._lock:
+                cls._retired_clients.append(pooled_client)
+            return
+        cls._close(pooled_client)
+
+    @classmethod
+    def _close_retired(cls) -> None:
+        if not cls._retired_clients:
+            return
+
+        with cls._lock:
+            released_clients = [
+                pooled_client for pooled_client in cls._retired_clients if not cls._is_in_use(pooled_client)
+            ]
+            for pooled_client in released_clients:
+                cls._retired_clients.remove(pooled_client)
+
+        for pooled_client in released_clients:
+            cls._close(pooled_client)
+
+    @staticmethod
+    def _close(pooled_client: _PooledClient) -> None:
+        if pooled_client.close:
+            try:
+                pooled_client.close(pooled_client.client)
+            except Exception:
+                logger.exception(f'Failed to close {pooled_client.backend} client')
+
+    @staticmethod
+    def _is_in_use(pooled_client: _PooledClient) -> bool:
+        if not pooled_client.in_use:
+            return False
+        try:
+            return pooled_client.in_use(pooled_client.client)
+        except Exception:
+            logger.exception(f'Failed to check usage of {pooled_client.backend} client')
+            return True
+
+    @staticmethod
+    def _is_healthy(pooled_client: _PooledClient) -> bool:
+        try:
+            return pooled_client.health_check(pooled_client.client)
+        except Exception:
+            logger.exception(f'Health check of {pooled_client.backend} client failed')
+            return False
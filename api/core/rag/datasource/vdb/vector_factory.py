@@ -4,6 +4,7 @@ from typing import Any
 from flask import current_app
 
 from core.embedding.cached_embedding import CacheEmbedding
+from core.helper.dataset_index_version import DatasetIndexVersion
 from core.model_manager import ModelManager
 from core.model_runtime.entities.model_entities import ModelType
 from core.rag.datasource.entity.embedding import Embeddings
@@ -161,6 +162,7 @@ class Vector:
                     user=config.get('PGVECTO_RS_USER'),
                     password=config.get('PGVECTO_RS_PASSWORD'),
                     database=config.get('PGVECTO_RS_DATABASE'),
+                    text_search_config=config.get('PGVECTO_RS_TEXT_SEARCH_CONFIG', 'simple'),
                 ),
                 dim=dim
             )
@@ -185,6 +187,16 @@ class Vector:
                     user=config.get("PGVECTOR_USER"),
                     password=config.get("PGVECTOR_PASSWORD"),
                     database=config.get("PGVECTOR_DATABASE"),
+                    min_connection=int(config.get("PGVECTOR_MIN_CONNECTION", 1)),
+                    max_connection=int(config.get("PGVECTOR_MAX_CONNECTION", 20)),
+                    pool_timeout=float(config.get("PGVECTOR_POOL_TIMEOUT", 30)),
+                    index_type=config.get("PGVECTOR_INDEX_TYPE", "hnsw"),
+                    hnsw_m=int(config.get("PGVECTOR_HNSW_M", 16)),
+                    hnsw_ef_construction=int(config.get("PGVECTOR_HNSW_EF_CONSTRUCTION", 64)),
+                    hnsw_ef_search=int(config.get("PGVECTOR_HNSW_EF_SEARCH", 40)),
+                    ivfflat_lists=int(config.get("PGVECTOR_IVFFLAT_LISTS", 100)),
+                    ivfflat_probes=int(config.get("PGVECTOR_IVFFLAT_PROBES", 1)),
+                    text_search_config=config.get("PGVECTOR_TEXT_SEARCH_CONFIG", "simple"),
                 ),
             )
         else:
@@ -192,12 +204,25 @@ class Vector:
 
     def create(self, texts: list = None, **kwargs):
         if texts:
-            embeddings = self._embeddings.embed_documents([document.page_content for document in texts])
-            self._vector_processor.create(
-                texts=texts,
-                embeddings=embeddings,
-                **kwargs
-            )
+            embeddings = self.embed_documents(texts)
+            self.create_with_embeddings(texts, embeddings, **kwargs)
+
+    def embed_documents(self, documents: list[Document]) -> list[list[float]]:
+        """
+        Embed documents to create, for callers embedding and writing documents in separate steps
+        """
+        return self._embeddings.embed_documents([document.page_content for document in documents])
+
+    def create_with_embeddings(self, documents: list[Document], embeddings: list[list[float]], **kwargs):
+        """
+        Create documents with embeddings from `embed_documents`
+        """
+        self._vector_processor.create(
+            texts=documents,
+            embeddings=embeddings,
+            **kwargs
+        )
+        DatasetIndexVersion.increase(self._dataset.id)
 
     def add_texts(self, documents: list[Document], **kwargs):
         if kwargs.get('duplicate_check', False):
@@ -208,15 +233,18 @@ class Vector:
             embeddings=embeddings,
             **kwargs
         )
+        DatasetIndexVersion.increase(self._dataset.id)
 
     def text_exists(self, id: str) -> bool:
         return self._vector_processor.text_exists(id)
 
     def delete_by_ids(self, ids: list[str]) -> None:
         self._vector_processor.delete_by_ids(ids)
+        DatasetIndexVersion.increase(self._dataset.id)
 
     def delete_by_metadata_field(self, key: str, value: str) -> None:
         self._vector_processor.delete_by_metadata_field(key, value)
+        DatasetIndexVersion.increase(self._dataset.id)
 
     def search_by_vector(
             self, query: str,
@@ -233,6 +261,7 @@ class Vector:
 
     def delete(self) -> None:
         self._vector_processor.delete()
+        DatasetIndexVersion.increase(self._dataset.id)
 
     def _get_embeddings(self) -> Embeddings:
         model_manager = ModelManager()
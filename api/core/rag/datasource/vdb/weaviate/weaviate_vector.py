@@ -1,4 +1,5 @@
 import datetime
+import threading
 from typing import Any, Optional
 
 import requests
@@ -7,6 +8,7 @@ from pydantic import BaseModel, root_validator
 
 from core.rag.datasource.vdb.field import Field
 from core.rag.datasource.vdb.vector_base import BaseVector
+from core.rag.datasource.vdb.vector_client_registry import VectorClientRegistry
 from core.rag.models.document import Document
 from extensions.ext_redis import redis_client
 from models.dataset import Dataset
@@ -28,7 +30,13 @@ class WeaviateVector(BaseVector):
 
     def __init__(self, collection_name: str, config: WeaviateConfig, attributes: list):
         super().__init__(collection_name)
-        self._client = self._init_client(config)
+        # client is shared by all collections of the same endpoint in the process,
+        # its batch is not thread safe and guarded by the batch lock
+        self._client, self._batch_lock = VectorClientRegistry.get(
+            backend='weaviate',
+            key=(config.endpoint, config.api_key, config.batch_size),
+            factory=lambda: (self._init_client(config), threading.Lock())
+        )
         self._attributes = attributes
 
     def _init_client(self, config: WeaviateConfig) -> weaviate.Client:
@@ -104,7 +112,7 @@ class WeaviateVector(BaseVector):
 
         ids = []
 
-        with self._client.batch as batch:
+        with self._batch_lock, self._client.batch as batch:
             for i, text in enumerate(texts):
                 data_properties = {Field.TEXT_KEY.value: text}
                 if metadatas is not None:
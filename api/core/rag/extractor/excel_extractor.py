@@ -1,4 +1,5 @@
 """Abstract interface for document loader implementations."""
+from collections.abc import Iterator
 from typing import Optional
 
 import pandas as pd
@@ -29,16 +30,21 @@ class ExcelExtractor(BaseExtractor):
 
     def extract(self) -> list[Document]:
         """ parse excel file"""
+        return list(self.extract_iter())
+
+    def extract_iter(self) -> Iterator[Document]:
+        """ parse excel file, rows are yielded sheet by sheet"""
         if self._file_path.endswith('.xls'):
-            return self._extract4xls()
+            yield from self._extract4xls()
         elif self._file_path.endswith('.xlsx'):
-            return self._extract4xlsx()
+            yield from self._extract4xlsx()
 
-    def _extract4xls(self) -> list[Document]:
-        wb = xlrd.open_workbook(filename=self._file_path)
-        documents = []
+    def _extract4xls(self) -> Iterator[Document]:
+        # load sheets one at a time
+        wb = xlrd.open_workbook(filename=self._file_path, on_demand=True)
         # loop over all sheets
-        for sheet in wb.sheets():
+        for sheet_index in range(wb.nsheets):
+            sheet = wb.sheet_by_index(sheet_index)
             for row_index, row in enumerate(sheet.get_rows(), start=1):
                 row_header = None
                 if self.is_blank_row(row):
@@ -52,12 +58,11 @@ class ExcelExtractor(BaseExtractor):
                     item_arr.append(f'{row_header[index].value}:{txt_value}')
                 item_str = "\n".join(item_arr)
                 document = Document(page_content=item_str, metadata={'source': self._file_path})
-                documents.append(document)
-        return documents
+                yield document
+            wb.unload_sheet(sheet_index)
 
-    def _extract4xlsx(self) -> list[Document]:
+    def _extract4xlsx(self) -> Iterator[Document]:
         """Load from file path using Pandas."""
-        data = []
         # Read each worksheet of an Excel file using Pandas
         xls = pd.ExcelFile(self._file_path)
         for sheet_name in xls.sheet_names:
@@ -70,8 +75,7 @@ class ExcelExtractor(BaseExtractor):
             for _, row in df.iterrows():
                 item = ';'.join(f'{k}:{v}' for k, v in row.items() if pd.notna(v))
                 document = Document(page_content=item, metadata={'source': self._file_path})
-                data.append(document)
-        return data
+                yield document
 
     @staticmethod
     def is_blank_row(row):
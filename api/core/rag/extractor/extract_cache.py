@@ -0,0 +1,78 @@
+import json
+import logging
+from typing import Optional
+
+from flask import current_app
+
+from core.rag.extractor.extractor_base import BaseExtractor
+from core.rag.models.document import Document
+from extensions.ext_storage import storage
+from models.model import UploadFile
+
+logger = logging.getLogger(__name__)
+
+
+class ExtractCache:
+    """
+    Content-addressed cache of extracted documents of upload files, kept in storage.
+
+    Entries are keyed by the content hash of the upload file and the extractor and its version, so unchanged
+    files are not downloaded and parsed again by previews and re-indexing, and a new extractor version
+    is never served stale output. Entries are scoped by tenant, as extracted text may link to tenant files.
+    Files with more than `EXTRACT_CACHE_MAX_BYTES` of extracted text are not cached.
+    """
+
+    @staticmethod
+    def get_max_bytes() -> int:
+        """
+        Get max bytes of extracted text of a cached file
+        """
+        return int(current_app.config.get('EXTRACT_CACHE_MAX_BYTES', 10 * 1024 * 1024))
+
+    @staticmethod
+    def get_key(upload_file: UploadFile, extractor_type: type[BaseExtractor]) -> Optional[str]:
+        """
+        Get cache key of extracted documents
+
+        :param upload_file: upload file
+        :param extractor_type: extractor class of the file
+        :return: cache key, None if the file can not be cached
+        """
+        if not upload_file.hash or not current_app.config.get('EXTRACT_CACHE_ENABLED', True):
+            return None
+
+        return (f'extract_cache/{upload_file.tenant_id}/{upload_file.hash}/'
+                f'{extractor_type.__name__}.{extractor_type.version}.json')
+
+    @staticmethod
+    def load(key: str) -> Optional[list[Document]]:
+        """
+        Load extracted documents
+
+        :param key: cache key
+        :return: documents, None if not cached
+        """
+        try:
+            data = storage.load(key)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            logger.exception(f'Failed to load extract cache {key}')
+            return None
+
+        return [Document(**document) for document in json.loads(data)]
+
+    @staticmethod
+    def save(key: str, documents: list[Document]) -> None:
+        """
+        Save extracted documents
+
+        :param key: cache key
+        :param documents: documents
+        :return:
+        """
+        data = json.dumps([document.dict() for document in documents], ensure_ascii=False)
+        try:
+            storage.save(key, data.encode('utf-8'))
+        except Exception:
+            logger.exception(f'Failed to save extract cache {key}')
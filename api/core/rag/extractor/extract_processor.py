@@ -1,5 +1,7 @@
 import re
 import tempfile
+from collections.abc import Iterator
+from functools import partial
 from pathlib import Path
 from typing import Union
 from urllib.parse import unquote
@@ -11,6 +13,8 @@ from core.rag.extractor.csv_extractor import CSVExtractor
 from core.rag.extractor.entity.datasource_type import DatasourceType
 from core.rag.extractor.entity.extract_setting import ExtractSetting
 from core.rag.extractor.excel_extractor import ExcelExtractor
+from core.rag.extractor.extract_cache import ExtractCache
+from core.rag.extractor.extractor_base import BaseExtractor
 from core.rag.extractor.html_extractor import HtmlExtractor
 from core.rag.extractor.markdown_extractor import MarkdownExtractor
 from core.rag.extractor.notion_extractor import NotionExtractor
@@ -84,67 +88,54 @@ class ExtractProcessor:
     @classmethod
     def extract(cls, extract_setting: ExtractSetting, is_automatic: bool = False,
                 file_path: str = None) -> list[Document]:
+        return list(cls.extract_iter(extract_setting, is_automatic, file_path))
+
+    @classmethod
+    def extract_iter(cls, extract_setting: ExtractSetting, is_automatic: bool = False,
+                     file_path: str = None) -> Iterator[Document]:
+        """
+        Extract documents lazily, yielded as they are parsed, e.g. page by page for pdf files
+        :param extract_setting: extract setting
+        :param is_automatic: whether to use the unstructured api for markdown and text files
+        :param file_path: local file to extract instead of the upload file
+        :return:
+        """
         if extract_setting.datasource_type == DatasourceType.FILE.value:
+            upload_file: UploadFile = extract_setting.upload_file
+            file_extension = Path(file_path or upload_file.key).suffix.lower()
+            create_extractor = cls._get_extractor_factory(file_extension, upload_file, is_automatic)
+
+            # extracted documents of upload files are cached by content, checked before download
+            cache_key = None
+            if not file_path:
+                cache_key = ExtractCache.get_key(upload_file, create_extractor.func)
+                if cache_key:
+                    documents = ExtractCache.load(cache_key)
+                    if documents is not None:
+                        yield from documents
+                        return
+
+            # documents are kept for the cache entry until the text exceeds the max bytes of cached files
+            documents = []
+            documents_bytes = 0
+            max_cache_bytes = ExtractCache.get_max_bytes() if cache_key else 0
             with tempfile.TemporaryDirectory() as temp_dir:
                 if not file_path:
-                    upload_file: UploadFile = extract_setting.upload_file
-                    suffix = Path(upload_file.key).suffix
-                    file_path = f"{temp_dir}/{next(tempfile._get_candidate_names())}{suffix}"
+                    file_path = f"{temp_dir}/{next(tempfile._get_candidate_names())}{Path(upload_file.key).suffix}"
                     storage.download(upload_file.key, file_path)
-                input_file = Path(file_path)
-                file_extension = input_file.suffix.lower()
-                etl_type = current_app.config['ETL_TYPE']
-                unstructured_api_url = current_app.config['UNSTRUCTURED_API_URL']
-                unstructured_api_key = current_app.config['UNSTRUCTURED_API_KEY']
-                if etl_type == 'Unstructured':
-                    if file_extension == '.xlsx' or file_extension == '.xls':
-                        extractor = ExcelExtractor(file_path)
-                    elif file_extension == '.pdf':
-                        extractor = PdfExtractor(file_path)
-                    elif file_extension in ['.md', '.markdown']:
-                        extractor = UnstructuredMarkdownExtractor(file_path, unstructured_api_url) if is_automatic \
-                            else MarkdownExtractor(file_path, autodetect_encoding=True)
-                    elif file_extension in ['.htm', '.html']:
-                        extractor = HtmlExtractor(file_path)
-                    elif file_extension in ['.docx']:
-                        extractor = WordExtractor(file_path, upload_file.tenant_id, upload_file.created_by)
-                    elif file_extension == '.csv':
-                        extractor = CSVExtractor(file_path, autodetect_encoding=True)
-                    elif file_extension == '.msg':
-                        extractor = UnstructuredMsgExtractor(file_path, unstructured_api_url)
-                    elif file_extension == '.eml':
-                        extractor = UnstructuredEmailExtractor(file_path, unstructured_api_url)
-                    elif file_extension == '.ppt':
-                        extractor = UnstructuredPPTExtractor(file_path, unstructured_api_url, unstructured_api_key)
-                    elif file_extension == '.pptx':
-                        extractor = UnstructuredPPTXExtractor(file_path, unstructured_api_url)
-                    elif file_extension == '.xml':
-                        extractor = UnstructuredXmlExtractor(file_path, unstructured_api_url)
-                    elif file_extension == 'epub':
-                        extractor = UnstructuredEpubExtractor(file_path, unstructured_api_url)
-                    else:
-                        # txt
-                        extractor = UnstructuredTextExtractor(file_path, unstructured_api_url) if is_automatic \
-                            else TextExtractor(file_path, autodetect_encoding=True)
-                else:
-                    if file_extension == '.xlsx' or file_extension == '.xls':
-                        extractor = ExcelExtractor(file_path)
-                    elif file_extension == '.pdf':
-                        extractor = PdfExtractor(file_path)
-                    elif file_extension in ['.md', '.markdown']:
-                        extractor = MarkdownExtractor(file_path, autodetect_encoding=True)
-                    elif file_extension in ['.htm', '.html']:
-                        extractor = HtmlExtractor(file_path)
-                    elif file_extension in ['.docx']:
-                        extractor = WordExtractor(file_path, upload_file.tenant_id, upload_file.created_by)
-                    elif file_extension == '.csv':
-                        extractor = CSVExtractor(file_path, autodetect_encoding=True)
-                    elif file_extension == 'epub':
-                        extractor = UnstructuredEpubExtractor(file_path)
-                    else:
-                        # txt
-                        extractor = TextExtractor(file_path, autodetect_encoding=True)
-                return extractor.extract()
+                for document in create_extractor(file_path).extract_iter():
+                    if cache_key:
+                        documents_bytes += len(document.page_content.encode('utf-8'))
+                        if documents_bytes > max_cache_bytes:
+                            # too large to cache, stop holding every page in memory
+                            cache_key = None
+                            documents = []
+                        else:
+                            documents.append(document)
+                    yield document
+
+            if cache_key:
+                ExtractCache.save(cache_key, documents)
         elif extract_setting.datasource_type == DatasourceType.NOTION.value:
             extractor = NotionExtractor(
                 notion_workspace_id=extract_setting.notion_info.notion_workspace_id,
@@ -153,6 +144,70 @@ class ExtractProcessor:
                 document_model=extract_setting.notion_info.document,
                 tenant_id=extract_setting.notion_info.tenant_id,
             )
-            return extractor.extract()
+            yield from extractor.extract()
         else:
             raise ValueError(f"Unsupported datasource type: {extract_setting.datasource_type}")
+
+    @classmethod
+    def _get_extractor_factory(cls, file_extension: str, upload_file: UploadFile,
+                               is_automatic: bool) -> partial[BaseExtractor]:
+        """
+        Get factory of the extractor of a file, called with the file path
+        :param file_extension: lower case file extension
+        :param upload_file: upload file
+        :param is_automatic: whether to use the unstructured api for markdown and text files
+        :return:
+        """
+        etl_type = current_app.config['ETL_TYPE']
+        unstructured_api_url = current_app.config['UNSTRUCTURED_API_URL']
+        unstructured_api_key = current_app.config['UNSTRUCTURED_API_KEY']
+        pdf_extract_max_workers = int(current_app.config.get('PDF_EXTRACT_MAX_WORKERS', 1))
+        pdf_extract_batch_pages = int(current_app.config.get('PDF_EXTRACT_BATCH_PAGES', 32))
+        if etl_type == 'Unstructured':
+            if file_extension == '.xlsx' or file_extension == '.xls':
+                return partial(ExcelExtractor)
+            elif file_extension == '.pdf':
+                return partial(PdfExtractor, max_workers=pdf_extract_max_workers, batch_pages=pdf_extract_batch_pages)
+            elif file_extension in ['.md', '.markdown']:
+                return partial(UnstructuredMarkdownExtractor, api_url=unstructured_api_url) if is_automatic \
+                    else partial(MarkdownExtractor, autodetect_encoding=True)
+            elif file_extension in ['.htm', '.html']:
+                return partial(HtmlExtractor)
+            elif file_extension in ['.docx']:
+                return partial(WordExtractor, tenant_id=upload_file.tenant_id, user_id=upload_file.created_by)
+            elif file_extension == '.csv':
+                return partial(CSVExtractor, autodetect_encoding=True)
+            elif file_extension == '.msg':
+                return partial(UnstructuredMsgExtractor, api_url=unstructured_api_url)
+            elif file_extension == '.eml':
+                return partial(UnstructuredEmailExtractor, api_url=unstructured_api_url)
+            elif file_extension == '.ppt':
+                return partial(UnstructuredPPTExtractor, api_url=unstructured_api_url, api_key=unstructured_api_key)
+            elif file_extension == '.pptx':
+                return partial(UnstructuredPPTXExtractor, api_url=unstructured_api_url)
+            elif file_extension == '.xml':
+                return partial(UnstructuredXmlExtractor, api_url=unstructured_api_url)
+            elif file_extension == 'epub':
+                return partial(UnstructuredEpubExtractor, api_url=unstructured_api_url)
+            else:
+                # txt
+                return partial(UnstructuredTextExtractor, api_url=unstructured_api_url) if is_automatic \
+                    else partial(TextExtractor, autodetect_encoding=True)
+        else:
+            if file_extension == '.xlsx' or file_extension == '.xls':
+                return partial(ExcelExtractor)
+            elif file_extension == '.pdf':
+                return partial(PdfExtractor, max_workers=pdf_extract_max_workers, batch_pages=pdf_extract_batch_pages)
+            elif file_extension in ['.md', '.markdown']:
+                return partial(MarkdownExtractor, autodetect_encoding=True)
+            elif file_extension in ['.htm', '.html']:
+                return partial(HtmlExtractor)
+            elif file_extension in ['.docx']:
+                return partial(WordExtractor, tenant_id=upload_file.tenant_id, user_id=upload_file.created_by)
+            elif file_extension == '.csv':
+                return partial(CSVExtractor, autodetect_encoding=True)
+            elif file_extension == 'epub':
+                return partial(UnstructuredEpubExtractor)
+            else:
+                # txt
+                return partial(TextExtractor, autodetect_encoding=True)
@@ -1,12 +1,21 @@
 """Abstract interface for document loader implementations."""
 from abc import ABC, abstractmethod
+from collections.abc import Iterator
 
 
 class BaseExtractor(ABC):
     """Interface for extract files.
     """
 
+    # bump when the output of the extractor changes, cached extractions of older versions are not used
+    version: str = '1'
+
     @abstractmethod
     def extract(self):
         raise NotImplementedError
 
+    def extract_iter(self) -> Iterator:
+        """
+        Extract documents lazily, extractors able to parse files incrementally yield documents as they are parsed
+        """
+        yield from self.extract()
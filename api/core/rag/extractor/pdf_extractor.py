@@ -1,51 +1,72 @@
 """Abstract interface for document loader implementations."""
+import multiprocessing
+import os
+import threading
+from collections import deque
 from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
 from typing import Optional
 
 from core.rag.extractor.blod.blod import Blob
 from core.rag.extractor.extractor_base import BaseExtractor
 from core.rag.models.document import Document
-from extensions.ext_storage import storage
+
+# process pool shared by extractions in this process, created on first use
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_pid: Optional[int] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor(max_workers: int) -> ProcessPoolExecutor:
+    """
+    Get process pool of this process, sized by the first extraction using it
+    :param max_workers: max processes
+    :return:
+    """
+    global _executor, _executor_pid
+
+    with _executor_lock:
+        # pools are not inherited by forked processes, e.g. gunicorn workers of a preloaded app,
+        # and a pool with a crashed process rejects new tasks
+        if _executor is None or _executor_pid != os.getpid() or _executor._broken:
+            # spawn, forking a process with running threads is unsafe
+            _executor = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn'))
+            _executor_pid = os.getpid()
+
+        return _executor
 
 
 class PdfExtractor(BaseExtractor):
     """Load pdf files.
 
+    Pages are parsed lazily. Pdfs of more than `batch_pages` pages are parsed in page ranges on a pool of
+    `max_workers` processes, with at most two ranges per process in flight, so pages are yielded in order
+    while later pages are still parsed, and memory stays bounded regardless of the page count.
+    The pool is spawned once per process and shared by all extractions.
 
     Args:
         file_path: Path to the file to load.
+        max_workers: Max processes parsing pages, at most the cpu count, 1 to parse in this process.
+        batch_pages: Pages parsed per task of the process pool.
     """
 
     def __init__(
             self,
             file_path: str,
-            file_cache_key: Optional[str] = None
+            max_workers: int = 1,
+            batch_pages: int = 32
     ):
         """Initialize with file path."""
         self._file_path = file_path
-        self._file_cache_key = file_cache_key
+        self._max_workers = min(max_workers, os.cpu_count() or 1)
+        self._batch_pages = batch_pages
 
     def extract(self) -> list[Document]:
-        plaintext_file_key = ''
-        plaintext_file_exists = False
-        if self._file_cache_key:
-            try:
-                text = storage.load(self._file_cache_key).decode('utf-8')
-                plaintext_file_exists = True
-                return [Document(page_content=text)]
-            except FileNotFoundError:
-                pass
-        documents = list(self.load())
-        text_list = []
-        for document in documents:
-            text_list.append(document.page_content)
-        text = "\n\n".join(text_list)
-
-        # save plaintext file for caching
-        if not plaintext_file_exists and plaintext_file_key:
-            storage.save(plaintext_file_key, text.encode('utf-8'))
-
-        return documents
+        return list(self.load())
+
+    def extract_iter(self) -> Iterator[Document]:
+        return self.load()
 
     def load(
             self,
@@ -58,6 +79,17 @@ class PdfExtractor(BaseExtractor):
         """Lazily parse the blob."""
         import pypdfium2
 
+        if blob.path and self._max_workers > 1:
+            pdf_reader = pypdfium2.PdfDocument(str(blob.path), autoclose=True)
+            try:
+                page_count = len(pdf_reader)
+            finally:
+                pdf_reader.close()
+
+            if page_count > self._batch_pages:
+                yield from self._parse_in_parallel(blob, page_count)
+                return
+
         with blob.as_bytes_io() as file_path:
             pdf_reader = pypdfium2.PdfDocument(file_path, autoclose=True)
             try:
@@ -70,3 +102,47 @@ class PdfExtractor(BaseExtractor):
                     yield Document(page_content=content, metadata=metadata)
             finally:
                 pdf_reader.close()
+
+    def _parse_in_parallel(self, blob: Blob, page_count: int) -> Iterator[Document]:
+        page_ranges = iter([
+            (start, min(start + self._batch_pages, page_count)) for start in range(0, page_count, self._batch_pages)
+        ])
+        executor = _get_executor(self._max_workers)
+        futures = deque()
+        try:
+            for start, end in islice(page_ranges, self._max_workers * 2):
+                futures.append((start, executor.submit(_parse_pages, str(blob.path), start, end)))
+
+            while futures:
+                start, future = futures.popleft()
+                contents = future.result()
+                for next_start, next_end in islice(page_ranges, 1):
+                    futures.append((next_start, executor.submit(_parse_pages, str(blob.path), next_start, next_end)))
+
+                for page_number, content in enumerate(contents, start=start):
+                    metadata = {"source": blob.source, "page": page_number}
+                    yield Document(page_content=content, metadata=metadata)
+        finally:
+            # the pool is shared, only cancel page ranges of this pdf not started yet
+            for _, future in futures:
+                future.cancel()
+
+
+def _parse_pages(file_path: str, start: int, end: int) -> list[str]:
+    """
+    Parse text of pages in [start, end) of pdf, run in the process pool
+    """
+    import pypdfium2
+
+    pdf_reader = pypdfium2.PdfDocument(file_path, autoclose=True)
+    try:
+        contents = []
+        for page_number in range(start, end):
+            page = pdf_reader[page_number]
+            text_page = page.get_textpage()
+            contents.append(text_page.get_text_range())
+            text_page.close()
+            page.close()
+        return contents
+    finally:
+        pdf_reader.close()
@@ -1,5 +1,6 @@
 """Abstract interface for document loader implementations."""
 from abc import ABC, abstractmethod
+from collections.abc import Iterator
 from typing import Optional
 
 from flask import current_app
@@ -20,6 +21,12 @@ class BaseIndexProcessor(ABC):
     def extract(self, extract_setting: ExtractSetting, **kwargs) -> list[Document]:
         raise NotImplementedError
 
+    def extract_iter(self, extract_setting: ExtractSetting, **kwargs) -> Iterator[Document]:
+        """
+        Extract documents lazily, yielded as they are parsed
+        """
+        yield from self.extract(extract_setting, **kwargs)
+
     @abstractmethod
     def transform(self, documents: list[Document], **kwargs) -> list[Document]:
         raise NotImplementedError
@@ -1,5 +1,6 @@
 """Paragraph index processor."""
 import uuid
+from collections.abc import Iterator
 from typing import Optional
 
 from core.rag.cleaner.clean_processor import CleanProcessor
@@ -23,6 +24,10 @@ class ParagraphIndexProcessor(BaseIndexProcessor):
 
         return text_docs
 
+    def extract_iter(self, extract_setting: ExtractSetting, **kwargs) -> Iterator[Document]:
+        return ExtractProcessor.extract_iter(extract_setting=extract_setting,
+                                             is_automatic=kwargs.get('process_rule_mode') == "automatic")
+
     def transform(self, documents: list[Document], **kwargs) -> list[Document]:
         # Split the text documents into nodes.
         splitter = self._get_splitter(processing_rule=kwargs.get('process_rule'),
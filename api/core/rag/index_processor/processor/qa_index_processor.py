@@ -3,6 +3,7 @@ import logging
 import re
 import threading
 import uuid
+from collections.abc import Iterator
 from typing import Optional
 
 import pandas as pd
@@ -28,6 +29,10 @@ class QAIndexProcessor(BaseIndexProcessor):
                                              is_automatic=kwargs.get('process_rule_mode') == "automatic")
         return text_docs
 
+    def extract_iter(self, extract_setting: ExtractSetting, **kwargs) -> Iterator[Document]:
+        return ExtractProcessor.extract_iter(extract_setting=extract_setting,
+                                             is_automatic=kwargs.get('process_rule_mode') == "automatic")
+
     def transform(self, documents: list[Document], **kwargs) -> list[Document]:
         splitter = self._get_splitter(processing_rule=kwargs.get('process_rule'),
                                       embedding_model_instance=kwargs.get('embedding_model_instance'))
@@ -21,7 +21,8 @@ from core.tools.tool.dataset_retriever.dataset_multi_retriever_tool import Datas
 from core.tools.tool.dataset_retriever.dataset_retriever_base_tool import DatasetRetrieverBaseTool
 from core.tools.tool.dataset_retriever.dataset_retriever_tool import DatasetRetrieverTool
 from extensions.ext_database import db
-from models.dataset import Dataset, DatasetQuery, DocumentSegment
+from extensions.ext_retrieval_log import retrieval_log
+from models.dataset import Dataset, DocumentSegment
 from models.dataset import Document as DatasetDocument
 
 default_retrieval_model = {
@@ -148,16 +149,23 @@ class DatasetRetrieval:
                 else:
                     document_context_list.append(segment.get_sign_content())
             if show_retrieve_source:
+                # load datasets and documents of all segments at once
+                datasets = db.session.query(Dataset).filter(
+                    Dataset.id.in_({segment.dataset_id for segment in sorted_segments})
+                ).all()
+                dataset_map = {dataset.id: dataset for dataset in datasets}
+                documents = db.session.query(DatasetDocument).filter(
+                    DatasetDocument.id.in_({segment.document_id for segment in sorted_segments}),
+                    DatasetDocument.enabled == True,
+                    DatasetDocument.archived == False,
+                ).all()
+                document_map = {document.id: document for document in documents}
+
                 context_list = []
                 resource_number = 1
                 for segment in sorted_segments:
-                    dataset = Dataset.query.filter_by(
-                        id=segment.dataset_id
-                    ).first()
-                    document = DatasetDocument.query.filter(DatasetDocument.id == segment.document_id,
-                                                            DatasetDocument.enabled == True,
-                                                            DatasetDocument.archived == False,
-                                                            ).first()
+                    dataset = dataset_map.get(segment.dataset_id)
+                    document = document_map.get(segment.document_id)
                     if dataset and document:
                         source = {
                             'position': resource_number,
@@ -253,7 +261,8 @@ class DatasetRetrieval:
                 results = RetrievalService.retrieve(retrival_method=retrival_method, dataset_id=dataset.id,
                                                     query=query,
                                                     top_k=top_k, score_threshold=score_threshold,
-                                                    reranking_model=reranking_model)
+                                                    reranking_model=reranking_model,
+                                                    fusion=retrieval_model_config.get('fusion'))
                 self._on_query(query, [dataset_id], app_id, user_from, user_id)
                 if results:
                     self._on_retrival_end(results)
@@ -306,40 +315,13 @@ class DatasetRetrieval:
 
     def _on_retrival_end(self, documents: list[Document]) -> None:
         """Handle retrival end."""
-        for document in documents:
-            query = db.session.query(DocumentSegment).filter(
-                DocumentSegment.index_node_id == document.metadata['doc_id']
-            )
-
-            # if 'dataset_id' in document.metadata:
-            if 'dataset_id' in document.metadata:
-                query = query.filter(DocumentSegment.dataset_id == document.metadata['dataset_id'])
-
-            # add hit count to document segment
-            query.update(
-                {DocumentSegment.hit_count: DocumentSegment.hit_count + 1},
-                synchronize_session=False
-            )
-
-            db.session.commit()
+        retrieval_log.add_hits(documents)
 
     def _on_query(self, query: str, dataset_ids: list[str], app_id: str, user_from: str, user_id: str) -> None:
         """
         Handle query.
         """
-        if not query:
-            return
-        for dataset_id in dataset_ids:
-            dataset_query = DatasetQuery(
-                dataset_id=dataset_id,
-                content=query,
-                source='app',
-                source_app_id=app_id,
-                created_by_role=user_from,
-                created_by=user_id
-            )
-            db.session.add(dataset_query)
-        db.session.commit()
+        retrieval_log.add_queries(query, dataset_ids, app_id, user_from, user_id)
 
     def _retriever(self, flask_app: Flask, dataset_id: str, query: str, top_k: int, all_documents: list):
         with flask_app.app_context():
@@ -372,7 +354,8 @@ class DatasetRetrieval:
                                                           score_threshold=retrieval_model['score_threshold']
                                                           if retrieval_model['score_threshold_enabled'] else None,
                                                           reranking_model=retrieval_model['reranking_model']
-                                                          if retrieval_model['reranking_enable'] else None
+                                                          if retrieval_model['reranking_enable'] else None,
+                                                          fusion=retrieval_model.get('fusion')
                                                           )
 
                     all_documents.extend(documents)
@@ -0,0 +1,124 @@
+import logging
+import uuid
+from collections import Counter, defaultdict
+
+from redis.exceptions import ResponseError
+
+from core.rag.models.document import Document
+from extensions.ext_database import db
+from extensions.ext_redis import redis_client
+from models.dataset import DocumentSegment
+
+logger = logging.getLogger(__name__)
+
+
+class SegmentHitCounter:
+    """
+    Aggregated hit count of retrieved segments.
+
+    Hits are coalesced in a redis hash on the request path, and flushed to `document_segments.hit_count`
+    in batches by the periodic `update_segment_hit_count_task`.
+    """
+    pending_key = 'segment_hit_count:pending'
+
+    @classmethod
+    def incr(cls, documents: list[Document]) -> None:
+        """
+        Count hits of retrieved documents
+
+        :param documents: retrieved documents
+        :return:
+        """
+        hits = Counter(
+            (document.metadata.get('dataset_id', ''), document.metadata['doc_id']) for document in documents
+        )
+        cls.incr_many(hits)
+
+    @classmethod
+    def incr_many(cls, hits: dict[tuple[str, str], int]) -> None:
+        """
+        Count aggregated hits of segments
+
+        :param hits: (dataset_id, index_node_id) -> hits, dataset_id may be empty
+        :return:
+        """
+        if not hits:
+            return
+
+        try:
+            pipeline = redis_client.pipeline()
+            for (dataset_id, index_node_id), count in hits.items():
+                pipeline.hincrby(cls.pending_key, f'{dataset_id}:{index_node_id}', count)
+            pipeline.execute()
+        except Exception:
+            logger.exception('Failed to count segment hits')
+
+    @classmethod
+    def flush(cls, batch_size: int = 500) -> int:
+        """
+        Add pending hit counts to document segments
+
+        :param batch_size: number of segments updated per statement
+        :return: number of segments updated
+        """
+        # take pending hits atomically, hits counted meanwhile go to a new pending hash
+        processing_key = f'segment_hit_count:processing:{uuid.uuid4()}'
+        try:
+            redis_client.rename(cls.pending_key, processing_key)
+        except ResponseError:
+            # no pending hits
+            return 0
+
+        pending_hits = {
+            field.decode() if isinstance(field, bytes) else field: int(increment)
+            for field, increment in redis_client.hgetall(processing_key).items()
+        }
+        # fields of segments whose hits are committed
+        committed_fields = set()
+        try:
+            # group segments by increment, so that each statement adds the same increment
+            segments_by_increment = defaultdict(list)
+            for field, increment in pending_hits.items():
+                dataset_id, _, index_node_id = field.partition(':')
+                segments_by_increment[increment].append((dataset_id, index_node_id))
+
+            for increment, segments in segments_by_increment.items():
+                for i in range(0, len(segments), batch_size):
+                    batch = segments[i:i + batch_size]
+                    cls._add_hit_count(batch, increment)
+                    db.session.commit()
+                    committed_fields.update(f'{dataset_id}:{index_node_id}' for dataset_id, index_node_id in batch)
+        except Exception:
+            db.session.rollback()
+            # put back hits of batches not committed
+            pipeline = redis_client.pipeline()
+            for field, increment in pending_hits.items():
+                if field not in committed_fields:
+                    pipeline.hincrby(cls.pending_key, field, increment)
+            pipeline.execute()
+            raise
+        finally:
+            redis_client.delete(processing_key)
+
+        return len(committed_fields)
+
+    @staticmethod
+    def _add_hit_count(segments: list[tuple[str, str]], increment: int) -> None:
+        segments_with_dataset = [(dataset_id, index_node_id) for dataset_id, index_node_id in segments if dataset_id]
+        index_node_ids_without_dataset = [index_node_id for dataset_id, index_node_id in segments if not dataset_id]
+
+        if segments_with_dataset:
+            db.session.query(DocumentSegment).filter(
+                db.tuple_(DocumentSegment.dataset_id, DocumentSegment.index_node_id).in_(segments_with_dataset)
+            ).update(
+                {DocumentSegment.hit_count: DocumentSegment.hit_count + increment},
+                synchronize_session=False
+            )
+
+        if index_node_ids_without_dataset:
+            db.session.query(DocumentSegment).filter(
+                DocumentSegment.index_node_id.in_(index_node_ids_without_dataset)
+            ).update(
+                {DocumentSegment.hit_count: DocumentSegment.hit_count + increment},
+                synchronize_session=False
+            )
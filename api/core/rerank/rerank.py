@@ -2,6 +2,8 @@ from typing import Optional
 
 from core.model_manager import ModelInstance
 from core.rag.models.document import Document
+from core.rerank.rerank_cache import RerankCache
+from libs import helper
 
 
 class RerankRunner:
@@ -29,6 +31,17 @@ class RerankRunner:
                 unique_documents.append(document)
 
         documents = unique_documents
+        doc_hashes = [document.metadata.get('doc_hash') or helper.generate_text_hash(document.page_content)
+                      for document in documents]
+
+        rerank_cache = None
+        cache_key = None
+        if RerankCache.is_enabled():
+            rerank_cache = RerankCache(self.rerank_model_instance.provider, self.rerank_model_instance.model)
+            cache_key = rerank_cache.build_key(query, doc_hashes, top_n, score_threshold)
+            cached_result = rerank_cache.get(cache_key)
+            if cached_result is not None:
+                return self._build_documents_from_cache(documents, doc_hashes, cached_result)
 
         rerank_result = self.rerank_model_instance.invoke_rerank(
             query=query,
@@ -54,4 +67,38 @@ class RerankRunner:
             )
             rerank_documents.append(rerank_document)
 
+        if rerank_cache:
+            rerank_cache.set(cache_key, [(doc_hashes[result.index], result.score) for result in rerank_result.docs])
+
+        return rerank_documents
+
+    @staticmethod
+    def _build_documents_from_cache(documents: list[Document], doc_hashes: list[str],
+                                    cached_result: list[tuple[str, float]]) -> list[Document]:
+        """
+        Build reranked documents of cached (doc_hash, score)
+        :param documents: unique candidate documents
+        :param doc_hashes: content hashes of candidate documents
+        :param cached_result: cached (doc_hash, score) in rerank order
+        :return:
+        """
+        # segments with the same content share a hash, hand them out in candidate order
+        documents_by_hash: dict[str, list[Document]] = {}
+        for document, doc_hash in zip(documents, doc_hashes):
+            documents_by_hash.setdefault(doc_hash, []).append(document)
+
+        rerank_documents = []
+        for doc_hash, score in cached_result:
+            document = documents_by_hash[doc_hash].pop(0)
+            rerank_documents.append(Document(
+                page_content=document.page_content,
+                metadata={
+                    "doc_id": document.metadata['doc_id'],
+                    "doc_hash": document.metadata['doc_hash'],
+                    "document_id": document.metadata['document_id'],
+                    "dataset_id": document.metadata['dataset_id'],
+                    'score': score
+                }
+            ))
+
         return rerank_documents
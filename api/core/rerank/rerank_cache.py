@@ -0,0 +1,161 @@
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from flask import current_app
+from prometheus_client import Counter, Gauge
+
+from extensions.ext_redis import redis_client
+
+logger = logging.getLogger(__name__)
+
+rerank_cache_lookups = Counter(
+    'rerank_cache_lookups_total',
+    'Rerank result cache lookups, by tier and result',
+    ['provider', 'model', 'tier', 'result']
+)
+rerank_cache_hit_ratio = Gauge(
+    'rerank_cache_hit_ratio',
+    'Rerank result cache hit ratio since process start, by tier',
+    ['provider', 'model', 'tier']
+)
+rerank_cache_memory_bytes = Gauge(
+    'rerank_cache_memory_bytes',
+    'Approximate size of the in-process rerank result cache'
+)
+
+# cached result: (doc_hash, score) of reranked documents, in rerank order
+RerankCacheResult = list[tuple[str, float]]
+
+
+class _MemoryLRU:
+    """
+    Thread safe LRU of serialized results, bounded by total payload size.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: OrderedDict[str, str] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str) -> None:
+        entry_size = len(key) + len(value)
+        if entry_size > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self.size -= len(key) + len(self._entries.pop(key))
+            self._entries[key] = value
+            self.size += entry_size
+            while self.size > self.max_bytes:
+                evicted_key, evicted_value = self._entries.popitem(last=False)
+                self.size -= len(evicted_key) + len(evicted_value)
+            rerank_cache_memory_bytes.set(self.size)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+            rerank_cache_memory_bytes.set(0)
+
+
+class RerankCache:
+    """
+    Two tier cache of rerank results, an in-process LRU in front of redis.
+
+    Keys are built from the rerank model, the normalized query and the sorted doc_hash of candidates,
+    doc_hash being the content hash of a segment. Editing a segment changes its hash, and disabling or
+    deleting it removes it from candidates, so results of changed segments are never looked up again
+    and age out by TTL and LRU eviction.
+    """
+    _memory_cache: Optional[_MemoryLRU] = None
+    _lookup_totals: dict[tuple[str, str, str], list[int]] = {}
+    _lock = threading.Lock()
+
+    def __init__(self, provider: str, model: str):
+        self._provider = provider
+        self._model = model
+        self._ttl = int(current_app.config.get('RERANK_CACHE_TTL', 3600))
+        self._memory = self._get_memory_cache(int(current_app.config.get('RERANK_CACHE_MAX_MEMORY_MB', 16)))
+
+    @staticmethod
+    def is_enabled() -> bool:
+        return bool(current_app.config.get('RERANK_CACHE_ENABLED'))
+
+    def get(self, key: str) -> Optional[RerankCacheResult]:
+        """
+        Get cached rerank result, from memory first and then redis
+        :param key: cache key
+        :return: (doc_hash, score) in rerank order, None if not cached
+        """
+        value = self._memory.get(key)
+        self._record_lookup('memory', value is not None)
+        if value is None:
+            try:
+                value = redis_client.get(key)
+            except Exception:
+                logger.exception('Failed to get rerank result from redis')
+                value = None
+            self._record_lookup('redis', value is not None)
+            if value is None:
+                return None
+            value = value.decode() if isinstance(value, bytes) else value
+            self._memory.set(key, value)
+
+        return [(doc_hash, score) for doc_hash, score in json.loads(value)]
+
+    def set(self, key: str, result: RerankCacheResult) -> None:
+        """
+        Cache rerank result in memory and redis
+        :param key: cache key
+        :param result: (doc_hash, score) in rerank order
+        :return:
+        """
+        value = json.dumps(result)
+        self._memory.set(key, value)
+        try:
+            redis_client.setex(key, self._ttl, value)
+        except Exception:
+            logger.exception('Failed to set rerank result to redis')
+
+    def build_key(self, query: str, doc_hashes: list[str], top_n: Optional[int],
+                  score_threshold: Optional[float]) -> str:
+        """
+        Build cache key of a rerank request
+        :param query: search query
+        :param doc_hashes: content hashes of candidate documents
+        :param top_n: top n
+        :param score_threshold: score threshold
+        :return:
+        """
+        normalized_query = ' '.join(query.lower().split())
+        payload = json.dumps([normalized_query, sorted(doc_hashes), top_n, score_threshold])
+        digest = hashlib.sha256(payload.encode()).hexdigest()
+        return f'rerank_cache:{self._provider}:{self._model}:{digest}'
+
+    def _record_lookup(self, tier: str, hit: bool) -> None:
+        rerank_cache_lookups.labels(self._provider, self._model, tier, 'hit' if hit else 'miss').inc()
+        with self._lock:
+            totals = self._lookup_totals.setdefault((self._provider, self._model, tier), [0, 0])
+            totals[0] += int(hit)
+            totals[1] += 1
+            rerank_cache_hit_ratio.labels(self._provider, self._model, tier).set(totals[0] / totals[1])
+
+    @classmethod
+    def _get_memory_cache(cls, max_memory_mb: int) -> _MemoryLRU:
+        with cls._lock:
+            if cls._memory_cache is None or cls._memory_cache.max_bytes != max_memory_mb * 1024 * 1024:
+                cls._memory_cache = _MemoryLRU(max_memory_mb * 1024 * 1024)
+            return cls._memory_cache
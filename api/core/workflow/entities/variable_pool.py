@@ -1,3 +1,5 @@
+import sys
+import threading
 from enum import Enum
 from typing import Any, Optional, Union
 
@@ -22,6 +24,19 @@ class ValueType(Enum):
 
 
 class VariablePool:
+    """
+    Variable pool of workflow run.
+
+    Node outputs are stored once under their top level keys, nested selectors like
+    ['node_id', 'result', 'text'] are resolved lazily by walking into dict values.
+    Child scopes share all variables of their parent and only hold their own writes,
+    so they are O(1) to create, e.g. for iteration items or parallel branches.
+    A pool and its child scopes share one lock, so nodes running in worker threads can read
+    while the engine appends outputs of other nodes.
+    """
+
+    # node id -> {variable key tuple -> value}
+    variables_mapping: dict[str, dict[tuple[str, ...], VariableValue]]
 
     def __init__(self, system_variables: dict[SystemVariable, Any],
                  user_inputs: dict) -> None:
@@ -34,9 +49,25 @@ class VariablePool:
         self.variables_mapping = {}
         self.user_inputs = user_inputs
         self.system_variables = system_variables
+        self.parent: Optional[VariablePool] = None
+        self._lock = threading.Lock()
+        # node ids cleared in this scope, variables of them in parent scopes are hidden
+        self.cleared_node_ids: set[str] = set()
         for system_variable, value in system_variables.items():
             self.append_variable('sys', [system_variable.value], value)
 
+    def create_child_scope(self) -> 'VariablePool':
+        """
+        Create child scope, variables not found in child scope are looked up in this pool,
+        while variables appended to child scope are invisible to this pool.
+        :return:
+        """
+        child = VariablePool(system_variables={}, user_inputs=self.user_inputs)
+        child.system_variables = self.system_variables
+        child.parent = self
+        child._lock = self._lock
+        return child
+
     def append_variable(self, node_id: str, variable_key_list: list[str], value: VariableValue) -> None:
         """
         Append variable
@@ -45,12 +76,11 @@ class VariablePool:
         :param value: value
         :return:
         """
-        if node_id not in self.variables_mapping:
-            self.variables_mapping[node_id] = {}
+        with self._lock:
+            if node_id not in self.variables_mapping:
+                self.variables_mapping[node_id] = {}
 
-        variable_key_list_hash = hash(tuple(variable_key_list))
-
-        self.variables_mapping[node_id][variable_key_list_hash] = value
+            self.variables_mapping[node_id][tuple(variable_key_list)] = value
 
     def get_variable_value(self, variable_selector: list[str],
                            target_value_type: Optional[ValueType] = None) -> Optional[VariableValue]:
@@ -64,15 +94,30 @@ class VariablePool:
             raise ValueError('Invalid value selector')
 
         node_id = variable_selector[0]
-        if node_id not in self.variables_mapping:
-            return None
 
         # fetch variable keys, pop node_id
-        variable_key_list = variable_selector[1:]
-
-        variable_key_list_hash = hash(tuple(variable_key_list))
-
-        value = self.variables_mapping[node_id].get(variable_key_list_hash)
+        variable_keys = tuple(variable_selector[1:])
+
+        # look up from current scope to parent scopes
+        pool = self
+        node_found = False
+        value = None
+        with self._lock:
+            while pool:
+                node_variables = pool.variables_mapping.get(node_id)
+                if node_variables is not None:
+                    node_found = True
+                    found, value = self._resolve_variable(node_variables, variable_keys)
+                    if found:
+                        break
+
+                if node_id in pool.cleared_node_ids:
+                    break
+
+                pool = pool.parent
+
+        if not node_found:
+            return None
 
         if target_value_type:
             if target_value_type == ValueType.STRING:
@@ -97,5 +142,70 @@ class VariablePool:
         :param node_id: node id
         :return:
         """
-        if node_id in self.variables_mapping:
-            self.variables_mapping.pop(node_id)
\ No newline at end of file
+        with self._lock:
+            if node_id in self.variables_mapping:
+                self.variables_mapping.pop(node_id)
+
+            if self.parent:
+                self.cleared_node_ids.add(node_id)
+
+    def get_memory_footprint(self) -> int:
+        """
+        Get approximate memory footprint in bytes of variables in this scope,
+        objects shared by several variables are counted once.
+        :return:
+        """
+        seen_ids = set()
+        size = sys.getsizeof(self.variables_mapping)
+        with self._lock:
+            for node_variables in self.variables_mapping.values():
+                size += sys.getsizeof(node_variables)
+                for variable_keys, value in node_variables.items():
+                    size += self._get_object_size(variable_keys, seen_ids)
+                    size += self._get_object_size(value, seen_ids)
+
+        return size
+
+    @classmethod
+    def _resolve_variable(cls, node_variables: dict[tuple[str, ...], VariableValue],
+                          variable_keys: tuple[str, ...]) -> tuple[bool, Optional[VariableValue]]:
+        """
+        Resolve variable from node variables by the longest appended key prefix
+        :param node_variables: node variables
+        :param variable_keys: variable keys
+        :return: whether a key prefix is found, and the value
+        """
+        if variable_keys in node_variables:
+            return True, node_variables[variable_keys]
+
+        for prefix_length in range(len(variable_keys) - 1, 0, -1):
+            prefix = variable_keys[:prefix_length]
+            if prefix not in node_variables:
+                continue
+
+            value = node_variables[prefix]
+            for key in variable_keys[prefix_length:]:
+                if not isinstance(value, dict):
+                    return True, None
+                value = value.get(key)
+
+            return True, value
+
+        return False, None
+
+    @classmethod
+    def _get_object_size(cls, obj: Any, seen_ids: set[int]) -> int:
+        if id(obj) in seen_ids:
+            return 0
+
+        seen_ids.add(id(obj))
+        size = sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            for key, value in obj.items():
+                size += cls._get_object_size(key, seen_ids)
+                size += cls._get_object_size(value, seen_ids)
+        elif isinstance(obj, list | tuple | set):
+            for item in obj:
+                size += cls._get_object_size(item, seen_ids)
+
+        return size
@@ -1,3 +1,4 @@
+import copy
 from typing import Optional
 
 from pydantic import BaseModel
@@ -6,6 +7,7 @@ from core.app.entities.app_invoke_entities import InvokeFrom
 from core.workflow.entities.base_node_data_entities import BaseIterationState
 from core.workflow.entities.node_entities import NodeRunResult
 from core.workflow.entities.variable_pool import VariablePool
+from core.workflow.entities.workflow_graph import WorkflowGraph
 from core.workflow.nodes.base_node import BaseNode, UserFrom
 from models.workflow import Workflow, WorkflowType
 
@@ -42,6 +44,8 @@ class WorkflowRunState:
         iteration_node_id: str
 
     workflow_node_runs: list[NodeRun]
+    # ids of nodes in workflow_node_runs, for constant time lookups
+    workflow_node_run_ids: set[str]
     workflow_node_steps: int
 
     current_iteration_state: Optional[BaseIterationState]
@@ -70,4 +74,98 @@ class WorkflowRunState:
 
         self.current_iteration_state = None
         self.workflow_node_steps = 1
-        self.workflow_node_runs = []
\ No newline at end of file
+        self.workflow_node_runs = []
+        self.workflow_node_run_ids = set()
+
+    def create_child_run_state(self, variable_pool: VariablePool) -> 'WorkflowRunState':
+        """
+        Create run state of sub graph running concurrently, e.g. single iteration in parallel mode
+        :param variable_pool: variable pool scope of the sub graph
+        :return:
+        """
+        child_run_state = copy.copy(self)
+        child_run_state.variable_pool = variable_pool
+        child_run_state.total_tokens = 0
+        child_run_state.workflow_nodes_and_results = []
+        child_run_state.current_iteration_state = None
+        child_run_state.workflow_node_runs = []
+        child_run_state.workflow_node_run_ids = set()
+        return child_run_state
+
+
+class WorkflowParallelRunState:
+    """
+    Edge resolution state of a workflow run in parallel mode.
+
+    A node is ready once every incoming edge from nodes reachable from the start node
+    has been resolved and at least one of them was taken. Nodes whose incoming edges
+    are all skipped (e.g. unselected if-else branches) are skipped as well, so that
+    convergent nodes like variable aggregator or answer do not wait for them.
+    """
+    graph: WorkflowGraph
+
+    # node id -> count of incoming edges not resolved yet
+    pending_edge_counts: dict[str, int]
+    # node id -> count of incoming edges taken
+    taken_edge_counts: dict[str, int]
+
+    def __init__(self, graph: WorkflowGraph, start_node_id: str):
+        self.graph = graph
+        self.pending_edge_counts = {}
+        self.taken_edge_counts = {}
+
+        # nested nodes of iterations are run by the iteration, not scheduled on their own
+        reachable_node_ids = {start_node_id}
+        stack = [start_node_id]
+        while stack:
+            node_id = stack.pop()
+            for edge in self._get_outgoing_edges(node_id):
+                target_node_id = edge.get('target')
+                self.pending_edge_counts[target_node_id] = self.pending_edge_counts.get(target_node_id, 0) + 1
+                if target_node_id not in reachable_node_ids:
+                    reachable_node_ids.add(target_node_id)
+                    stack.append(target_node_id)
+
+    def complete_node(self, node_id: str, source_handle: Optional[str] = None) -> list[str]:
+        """
+        Resolve outgoing edges of completed node
+        :param node_id: completed node id
+        :param source_handle: source handle selected by node with multiple branches
+        :return: ids of nodes become ready
+        """
+        ready_node_ids = []
+        stack = []
+        for edge in self._get_outgoing_edges(node_id):
+            taken = not source_handle or edge.get('sourceHandle') == source_handle
+            self._resolve_edge(edge, taken, ready_node_ids, stack)
+
+        # propagate skipped branches
+        while stack:
+            for edge in self._get_outgoing_edges(stack.pop()):
+                self._resolve_edge(edge, False, ready_node_ids, stack)
+
+        return ready_node_ids
+
+    def _resolve_edge(self, edge: dict, taken: bool, ready_node_ids: list[str], skipped_node_ids: list[str]) -> None:
+        target_node_id = edge.get('target')
+        if taken:
+            self.taken_edge_counts[target_node_id] = self.taken_edge_counts.get(target_node_id, 0) + 1
+
+        self.pending_edge_counts[target_node_id] -= 1
+        if self.pending_edge_counts[target_node_id] > 0:
+            return
+
+        if self.taken_edge_counts.get(target_node_id):
+            ready_node_ids.append(target_node_id)
+        else:
+            skipped_node_ids.append(target_node_id)
+
+    def _get_outgoing_edges(self, node_id: str) -> list[dict]:
+        return [
+            edge for edge in self.graph.get_outgoing_edges(node_id)
+            if not self._is_nested_node(edge.get('target'))
+        ]
+
+    def _is_nested_node(self, node_id: str) -> bool:
+        node_config = self.graph.get_node_config(node_id)
+        return bool(node_config and node_config.get('data', {}).get('iteration_id'))
@@ -0,0 +1,172 @@
+import json
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from core.workflow.entities.node_entities import NodeType
+from models.workflow import Workflow
+
+
+class WorkflowGraph:
+    """
+    Compiled, read-only index over a workflow graph.
+
+    Built once per workflow graph and shared across runs, so that the engine can
+    resolve nodes and edges with dict lookups instead of scanning `nodes` / `edges`.
+    """
+    nodes: list[dict]
+    edges: list[dict]
+
+    # node id -> node config
+    node_configs: dict[str, dict]
+    # node id -> node type
+    node_types: dict[str, NodeType]
+    # source node id -> outgoing edges, in graph order
+    outgoing_edges: dict[str, list[dict]]
+    # (source node id, source handle) -> first matched edge
+    handle_edges: dict[tuple[str, str], dict]
+    # iteration node id -> nested node ids
+    iteration_nested_node_ids: dict[str, list[str]]
+
+    start_node_id: Optional[str]
+
+    def __init__(self, graph: dict) -> None:
+        if not graph:
+            raise ValueError('workflow graph not found')
+
+        if 'nodes' not in graph or 'edges' not in graph:
+            raise ValueError('nodes or edges not found in workflow graph')
+
+        if not isinstance(graph.get('nodes'), list):
+            raise ValueError('nodes in workflow graph must be a list')
+
+        if not isinstance(graph.get('edges'), list):
+            raise ValueError('edges in workflow graph must be a list')
+
+        self.nodes = graph['nodes']
+        self.edges = graph['edges']
+
+        self.node_configs = {}
+        self.node_types = {}
+        self.iteration_nested_node_ids = {}
+        self.start_node_id = None
+        for node_config in self.nodes:
+            node_id = node_config.get('id')
+            if not node_id or node_id in self.node_configs:
+                # keep the first occurrence, same as the former linear scan
+                continue
+
+            node_data = node_config.get('data', {})
+            self.node_configs[node_id] = node_config
+            node_type_value = node_data.get('type', '')
+            try:
+                self.node_types[node_id] = NodeType.value_of(node_type_value)
+            except ValueError:
+                pass
+
+            if self.start_node_id is None and node_type_value == NodeType.START.value:
+                self.start_node_id = node_id
+
+            iteration_id = node_data.get('iteration_id')
+            if iteration_id:
+                self.iteration_nested_node_ids.setdefault(iteration_id, []).append(node_id)
+
+        self.outgoing_edges = {}
+        self.handle_edges = {}
+        for edge in self.edges:
+            source = edge.get('source')
+            self.outgoing_edges.setdefault(source, []).append(edge)
+
+            source_handle = edge.get('sourceHandle')
+            if source_handle and (source, source_handle) not in self.handle_edges:
+                self.handle_edges[(source, source_handle)] = edge
+
+    def get_node_config(self, node_id: str) -> Optional[dict]:
+        """
+        Get node config by node id
+        :param node_id: node id
+        :return:
+        """
+        return self.node_configs.get(node_id)
+
+    def get_node_type(self, node_id: str) -> Optional[NodeType]:
+        """
+        Get node type by node id
+        :param node_id: node id
+        :return:
+        """
+        return self.node_types.get(node_id)
+
+    def get_outgoing_edges(self, source_node_id: str) -> list[dict]:
+        """
+        Get outgoing edges of node
+        :param source_node_id: source node id
+        :return:
+        """
+        return self.outgoing_edges.get(source_node_id, [])
+
+    def get_next_edge(self, source_node_id: str, source_handle: Optional[str] = None) -> Optional[dict]:
+        """
+        Get the edge to follow from source node
+        :param source_node_id: source node id
+        :param source_handle: source handle of node with multiple branches
+        :return:
+        """
+        if source_handle:
+            return self.handle_edges.get((source_node_id, source_handle))
+
+        outgoing_edges = self.outgoing_edges.get(source_node_id)
+        return outgoing_edges[0] if outgoing_edges else None
+
+    def get_iteration_nested_node_ids(self, iteration_node_id: str) -> list[str]:
+        """
+        Get nested node ids of iteration
+        :param iteration_node_id: iteration node id
+        :return:
+        """
+        return self.iteration_nested_node_ids.get(iteration_node_id, [])
+
+
+class WorkflowGraphCache:
+    """
+    Process-level LRU cache of compiled workflow graphs.
+
+    Keyed by workflow id and the raw graph text, so that a republished or edited
+    draft workflow compiles into a new entry while unchanged versions are reused.
+    """
+    max_size = 256
+
+    _cache: OrderedDict[tuple[str, int], WorkflowGraph] = OrderedDict()
+    _lock = threading.Lock()
+
+    @classmethod
+    def get(cls, workflow: Workflow) -> WorkflowGraph:
+        """
+        Get compiled graph of workflow, compile it if not cached
+        :param workflow: Workflow instance
+        :return:
+        """
+        cache_key = (workflow.id, hash(workflow.graph))
+        with cls._lock:
+            graph = cls._cache.get(cache_key)
+            if graph:
+                cls._cache.move_to_end(cache_key)
+                return graph
+
+        graph = WorkflowGraph(json.loads(workflow.graph) if workflow.graph else None)
+
+        with cls._lock:
+            cls._cache[cache_key] = graph
+            cls._cache.move_to_end(cache_key)
+            while len(cls._cache) > cls.max_size:
+                cls._cache.popitem(last=False)
+
+        return graph
+
+    @classmethod
+    def clear(cls) -> None:
+        """
+        Clear cache
+        """
+        with cls._lock:
+            cls._cache.clear()
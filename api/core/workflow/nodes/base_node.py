@@ -1,6 +1,6 @@
 from abc import ABC, abstractmethod
 from enum import Enum
-from typing import Optional
+from typing import Any, Optional
 
 from core.app.entities.app_invoke_entities import InvokeFrom
 from core.workflow.callbacks.base_workflow_callback import BaseWorkflowCallback
@@ -183,3 +183,38 @@ class BaseIterationNode(BaseNode):
         :return: next node id
         """
         raise NotImplementedError
+
+    def get_parallel_items(self, variable_pool: VariablePool, state: BaseIterationState) -> list[Any]:
+        """
+        Get items of iterations to run concurrently in parallel mode.
+        :param variable_pool: variable pool
+        :param state: iteration state
+        :return: items
+        """
+        raise NotImplementedError
+
+    def set_item_variables(self, variable_pool: VariablePool, index: int, item: Any) -> None:
+        """
+        Set variables of single iteration in parallel mode, e.g. current index and item.
+        :param variable_pool: variable pool scope of the iteration
+        :param index: iteration index
+        :param item: iteration item
+        :return:
+        """
+        raise NotImplementedError
+
+    def get_item_output(self, variable_pool: VariablePool) -> Optional[Any]:
+        """
+        Get output of single iteration in parallel mode.
+        :param variable_pool: variable pool scope of the iteration
+        :return: output
+        """
+        raise NotImplementedError
+
+    def get_iteration_result(self, state: BaseIterationState) -> NodeRunResult:
+        """
+        Get result of all iterations.
+        :param state: iteration state
+        :return: node run result
+        """
+        raise NotImplementedError
@@ -1,9 +1,12 @@
-from typing import cast
+from typing import Optional, cast
+
+from sqlalchemy.dialects.postgresql import JSONB
 
 from core.app.entities.app_invoke_entities import ModelConfigWithCredentialsEntity
 from core.file.file_obj import FileTransferMethod, FileType, FileVar
 from core.entities.model_entities import ModelStatus
 from core.errors.error import ModelCurrentlyNotSupportError, ProviderTokenNotInitError, QuotaExceededError
+from core.helper.document_file_cache import DocumentFileCache
 from core.model_manager import ModelInstance, ModelManager
 from core.model_runtime.entities.model_entities import ModelFeature, ModelType
 from core.model_runtime.model_providers.__base.large_language_model import LargeLanguageModel
@@ -12,12 +15,12 @@ from core.workflow.entities.node_entities import NodeRunResult, NodeType
 from core.workflow.entities.variable_pool import VariablePool
 from core.workflow.nodes.base_node import BaseNode
 from core.workflow.nodes.doc_select.entities import DocSelectNodeData
+from extensions.ext_database import db
+from models import StringUUID
 from models.dataset import Dataset, Document, DocumentSegment
 from models.model import UploadFile
 from models.workflow import WorkflowNodeExecutionStatus
 
-import json
-
 default_retrieval_model = {
     'search_method': 'semantic_search',
     'reranking_enable': False,
@@ -36,27 +39,19 @@ class DocSelectNode(BaseNode):
 
     def _run(self, variable_pool: VariablePool) -> NodeRunResult:
         node_data: DocSelectNodeData = cast(self._node_data_cls, self.node_data)
-        print(node_data)
-        # retrieve knowledge
+        # resolve upload files of documents
         try:
-            file_ids = []
+            document_files = self._fetch_document_files(node_data.doc_ids)
+
+            files = []
             for doc_id in node_data.doc_ids:
-                doc = Document.query.filter_by(
-                    id=doc_id
-                ).first()
-                if doc:
-                    file_info = json.loads(doc.data_source_info)
-                    file_id = file_info['upload_file_id']
-                    file = UploadFile.query.filter_by(
-                        id=file_id
-                    ).first()
-                    if not file:
-                        continue
-
-                    file_ids.append(file.id)
+                file = document_files.get(doc_id)
+                if file:
+                    files.append(file)
 
             outputs = {
-                'file_ids': file_ids
+                'file_ids': [file['id'] for file in files],
+                'files': files
             }
             return NodeRunResult(
                 status=WorkflowNodeExecutionStatus.SUCCEEDED,
@@ -73,6 +68,52 @@ class DocSelectNode(BaseNode):
                 error=str(e)
             )
 
+    def _fetch_document_files(self, doc_ids: list[str]) -> dict[str, Optional[dict]]:
+        """
+        Fetch upload files of documents, from cache first and then with one bulk query
+        :param doc_ids: document ids
+        :return: document id -> file info, None for documents without upload file
+        """
+        doc_ids = list(dict.fromkeys(doc_ids))
+        file_cache = DocumentFileCache(tenant_id=self.tenant_id)
+        document_files = file_cache.get_many(doc_ids)
+
+        missing_doc_ids = [doc_id for doc_id in doc_ids if doc_id not in document_files]
+        if not missing_doc_ids:
+            return document_files
+
+        upload_file_id = db.cast(Document.data_source_info, JSONB)['upload_file_id'].astext
+        rows = db.session.query(
+            Document.id, UploadFile.id, UploadFile.name, UploadFile.size,
+            UploadFile.extension, UploadFile.mime_type
+        ).outerjoin(
+            UploadFile, db.and_(
+                # cast the json value rather than the primary key, so the join can use its index
+                UploadFile.id == db.cast(upload_file_id, StringUUID),
+                UploadFile.tenant_id == Document.tenant_id
+            )
+        ).filter(
+            Document.tenant_id == self.tenant_id,
+            Document.id.in_(missing_doc_ids),
+            Document.data_source_type == 'upload_file'
+        ).all()
+
+        fetched_files = {doc_id: None for doc_id in missing_doc_ids}
+        for document_id, file_id, name, size, extension, mime_type in rows:
+            if not file_id:
+                continue
+
+            fetched_files[document_id] = {
+                'id': file_id,
+                'name': name,
+                'size': size,
+                'extension': extension,
+                'mime_type': mime_type
+            }
+
+        file_cache.set_many(fetched_files)
+        document_files.update(fetched_files)
+        return document_files
 
     @classmethod
     def _extract_variable_selector_to_variable_mapping(cls, node_data: BaseNodeData) -> dict[str, list[str]]:
@@ -10,6 +10,8 @@ class IterationNodeData(BaseIterationNodeData):
     parent_loop_id: Optional[str] # redundant field, not used currently
     iterator_selector: list[str] # variable selector
     output_selector: list[str] # output selector
+    parallel: bool = False # run iterations concurrently, each in its own variable pool scope
+    max_parallelism: int = 10 # max iterations running concurrently in parallel mode
 
 class IterationState(BaseIterationState):
     """
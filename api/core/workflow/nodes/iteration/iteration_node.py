@@ -1,4 +1,4 @@
-from typing import cast
+from typing import Any, Optional, cast
 
 from core.model_runtime.utils.encoders import jsonable_encoder
 from core.workflow.entities.base_node_data_entities import BaseIterationState
@@ -47,14 +47,43 @@ class IterationNode(BaseIterationNode):
 
         node_data = cast(IterationNodeData, self.node_data)
         if self._reached_iteration_limit(variable_pool, state):
-            return NodeRunResult(
-                status=WorkflowNodeExecutionStatus.SUCCEEDED,
-                outputs={
-                    'output': jsonable_encoder(state.outputs)
-                }
-            )
-        
+            return self.get_iteration_result(state)
+
         return node_data.start_node_id
+
+    def get_parallel_items(self, variable_pool: VariablePool, state: IterationState) -> list[Any]:
+        """
+        Get items of iterations to run concurrently in parallel mode.
+        """
+        iterator = variable_pool.get_variable_value(cast(IterationNodeData, self.node_data).iterator_selector)
+        if iterator is None or not isinstance(iterator, list):
+            return []
+
+        return iterator
+
+    def set_item_variables(self, variable_pool: VariablePool, index: int, item: Any) -> None:
+        """
+        Set current index and item of single iteration in parallel mode.
+        """
+        variable_pool.append_variable(self.node_id, ['index'], index)
+        variable_pool.append_variable(self.node_id, ['item'], item)
+
+    def get_item_output(self, variable_pool: VariablePool) -> Optional[Any]:
+        """
+        Get output of single iteration in parallel mode.
+        """
+        return variable_pool.get_variable_value(cast(IterationNodeData, self.node_data).output_selector)
+
+    def get_iteration_result(self, state: IterationState) -> NodeRunResult:
+        """
+        Get result of all iterations.
+        """
+        return NodeRunResult(
+            status=WorkflowNodeExecutionStatus.SUCCEEDED,
+            outputs={
+                'output': jsonable_encoder(state.outputs)
+            }
+        )
     
     def _set_current_iteration_variable(self, variable_pool: VariablePool, state: IterationState):
         """
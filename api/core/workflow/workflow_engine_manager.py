@@ -1,17 +1,25 @@
 import logging
 import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from typing import Optional, cast
 
-from flask import current_app
+from flask import Flask, current_app
 
 from core.app.app_config.entities import FileExtraConfig
 from core.app.apps.base_app_queue_manager import GenerateTaskStoppedException
 from core.app.entities.app_invoke_entities import InvokeFrom
 from core.file.file_obj import FileTransferMethod, FileType, FileVar
 from core.workflow.callbacks.base_workflow_callback import BaseWorkflowCallback
+from core.workflow.callbacks.recording_workflow_callback import RecordingWorkflowCallback
 from core.workflow.entities.node_entities import NodeRunMetadataKey, NodeRunResult, NodeType
-from core.workflow.entities.variable_pool import VariablePool, VariableValue
-from core.workflow.entities.workflow_entities import WorkflowNodeAndResult, WorkflowRunState
+from core.workflow.entities.variable_pool import VariablePool
+from core.workflow.entities.workflow_entities import (
+    WorkflowNodeAndResult,
+    WorkflowParallelRunState,
+    WorkflowRunState,
+)
+from core.workflow.entities.workflow_graph import WorkflowGraph, WorkflowGraphCache
 from core.workflow.errors import WorkflowNodeRunFailedError
 from core.workflow.nodes.answer.answer_node import AnswerNode
 from core.workflow.nodes.base_node import BaseIterationNode, BaseNode, UserFrom
@@ -97,7 +105,8 @@ class WorkflowEngineManager:
                      system_inputs: Optional[dict] = None,
                      callbacks: list[BaseWorkflowCallback] = None,
                      call_depth: Optional[int] = 0,
-                     variable_pool: Optional[VariablePool] = None) -> None:
+                     variable_pool: Optional[VariablePool] = None,
+                     max_parallelism: Optional[int] = None) -> None:
         """
         :param workflow: Workflow instance
         :param user_id: user id
@@ -106,21 +115,12 @@ class WorkflowEngineManager:
         :param system_inputs: system inputs, like: query, files
         :param callbacks: workflow callbacks
         :param call_depth: call depth
+        :param max_parallelism: max nodes running concurrently in parallel mode,
+            default to WORKFLOW_MAX_PARALLELISM when parallel mode is enabled
         """
-        # fetch workflow graph
-        graph = workflow.graph_dict
-        if not graph:
-            raise ValueError('workflow graph not found')
-
-        if 'nodes' not in graph or 'edges' not in graph:
-            raise ValueError('nodes or edges not found in workflow graph')
-
-        if not isinstance(graph.get('nodes'), list):
-            raise ValueError('nodes in workflow graph must be a list')
+        # fetch compiled workflow graph, validated on compile
+        WorkflowGraphCache.get(workflow)
 
-        if not isinstance(graph.get('edges'), list):
-            raise ValueError('edges in workflow graph must be a list')
-        
         # init variable pool
         if not variable_pool:
             variable_pool = VariablePool(
@@ -148,18 +148,23 @@ class WorkflowEngineManager:
             for callback in callbacks:
                 callback.on_workflow_run_started()
 
+        if max_parallelism is None and current_app.config.get("WORKFLOW_PARALLEL_MODE_ENABLED"):
+            max_parallelism = current_app.config.get("WORKFLOW_MAX_PARALLELISM")
+
         # run workflow
         self._run_workflow(
             workflow=workflow,
             workflow_run_state=workflow_run_state,
             callbacks=callbacks,
+            max_parallelism=max_parallelism
         )
 
     def _run_workflow(self, workflow: Workflow,
                      workflow_run_state: WorkflowRunState,
                      callbacks: list[BaseWorkflowCallback] = None,
                      start_at: Optional[str] = None,
-                     end_at: Optional[str] = None) -> None:
+                     end_at: Optional[str] = None,
+                     max_parallelism: Optional[int] = None) -> None:
         """
         Run workflow
         :param workflow: Workflow instance
@@ -171,109 +176,84 @@ class WorkflowEngineManager:
         :param call_depth: call depth
         :param start_at: force specific start node
         :param end_at: force specific end node
+        :param max_parallelism: run as DAG with at most max_parallelism nodes running concurrently if greater than 1
         :return:
         """
-        graph = workflow.graph_dict
+        graph = WorkflowGraphCache.get(workflow)
 
         try:
-            predecessor_node: BaseNode = None
-            current_iteration_node: BaseIterationNode = None
-            has_entry_node = False
-            max_execution_steps = current_app.config.get("WORKFLOW_MAX_EXECUTION_STEPS")
-            max_execution_time = current_app.config.get("WORKFLOW_MAX_EXECUTION_TIME")
-            while True:
-                # get next node, multiple target nodes in the future
-                next_node = self._get_next_overall_node(
+            if max_parallelism and max_parallelism > 1:
+                has_entry_node = self._run_workflow_parallel(
+                    graph=graph,
                     workflow_run_state=workflow_run_state,
+                    max_parallelism=max_parallelism,
+                    callbacks=callbacks
+                )
+            else:
+                has_entry_node = self._run_workflow_steps(
                     graph=graph,
-                    predecessor_node=predecessor_node,
+                    workflow_run_state=workflow_run_state,
                     callbacks=callbacks,
                     start_at=start_at,
                     end_at=end_at
                 )
 
-                if not next_node:
-                    # reached loop/iteration end or overall end
-                    if current_iteration_node and workflow_run_state.current_iteration_state:
-                        # reached loop/iteration end
-                        # get next iteration
-                        next_iteration = current_iteration_node.get_next_iteration(
-                            variable_pool=workflow_run_state.variable_pool,
-                            state=workflow_run_state.current_iteration_state
-                        )
-                        self._workflow_iteration_next(
-                            graph=graph,
-                            current_iteration_node=current_iteration_node,
-                            workflow_run_state=workflow_run_state,
-                            callbacks=callbacks
-                        )
-                        if isinstance(next_iteration, NodeRunResult):
-                            if next_iteration.outputs:
-                                for variable_key, variable_value in next_iteration.outputs.items():
-                                    # append variables to variable pool recursively
-                                    self._append_variables_recursively(
-                                        variable_pool=workflow_run_state.variable_pool,
-                                        node_id=current_iteration_node.node_id,
-                                        variable_key_list=[variable_key],
-                                        variable_value=variable_value
-                                    )
-                            self._workflow_iteration_completed(
-                                current_iteration_node=current_iteration_node,
-                                workflow_run_state=workflow_run_state,
-                                callbacks=callbacks
-                            )
-                            # iteration has ended
-                            next_node = self._get_next_overall_node(
-                                workflow_run_state=workflow_run_state,
-                                graph=graph,
-                                predecessor_node=current_iteration_node,
-                                callbacks=callbacks,
-                                start_at=start_at,
-                                end_at=end_at
-                            )
-                            current_iteration_node = None
-                            workflow_run_state.current_iteration_state = None
-                            # continue overall process
-                        elif isinstance(next_iteration, str):
-                            # move to next iteration
-                            next_node_id = next_iteration
-                            # get next id
-                            next_node = self._get_node(workflow_run_state, graph, next_node_id, callbacks)
-                
-                if not next_node:
-                    break
-
-                # check is already ran
-                if self._check_node_has_ran(workflow_run_state, next_node.node_id):
-                    predecessor_node = next_node
-                    continue
-
-                has_entry_node = True
+            if not has_entry_node:
+                self._workflow_run_failed(
+                    error='Start node not found in workflow graph.',
+                    callbacks=callbacks
+                )
+                return
+        except GenerateTaskStoppedException as e:
+            return
+        except Exception as e:
+            self._workflow_run_failed(
+                error=str(e),
+                callbacks=callbacks
+            )
+            return
 
-                # max steps reached
-                if workflow_run_state.workflow_node_steps > max_execution_steps:
-                    raise ValueError('Max steps {} reached.'.format(max_execution_steps))
+        # workflow run success
+        self._workflow_run_success(
+            callbacks=callbacks
+        )
 
-                # or max execution time reached
-                if self._is_timed_out(start_at=workflow_run_state.start_at, max_execution_time=max_execution_time):
-                    raise ValueError('Max execution time {}s reached.'.format(max_execution_time))
+    def _run_workflow_steps(self, graph: WorkflowGraph,
+                            workflow_run_state: WorkflowRunState,
+                            callbacks: list[BaseWorkflowCallback] = None,
+                            start_at: Optional[str] = None,
+                            end_at: Optional[str] = None) -> bool:
+        """
+        Run workflow nodes one by one, following the first matched outgoing edge
+        :param graph: compiled workflow graph
+        :param workflow_run_state: workflow run state
+        :param callbacks: workflow callbacks
+        :param start_at: force specific start node
+        :param end_at: force specific end node
+        :return: whether entry node is found
+        """
+        predecessor_node: BaseNode = None
+        current_iteration_node: BaseIterationNode = None
+        has_entry_node = False
+        max_execution_steps = current_app.config.get("WORKFLOW_MAX_EXECUTION_STEPS")
+        max_execution_time = current_app.config.get("WORKFLOW_MAX_EXECUTION_TIME")
+        while True:
+            # get next node, multiple target nodes in the future
+            next_node = self._get_next_overall_node(
+                workflow_run_state=workflow_run_state,
+                graph=graph,
+                predecessor_node=predecessor_node,
+                callbacks=callbacks,
+                start_at=start_at,
+                end_at=end_at
+            )
 
-                # handle iteration nodes
-                if isinstance(next_node, BaseIterationNode):
-                    current_iteration_node = next_node
-                    workflow_run_state.current_iteration_state = next_node.run(
-                        variable_pool=workflow_run_state.variable_pool
-                    )
-                    self._workflow_iteration_started(
-                        graph=graph,
-                        current_iteration_node=current_iteration_node,
-                        workflow_run_state=workflow_run_state,
-                        predecessor_node_id=predecessor_node.node_id if predecessor_node else None,
-                        callbacks=callbacks
-                    )
-                    predecessor_node = next_node
-                    # move to start node of iteration
-                    next_node_id = next_node.get_next_iteration(
+            if not next_node:
+                # reached loop/iteration end or overall end
+                if current_iteration_node and workflow_run_state.current_iteration_state:
+                    # reached loop/iteration end
+                    # get next iteration
+                    next_iteration = current_iteration_node.get_next_iteration(
                         variable_pool=workflow_run_state.variable_pool,
                         state=workflow_run_state.current_iteration_state
                     )
@@ -283,56 +263,558 @@ class WorkflowEngineManager:
                         workflow_run_state=workflow_run_state,
                         callbacks=callbacks
                     )
-                    if isinstance(next_node_id, NodeRunResult):
-                        # iteration has ended
-                        current_iteration_node.set_output(
-                            variable_pool=workflow_run_state.variable_pool,
-                            state=workflow_run_state.current_iteration_state
-                        )
+                    if isinstance(next_iteration, NodeRunResult):
+                        if next_iteration.outputs:
+                            for variable_key, variable_value in next_iteration.outputs.items():
+                                # append variables to variable pool, nested values are resolved lazily
+                                workflow_run_state.variable_pool.append_variable(
+                                    node_id=current_iteration_node.node_id,
+                                    variable_key_list=[variable_key],
+                                    value=variable_value
+                                )
                         self._workflow_iteration_completed(
                             current_iteration_node=current_iteration_node,
                             workflow_run_state=workflow_run_state,
                             callbacks=callbacks
                         )
+                        # iteration has ended
+                        next_node = self._get_next_overall_node(
+                            workflow_run_state=workflow_run_state,
+                            graph=graph,
+                            predecessor_node=current_iteration_node,
+                            callbacks=callbacks,
+                            start_at=start_at,
+                            end_at=end_at
+                        )
                         current_iteration_node = None
                         workflow_run_state.current_iteration_state = None
-                        continue
-                    else:
+                        # continue overall process
+                    elif isinstance(next_iteration, str):
+                        # move to next iteration
+                        next_node_id = next_iteration
+                        # get next id
                         next_node = self._get_node(workflow_run_state, graph, next_node_id, callbacks)
 
-                # run workflow, run multiple target nodes in the future
-                self._run_workflow_node(
+            if not next_node:
+                break
+
+            # check is already ran
+            if self._check_node_has_ran(workflow_run_state, next_node.node_id):
+                predecessor_node = next_node
+                continue
+
+            has_entry_node = True
+
+            # max steps reached
+            if workflow_run_state.workflow_node_steps > max_execution_steps:
+                raise ValueError('Max steps {} reached.'.format(max_execution_steps))
+
+            # or max execution time reached
+            if self._is_timed_out(start_at=workflow_run_state.start_at, max_execution_time=max_execution_time):
+                raise ValueError('Max execution time {}s reached.'.format(max_execution_time))
+
+            # handle iteration nodes
+            if isinstance(next_node, IterationNode) and next_node.node_data.parallel:
+                self._run_iteration_parallel(
+                    graph=graph,
                     workflow_run_state=workflow_run_state,
-                    node=next_node,
+                    iteration_node=next_node,
                     predecessor_node=predecessor_node,
                     callbacks=callbacks
                 )
+                predecessor_node = next_node
+                continue
+            elif isinstance(next_node, BaseIterationNode):
+                current_iteration_node = next_node
+                workflow_run_state.current_iteration_state = next_node.run(
+                    variable_pool=workflow_run_state.variable_pool
+                )
+                self._workflow_iteration_started(
+                    graph=graph,
+                    current_iteration_node=current_iteration_node,
+                    workflow_run_state=workflow_run_state,
+                    predecessor_node_id=predecessor_node.node_id if predecessor_node else None,
+                    callbacks=callbacks
+                )
+                predecessor_node = next_node
+                # move to start node of iteration
+                next_node_id = next_node.get_next_iteration(
+                    variable_pool=workflow_run_state.variable_pool,
+                    state=workflow_run_state.current_iteration_state
+                )
+                self._workflow_iteration_next(
+                    graph=graph,
+                    current_iteration_node=current_iteration_node,
+                    workflow_run_state=workflow_run_state,
+                    callbacks=callbacks
+                )
+                if isinstance(next_node_id, NodeRunResult):
+                    # iteration has ended
+                    current_iteration_node.set_output(
+                        variable_pool=workflow_run_state.variable_pool,
+                        state=workflow_run_state.current_iteration_state
+                    )
+                    self._workflow_iteration_completed(
+                        current_iteration_node=current_iteration_node,
+                        workflow_run_state=workflow_run_state,
+                        callbacks=callbacks
+                    )
+                    current_iteration_node = None
+                    workflow_run_state.current_iteration_state = None
+                    continue
+                else:
+                    next_node = self._get_node(workflow_run_state, graph, next_node_id, callbacks)
 
-                if next_node.node_type in [NodeType.END]:
-                    break
+            # run workflow, run multiple target nodes in the future
+            self._run_workflow_node(
+                workflow_run_state=workflow_run_state,
+                node=next_node,
+                predecessor_node=predecessor_node,
+                callbacks=callbacks
+            )
 
-                predecessor_node = next_node
+            if next_node.node_type in [NodeType.END]:
+                break
 
-            if not has_entry_node:
-                self._workflow_run_failed(
-                    error='Start node not found in workflow graph.',
+            predecessor_node = next_node
+
+        return has_entry_node
+
+    def _run_workflow_parallel(self, graph: WorkflowGraph,
+                               workflow_run_state: WorkflowRunState,
+                               max_parallelism: int,
+                               callbacks: list[BaseWorkflowCallback] = None) -> bool:
+        """
+        Run workflow as a DAG, ready nodes of parallel branches run concurrently in a bounded thread pool.
+
+        Node started / finished events and variable pool writes happen on the calling thread,
+        only node execution is handed over to worker threads, so events of each node keep their order.
+        Iteration nodes run with their nested nodes in a worker thread as well, in their own run state and
+        variable pool scope, and their recorded events are replayed once the iteration completed.
+        When the workflow ends or fails, nodes still running are waited for until the max execution time
+        and get their finished or failed events, queued ones are cancelled.
+        :param graph: compiled workflow graph
+        :param workflow_run_state: workflow run state
+        :param max_parallelism: max nodes running concurrently
+        :param callbacks: workflow callbacks
+        :return: whether entry node is found
+        """
+        start_node = self._get_next_overall_node(
+            workflow_run_state=workflow_run_state,
+            graph=graph,
+            callbacks=callbacks
+        )
+        if not start_node:
+            return False
+
+        max_execution_steps = current_app.config.get("WORKFLOW_MAX_EXECUTION_STEPS")
+        max_execution_time = current_app.config.get("WORKFLOW_MAX_EXECUTION_TIME")
+        flask_app = current_app._get_current_object()
+
+        parallel_run_state = WorkflowParallelRunState(graph=graph, start_node_id=start_node.node_id)
+        # ready nodes with their predecessor nodes
+        ready_nodes: deque[tuple[BaseNode, Optional[BaseNode]]] = deque([(start_node, None)])
+        running_nodes: dict[Future, WorkflowNodeAndResult] = {}
+        # running iteration nodes with their predecessor nodes
+        running_iterations: dict[Future, tuple[BaseIterationNode, Optional[BaseNode]]] = {}
+
+        executor = ThreadPoolExecutor(max_workers=max_parallelism, thread_name_prefix='workflow_node')
+        try:
+            while ready_nodes or running_nodes or running_iterations:
+                while ready_nodes and len(running_nodes) + len(running_iterations) < max_parallelism:
+                    node, predecessor_node = ready_nodes.popleft()
+
+                    # max steps reached
+                    if workflow_run_state.workflow_node_steps > max_execution_steps:
+                        raise ValueError('Max steps {} reached.'.format(max_execution_steps))
+
+                    # or max execution time reached
+                    if self._is_timed_out(start_at=workflow_run_state.start_at,
+                                          max_execution_time=max_execution_time):
+                        raise ValueError('Max execution time {}s reached.'.format(max_execution_time))
+
+                    if isinstance(node, BaseIterationNode):
+                        # run iteration and its nested nodes, stop before the node next to iteration
+                        outgoing_edge = graph.get_next_edge(node.node_id)
+                        future = executor.submit(
+                            self._run_workflow_steps_in_thread,
+                            flask_app,
+                            graph,
+                            workflow_run_state.create_child_run_state(
+                                workflow_run_state.variable_pool.create_child_scope()
+                            ),
+                            node.node_id,
+                            outgoing_edge.get('target') if outgoing_edge else None
+                        )
+                        running_iterations[future] = (node, predecessor_node)
+                        continue
+
+                    workflow_nodes_and_result = self._workflow_node_started(
+                        workflow_run_state=workflow_run_state,
+                        node=node,
+                        predecessor_node=predecessor_node,
+                        callbacks=callbacks
+                    )
+                    future = executor.submit(
+                        self._execute_node_in_thread, flask_app, node, workflow_run_state.variable_pool
+                    )
+                    running_nodes[future] = workflow_nodes_and_result
+
+                timeout = max_execution_time - (time.perf_counter() - workflow_run_state.start_at)
+                done, _ = wait([*running_nodes.keys(), *running_iterations.keys()],
+                               timeout=max(timeout, 0), return_when=FIRST_COMPLETED)
+                if not done:
+                    raise ValueError('Max execution time {}s reached.'.format(max_execution_time))
+
+                for future in done:
+                    if future in running_iterations:
+                        node, predecessor_node = running_iterations.pop(future)
+                        iteration_run_state, recorder, error = future.result()
+                        self._merge_child_run_state(
+                            workflow_run_state=workflow_run_state,
+                            child_run_state=iteration_run_state,
+                            recorder=recorder,
+                            max_execution_steps=max_execution_steps,
+                            predecessor_node_id=predecessor_node.node_id if predecessor_node else None,
+                            callbacks=callbacks
+                        )
+                        if error:
+                            raise error
+
+                        # outputs of iteration, nested node variables are cleared by the iteration
+                        iteration_variables = iteration_run_state.variable_pool.variables_mapping.get(node.node_id, {})
+                        for variable_keys, variable_value in iteration_variables.items():
+                            workflow_run_state.variable_pool.append_variable(
+                                node_id=node.node_id,
+                                variable_key_list=list(variable_keys),
+                                value=variable_value
+                            )
+                        next_node_ids = parallel_run_state.complete_node(node.node_id)
+                    else:
+                        workflow_nodes_and_result = running_nodes.pop(future)
+                        node = workflow_nodes_and_result.node
+                        node_run_result = future.result()
+                        self._workflow_node_finished(
+                            workflow_run_state=workflow_run_state,
+                            workflow_nodes_and_result=workflow_nodes_and_result,
+                            node_run_result=node_run_result,
+                            callbacks=callbacks
+                        )
+
+                        if node.node_type in [NodeType.END]:
+                            self._stop_running_nodes(
+                                workflow_run_state=workflow_run_state,
+                                running_nodes=running_nodes,
+                                running_iterations=running_iterations,
+                                max_execution_time=max_execution_time,
+                                callbacks=callbacks
+                            )
+                            return True
+
+                        next_node_ids = parallel_run_state.complete_node(
+                            node.node_id, node_run_result.edge_source_handle
+                        )
+
+                    ready_nodes.extend(
+                        (next_node, node) for next_node in self._get_nodes(
+                            workflow_run_state, graph, next_node_ids, callbacks
+                        )
+                    )
+        except BaseException:
+            self._stop_running_nodes(
+                workflow_run_state=workflow_run_state,
+                running_nodes=running_nodes,
+                running_iterations=running_iterations,
+                max_execution_time=max_execution_time,
+                callbacks=callbacks
+            )
+            raise
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        return True
+
+    def _stop_running_nodes(self, workflow_run_state: WorkflowRunState,
+                            running_nodes: dict[Future, WorkflowNodeAndResult],
+                            running_iterations: dict[Future, tuple[BaseIterationNode, Optional[BaseNode]]],
+                            max_execution_time: int,
+                            callbacks: list[BaseWorkflowCallback] = None) -> None:
+        """
+        Stop nodes of parallel mode still running when the workflow ended or failed.
+        Queued nodes are cancelled, running nodes are waited for until the max execution time,
+        then every node already started gets its finished or failed event.
+        Events of iterations are only replayed once they completed, so running iterations are dropped.
+        :param workflow_run_state: workflow run state
+        :param running_nodes: running nodes
+        :param running_iterations: running iteration nodes
+        :param max_execution_time: max execution time
+        :param callbacks: workflow callbacks
+        :return:
+        """
+        for future in [*running_nodes.keys(), *running_iterations.keys()]:
+            future.cancel()
+        running_iterations.clear()
+
+        timeout = max_execution_time - (time.perf_counter() - workflow_run_state.start_at)
+        wait(running_nodes.keys(), timeout=max(timeout, 0))
+
+        for future, workflow_nodes_and_result in running_nodes.items():
+            if future.cancelled():
+                node_run_result = NodeRunResult(
+                    status=WorkflowNodeExecutionStatus.FAILED,
+                    error='Workflow stopped before node ran.'
+                )
+            elif future.done():
+                node_run_result = future.result()
+            else:
+                node_run_result = NodeRunResult(
+                    status=WorkflowNodeExecutionStatus.FAILED,
+                    error='Max execution time {}s reached.'.format(max_execution_time)
+                )
+
+            try:
+                self._workflow_node_finished(
+                    workflow_run_state=workflow_run_state,
+                    workflow_nodes_and_result=workflow_nodes_and_result,
+                    node_run_result=node_run_result,
                     callbacks=callbacks
                 )
-                return
-        except GenerateTaskStoppedException as e:
-            return
-        except Exception as e:
-            self._workflow_run_failed(
-                error=str(e),
+            except GenerateTaskStoppedException:
+                # events can not be published any more
+                break
+            except ValueError:
+                # node failed, failed event is published
+                continue
+        running_nodes.clear()
+
+    def _merge_child_run_state(self, workflow_run_state: WorkflowRunState,
+                               child_run_state: WorkflowRunState,
+                               recorder: RecordingWorkflowCallback,
+                               max_execution_steps: int,
+                               predecessor_node_id: Optional[str] = None,
+                               callbacks: list[BaseWorkflowCallback] = None) -> None:
+        """
+        Replay events recorded by a sub graph run in a worker thread and merge its run state.
+        Node run indexes are renumbered in the order of replay.
+        :param workflow_run_state: workflow run state
+        :param child_run_state: run state of the sub graph
+        :param recorder: recorded events of the sub graph
+        :param max_execution_steps: max execution steps
+        :param predecessor_node_id: predecessor of nodes of the sub graph started without one
+        :param callbacks: workflow callbacks
+        :return:
+        """
+        for event in recorder.events:
+            if 'node_run_index' in event.kwargs:
+                event.kwargs['node_run_index'] = workflow_run_state.workflow_node_steps
+
+            if event.method in ('on_workflow_node_execute_started', 'on_workflow_iteration_started'):
+                # max steps reached
+                if workflow_run_state.workflow_node_steps > max_execution_steps:
+                    raise ValueError('Max steps {} reached.'.format(max_execution_steps))
+
+                if not event.kwargs.get('predecessor_node_id'):
+                    event.kwargs['predecessor_node_id'] = predecessor_node_id
+                workflow_run_state.workflow_node_steps += 1
+
+            if callbacks:
+                recorder.replay(callbacks, event)
+
+        workflow_run_state.total_tokens += child_run_state.total_tokens
+        workflow_run_state.workflow_nodes_and_results.extend(child_run_state.workflow_nodes_and_results)
+
+    def _run_iteration_parallel(self, graph: WorkflowGraph,
+                                workflow_run_state: WorkflowRunState,
+                                iteration_node: IterationNode,
+                                predecessor_node: Optional[BaseNode] = None,
+                                callbacks: list[BaseWorkflowCallback] = None) -> None:
+        """
+        Run iterations concurrently, each iteration runs nested nodes in its own variable pool scope.
+
+        Events of nested nodes are recorded in worker threads and replayed in item order,
+        so that callbacks receive the same event sequence as running iterations one by one.
+        Items are dispatched while steps taken by completed items stay within the max steps,
+        and a failed item stops dispatching, items after it are dropped.
+        :param graph: compiled workflow graph
+        :param workflow_run_state: workflow run state
+        :param iteration_node: iteration node
+        :param predecessor_node: predecessor node
+        :param callbacks: workflow callbacks
+        :return:
+        """
+        node_data = iteration_node.node_data
+        workflow_run_state.current_iteration_state = state = iteration_node.run(
+            variable_pool=workflow_run_state.variable_pool
+        )
+        self._workflow_iteration_started(
+            graph=graph,
+            current_iteration_node=iteration_node,
+            workflow_run_state=workflow_run_state,
+            predecessor_node_id=predecessor_node.node_id if predecessor_node else None,
+            callbacks=callbacks
+        )
+
+        max_execution_steps = current_app.config.get("WORKFLOW_MAX_EXECUTION_STEPS")
+        max_execution_time = current_app.config.get("WORKFLOW_MAX_EXECUTION_TIME")
+        flask_app = current_app._get_current_object()
+        items = iteration_node.get_parallel_items(workflow_run_state.variable_pool, state)
+        max_parallelism = max(node_data.max_parallelism, 1)
+
+        # item index -> run state, recorded events and error of completed items
+        item_results: dict[int, tuple[WorkflowRunState, RecordingWorkflowCallback, Optional[Exception]]] = {}
+        running_items: dict[Future, int] = {}
+        # steps taken before the iteration and by completed items
+        taken_steps = workflow_run_state.workflow_node_steps
+        failed_index = None
+        error = None
+
+        executor = ThreadPoolExecutor(max_workers=max_parallelism, thread_name_prefix='workflow_iteration')
+        try:
+            next_index = 0
+            while failed_index is None and (next_index < len(items) or running_items):
+                while next_index < len(items) and len(running_items) < max_parallelism:
+                    # max steps reached, steps of running items are checked on replay
+                    if taken_steps > max_execution_steps:
+                        error = ValueError('Max steps {} reached.'.format(max_execution_steps))
+                        break
+
+                    item_variable_pool = workflow_run_state.variable_pool.create_child_scope()
+                    iteration_node.set_item_variables(item_variable_pool, next_index, items[next_index])
+                    future = executor.submit(
+                        self._run_workflow_steps_in_thread,
+                        flask_app,
+                        graph,
+                        workflow_run_state.create_child_run_state(item_variable_pool),
+                        node_data.start_node_id
+                    )
+                    running_items[future] = next_index
+                    next_index += 1
+
+                if error:
+                    break
+
+                timeout = max_execution_time - (time.perf_counter() - workflow_run_state.start_at)
+                done, _ = wait(running_items.keys(), timeout=max(timeout, 0), return_when=FIRST_COMPLETED)
+                if not done:
+                    error = ValueError('Max execution time {}s reached.'.format(max_execution_time))
+                    break
+
+                for future in done:
+                    index = running_items.pop(future)
+                    item_results[index] = future.result()
+                    _, recorder, item_error = item_results[index]
+                    taken_steps += sum(
+                        1 for event in recorder.events if event.method == 'on_workflow_node_execute_started'
+                    )
+                    if item_error and (failed_index is None or index < failed_index):
+                        failed_index = index
+
+            if failed_index is not None:
+                # items before the failed one are replayed before its error, items after it are dropped
+                timeout = max_execution_time - (time.perf_counter() - workflow_run_state.start_at)
+                done, not_done = wait([future for future, index in running_items.items() if index < failed_index],
+                                      timeout=max(timeout, 0))
+                for future in done:
+                    item_results[running_items[future]] = future.result()
+                if not_done:
+                    error = ValueError('Max execution time {}s reached.'.format(max_execution_time))
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        state.outputs = []
+        for index in range(len(items)):
+            if index not in item_results:
+                break
+
+            item_run_state, recorder, item_error = item_results[index]
+
+            state.index = index
+            self._workflow_iteration_next(
+                graph=graph,
+                current_iteration_node=iteration_node,
+                workflow_run_state=workflow_run_state,
                 callbacks=callbacks
             )
-            return
 
-        # workflow run success
-        self._workflow_run_success(
+            self._merge_child_run_state(
+                workflow_run_state=workflow_run_state,
+                child_run_state=item_run_state,
+                recorder=recorder,
+                max_execution_steps=max_execution_steps,
+                predecessor_node_id=iteration_node.node_id,
+                callbacks=callbacks
+            )
+
+            if item_error:
+                raise item_error
+
+            state.current_output = iteration_node.get_item_output(item_run_state.variable_pool)
+            if state.current_output is not None:
+                state.outputs.append(state.current_output)
+
+        if error:
+            raise error
+
+        state.index = len(items)
+        self._workflow_iteration_next(
+            graph=graph,
+            current_iteration_node=iteration_node,
+            workflow_run_state=workflow_run_state,
             callbacks=callbacks
         )
 
+        iteration_result = iteration_node.get_iteration_result(state)
+        if iteration_result.outputs:
+            for variable_key, variable_value in iteration_result.outputs.items():
+                # append variables to variable pool, nested values are resolved lazily
+                workflow_run_state.variable_pool.append_variable(
+                    node_id=iteration_node.node_id,
+                    variable_key_list=[variable_key],
+                    value=variable_value
+                )
+
+        self._workflow_iteration_completed(
+            current_iteration_node=iteration_node,
+            workflow_run_state=workflow_run_state,
+            callbacks=callbacks
+        )
+        workflow_run_state.current_iteration_state = None
+
+    def _run_workflow_steps_in_thread(self, flask_app: Flask,
+                                      graph: WorkflowGraph,
+                                      child_run_state: WorkflowRunState,
+                                      start_at: str,
+                                      end_at: Optional[str] = None) \
+            -> tuple[WorkflowRunState, RecordingWorkflowCallback, Optional[Exception]]:
+        """
+        Run nodes one by one in worker thread of parallel mode, e.g. nested nodes of single iteration,
+        events are recorded to be replayed on the engine thread
+        :param flask_app: flask app
+        :param graph: compiled workflow graph
+        :param child_run_state: run state of the sub graph
+        :param start_at: start node id
+        :param end_at: end node id, not run
+        :return: run state, recorded events and error of the sub graph
+        """
+        recorder = RecordingWorkflowCallback()
+        with flask_app.app_context():
+            try:
+                has_entry_node = self._run_workflow_steps(
+                    graph=graph,
+                    workflow_run_state=child_run_state,
+                    callbacks=[recorder],
+                    start_at=start_at,
+                    end_at=end_at
+                )
+                if not has_entry_node:
+                    raise ValueError(f'Node {start_at} not found in workflow graph.')
+            except Exception as e:
+                return child_run_state, recorder, e
+            finally:
+                db.session.close()
+
+        return child_run_state, recorder, None
+
     def single_step_run_workflow_node(self, workflow: Workflow,
                                       node_id: str,
                                       user_id: str,
@@ -430,24 +912,17 @@ class WorkflowEngineManager:
         Single iteration run workflow node
         """
         # fetch node info from workflow graph
-        graph = workflow.graph_dict
-        if not graph:
-            raise ValueError('workflow graph not found')
-
-        nodes = graph.get('nodes')
-        if not nodes:
+        graph = WorkflowGraphCache.get(workflow)
+        if not graph.nodes:
             raise ValueError('nodes not found in workflow graph')
 
-        for node in nodes:
-            if node.get('id') == node_id:
-                if node.get('data', {}).get('type') in [
-                    NodeType.ITERATION.value,
-                    NodeType.LOOP.value,
-                ]:
-                    node_config = node
-                else:
-                    raise ValueError('node id is not an iteration node')
-        
+        node_config = graph.get_node_config(node_id)
+        if node_config and graph.get_node_type(node_id) not in [
+            NodeType.ITERATION,
+            NodeType.LOOP,
+        ]:
+            raise ValueError('node id is not an iteration node')
+
         # init variable pool
         variable_pool = VariablePool(
             system_variables={},
@@ -456,7 +931,7 @@ class WorkflowEngineManager:
 
         # variable selector to variable mapping
         iteration_nested_nodes = [
-            node for node in nodes 
+            node for node in graph.nodes
             if node.get('data', {}).get('iteration_id') == node_id or node.get('id') == node_id
         ]
         iteration_nested_node_ids = [node.get('id') for node in iteration_nested_nodes]
@@ -512,10 +987,9 @@ class WorkflowEngineManager:
 
         # fetch end node of iteration
         end_node_id = None
-        for edge in graph.get('edges'):
-            if edge.get('source') == node_id:
-                end_node_id = edge.get('target')
-                break
+        outgoing_edge = graph.get_next_edge(node_id)
+        if outgoing_edge:
+            end_node_id = outgoing_edge.get('target')
 
         if not end_node_id:
             raise ValueError('end node of iteration not found')
@@ -565,7 +1039,7 @@ class WorkflowEngineManager:
                     error=error
                 )
 
-    def _workflow_iteration_started(self, graph: dict, 
+    def _workflow_iteration_started(self, graph: WorkflowGraph,
                                     current_iteration_node: BaseIterationNode,
                                     workflow_run_state: WorkflowRunState,
                                     predecessor_node_id: Optional[str] = None,
@@ -578,12 +1052,7 @@ class WorkflowEngineManager:
         :return:
         """
         # get nested nodes
-        iteration_nested_nodes = [
-            node for node in graph.get('nodes')
-            if node.get('data', {}).get('iteration_id') == current_iteration_node.node_id
-        ]
-
-        if not iteration_nested_nodes:
+        if not graph.get_iteration_nested_node_ids(current_iteration_node.node_id):
             raise ValueError('iteration has no nested nodes')
 
         if callbacks:
@@ -602,7 +1071,7 @@ class WorkflowEngineManager:
         # add steps
         workflow_run_state.workflow_node_steps += 1
 
-    def _workflow_iteration_next(self, graph: dict,
+    def _workflow_iteration_next(self, graph: WorkflowGraph,
                                  current_iteration_node: BaseIterationNode,
                                  workflow_run_state: WorkflowRunState, 
                                  callbacks: list[BaseWorkflowCallback] = None) -> None:
@@ -626,14 +1095,14 @@ class WorkflowEngineManager:
             node_run for node_run in workflow_run_state.workflow_node_runs
             if node_run.iteration_node_id != current_iteration_node.node_id
         ]
+        workflow_run_state.workflow_node_run_ids = {
+            node_run.node_id for node_run in workflow_run_state.workflow_node_runs
+        }
 
         # clear variables in current iteration
-        nodes = graph.get('nodes')
-        nodes = [node for node in nodes if node.get('data', {}).get('iteration_id') == current_iteration_node.node_id]
+        for node_id in graph.get_iteration_nested_node_ids(current_iteration_node.node_id):
+            workflow_run_state.variable_pool.clear_node_variables(node_id=node_id)
 
-        for node in nodes:
-            workflow_run_state.variable_pool.clear_node_variables(node_id=node.get('id'))
-    
     def _workflow_iteration_completed(self, current_iteration_node: BaseIterationNode,
                                         workflow_run_state: WorkflowRunState, 
                                         callbacks: list[BaseWorkflowCallback] = None) -> None:
@@ -650,7 +1119,7 @@ class WorkflowEngineManager:
                     )
 
     def _get_next_overall_node(self, workflow_run_state: WorkflowRunState,
-                       graph: dict,
+                       graph: WorkflowGraph,
                        predecessor_node: Optional[BaseNode] = None,
                        callbacks: list[BaseWorkflowCallback] = None,
                        start_at: Optional[str] = None,
@@ -658,119 +1127,74 @@ class WorkflowEngineManager:
         """
         Get next node
         multiple target nodes in the future.
-        :param graph: workflow graph
+        :param graph: compiled workflow graph
         :param predecessor_node: predecessor node
         :param callbacks: workflow callbacks
         :return:
         """
-        nodes = graph.get('nodes')
-        if not nodes:
+        if not graph.nodes:
             return None
 
         if not predecessor_node:
-            for node_config in nodes:
-                node_cls = None
-                if start_at:
-                    if node_config.get('id') == start_at:
-                        node_cls = node_classes.get(NodeType.value_of(node_config.get('data', {}).get('type')))
-                else:
-                    if node_config.get('data', {}).get('type', '') == NodeType.START.value:
-                        node_cls = StartNode
-                if node_cls:
-                    return node_cls(
-                        tenant_id=workflow_run_state.tenant_id,
-                        app_id=workflow_run_state.app_id,
-                        workflow_id=workflow_run_state.workflow_id,
-                        user_id=workflow_run_state.user_id,
-                        user_from=workflow_run_state.user_from,
-                        invoke_from=workflow_run_state.invoke_from,
-                        config=node_config,
-                        callbacks=callbacks,
-                        workflow_call_depth=workflow_run_state.workflow_call_depth
-                    )
-                
-        else:
-            edges = graph.get('edges')
-            source_node_id = predecessor_node.node_id
-
-            # fetch all outgoing edges from source node
-            outgoing_edges = [edge for edge in edges if edge.get('source') == source_node_id]
-            if not outgoing_edges:
-                return None
-
-            # fetch target node id from outgoing edges
-            outgoing_edge = None
-            source_handle = predecessor_node.node_run_result.edge_source_handle \
-                if predecessor_node.node_run_result else None
-            if source_handle:
-                for edge in outgoing_edges:
-                    if edge.get('sourceHandle') and edge.get('sourceHandle') == source_handle:
-                        outgoing_edge = edge
-                        break
-            else:
-                outgoing_edge = outgoing_edges[0]
-
-            if not outgoing_edge:
-                return None
-
-            target_node_id = outgoing_edge.get('target')
+            return self._get_node(
+                workflow_run_state=workflow_run_state,
+                graph=graph,
+                node_id=start_at or graph.start_node_id,
+                callbacks=callbacks
+            )
 
-            if end_at and target_node_id == end_at:
-                return None
+        # fetch target node id from outgoing edges
+        source_handle = predecessor_node.node_run_result.edge_source_handle \
+            if predecessor_node.node_run_result else None
+        outgoing_edge = graph.get_next_edge(predecessor_node.node_id, source_handle)
+        if not outgoing_edge:
+            return None
 
-            # fetch target node from target node id
-            target_node_config = None
-            for node in nodes:
-                if node.get('id') == target_node_id:
-                    target_node_config = node
-                    break
+        target_node_id = outgoing_edge.get('target')
 
-            if not target_node_config:
-                return None
+        if end_at and target_node_id == end_at:
+            return None
 
-            # get next node
-            target_node = node_classes.get(NodeType.value_of(target_node_config.get('data', {}).get('type')))
+        return self._get_node(workflow_run_state, graph, target_node_id, callbacks)
 
-            return target_node(
-                tenant_id=workflow_run_state.tenant_id,
-                app_id=workflow_run_state.app_id,
-                workflow_id=workflow_run_state.workflow_id,
-                user_id=workflow_run_state.user_id,
-                user_from=workflow_run_state.user_from,
-                invoke_from=workflow_run_state.invoke_from,
-                config=target_node_config,
-                callbacks=callbacks,
-                workflow_call_depth=workflow_run_state.workflow_call_depth
-            )
-        
-    def _get_node(self, workflow_run_state: WorkflowRunState, 
-                  graph: dict, 
-                  node_id: str,
+    def _get_node(self, workflow_run_state: WorkflowRunState,
+                  graph: WorkflowGraph,
+                  node_id: Optional[str],
                   callbacks: list[BaseWorkflowCallback]) -> Optional[BaseNode]:
         """
         Get node from graph by node id
         """
-        nodes = graph.get('nodes')
-        if not nodes:
+        node_config = graph.get_node_config(node_id) if node_id else None
+        if not node_config:
             return None
 
-        for node_config in nodes:
-            if node_config.get('id') == node_id:
-                node_type = NodeType.value_of(node_config.get('data', {}).get('type'))
-                node_cls = node_classes.get(node_type)
-                return node_cls(
-                    tenant_id=workflow_run_state.tenant_id,
-                    app_id=workflow_run_state.app_id,
-                    workflow_id=workflow_run_state.workflow_id,
-                    user_id=workflow_run_state.user_id,
-                    user_from=workflow_run_state.user_from,
-                    invoke_from=workflow_run_state.invoke_from,
-                    config=node_config,
-                    callbacks=callbacks,
-                    workflow_call_depth=workflow_run_state.workflow_call_depth
-                )
+        node_cls = node_classes.get(graph.get_node_type(node_id))
+        return node_cls(
+            tenant_id=workflow_run_state.tenant_id,
+            app_id=workflow_run_state.app_id,
+            workflow_id=workflow_run_state.workflow_id,
+            user_id=workflow_run_state.user_id,
+            user_from=workflow_run_state.user_from,
+            invoke_from=workflow_run_state.invoke_from,
+            config=node_config,
+            callbacks=callbacks,
+            workflow_call_depth=workflow_run_state.workflow_call_depth
+        )
 
-        return None
+    def _get_nodes(self, workflow_run_state: WorkflowRunState,
+                   graph: WorkflowGraph,
+                   node_ids: list[str],
+                   callbacks: list[BaseWorkflowCallback]) -> list[BaseNode]:
+        """
+        Get nodes from graph by node ids, missing nodes are ignored
+        """
+        nodes = []
+        for node_id in node_ids:
+            node = self._get_node(workflow_run_state, graph, node_id, callbacks)
+            if node:
+                nodes.append(node)
+
+        return nodes
 
     def _is_timed_out(self, start_at: float, max_execution_time: int) -> bool:
         """
@@ -785,15 +1209,43 @@ class WorkflowEngineManager:
         """
         Check node has ran
         """
-        return bool([
-            node_and_result for node_and_result in workflow_run_state.workflow_node_runs
-            if node_and_result.node_id == node_id
-        ])
+        return node_id in workflow_run_state.workflow_node_run_ids
 
     def _run_workflow_node(self, workflow_run_state: WorkflowRunState,
                            node: BaseNode,
                            predecessor_node: Optional[BaseNode] = None,
                            callbacks: list[BaseWorkflowCallback] = None) -> None:
+        workflow_nodes_and_result = self._workflow_node_started(
+            workflow_run_state=workflow_run_state,
+            node=node,
+            predecessor_node=predecessor_node,
+            callbacks=callbacks
+        )
+
+        node_run_result = self._execute_node(
+            node=node,
+            variable_pool=workflow_run_state.variable_pool
+        )
+
+        self._workflow_node_finished(
+            workflow_run_state=workflow_run_state,
+            workflow_nodes_and_result=workflow_nodes_and_result,
+            node_run_result=node_run_result,
+            callbacks=callbacks
+        )
+
+    def _workflow_node_started(self, workflow_run_state: WorkflowRunState,
+                               node: BaseNode,
+                               predecessor_node: Optional[BaseNode] = None,
+                               callbacks: list[BaseWorkflowCallback] = None) -> WorkflowNodeAndResult:
+        """
+        Workflow node started
+        :param workflow_run_state: workflow run state
+        :param node: node to run
+        :param predecessor_node: predecessor node
+        :param callbacks: workflow callbacks
+        :return:
+        """
         if callbacks:
             for callback in callbacks:
                 callback.on_workflow_node_execute_started(
@@ -823,24 +1275,64 @@ class WorkflowEngineManager:
                 node_id=node.node_id,
                 iteration_node_id=workflow_run_state.current_iteration_state.iteration_node_id
             ))
+            workflow_run_state.workflow_node_run_ids.add(node.node_id)
+
+        return workflow_nodes_and_result
 
+    def _execute_node(self, node: BaseNode, variable_pool: VariablePool) -> NodeRunResult:
+        """
+        Execute node, errors are returned as failed node run result
+        :param node: node to run
+        :param variable_pool: variable pool
+        :return:
+        """
         try:
             # run node, result must have inputs, process_data, outputs, execution_metadata
-            node_run_result = node.run(
-                variable_pool=workflow_run_state.variable_pool
+            return node.run(
+                variable_pool=variable_pool
             )
         except GenerateTaskStoppedException as e:
-            node_run_result = NodeRunResult(
+            return NodeRunResult(
                 status=WorkflowNodeExecutionStatus.FAILED,
                 error='Workflow stopped.'
             )
         except Exception as e:
             logger.exception(f"Node {node.node_data.title} run failed: {str(e)}")
-            node_run_result = NodeRunResult(
+            return NodeRunResult(
                 status=WorkflowNodeExecutionStatus.FAILED,
                 error=str(e)
             )
 
+    def _execute_node_in_thread(self, flask_app: Flask, node: BaseNode, variable_pool: VariablePool) -> NodeRunResult:
+        """
+        Execute node in worker thread of parallel mode
+        :param flask_app: flask app
+        :param node: node to run
+        :param variable_pool: variable pool
+        :return:
+        """
+        with flask_app.app_context():
+            try:
+                return self._execute_node(
+                    node=node,
+                    variable_pool=variable_pool
+                )
+            finally:
+                db.session.close()
+
+    def _workflow_node_finished(self, workflow_run_state: WorkflowRunState,
+                                workflow_nodes_and_result: WorkflowNodeAndResult,
+                                node_run_result: NodeRunResult,
+                                callbacks: list[BaseWorkflowCallback] = None) -> None:
+        """
+        Workflow node finished, raise if node run failed
+        :param workflow_run_state: workflow run state
+        :param workflow_nodes_and_result: node and result of the run
+        :param node_run_result: node run result
+        :param callbacks: workflow callbacks
+        :return:
+        """
+        node = workflow_nodes_and_result.node
         if node_run_result.status == WorkflowNodeExecutionStatus.FAILED:
             # node run failed
             if callbacks:
@@ -874,12 +1366,11 @@ class WorkflowEngineManager:
 
         if node_run_result.outputs:
             for variable_key, variable_value in node_run_result.outputs.items():
-                # append variables to variable pool recursively
-                self._append_variables_recursively(
-                    variable_pool=workflow_run_state.variable_pool,
+                # append variables to variable pool, nested values are resolved lazily
+                workflow_run_state.variable_pool.append_variable(
                     node_id=node.node_id,
                     variable_key_list=[variable_key],
-                    variable_value=variable_value
+                    value=variable_value
                 )
 
         if node_run_result.metadata and node_run_result.metadata.get(NodeRunMetadataKey.TOTAL_TOKENS):
@@ -887,36 +1378,6 @@ class WorkflowEngineManager:
 
         db.session.close()
 
-    def _append_variables_recursively(self, variable_pool: VariablePool,
-                                      node_id: str,
-                                      variable_key_list: list[str],
-                                      variable_value: VariableValue):
-        """
-        Append variables recursively
-        :param variable_pool: variable pool
-        :param node_id: node id
-        :param variable_key_list: variable key list
-        :param variable_value: variable value
-        :return:
-        """
-        variable_pool.append_variable(
-            node_id=node_id,
-            variable_key_list=variable_key_list,
-            value=variable_value
-        )
-
-        # if variable_value is a dict, then recursively append variables
-        if isinstance(variable_value, dict):
-            for key, value in variable_value.items():
-                # construct new key list
-                new_key_list = variable_key_list + [key]
-                self._append_variables_recursively(
-                    variable_pool=variable_pool,
-                    node_id=node_id,
-                    variable_key_list=new_key_list,
-                    variable_value=value
-                )
-
     @classmethod
     def handle_special_values(cls, value: Optional[dict]) -> Optional[dict]:
         """
@@ -4,6 +4,7 @@ from .create_document_index import handle
 from .create_installed_app_when_app_created import handle
 from .create_site_record_when_app_created import handle
 from .deduct_quota_when_messaeg_created import handle
+from .delete_document_file_cache_when_document_deleted import handle
 from .delete_installed_app_when_app_deleted import handle
 from .delete_tool_parameters_cache_when_sync_draft_workflow import handle
 from .delete_workflow_as_tool_when_app_deleted import handle
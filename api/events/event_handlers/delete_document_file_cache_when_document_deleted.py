@@ -0,0 +1,10 @@
+from core.helper.document_file_cache import DocumentFileCache
+from events.document_event import document_was_deleted
+
+
+@document_was_deleted.connect
+def handle(sender, **kwargs):
+    document_id = sender
+    tenant_id = kwargs.get('tenant_id')
+    if tenant_id:
+        DocumentFileCache(tenant_id=tenant_id).delete([document_id])
@@ -42,6 +42,7 @@ def init_app(app: Flask) -> Celery:
     imports = [
         "schedule.clean_embedding_cache_task",
         "schedule.clean_unused_datasets_task",
+        "schedule.update_segment_hit_count_task",
     ]
 
     beat_schedule = {
@@ -52,6 +53,10 @@ def init_app(app: Flask) -> Celery:
         'clean_unused_datasets_task': {
             'task': 'schedule.clean_unused_datasets_task.clean_unused_datasets_task',
             'schedule': timedelta(days=1),
+        },
+        'update_segment_hit_count_task': {
+            'task': 'schedule.update_segment_hit_count_task.update_segment_hit_count_task',
+            'schedule': timedelta(seconds=int(app.config["SEGMENT_HIT_COUNT_FLUSH_INTERVAL"])),
         }
     }
     celery_app.conf.update(
@@ -0,0 +1,202 @@
+import atexit
+import datetime
+import logging
+import os
+import queue
+import threading
+import time
+from collections import Counter as HitCounter
+from typing import Optional
+
+from flask import Flask
+from prometheus_client import Counter, Gauge
+from sqlalchemy import insert
+
+from core.rag.models.document import Document
+from core.rag.retrieval.segment_hit_counter import SegmentHitCounter
+from extensions.ext_database import db
+from models.dataset import DatasetQuery
+
+logger = logging.getLogger(__name__)
+
+retrieval_log_events = Counter(
+    'retrieval_log_events_total',
+    'Retrieval log events of the buffered sink, by kind and result',
+    ['kind', 'result']
+)
+retrieval_log_queue_size = Gauge(
+    'retrieval_log_queue_size',
+    'Retrieval log events waiting in the buffered sink'
+)
+
+_STOP = object()
+
+
+class RetrievalLogSink:
+    """
+    Buffered sink of dataset query logs and segment hits, off the request path.
+
+    Events are put in a bounded in-process queue and drained by a background worker, which bulk inserts
+    `DatasetQuery` rows and passes aggregated hits to `SegmentHitCounter`, every `RETRIEVAL_LOG_BATCH_SIZE`
+    events or `RETRIEVAL_LOG_FLUSH_INTERVAL` seconds. When the queue is full, new events are dropped, or
+    with the `block` policy the caller waits up to `RETRIEVAL_LOG_BLOCK_TIMEOUT` seconds before dropping.
+    Pending events are flushed on process exit.
+    """
+
+    def __init__(self):
+        self._app: Optional[Flask] = None
+        self._queue: Optional[queue.Queue] = None
+        self._worker: Optional[threading.Thread] = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app: Flask):
+        self._app = app
+        self.enabled = app.config.get('RETRIEVAL_LOG_ASYNC_ENABLED', True)
+        self.queue_size = int(app.config.get('RETRIEVAL_LOG_QUEUE_SIZE', 10000))
+        self.batch_size = int(app.config.get('RETRIEVAL_LOG_BATCH_SIZE', 500))
+        self.flush_interval = float(app.config.get('RETRIEVAL_LOG_FLUSH_INTERVAL', 1))
+        self.full_policy = app.config.get('RETRIEVAL_LOG_FULL_POLICY', 'drop')
+        self.block_timeout = float(app.config.get('RETRIEVAL_LOG_BLOCK_TIMEOUT', 0.1))
+        if self.full_policy not in ['drop', 'block']:
+            raise ValueError(f'invalid retrieval log full policy {self.full_policy}')
+
+    def add_queries(self, query: str, dataset_ids: list[str], app_id: str, user_from: str, user_id: str) -> None:
+        """
+        Log query of datasets
+
+        :param query: query
+        :param dataset_ids: dataset ids
+        :param app_id: app id
+        :param user_from: account or end_user
+        :param user_id: user id
+        :return:
+        """
+        if not query:
+            return
+
+        created_at = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+        for dataset_id in dataset_ids:
+            self._put('query', {
+                'dataset_id': dataset_id,
+                'content': query,
+                'source': 'app',
+                'source_app_id': app_id,
+                'created_by_role': user_from,
+                'created_by': user_id,
+                'created_at': created_at
+            })
+
+    def add_hits(self, documents: list[Document]) -> None:
+        """
+        Log hits of retrieved documents
+
+        :param documents: retrieved documents
+        :return:
+        """
+        if documents:
+            self._put('hits', [
+                (document.metadata.get('dataset_id', ''), document.metadata['doc_id']) for document in documents
+            ])
+
+    def shutdown(self, timeout: float = 5) -> None:
+        """
+        Stop worker after flushing pending events
+
+        :param timeout: seconds to wait for the worker
+        :return:
+        """
+        with self._lock:
+            worker, self._worker = self._worker, None
+            if not worker or self._pid != os.getpid():
+                return
+            self._queue.put(_STOP)
+        worker.join(timeout)
+
+    def _put(self, kind: str, payload) -> None:
+        if not self._app or not self.enabled:
+            # not initialized or disabled, write synchronously
+            self._write([(kind, payload)])
+            return
+
+        event_queue = self._ensure_worker()
+        try:
+            if self.full_policy == 'block':
+                event_queue.put((kind, payload), timeout=self.block_timeout)
+            else:
+                event_queue.put_nowait((kind, payload))
+        except queue.Full:
+            retrieval_log_events.labels(kind, 'dropped').inc()
+            return
+        retrieval_log_events.labels(kind, 'enqueued').inc()
+        retrieval_log_queue_size.set(event_queue.qsize())
+
+    def _ensure_worker(self) -> queue.Queue:
+        pid = os.getpid()
+        if self._worker and self._pid == pid:
+            return self._queue
+
+        with self._lock:
+            # start worker lazily, and again in forked processes
+            if not self._worker or self._pid != pid:
+                self._pid = pid
+                self._queue = queue.Queue(maxsize=self.queue_size)
+                self._worker = threading.Thread(target=self._run, args=(self._queue,), daemon=True)
+                self._worker.start()
+                atexit.register(self.shutdown)
+            return self._queue
+
+    def _run(self, event_queue: queue.Queue) -> None:
+        with self._app.app_context():
+            stopped = False
+            while not stopped:
+                events = []
+                deadline = time.monotonic() + self.flush_interval
+                while len(events) < self.batch_size:
+                    try:
+                        event = event_queue.get(timeout=max(deadline - time.monotonic(), 0))
+                    except queue.Empty:
+                        break
+                    if event is _STOP:
+                        stopped = True
+                        # drain events left in queue
+                        while True:
+                            try:
+                                event = event_queue.get_nowait()
+                            except queue.Empty:
+                                break
+                            if event is not _STOP:
+                                events.append(event)
+                        break
+                    events.append(event)
+
+                retrieval_log_queue_size.set(event_queue.qsize())
+                if events:
+                    self._write(events)
+                    db.session.remove()
+
+    @staticmethod
+    def _write(events: list[tuple]) -> None:
+        queries = [payload for kind, payload in events if kind == 'query']
+        hits = HitCounter(hit for kind, payload in events if kind == 'hits' for hit in payload)
+
+        if queries:
+            try:
+                db.session.execute(insert(DatasetQuery), queries)
+                db.session.commit()
+                retrieval_log_events.labels('query', 'written').inc(len(queries))
+            except Exception:
+                db.session.rollback()
+                retrieval_log_events.labels('query', 'failed').inc(len(queries))
+                logger.exception('Failed to write dataset queries')
+
+        if hits:
+            SegmentHitCounter.incr_many(hits)
+            retrieval_log_events.labels('hits', 'written').inc(sum(1 for kind, _ in events if kind == 'hits'))
+
+
+retrieval_log = RetrievalLogSink()
+
+
+def init_app(app: Flask):
+    retrieval_log.init_app(app)
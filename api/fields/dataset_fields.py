@@ -18,13 +18,20 @@ reranking_model_fields = {
     'reranking_model_name': fields.String
 }
 
+fusion_fields = {
+    'method': fields.String,
+    'rrf_k': fields.Integer,
+    'weights': fields.Raw
+}
+
 dataset_retrieval_model_fields = {
     'search_method': fields.String,
     'reranking_enable': fields.Boolean,
     'reranking_model': fields.Nested(reranking_model_fields),
     'top_k': fields.Integer,
     'score_threshold_enabled': fields.Boolean,
-    'score_threshold': fields.Float
+    'score_threshold': fields.Float,
+    'fusion': fields.Nested(fusion_fields, allow_null=True)
 }
 
 tag_fields = {
@@ -4,7 +4,6 @@ import hmac
 import json
 import logging
 import os
-import pickle
 import re
 import time
 from json import JSONDecodeError
@@ -13,6 +12,7 @@ from flask import current_app
 from sqlalchemy import func
 from sqlalchemy.dialects.postgresql import JSONB
 
+from core.embedding.embedding_codec import EmbeddingCodec, EmbeddingStorageDtype
 from extensions.ext_database import db
 from extensions.ext_storage import storage
 from models import StringUUID
@@ -522,6 +522,37 @@ class DatasetKeywordTable(db.Model):
                 return None
 
 
+class DatasetKeywordPosting(db.Model):
+    __tablename__ = 'dataset_keyword_postings'
+    __table_args__ = (
+        db.PrimaryKeyConstraint('id', name='dataset_keyword_posting_pkey'),
+        db.UniqueConstraint('dataset_id', 'keyword', 'index_node_id', name='dataset_keyword_posting_unique_idx'),
+        db.Index('dataset_keyword_posting_node_idx', 'dataset_id', 'index_node_id'),
+    )
+
+    id = db.Column(StringUUID, primary_key=True, server_default=db.text('uuid_generate_v4()'))
+    dataset_id = db.Column(StringUUID, nullable=False)
+    keyword = db.Column(db.String(255), nullable=False)
+    index_node_id = db.Column(db.String(255), nullable=False)
+    # number of keywords of the segment, used for BM25 length normalization
+    segment_length = db.Column(db.Integer, nullable=False, server_default=db.text('1'))
+    created_at = db.Column(db.DateTime, nullable=False, server_default=db.text('CURRENT_TIMESTAMP(0)'))
+
+
+class DatasetKeywordStats(db.Model):
+    __tablename__ = 'dataset_keyword_stats'
+    __table_args__ = (
+        db.PrimaryKeyConstraint('id', name='dataset_keyword_stats_pkey'),
+        db.UniqueConstraint('dataset_id', name='dataset_keyword_stats_dataset_id_key'),
+    )
+
+    id = db.Column(StringUUID, primary_key=True, server_default=db.text('uuid_generate_v4()'))
+    dataset_id = db.Column(StringUUID, nullable=False)
+    segment_count = db.Column(db.Integer, nullable=False, server_default=db.text('0'))
+    total_segment_length = db.Column(db.BigInteger, nullable=False, server_default=db.text('0'))
+    updated_at = db.Column(db.DateTime, nullable=False, server_default=db.text('CURRENT_TIMESTAMP(0)'))
+
+
 class Embedding(db.Model):
     __tablename__ = 'embeddings'
     __table_args__ = (
@@ -538,11 +569,13 @@ class Embedding(db.Model):
     provider_name = db.Column(db.String(40), nullable=False,
                               server_default=db.text("''::character varying"))
 
-    def set_embedding(self, embedding_data: list[float]):
-        self.embedding = pickle.dumps(embedding_data, protocol=pickle.HIGHEST_PROTOCOL)
+    def set_embedding(self, embedding_data: list[float],
+                      dtype: EmbeddingStorageDtype = EmbeddingStorageDtype.FLOAT32):
+        self.embedding = EmbeddingCodec.encode(embedding_data, dtype)
 
     def get_embedding(self) -> list[float]:
-        return pickle.loads(self.embedding)
+        # rows pickled before the compact codec are still decodable
+        return EmbeddingCodec.decode(self.embedding)
 
 
 class DatasetCollectionBinding(db.Model):
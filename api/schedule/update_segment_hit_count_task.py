@@ -0,0 +1,18 @@
+import time
+
+import click
+from flask import current_app
+
+import app
+from core.rag.retrieval.segment_hit_counter import SegmentHitCounter
+
+
+@app.celery.task(queue='dataset')
+def update_segment_hit_count_task():
+    click.echo(click.style('Start update segment hit count.', fg='green'))
+    batch_size = int(current_app.config.get('SEGMENT_HIT_COUNT_FLUSH_BATCH_SIZE'))
+    start_at = time.perf_counter()
+    updated_count = SegmentHitCounter.flush(batch_size)
+    end_at = time.perf_counter()
+    click.echo(click.style('Updated hit count of {} segments latency: {}'.format(updated_count, end_at - start_at),
+                           fg='green'))
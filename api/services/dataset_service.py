@@ -11,6 +11,7 @@ from flask_login import current_user
 from sqlalchemy import func
 
 from core.errors.error import LLMBadRequestError, ProviderTokenNotInitError
+from core.helper.document_file_cache import DocumentFileCache
 from core.model_manager import ModelManager
 from core.model_runtime.entities.model_entities import ModelType
 from core.model_runtime.model_providers.__base.text_embedding_model import TextEmbeddingModel
@@ -446,7 +447,8 @@ class DocumentService:
     @staticmethod
     def delete_document(document):
         # trigger document_was_deleted signal
-        document_was_deleted.send(document.id, dataset_id=document.dataset_id, doc_form=document.doc_form)
+        document_was_deleted.send(document.id, dataset_id=document.dataset_id, doc_form=document.doc_form,
+                                  tenant_id=document.tenant_id)
 
         db.session.delete(document)
         db.session.commit()
@@ -701,6 +703,7 @@ class DocumentService:
             if document_ids:
                 document_indexing_task.delay(dataset.id, document_ids)
             if duplicate_document_ids:
+                DocumentFileCache(tenant_id=dataset.tenant_id).delete(duplicate_document_ids)
                 duplicate_document_indexing_task.delay(dataset.id, duplicate_document_ids)
 
         return documents, batch
@@ -828,6 +831,7 @@ class DocumentService:
         document.doc_form = document_data['doc_form']
         db.session.add(document)
         db.session.commit()
+        DocumentFileCache(tenant_id=document.tenant_id).delete([document.id])
         # update document segment
         update_params = {
             DocumentSegment.status: 're_segment'
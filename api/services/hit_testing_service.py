@@ -62,7 +62,8 @@ class HitTestingService:
                                                   score_threshold=retrieval_model['score_threshold']
                                                   if retrieval_model['score_threshold_enabled'] else None,
                                                   reranking_model=retrieval_model['reranking_model']
-                                                  if retrieval_model['reranking_enable'] else None
+                                                  if retrieval_model['reranking_enable'] else None,
+                                                  fusion=retrieval_model.get('fusion')
                                                   )
 
         end = time.perf_counter()
@@ -0,0 +1,77 @@
+import os
+import subprocess
+import sys
+import textwrap
+
+from tests.integration_tests.conftest import PROJECT_DIR
+
+# runs in a fresh interpreter, gevent must patch the stdlib before anything else is imported, as app.py does
+WORKER_SCRIPT = textwrap.dedent('''
+    from gevent import monkey
+
+    monkey.patch_all()
+
+    import os
+    import sys
+    import time
+
+    import gevent
+    from celery.concurrency.gevent import TaskPool
+
+    from core.rag.extractor import pdf_extractor
+    from core.rag.extractor.pdf_extractor import PdfExtractor
+
+    file_path, page_count = sys.argv[1], int(sys.argv[2])
+    # parse in the process pool on hosts with a single cpu too
+    os.cpu_count = lambda: 2
+    results = {}
+    ticks = []
+
+    def extract(task_id):
+        documents = PdfExtractor(file_path, max_workers=2, batch_pages=4).extract()
+        results[task_id] = ([document.page_content.strip() for document in documents], pdf_extractor._executor)
+
+    def heartbeat():
+        while len(results) < 4:
+            ticks.append(time.perf_counter())
+            gevent.sleep(0.01)
+
+    # the pool class of celery workers started with -P gevent
+    pool = TaskPool(limit=4)
+    pool.start()
+    heartbeat_greenlet = gevent.spawn(heartbeat)
+    gevent.sleep(0)
+    for task_id in range(4):
+        pool.on_apply(extract, args=(task_id,), callback=lambda result: None)
+    heartbeat_greenlet.join(timeout=60)
+    ticks.append(time.perf_counter())
+    pool.stop()
+
+    assert len(results) == 4, results
+    assert all(contents == [f'page {i}' for i in range(page_count)] for contents, _ in results.values())
+    # all tasks share one process pool
+    assert len({id(executor) for _, executor in results.values()}) == 1
+    assert results[0][1] is not None
+    # the hub keeps scheduling other greenlets while pages are parsed
+    assert max(b - a for a, b in zip(ticks, ticks[1:])) < 1, ticks
+    print('ok')
+''')
+
+
+def test_extract_in_gevent_celery_worker(tmp_path):
+    from tests.unit_tests.core.rag.extractor.test_pdf_extractor import _write_pdf
+
+    file_path = tmp_path / 'file.pdf'
+    _write_pdf(file_path, 40)
+
+    result = subprocess.run(
+        [sys.executable, '-c', WORKER_SCRIPT, str(file_path), '40'],
+        cwd=PROJECT_DIR,
+        env={**os.environ, 'PYTHONPATH': PROJECT_DIR},
+        capture_output=True,
+        text=True,
+        timeout=120
+    )
+
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip().endswith('ok')
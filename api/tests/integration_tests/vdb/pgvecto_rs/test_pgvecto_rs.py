@@ -1,7 +1,6 @@
 from core.rag.datasource.vdb.pgvecto_rs.pgvecto_rs import PGVectoRS, PgvectoRSConfig
 from tests.integration_tests.vdb.test_vector_store import (
     AbstractVectorTest,
-    get_example_text,
     setup_mock_redis,
 )
 
@@ -21,11 +20,6 @@ class TestPgvectoRSVector(AbstractVectorTest):
             dim=128
         )
 
-    def search_by_full_text(self):
-        # pgvecto rs only support english text search, So it’s not open for now
-        hits_by_full_text = self.vector.search_by_full_text(query=get_example_text())
-        assert len(hits_by_full_text) == 0
-
     def delete_by_document_id(self):
         self.vector.delete_by_document_id(document_id=self.example_doc_id)
 
@@ -0,0 +1,70 @@
+import os
+import time
+import uuid
+
+import numpy as np
+import pytest
+
+from core.rag.datasource.vdb.pgvector.pgvector import PGVector, PGVectorConfig
+from core.rag.models.document import Document
+from models.dataset import Dataset
+from tests.integration_tests.vdb.test_vector_store import setup_mock_redis
+
+DIMENSION = 128
+QUERY_COUNT = 100
+TOP_K = 10
+INSERT_BATCH_SIZE = 5000
+
+
+@pytest.mark.skipif(os.environ.get('PGVECTOR_BENCHMARK') != 'true',
+                    reason='set PGVECTOR_BENCHMARK=true to benchmark against the pgvector container')
+@pytest.mark.parametrize('row_count', [100_000, 1_000_000])
+@pytest.mark.parametrize('index_type', ['hnsw', 'ivfflat'])
+def test_pgvector_ann_benchmark(setup_mock_redis, row_count: int, index_type: str):
+    vector = PGVector(
+        collection_name=Dataset.gen_collection_name_by_id(str(uuid.uuid4())) + '_bench',
+        config=PGVectorConfig(
+            host="localhost",
+            port=5433,
+            user="postgres",
+            password="difyai123456",
+            database="dify",
+            index_type=index_type,
+            ivfflat_lists=int(row_count ** 0.5),
+            ivfflat_probes=int(row_count ** 0.5 / 10),
+        ),
+    )
+
+    rng = np.random.default_rng(0)
+    embeddings = rng.standard_normal((row_count, DIMENSION), dtype=np.float32)
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    doc_ids = [str(uuid.uuid4()) for _ in range(row_count)]
+
+    try:
+        vector._create_collection(DIMENSION)
+        for i in range(0, row_count, INSERT_BATCH_SIZE):
+            vector.add_texts(
+                [Document(page_content='', metadata={'doc_id': doc_id}) for doc_id in doc_ids[i:i + INSERT_BATCH_SIZE]],
+                embeddings[i:i + INSERT_BATCH_SIZE].tolist()
+            )
+        # ivfflat lists are trained on existing rows
+        vector.create_index(rebuild=True)
+
+        queries = embeddings[rng.choice(row_count, QUERY_COUNT, replace=False)] \
+            + rng.standard_normal((QUERY_COUNT, DIMENSION), dtype=np.float32) * 0.1
+        exact_top_k = np.argsort(-queries @ embeddings.T, axis=1)[:, :TOP_K]
+
+        latencies = []
+        hits = 0
+        for query, exact in zip(queries, exact_top_k):
+            start = time.perf_counter()
+            docs = vector.search_by_vector(query.tolist(), top_k=TOP_K, score_threshold=-1)
+            latencies.append(time.perf_counter() - start)
+            hits += len({doc.metadata['doc_id'] for doc in docs} & {doc_ids[i] for i in exact})
+
+        recall = hits / (QUERY_COUNT * TOP_K)
+        p95 = np.percentile(latencies, 95) * 1000
+        print(f'\npgvector {index_type} rows={row_count} recall@{TOP_K}={recall:.3f} p95={p95:.1f}ms')
+        assert recall >= 0.8
+    finally:
+        vector.delete()
@@ -0,0 +1,83 @@
+import time
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+
+from core.app.apps.chat import app_runner as app_runner_module
+from core.app.apps.chat.app_runner import ChatAppRunner
+from core.app.entities.queue_entities import QueueLLMChunkEvent, QueueMessageEndEvent
+
+CACHED_ANSWER = 'Dify is an LLM app development platform. ' * 50
+
+
+class FakeSemanticCache:
+    def __init__(self, **kwargs):
+        pass
+
+    def query(self, query: str):
+        return CACHED_ANSWER
+
+    def save(self, query: str, answer: str):
+        raise AssertionError('cache hits are not saved')
+
+
+@pytest.fixture
+def runner(monkeypatch):
+    monkeypatch.setattr(app_runner_module, 'db', MagicMock())
+    monkeypatch.setattr(app_runner_module, 'SemanticCacheFeature', FakeSemanticCache)
+    runner = ChatAppRunner()
+    monkeypatch.setattr(runner, 'get_pre_calculate_rest_tokens', MagicMock())
+    monkeypatch.setattr(runner, 'organize_prompt_messages', MagicMock(return_value=([], None)))
+    monkeypatch.setattr(runner, 'moderation_for_inputs',
+                        MagicMock(side_effect=lambda **kwargs: (True, kwargs['inputs'], kwargs['query'])))
+    monkeypatch.setattr(runner, 'query_app_annotations_to_reply', MagicMock(return_value=None))
+    monkeypatch.setattr(runner, 'check_hosting_moderation', MagicMock(return_value=False))
+    return runner
+
+
+def _generate_entity():
+    app_config = SimpleNamespace(
+        app_id='app-id',
+        tenant_id='tenant-id',
+        prompt_template=None,
+        external_data_variables=[],
+        dataset=None,
+        additional_features=SimpleNamespace(semantic_cache=SimpleNamespace(enabled=True))
+    )
+    return SimpleNamespace(
+        app_config=app_config,
+        model_config=SimpleNamespace(model='gpt-3.5-turbo'),
+        inputs={},
+        query='What is Dify?',
+        files=[],
+        conversation_id=None,
+        user_id='user-id',
+        invoke_from=None,
+        stream=True
+    )
+
+
+def test_semantic_cache_hit_is_replayed_at_once(runner):
+    queue_manager = MagicMock()
+
+    started_at = time.perf_counter()
+    runner.run(_generate_entity(), queue_manager, conversation=MagicMock(), message=MagicMock())
+    elapsed = time.perf_counter() - started_at
+
+    events = [call.args[0] for call in queue_manager.publish.call_args_list]
+    chunks = [event.chunk.delta.message.content for event in events if isinstance(event, QueueLLMChunkEvent)]
+    assert ''.join(chunks) == CACHED_ANSWER
+    assert len(chunks) <= 5
+    assert isinstance(events[-1], QueueMessageEndEvent)
+    assert elapsed < 0.5
+
+
+def test_semantic_cache_hit_is_moderated(runner):
+    queue_manager = MagicMock()
+    runner.check_hosting_moderation.return_value = True
+
+    runner.run(_generate_entity(), queue_manager, conversation=MagicMock(), message=MagicMock())
+
+    runner.check_hosting_moderation.assert_called_once()
+    queue_manager.publish.assert_not_called()
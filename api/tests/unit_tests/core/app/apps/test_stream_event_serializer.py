@@ -0,0 +1,166 @@
+import json
+import time
+
+import pytest
+
+from core.app.apps.chat.generate_response_converter import ChatAppGenerateResponseConverter
+from core.app.apps.stream_event_serializer import StreamEventSerializer, coalesce_stream_responses
+from core.app.apps.workflow.generate_response_converter import WorkflowAppGenerateResponseConverter
+from core.app.entities.app_invoke_entities import InvokeFrom
+from core.app.entities.task_entities import (
+    ChatbotAppStreamResponse,
+    MessageEndStreamResponse,
+    MessageStreamResponse,
+    PingStreamResponse,
+    TextChunkStreamResponse,
+    WorkflowAppStreamResponse,
+)
+
+TEXTS = ['Hello', ' world', '"quoted"\n', '\\ back\tslash', '中文', 'emoji 😀', '\x00\x1f', '</script>', '']
+
+
+def _message_chunk(answer: str) -> ChatbotAppStreamResponse:
+    return ChatbotAppStreamResponse(
+        conversation_id='conversation-id',
+        message_id='message-id',
+        created_at=1700000000,
+        stream_response=MessageStreamResponse(task_id='task-id', id='message-id', answer=answer)
+    )
+
+
+def _text_chunk(text: str) -> WorkflowAppStreamResponse:
+    return WorkflowAppStreamResponse(
+        workflow_run_id='workflow-run-id',
+        stream_response=TextChunkStreamResponse(task_id='task-id', data=TextChunkStreamResponse.Data(text=text))
+    )
+
+
+def _to_json(chunk) -> str:
+    # the generic path of the response converters
+    response_chunk = {'event': chunk.stream_response.event.value}
+    response_chunk.update({name: getattr(chunk, name) for name in chunk.__fields__ if name != 'stream_response'})
+    response_chunk.update(chunk.stream_response.to_dict())
+    return json.dumps(response_chunk)
+
+
+@pytest.mark.parametrize('text', TEXTS)
+def test_serialize_is_identical_to_json_dumps(text):
+    serializer = StreamEventSerializer()
+    for chunk in [_message_chunk(text), _text_chunk(text)]:
+        assert serializer.serialize(chunk) == _to_json(chunk)
+
+
+def test_converters_output_is_unchanged():
+    chunks = [_message_chunk(text) for text in TEXTS]
+    chunks.append(ChatbotAppStreamResponse(
+        conversation_id='conversation-id',
+        message_id='message-id',
+        created_at=1700000000,
+        stream_response=MessageEndStreamResponse(task_id='task-id', id='message-id')
+    ))
+    ping_chunk = ChatbotAppStreamResponse(
+        conversation_id='conversation-id',
+        message_id='message-id',
+        created_at=1700000000,
+        stream_response=PingStreamResponse(task_id='task-id')
+    )
+    events = list(ChatAppGenerateResponseConverter.convert(iter([ping_chunk, *chunks]), InvokeFrom.SERVICE_API))
+    assert events == ['event: ping\n\n', *(f'data: {_to_json(chunk)}\n\n' for chunk in chunks)]
+
+    chunks = [_text_chunk(text) for text in TEXTS]
+    events = list(WorkflowAppGenerateResponseConverter.convert(iter(chunks), InvokeFrom.WEB_APP))
+    assert events == [f'data: {_to_json(chunk)}\n\n' for chunk in chunks]
+
+
+def test_serialize_skips_other_events():
+    chunk = ChatbotAppStreamResponse(
+        conversation_id='conversation-id',
+        message_id='message-id',
+        created_at=1700000000,
+        stream_response=MessageEndStreamResponse(task_id='task-id', id='message-id')
+    )
+    assert StreamEventSerializer().serialize(chunk) is None
+
+
+def test_coalesce_merges_text_until_other_event():
+    end = ChatbotAppStreamResponse(
+        conversation_id='conversation-id',
+        message_id='message-id',
+        created_at=1700000000,
+        stream_response=MessageEndStreamResponse(task_id='task-id', id='message-id')
+    )
+    chunks = [_message_chunk('a'), _message_chunk('b'), _text_chunk('c'), _text_chunk('d'), end]
+
+    merged = list(coalesce_stream_responses(iter(chunks), interval_ms=60000, max_bytes=1024))
+
+    assert [chunk.stream_response.event.value for chunk in merged] == ['message', 'text_chunk', 'message_end']
+    assert merged[0].stream_response.answer == 'ab'
+    assert merged[0].conversation_id == 'conversation-id'
+    assert merged[1].stream_response.data.text == 'cd'
+
+
+def test_coalesce_flushes_on_max_bytes_and_interval():
+    chunks = [_message_chunk('abc') for _ in range(4)]
+    merged = list(coalesce_stream_responses(iter(chunks), interval_ms=60000, max_bytes=6))
+    assert [chunk.stream_response.answer for chunk in merged] == ['abcabc', 'abcabc']
+
+    def slow_chunks():
+        for chunk in chunks:
+            yield chunk
+            time.sleep(0.02)
+
+    merged = list(coalesce_stream_responses(slow_chunks(), interval_ms=10, max_bytes=1024))
+    assert ''.join(chunk.stream_response.answer for chunk in merged) == 'abc' * 4
+    assert len(merged) >= 2
+
+
+def test_coalesce_flushes_while_upstream_stalls():
+    def stalled_chunks():
+        yield _message_chunk('a')
+        yield _message_chunk('b')
+        # e.g. the model pauses for a tool call
+        time.sleep(0.5)
+        yield _message_chunk('c')
+
+    started_at = time.perf_counter()
+    received = []
+    for chunk in coalesce_stream_responses(stalled_chunks(), interval_ms=20, max_bytes=1024):
+        received.append((chunk.stream_response.answer, time.perf_counter() - started_at))
+
+    assert [answer for answer, _ in received] == ['ab', 'c']
+    # buffered text is sent on its deadline, not when the next chunk arrives
+    assert received[0][1] < 0.3
+
+
+def test_coalesce_raises_upstream_error():
+    def failing_chunks():
+        yield _message_chunk('a')
+        raise ValueError('upstream failed')
+
+    merged = coalesce_stream_responses(failing_chunks(), interval_ms=60000, max_bytes=1024)
+
+    assert next(merged).stream_response.answer == 'a'
+    with pytest.raises(ValueError, match='upstream failed'):
+        next(merged)
+
+
+STREAM_SIZE = 2000
+
+
+def _generic_convert(chunks):
+    for chunk in chunks:
+        yield f'data: {_to_json(chunk)}\n\n'
+
+
+@pytest.mark.benchmark(group='stream_event_serialization')
+def test_benchmark_generic_serialization(benchmark):
+    chunks = [_message_chunk(f'token {i} ') for i in range(STREAM_SIZE)]
+    events = benchmark(lambda: list(_generic_convert(chunks)))
+    assert len(events) == STREAM_SIZE
+
+
+@pytest.mark.benchmark(group='stream_event_serialization')
+def test_benchmark_fast_serialization(benchmark):
+    chunks = [_message_chunk(f'token {i} ') for i in range(STREAM_SIZE)]
+    events = benchmark(lambda: list(ChatAppGenerateResponseConverter.convert(iter(chunks), InvokeFrom.SERVICE_API)))
+    assert len(events) == STREAM_SIZE
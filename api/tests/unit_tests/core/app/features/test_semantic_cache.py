@@ -0,0 +1,135 @@
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from flask import Flask
+
+from core.app.app_config.entities import SemanticCacheEntity
+from core.app.app_config.features.semantic_cache.manager import SemanticCacheConfigManager
+from core.app.features.semantic_cache import semantic_cache as semantic_cache_module
+from core.app.features.semantic_cache.semantic_cache import SemanticCacheFeature
+from core.helper import dataset_index_version
+
+
+class FakeRedis:
+    def __init__(self):
+        self.lists = {}
+        self.values = {}
+
+    def lrange(self, key, start, end):
+        return list(self.lists.get(key, []))
+
+    def mget(self, keys):
+        return [self.values.get(key) for key in keys]
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+
+    def lpush(self, key, value):
+        self.redis.lists.setdefault(key, []).insert(0, value.encode())
+
+    def ltrim(self, key, start, end):
+        self.redis.lists[key] = self.redis.lists[key][start:end + 1]
+
+    def incr(self, key):
+        self.redis.values[key] = str(int(self.redis.values.get(key) or 0) + 1).encode()
+
+    def expire(self, key, ttl):
+        pass
+
+    def execute(self):
+        pass
+
+
+# queries about the same topic share most of their embedding
+EMBEDDINGS = {
+    'how do i reset my password': [1.0, 0.0, 0.0],
+    'how can i reset my password?': [0.99, 0.14, 0.0],
+    'what is the refund policy': [0.0, 0.0, 1.0],
+}
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    redis = FakeRedis()
+    monkeypatch.setattr(semantic_cache_module, 'redis_client', redis)
+    monkeypatch.setattr(dataset_index_version, 'redis_client', redis)
+    monkeypatch.setattr(SemanticCacheFeature, '_get_embedding_model_instance',
+                        lambda self: SimpleNamespace(provider='openai', model='text-embedding-3-small'))
+    monkeypatch.setattr(SemanticCacheFeature, '_embed_query',
+                        lambda self, query: (np.array(EMBEDDINGS[query]) / np.linalg.norm(EMBEDDINGS[query])).tolist())
+    return redis
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config['SEMANTIC_CACHE_TTL'] = 3600
+    app.config['SEMANTIC_CACHE_MAX_ENTRIES'] = 2
+    with app.app_context():
+        yield app
+
+
+def _app_config(pre_prompt: str = 'You are a helpful assistant.', score_threshold: float = 0.95):
+    return SimpleNamespace(
+        app_id='app-1',
+        tenant_id='tenant-1',
+        app_model_config_dict={'pre_prompt': pre_prompt},
+        dataset=SimpleNamespace(dataset_ids=['dataset-1']),
+        additional_features=SimpleNamespace(semantic_cache=SemanticCacheEntity(enabled=True,
+                                                                               score_threshold=score_threshold))
+    )
+
+
+def test_similar_query_replays_answer(app, redis):
+    app_config = _app_config()
+    SemanticCacheFeature(app_config, {}).save('how do i reset my password', 'Click "Forgot password".')
+
+    assert SemanticCacheFeature(app_config, {}).query('how can i reset my password?') == 'Click "Forgot password".'
+    assert SemanticCacheFeature(app_config, {}).query('what is the refund policy') is None
+    assert SemanticCacheFeature(_app_config(score_threshold=1.0), {}).query('how can i reset my password?') is None
+
+
+def test_scope_changes_with_config_inputs_and_datasets(app, redis):
+    SemanticCacheFeature(_app_config(), {'lang': 'en'}).save('how do i reset my password', 'answer')
+
+    assert SemanticCacheFeature(_app_config(), {'lang': 'en'}).query('how do i reset my password') == 'answer'
+    assert SemanticCacheFeature(_app_config(), {'lang': 'fr'}).query('how do i reset my password') is None
+    assert SemanticCacheFeature(_app_config('Be brief.'), {'lang': 'en'}).query('how do i reset my password') is None
+
+    dataset_index_version.DatasetIndexVersion.increase('dataset-1')
+    assert SemanticCacheFeature(_app_config(), {'lang': 'en'}).query('how do i reset my password') is None
+
+
+def test_eviction_by_size_and_ttl(app, redis, monkeypatch):
+    app_config = _app_config()
+    SemanticCacheFeature(app_config, {}).save('how do i reset my password', 'password answer')
+    SemanticCacheFeature(app_config, {}).save('what is the refund policy', 'refund answer')
+    SemanticCacheFeature(app_config, {}).save('how can i reset my password?', 'new password answer')
+
+    # max entries is 2, the oldest answer is evicted
+    assert len(next(iter(redis.lists.values()))) == 2
+    assert SemanticCacheFeature(app_config, {}).query('how do i reset my password') == 'new password answer'
+
+    monkeypatch.setattr(time, 'time', lambda: 10 ** 12)
+    assert SemanticCacheFeature(app_config, {}).query('what is the refund policy') is None
+
+
+def test_config_validation():
+    config, keys = SemanticCacheConfigManager.validate_and_set_defaults({})
+    assert config['semantic_cache'] == {'enabled': False, 'score_threshold': 0.95}
+    assert keys == ['semantic_cache']
+    assert SemanticCacheConfigManager.convert(config) is None
+
+    config = {'semantic_cache': {'enabled': True, 'score_threshold': 0.9}}
+    assert SemanticCacheConfigManager.convert(config).score_threshold == 0.9
+
+    with pytest.raises(ValueError):
+        SemanticCacheConfigManager.validate_and_set_defaults({'semantic_cache': {'enabled': True,
+                                                                                  'score_threshold': 1.5}})
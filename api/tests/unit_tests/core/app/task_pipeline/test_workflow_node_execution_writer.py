@@ -0,0 +1,153 @@
+import threading
+import time
+import uuid
+from datetime import datetime
+
+import pytest
+from flask import Flask
+from sqlalchemy.dialects import postgresql
+
+from core.app.entities.queue_entities import QueueNodeStartedEvent, QueueNodeSucceededEvent, QueueWorkflowSucceededEvent
+from core.app.entities.task_entities import WorkflowTaskState
+from core.app.task_pipeline.workflow_cycle_manage import WorkflowCycleManage
+from core.workflow.entities.base_node_data_entities import BaseNodeData
+from core.workflow.entities.node_entities import NodeType
+from extensions.ext_database import db
+from models.workflow import WorkflowNodeExecutionStatus, WorkflowRun
+
+COMMIT_LATENCY = 0.002
+
+
+class FakeSession:
+    """
+    Session with commit latency, recording rows written by upserts
+    """
+
+    def __init__(self, workflow_run: WorkflowRun):
+        self.workflow_run = workflow_run
+        self.commits = 0
+        self.rows = {}
+        self.objects = {}
+        self._lock = threading.Lock()
+
+    def add(self, obj):
+        if not obj.id:
+            obj.id = str(uuid.uuid4())
+            obj.created_at = datetime.now()
+        self.objects[obj.id] = obj
+        self.rows[obj.id] = {'status': obj.status}
+
+    def execute(self, stmt):
+        params = stmt.compile(dialect=postgresql.dialect()).params
+        with self._lock:
+            for key, value in params.items():
+                if key.startswith('id_m'):
+                    self.rows[value] = {'status': params[f'status_m{key[4:]}']}
+
+    def commit(self):
+        time.sleep(COMMIT_LATENCY)
+        with self._lock:
+            self.commits += 1
+
+    def query(self, model):
+        session = self
+
+        class Query:
+            def filter(self, condition):
+                self.id = condition.right.value
+                return self
+
+            def first(self):
+                if model is WorkflowRun:
+                    return session.workflow_run
+                return session.objects.get(self.id)
+
+        return Query()
+
+    def refresh(self, obj):
+        pass
+
+    def close(self):
+        pass
+
+    def remove(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+class FakePipeline(WorkflowCycleManage):
+    def __init__(self, workflow_run: WorkflowRun):
+        self._task_state = WorkflowTaskState(workflow_run_id=workflow_run.id, start_at=time.perf_counter())
+        self._task_state.ran_node_execution_infos = {}
+
+    def run(self, node_count: int) -> float:
+        """
+        Run nodes, return time to the first node started event
+        """
+        start_at = time.perf_counter()
+        time_to_first_event = None
+        for i in range(node_count):
+            node_data = BaseNodeData(title=f'node {i}')
+            self._handle_node_start(QueueNodeStartedEvent(
+                node_id=f'node-{i}', node_type=NodeType.CODE, node_data=node_data, node_run_index=i + 1
+            ))
+            if time_to_first_event is None:
+                time_to_first_event = time.perf_counter() - start_at
+            self._handle_node_finished(QueueNodeSucceededEvent(
+                node_id=f'node-{i}', node_type=NodeType.CODE, node_data=node_data, outputs={'result': i}
+            ))
+        self._handle_workflow_finished(QueueWorkflowSucceededEvent())
+        return time_to_first_event
+
+
+@pytest.fixture
+def session(monkeypatch):
+    workflow_run = WorkflowRun(id=str(uuid.uuid4()), tenant_id=str(uuid.uuid4()), app_id=str(uuid.uuid4()),
+                               workflow_id=str(uuid.uuid4()), created_by_role='account', created_by=str(uuid.uuid4()))
+    session = FakeSession(workflow_run)
+    monkeypatch.setattr(db, 'session', session)
+    return session
+
+
+def _pipeline(app: Flask, session: FakeSession, write_behind: bool) -> FakePipeline:
+    app.config['WORKFLOW_NODE_EXECUTION_WRITE_BEHIND_ENABLED'] = write_behind
+    pipeline = FakePipeline(session.workflow_run)
+    if write_behind:
+        from core.app.task_pipeline.workflow_node_execution_writer import WorkflowNodeExecutionWriter
+
+        pipeline._workflow_run = session.workflow_run
+        pipeline._node_execution_writer = WorkflowNodeExecutionWriter()
+    return pipeline
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config['WORKFLOW_NODE_EXECUTION_FLUSH_INTERVAL_MS'] = 50
+    with app.app_context():
+        yield app
+
+
+def test_node_executions_are_flushed_before_run_finished(app, session):
+    pipeline = _pipeline(app, session, write_behind=True)
+
+    pipeline.run(node_count=20)
+
+    assert len(session.rows) == 20
+    assert all(row['status'] == WorkflowNodeExecutionStatus.SUCCEEDED.value for row in session.rows.values())
+    # bulk flushes and the final run state instead of two commits per node
+    assert session.commits < 20
+    assert session.workflow_run.status == 'succeeded'
+
+
+@pytest.mark.parametrize('write_behind', [False, True], ids=['sync', 'write_behind'])
+def test_workflow_run_benchmark(app, session, benchmark, write_behind):
+    time_to_first_events = []
+
+    def run():
+        time_to_first_events.append(_pipeline(app, session, write_behind).run(node_count=60))
+
+    benchmark.pedantic(run, rounds=5)
+    benchmark.extra_info['time_to_first_event'] = min(time_to_first_events)
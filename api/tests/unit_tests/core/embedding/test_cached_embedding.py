@@ -0,0 +1,116 @@
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+from flask import Flask
+
+from core.embedding.cached_embedding import CacheEmbedding
+from extensions.ext_database import db
+from extensions.ext_redis import redis_client
+from libs import helper
+from models.dataset import Embedding
+
+
+class FakeEmbeddingStore:
+    """
+    In-memory embeddings table, answers `query(Embedding).filter(..., Embedding.hash.in_(...)).all()`
+    """
+
+    def __init__(self, embeddings: dict[str, list[float]]):
+        self.rows = {}
+        for hash, embedding in embeddings.items():
+            row = Embedding(model_name='model', hash=hash, provider_name='provider')
+            row.set_embedding(embedding)
+            self.rows[hash] = row
+        self.query_count = 0
+
+    def query(self, *args):
+        self.query_count += 1
+        query = MagicMock()
+
+        def filter(*criteria):
+            hashes = criteria[-1].right.value
+            query.all.return_value = [self.rows[hash] for hash in hashes if hash in self.rows]
+            return query
+
+        query.filter.side_effect = filter
+        return query
+
+
+def _model_instance(dimension: int = 4) -> MagicMock:
+    model_instance = MagicMock(provider='provider', model='model')
+    model_instance.model_type_instance.get_model_schema.return_value = None
+    model_instance.invoke_text_embedding.side_effect = lambda texts, user: MagicMock(
+        embeddings=[[float(len(text))] * dimension for text in texts]
+    )
+    return model_instance
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config['EMBEDDING_CACHE_LOOKUP_BATCH_SIZE'] = 1000
+    with app.app_context():
+        yield app
+
+
+def test_embed_documents_bulk_lookup(app, monkeypatch):
+    texts = [f'text {i}' for i in range(2500)]
+    store = FakeEmbeddingStore({helper.generate_text_hash(text): [1.0, 0.0, 0.0, 0.0] for text in texts[:2000]})
+    monkeypatch.setattr(db.session, 'query', store.query)
+    execute = MagicMock()
+    monkeypatch.setattr(db.session, 'execute', execute)
+    monkeypatch.setattr(db.session, 'commit', MagicMock())
+
+    model_instance = _model_instance()
+    embeddings = CacheEmbedding(model_instance).embed_documents(texts + texts[-1:])
+
+    # one lookup query per batch
+    assert store.query_count == 3
+    assert embeddings[0] == [1.0, 0.0, 0.0, 0.0]
+    assert embeddings[2499] == embeddings[2500] == [0.5, 0.5, 0.5, 0.5]
+    assert model_instance.invoke_text_embedding.call_count == 500
+
+    # misses are written back with a single insert
+    assert execute.call_count == 1
+    assert len(execute.call_args.args[0].compile().params) > 500
+
+
+def test_embed_documents_redis_tier(app, monkeypatch):
+    app.config['EMBEDDING_CACHE_REDIS_ENABLED'] = True
+    texts = ['redis hit', 'database hit', 'miss']
+    redis_data = {}
+
+    embedding = CacheEmbedding(_model_instance())
+    redis_data[embedding._embedding_cache_key(helper.generate_text_hash('redis hit'))] = \
+        np.array([0.0, 1.0, 0.0, 0.0], dtype='float').tobytes()
+
+    pipeline = MagicMock()
+    pipeline.setex.side_effect = lambda key, ttl, value: redis_data.__setitem__(key, value)
+    monkeypatch.setattr(redis_client, 'mget', lambda keys: [redis_data.get(key) for key in keys])
+    monkeypatch.setattr(redis_client, 'pipeline', MagicMock(return_value=pipeline))
+
+    store = FakeEmbeddingStore({helper.generate_text_hash('database hit'): [0.0, 0.0, 1.0, 0.0]})
+    monkeypatch.setattr(db.session, 'query', store.query)
+    monkeypatch.setattr(db.session, 'execute', MagicMock())
+    monkeypatch.setattr(db.session, 'commit', MagicMock())
+
+    embeddings = embedding.embed_documents(texts)
+
+    assert embeddings == [[0.0, 1.0, 0.0, 0.0], [0.0, 0.0, 1.0, 0.0], [0.5, 0.5, 0.5, 0.5]]
+    # database hit and newly embedded text are written through to redis
+    assert len(redis_data) == 3
+
+
+@pytest.mark.parametrize('text_count', [1000, 10000, 100000])
+def test_embed_documents_probe_benchmark(app, monkeypatch, benchmark, text_count):
+    texts = [f'text {i}' for i in range(text_count)]
+    store = FakeEmbeddingStore({helper.generate_text_hash(text): [1.0, 0.0, 0.0, 0.0] for text in texts})
+    monkeypatch.setattr(db.session, 'query', store.query)
+
+    model_instance = _model_instance()
+    embeddings = benchmark.pedantic(CacheEmbedding(model_instance).embed_documents, args=(texts,), rounds=3)
+
+    # batching of lookups is checked by test_embed_documents_bulk_lookup, rounds depend on --benchmark-disable
+    assert len(embeddings) == text_count
+    model_instance.invoke_text_embedding.assert_not_called()
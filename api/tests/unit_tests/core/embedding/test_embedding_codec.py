@@ -0,0 +1,67 @@
+import pickle
+
+import numpy as np
+import pytest
+
+from core.embedding.embedding_codec import EmbeddingCodec, EmbeddingStorageDtype
+from models.dataset import Embedding
+
+
+def _random_embeddings(count: int, dimension: int, seed: int = 0) -> np.ndarray:
+    vectors = np.random.default_rng(seed).standard_normal((count, dimension))
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+@pytest.mark.parametrize('dtype,tolerance', [
+    (EmbeddingStorageDtype.FLOAT32, 1e-7),
+    (EmbeddingStorageDtype.FLOAT16, 1e-3),
+    (EmbeddingStorageDtype.INT8, 1e-2),
+])
+def test_encode_decode(dtype, tolerance):
+    embedding = _random_embeddings(1, 1536)[0].tolist()
+    decoded = EmbeddingCodec.decode(EmbeddingCodec.encode(embedding, dtype))
+
+    assert len(decoded) == 1536
+    assert np.allclose(decoded, embedding, atol=tolerance)
+
+
+def test_decode_legacy_formats():
+    embedding = _random_embeddings(1, 8)[0].tolist()
+
+    assert EmbeddingCodec.decode(pickle.dumps(embedding, protocol=pickle.HIGHEST_PROTOCOL)) == embedding
+    assert EmbeddingCodec.decode(np.array(embedding).tobytes()) == embedding
+
+    row = Embedding(model_name='model', hash='hash', provider_name='provider')
+    row.embedding = pickle.dumps(embedding, protocol=pickle.HIGHEST_PROTOCOL)
+    assert row.get_embedding() == embedding
+
+    row.set_embedding(embedding)
+    assert EmbeddingCodec.is_encoded(row.embedding)
+    assert np.allclose(row.get_embedding(), embedding, atol=1e-7)
+
+
+def test_decode_unsupported_version():
+    data = bytearray(EmbeddingCodec.encode([1.0, 0.0]))
+    data[4] = EmbeddingCodec.VERSION + 1
+
+    with pytest.raises(ValueError):
+        EmbeddingCodec.decode(bytes(data))
+
+
+@pytest.mark.parametrize('dtype', list(EmbeddingStorageDtype))
+def test_storage_size_and_recall(dtype):
+    dimension, top_k = 1536, 10
+    corpus = _random_embeddings(2000, dimension, seed=1)
+    queries = _random_embeddings(20, dimension, seed=2)
+
+    legacy_size = len(pickle.dumps(corpus[0].tolist(), protocol=pickle.HIGHEST_PROTOCOL))
+    encoded = [EmbeddingCodec.encode(vector.tolist(), dtype) for vector in corpus]
+    decoded = np.array([EmbeddingCodec.decode(data) for data in encoded])
+
+    exact_top_k = np.argsort(-(queries @ corpus.T), axis=1)[:, :top_k]
+    approx_top_k = np.argsort(-(queries @ decoded.T), axis=1)[:, :top_k]
+    recall = np.mean([len(set(exact) & set(approx)) / top_k for exact, approx in zip(exact_top_k, approx_top_k)])
+
+    # pickled float64 lists take ~13.8 KB per 1536-d vector
+    assert len(encoded[0]) <= legacy_size / 2, f'{dtype.value}: {len(encoded[0])} bytes vs {legacy_size} bytes pickled'
+    assert recall >= 0.9, f'{dtype.value}: recall@{top_k} {recall:.3f}'
@@ -0,0 +1,103 @@
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+from flask import Flask
+
+from core.embedding.embedding_dispatcher import EmbeddingDispatcher, TokenBucket
+from core.model_runtime.errors.invoke import InvokeRateLimitError
+
+
+class FakeEmbeddingProvider:
+    """
+    Local embedding provider with fixed latency, records peak concurrency
+    """
+
+    def __init__(self, latency: float = 0.0, rate_limited_calls: int = 0):
+        self.latency = latency
+        self.rate_limited_calls = rate_limited_calls
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def invoke_text_embedding(self, texts: list[str], user=None):
+        with self._lock:
+            self.calls += 1
+            if self.calls <= self.rate_limited_calls:
+                raise InvokeRateLimitError('rate limited')
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+        time.sleep(self.latency)
+        with self._lock:
+            self.in_flight -= 1
+
+        return MagicMock(embeddings=[[float(text.split()[-1]), 1.0] for text in texts])
+
+
+def _model_instance(provider: FakeEmbeddingProvider, name: str) -> MagicMock:
+    model_instance = MagicMock(provider=name, model='model')
+    model_instance.invoke_text_embedding.side_effect = provider.invoke_text_embedding
+    return model_instance
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    with app.app_context():
+        yield app
+
+
+def test_embed_in_order_with_bounded_concurrency(app):
+    provider = FakeEmbeddingProvider(latency=0.02)
+    dispatcher = EmbeddingDispatcher(_model_instance(provider, 'ordered'), max_concurrency=3)
+
+    batches = [[f'text {i}', f'text {i + 1}'] for i in range(0, 40, 2)]
+    results = dispatcher.embed(batches)
+
+    assert [round(embedding[0] / embedding[1]) for batch in results for embedding in batch] == list(range(40))
+    assert provider.max_in_flight == 3
+
+
+def test_retry_on_rate_limit(app):
+    provider = FakeEmbeddingProvider(rate_limited_calls=2)
+    dispatcher = EmbeddingDispatcher(_model_instance(provider, 'rate-limited'), max_concurrency=1,
+                                     retry_base_delay=0.001)
+
+    assert len(dispatcher.embed([['text 1']])[0]) == 1
+    assert provider.calls == 3
+
+    provider = FakeEmbeddingProvider(rate_limited_calls=5)
+    dispatcher = EmbeddingDispatcher(_model_instance(provider, 'rate-limited'), max_concurrency=1,
+                                     max_retries=2, retry_base_delay=0.001)
+    with pytest.raises(InvokeRateLimitError):
+        dispatcher.embed([['text 1']])
+
+
+def test_provider_settings():
+    assert EmbeddingDispatcher._get_provider_setting('openai:8, cohere:2', 'cohere', 4) == 2
+    assert EmbeddingDispatcher._get_provider_setting('openai:8', 'cohere', 4) == 4
+    assert EmbeddingDispatcher._get_provider_setting(None, 'cohere', 4) == 4
+
+
+def test_token_bucket():
+    bucket = TokenBucket(tokens_per_minute=6000)
+    bucket.acquire(6000)
+
+    started_at = time.perf_counter()
+    bucket.acquire(10)
+    # 100 tokens refilled per second
+    assert 0.05 < time.perf_counter() - started_at < 0.5
+
+
+@pytest.mark.parametrize('max_concurrency', [1, 4, 16])
+def test_embed_throughput_benchmark(app, benchmark, max_concurrency):
+    provider = FakeEmbeddingProvider(latency=0.01)
+    dispatcher = EmbeddingDispatcher(_model_instance(provider, f'benchmark-{max_concurrency}'),
+                                     max_concurrency=max_concurrency)
+    batches = [[f'text {i}'] * 10 for i in range(32)]
+
+    results = benchmark.pedantic(dispatcher.embed, args=(batches,), rounds=3)
+    assert len(results) == 32
@@ -0,0 +1,68 @@
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+
+from core.memory import token_buffer_memory
+from core.memory.token_buffer_memory import TokenBufferMemory
+from core.model_runtime.entities.message_entities import PromptMessage
+
+
+def _count_tokens(model: str, credentials: dict, prompt_messages: list[PromptMessage]) -> int:
+    # one token per word and 3 tokens overhead per message
+    return sum(len(prompt_message.content.split()) + 3 for prompt_message in prompt_messages)
+
+
+@pytest.fixture
+def memory(monkeypatch):
+    messages = []
+    db = MagicMock()
+    db.session.query.return_value.filter.return_value.order_by.return_value.limit.side_effect = \
+        lambda limit: MagicMock(all=lambda: list(reversed(messages))[:limit])
+    monkeypatch.setattr(token_buffer_memory, 'db', db)
+
+    model_type_instance = MagicMock()
+    model_type_instance.get_num_tokens.side_effect = _count_tokens
+    provider_instance = MagicMock()
+    provider_instance.get_model_instance.return_value = model_type_instance
+    monkeypatch.setattr(token_buffer_memory.model_provider_factory, 'get_provider_instance',
+                        lambda provider: provider_instance)
+    monkeypatch.setattr(TokenBufferMemory, '_message_tokens_cache', token_buffer_memory.LRUCache(capacity=10000))
+
+    conversation = SimpleNamespace(id='conversation', mode='chat', app=SimpleNamespace(id='app', tenant_id='tenant'))
+    model_instance = SimpleNamespace(provider='openai', model='gpt-4', credentials={})
+    memory = TokenBufferMemory(conversation=conversation, model_instance=model_instance)
+    memory.messages = messages
+    memory.get_num_tokens = model_type_instance.get_num_tokens
+    return memory
+
+
+def _add_messages(memory: TokenBufferMemory, count: int) -> None:
+    for _ in range(count):
+        i = len(memory.messages)
+        memory.messages.append(SimpleNamespace(
+            id=f'message-{i}', query=f'question {i} ' * 10, answer=f'answer {i} ' * 40, message_files=[]
+        ))
+
+
+def test_history_is_pruned_by_cached_message_tokens(memory):
+    _add_messages(memory, 10)
+
+    # each message is 23 tokens of query and 83 tokens of answer
+    prompt_messages = memory.get_history_prompt_messages(max_token_limit=250, message_limit=10)
+    assert [prompt_message.content for prompt_message in prompt_messages] == [
+        'question 8 ' * 10, 'answer 8 ' * 40, 'question 9 ' * 10, 'answer 9 ' * 40
+    ]
+    assert memory.get_num_tokens.call_count == 20
+
+    # only messages of the new turn are counted
+    _add_messages(memory, 1)
+    memory.get_history_prompt_messages(max_token_limit=250, message_limit=10)
+    assert memory.get_num_tokens.call_count == 22
+
+
+@pytest.mark.parametrize('message_limit', [10, 50, 200])
+def test_long_conversation_pruning_benchmark(memory, benchmark, message_limit):
+    _add_messages(memory, 500)
+
+    benchmark(memory.get_history_prompt_messages, max_token_limit=2000, message_limit=message_limit)
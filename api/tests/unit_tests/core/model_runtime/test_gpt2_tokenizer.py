@@ -0,0 +1,53 @@
+from os.path import dirname, join
+
+import pytest
+
+from core.model_runtime.model_providers.__base.tokenizers import gpt2_tokenzier
+from core.model_runtime.model_providers.__base.tokenizers.gpt2_tokenzier import GPT2Tokenizer
+
+TEXTS = [
+    '',
+    'Hello world!  How are you?\n\n  Fine,   thanks',
+    "don't it's we'll 123456 3.1415",
+    '   leading spaces\tand tabs\r\n',
+    '中文分词测试，emoji 😀 and ünïcödé',
+    'end of text <|endoftext|> marker',
+    'long ' * 2000,
+]
+
+
+@pytest.fixture(scope='module')
+def transformers_tokenizer():
+    from transformers import GPT2Tokenizer as TransformerGPT2Tokenizer
+
+    return TransformerGPT2Tokenizer.from_pretrained(join(dirname(gpt2_tokenzier.__file__), 'gpt2'))
+
+
+def test_counts_match_transformers_tokenizer(transformers_tokenizer):
+    expected = [len(transformers_tokenizer.encode(text, verbose=False)) for text in TEXTS]
+
+    assert [GPT2Tokenizer.get_num_tokens(text) for text in TEXTS] == expected
+    assert GPT2Tokenizer.count_many(TEXTS) == expected
+    # served from cache
+    assert GPT2Tokenizer.count_many(TEXTS) == expected
+
+
+def _chunks(count: int) -> list[str]:
+    return [f'Segment {i} of the document, with some numbers {i * 7} and words to split. ' * 8 for i in range(count)]
+
+
+def test_count_many_benchmark(benchmark):
+    texts = _chunks(200)
+    gpt2_tokenzier._cache.cache.clear()
+
+    def count():
+        gpt2_tokenzier._cache.cache.clear()
+        return GPT2Tokenizer.count_many(texts)
+
+    benchmark(count)
+
+
+def test_transformers_tokenizer_benchmark(benchmark, transformers_tokenizer):
+    texts = _chunks(200)
+
+    benchmark(lambda: [len(transformers_tokenizer.encode(text, verbose=False)) for text in texts])
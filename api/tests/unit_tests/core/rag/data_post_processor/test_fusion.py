@@ -0,0 +1,102 @@
+import random
+
+import pytest
+
+from core.rag.data_post_processor.fusion import FusionRunner
+from core.rag.models.document import Document
+
+TOP_K = 5
+
+
+def _document(doc_id: str, score: float = None) -> Document:
+    metadata = {'doc_id': doc_id}
+    if score is not None:
+        metadata['score'] = score
+    return Document(page_content=doc_id, metadata=metadata)
+
+
+def test_rrf_dedups_and_ranks_by_agreement():
+    ranked_documents = {
+        'semantic_search': [_document('a', 0.9), _document('b', 0.8), _document('c', 0.7)],
+        'full_text_search': [_document('c', 0.3), _document('b', 0.2), _document('b', 0.2)],
+    }
+
+    documents = FusionRunner().run(ranked_documents)
+
+    assert [document.metadata['doc_id'] for document in documents] == ['c', 'b', 'a']
+    assert documents[0].metadata['score'] < 1
+    assert all(0 < document.metadata['score'] <= 1 for document in documents)
+
+
+def test_weighted_score_normalizes_scores_per_method():
+    ranked_documents = {
+        'semantic_search': [_document('a', 0.9), _document('b', 0.85), _document('c', 0.8)],
+        'full_text_search': [_document('c', 0.05), _document('a', 0.01)],
+    }
+
+    documents = FusionRunner({
+        'method': 'weighted_score',
+        'weights': {'semantic_search': 0.3, 'full_text_search': 0.7}
+    }).run(ranked_documents, top_n=2)
+
+    assert [document.metadata['doc_id'] for document in documents] == ['c', 'a']
+    assert documents[0].metadata['score'] == pytest.approx(0.7)
+
+
+def test_invalid_method():
+    with pytest.raises(ValueError):
+        FusionRunner({'method': 'borda'})
+
+
+def _fixture_corpus(query_count: int = 200, corpus_size: int = 1000, list_size: int = 20):
+    """
+    Queries with 5 relevant documents each, and two noisy ranked lists per query:
+    each method finds some relevant documents at random ranks, mixed with its own false positives.
+    """
+    rng = random.Random(42)
+    queries = []
+    for _ in range(query_count):
+        relevant = [f'doc-{i}' for i in rng.sample(range(corpus_size), 5)]
+        ranked_documents = {}
+        for method in ('semantic_search', 'full_text_search'):
+            found = [doc_id for doc_id in relevant if rng.random() < 0.7]
+            ranked = [f'doc-{i}' for i in rng.sample(range(corpus_size), list_size - len(found))]
+            for doc_id in found:
+                ranked.insert(rng.randrange(list_size // 2), doc_id)
+            ranked_documents[method] = [
+                _document(doc_id, 1 - rank / list_size) for rank, doc_id in enumerate(ranked)
+            ]
+        queries.append((set(relevant), ranked_documents))
+    return queries
+
+
+def _recall(queries, fuse) -> float:
+    hits = 0
+    for relevant, ranked_documents in queries:
+        doc_ids = [document.metadata['doc_id'] for document in fuse(ranked_documents)][:TOP_K]
+        hits += len(relevant & set(doc_ids))
+    return hits / (len(queries) * 5)
+
+
+def test_fusion_quality_on_fixture_corpus():
+    queries = _fixture_corpus()
+
+    concatenated = _recall(queries, lambda ranked: [d for documents in ranked.values() for d in documents])
+    semantic_only = _recall(queries, lambda ranked: ranked['semantic_search'])
+    rrf = _recall(queries, lambda ranked: FusionRunner().run(ranked, top_n=TOP_K))
+    weighted = _recall(queries, lambda ranked: FusionRunner({'method': 'weighted_score'}).run(ranked, top_n=TOP_K))
+
+    assert rrf > semantic_only >= concatenated
+    assert weighted > semantic_only
+
+
+@pytest.mark.parametrize('method', ['rrf', 'weighted_score'])
+def test_fusion_benchmark(benchmark, method):
+    queries = _fixture_corpus(query_count=50, list_size=100)
+    runner = FusionRunner({'method': method})
+
+    def fuse_all():
+        for _, ranked_documents in queries:
+            runner.run(ranked_documents, top_n=TOP_K)
+
+    benchmark(fuse_all)
@@ -0,0 +1,43 @@
+import random
+
+import pytest
+
+from core.rag.datasource.keyword.bm25 import BM25Scorer
+
+
+def test_rare_keywords_and_short_segments_score_higher():
+    scorer = BM25Scorer(segment_count=1000, avg_segment_length=5)
+
+    assert scorer.idf(1) > scorer.idf(100) > 0
+    assert scorer.score(10, segment_length=2) > scorer.score(10, segment_length=10)
+
+
+def test_top_k():
+    scorer = BM25Scorer(segment_count=100, avg_segment_length=3)
+    postings = [
+        ('common', 'node-1', 3),
+        ('common', 'node-2', 3),
+        ('common', 'node-3', 3),
+        ('rare', 'node-3', 3),
+    ]
+
+    top_k = scorer.top_k(postings, 2)
+
+    assert [node_id for node_id, _ in top_k] == ['node-3', 'node-1']
+    assert top_k[0][1] > top_k[1][1]
+
+
+@pytest.mark.parametrize('segment_count', [10000, 100000])
+def test_top_k_benchmark(benchmark, segment_count):
+    rng = random.Random(0)
+    keywords = [f'keyword-{i}' for i in range(3)]
+    # each query keyword matches about 1% of segments
+    postings = [
+        (keyword, f'node-{rng.randrange(segment_count)}', rng.randint(1, 10))
+        for keyword in keywords
+        for _ in range(segment_count // 100)
+    ]
+    scorer = BM25Scorer(segment_count=segment_count, avg_segment_length=5.5)
+
+    result = benchmark(scorer.top_k, postings, 10)
+    assert len(result) == 10
@@ -0,0 +1,36 @@
+from unittest.mock import MagicMock
+
+from core.rag.datasource.keyword.jieba import jieba
+from core.rag.datasource.keyword.jieba.jieba import Jieba
+from extensions.ext_database import db
+
+
+def test_retrieve_reads_segment_count_from_stats(monkeypatch):
+    handler = MagicMock()
+    handler.extract_keywords.return_value = {'apple'}
+    monkeypatch.setattr(jieba, 'JiebaKeywordTableHandler', MagicMock(return_value=handler))
+    query = MagicMock()
+    query.return_value.filter.return_value.scalar.return_value = 1000
+    monkeypatch.setattr(db.session, 'query', query)
+    keyword_table = {'apple': {'node-1', 'node-2'}, 'banana': {'node-3'}}
+
+    scored_chunk_indices = Jieba(MagicMock(id='dataset'))._retrieve_ids_by_query(keyword_table, 'apple', 4)
+
+    # idf of apple is computed from the stored segment count, not the table
+    assert {node_id for node_id, _ in scored_chunk_indices} == {'node-1', 'node-2'}
+    assert scored_chunk_indices[0][1] > jieba.BM25Scorer(3, avg_segment_length=1.0, b=0).idf(2)
+    query.assert_called_once_with(jieba.DatasetKeywordStats.segment_count)
+
+
+def test_save_keeps_stats(monkeypatch):
+    execute = MagicMock()
+    monkeypatch.setattr(db.session, 'execute', execute)
+    monkeypatch.setattr(db.session, 'commit', MagicMock())
+    dataset = MagicMock(id='dataset')
+    dataset.dataset_keyword_table.data_source_type = 'database'
+
+    Jieba(dataset)._save_dataset_keyword_table({'apple': {'node-1', 'node-2'}, 'banana': {'node-2'}})
+
+    params = execute.call_args.args[0].compile().params
+    assert params['segment_count'] == 2
+    assert params['total_segment_length'] == 3
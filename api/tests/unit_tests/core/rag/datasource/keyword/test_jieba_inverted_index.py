@@ -0,0 +1,78 @@
+from unittest.mock import MagicMock
+
+from core.rag.datasource.keyword.jieba_inverted_index import jieba_inverted_index
+from core.rag.datasource.keyword.jieba_inverted_index.jieba_inverted_index import JiebaInvertedIndex
+from core.rag.models.document import Document
+from extensions.ext_database import db
+
+
+def _index(monkeypatch, keywords: dict[str, list[str]]) -> JiebaInvertedIndex:
+    handler = MagicMock()
+    handler.extract_keywords.side_effect = lambda text, max_keywords=None: set(keywords[text])
+    monkeypatch.setattr(jieba_inverted_index, 'JiebaKeywordTableHandler', MagicMock(return_value=handler))
+    return JiebaInvertedIndex(MagicMock(id='dataset'))
+
+
+def test_add_texts_inserts_postings(monkeypatch):
+    index = _index(monkeypatch, {'apple banana': ['apple', 'banana']})
+    execute = MagicMock()
+    monkeypatch.setattr(db.session, 'execute', execute)
+    monkeypatch.setattr(db.session, 'query', MagicMock())
+    monkeypatch.setattr(index, '_get_stats', MagicMock(return_value=(0, 0)))
+    monkeypatch.setattr(index, '_delete_postings', MagicMock())
+    monkeypatch.setattr(db.session, 'commit', MagicMock())
+
+    index.add_texts(
+        [
+            Document(page_content='apple banana', metadata={'doc_id': 'node-1'}),
+            Document(page_content='ignored', metadata={'doc_id': 'node-2'}),
+        ],
+        keywords_list=[None, ['cherry', 'cherry']]
+    )
+
+    params = execute.call_args_list[0].args[0].compile().params
+    postings = sorted(
+        (params[f'keyword_m{i}'], params[f'index_node_id_m{i}'], params[f'segment_length_m{i}'])
+        for i in range(len(params) // 4)
+    )
+    assert postings == [('apple', 'node-1', 2), ('banana', 'node-1', 2), ('cherry', 'node-2', 1)]
+
+    # dataset stats are updated with the new segments
+    stats_params = execute.call_args_list[1].args[0].compile().params
+    assert stats_params['segment_count'] == 2
+    assert stats_params['total_segment_length'] == 3
+
+
+def test_search_ranks_by_bm25_and_loads_segments_once(monkeypatch):
+    index = _index(monkeypatch, {'apple banana': ['apple', 'banana']})
+    monkeypatch.setattr(index, '_get_stats', MagicMock(return_value=(100, 500)))
+
+    segments = {
+        node_id: MagicMock(index_node_id=node_id, content=f'content {node_id}', document_id='doc', dataset_id='dataset')
+        for node_id in ['node-1', 'node-2', 'node-3']
+    }
+    queries = []
+
+    def query(*entities):
+        queries.append(entities)
+        result = MagicMock()
+        if len(queries) == 1:
+            result.filter.return_value.all.return_value = [
+                ('apple', 'node-1', 5),
+                ('apple', 'node-2', 5),
+                ('apple', 'node-3', 5),
+                ('banana', 'node-2', 5),
+            ]
+        else:
+            result.filter.return_value.all.return_value = list(segments.values())
+        return result
+
+    monkeypatch.setattr(db.session, 'query', query)
+
+    documents = index.search('apple banana', top_k=2)
+
+    assert len(queries) == 2
+    assert [document.metadata['doc_id'] for document in documents][0] == 'node-2'
+    assert len(documents) == 2
+    assert documents[0].page_content == 'content node-2'
+    assert documents[0].metadata['score'] > documents[1].metadata['score'] > 0
@@ -0,0 +1,53 @@
+from unittest.mock import MagicMock
+
+import psycopg2.errors
+import pytest
+from sqlalchemy.exc import ProgrammingError
+
+from core.rag.datasource.vdb.pgvecto_rs import pgvecto_rs
+from core.rag.datasource.vdb.pgvecto_rs.pgvecto_rs import PGVectoRS, PgvectoRSConfig
+from core.rag.datasource.vdb.vector_client_registry import VectorClientRegistry
+
+VALID_CONFIG = {
+    'host': 'localhost',
+    'port': 5431,
+    'user': 'postgres',
+    'password': 'difyai123456',
+    'database': 'dify',
+}
+
+
+@pytest.fixture
+def session(monkeypatch) -> MagicMock:
+    session = MagicMock()
+    monkeypatch.setattr(PGVectoRS, '_create_engine', staticmethod(lambda url: MagicMock()))
+    monkeypatch.setattr(pgvecto_rs, 'Session', MagicMock(return_value=MagicMock(__enter__=lambda self: session)))
+    yield session
+    VectorClientRegistry.clear()
+
+
+def _vector() -> PGVectoRS:
+    return PGVectoRS('Vector_index_3f6a2f2e_Node', PgvectoRSConfig(**VALID_CONFIG), dim=3)
+
+
+def test_search_by_full_text(session):
+    session.execute.return_value.fetchall.return_value = [('hello world', {'doc_id': '1'}, 0.5)]
+
+    docs = _vector().search_by_full_text('hello')
+
+    assert [(doc.page_content, doc.metadata) for doc in docs] == [('hello world', {'doc_id': '1', 'score': 0.5})]
+    # same default as pgvector
+    assert session.execute.call_args.args[1]['top_k'] == 5
+
+
+def test_search_by_full_text_not_enabled(session):
+    session.execute.side_effect = ProgrammingError('SELECT', {}, psycopg2.errors.UndefinedColumn())
+
+    assert _vector().search_by_full_text('hello') == []
+
+
+def test_search_by_full_text_raises_other_errors(session):
+    session.execute.side_effect = ProgrammingError('SELECT', {}, psycopg2.errors.UndefinedTable())
+
+    with pytest.raises(ProgrammingError):
+        _vector().search_by_full_text('hello')
@@ -0,0 +1,212 @@
+import threading
+import time
+from contextlib import contextmanager
+from unittest.mock import MagicMock
+
+import psycopg2.pool
+import pytest
+from pydantic.error_wrappers import ValidationError
+
+from core.rag.datasource.vdb.pgvector.pgvector import BlockingConnectionPool, PGVector, PGVectorConfig, build_tsquery
+from core.rag.datasource.vdb.vector_client_registry import VectorClientRegistry
+
+VALID_CONFIG = {
+    'host': 'localhost',
+    'port': 5433,
+    'user': 'postgres',
+    'password': 'difyai123456',
+    'database': 'dify',
+}
+
+
+def _mock_vector(monkeypatch, rows=None, **config) -> tuple[PGVector, MagicMock]:
+    vector = PGVector('Vector_index_3f6a2f2e_0e0b_4c5b_9a2b_2f1c5b3d9e7a_Node',
+                      PGVectorConfig(**VALID_CONFIG, **config))
+    cur = MagicMock()
+    cur.__iter__.return_value = iter(rows or [])
+
+    @contextmanager
+    def get_cursor():
+        yield cur
+
+    monkeypatch.setattr(vector, '_get_cursor', get_cursor)
+    return vector, cur
+
+
+def test_index_type_validation():
+    with pytest.raises(ValidationError):
+        PGVectorConfig(**VALID_CONFIG, index_type='diskann')
+
+
+def test_index_name_within_identifier_limit(monkeypatch):
+    vector, _ = _mock_vector(monkeypatch)
+    assert len(vector.table_name) > 63
+    assert len(vector.index_name) <= 63
+
+
+def test_create_hnsw_index(monkeypatch):
+    vector, cur = _mock_vector(monkeypatch, hnsw_m=24, hnsw_ef_construction=128)
+    assert vector.create_index(rebuild=True)
+
+    drop_sql, create_sql = [call.args[0] for call in cur.execute.call_args_list]
+    assert drop_sql == f'DROP INDEX IF EXISTS {vector.index_name}'
+    assert 'USING hnsw (embedding vector_cosine_ops)' in create_sql
+    assert 'm = 24, ef_construction = 128' in create_sql
+
+
+def test_create_ivfflat_index(monkeypatch):
+    vector, cur = _mock_vector(monkeypatch, index_type='ivfflat', ivfflat_lists=1000)
+    assert vector.create_index()
+    assert 'USING ivfflat (embedding vector_cosine_ops) WITH (lists = 1000)' in cur.execute.call_args.args[0]
+
+    vector, cur = _mock_vector(monkeypatch, index_type='none')
+    assert not vector.create_index()
+    cur.execute.assert_not_called()
+
+
+def test_search_by_vector_pushes_params_into_sql(monkeypatch):
+    vector, cur = _mock_vector(monkeypatch, rows=[({'doc_id': '1'}, 'text', 0.25)], hnsw_ef_search=40)
+    docs = vector.search_by_vector([0.1, 0.2], top_k=100, score_threshold=0.6)
+
+    (set_sql, set_params), (search_sql, search_params) = [call.args for call in cur.execute.call_args_list]
+    assert set_sql == 'SET LOCAL hnsw.ef_search = %s'
+    assert set_params == (100,)
+    assert 'WHERE embedding <=> %s < %s' in search_sql
+    assert 'LIMIT 100' in search_sql
+    assert search_params[2] == pytest.approx(0.4)
+    assert docs[0].metadata['score'] == 0.75
+
+
+def test_search_by_vector_sets_ivfflat_probes(monkeypatch):
+    vector, cur = _mock_vector(monkeypatch, index_type='ivfflat', ivfflat_probes=10)
+    vector.search_by_vector([0.1, 0.2], top_k=4)
+
+    assert cur.execute.call_args_list[0].args == ('SET LOCAL ivfflat.probes = %s', (10,))
+    assert cur.execute.call_args_list[1].args[1][2] == 1.0
+
+
+def test_build_tsquery():
+    assert build_tsquery("What's the Dify API? dify api") == "'what' | 's' | 'the' | 'dify' | 'api'"
+    assert build_tsquery('?!') == ''
+
+
+def test_search_by_full_text_ranks_in_sql(monkeypatch):
+    vector, cur = _mock_vector(monkeypatch, rows=[({'doc_id': '1'}, 'text', 0.5)], text_search_config='english')
+    docs = vector.search_by_full_text('vector database', top_k=3)
+
+    sql, params = cur.execute.call_args.args
+    assert "ts_rank_cd(text_tsv, query, 32)" in sql
+    assert "to_tsquery('english', %s) query" in sql
+    assert 'WHERE text_tsv @@ query ORDER BY score DESC LIMIT 3' in sql
+    assert params == ("'vector' | 'database'",)
+    assert docs[0].metadata['score'] == 0.5
+
+
+def test_text_search_config_validation():
+    with pytest.raises(ValidationError):
+        PGVectorConfig(**VALID_CONFIG, text_search_config="english'); DROP TABLE users; --")
+
+
+def _pooled_vector(monkeypatch) -> tuple[PGVector, MagicMock, MagicMock]:
+    vector = PGVector('Vector_index_3f6a2f2e_0e0b_4c5b_9a2b_2f1c5b3d9e7a_Node', PGVectorConfig(**VALID_CONFIG))
+    pool = MagicMock()
+    conn = pool.getconn.return_value
+    conn.closed = 0
+    monkeypatch.setattr(PGVector, 'pool', pool)
+    return vector, pool, conn
+
+
+def test_connection_is_returned_on_any_error(monkeypatch):
+    vector, pool, conn = _pooled_vector(monkeypatch)
+
+    with pytest.raises(KeyError):
+        with vector._get_cursor():
+            raise KeyError('doc_id')
+
+    conn.rollback.assert_called_once()
+    conn.commit.assert_not_called()
+    pool.putconn.assert_called_once_with(conn, close=False)
+
+
+def test_broken_connection_is_discarded(monkeypatch):
+    vector, pool, conn = _pooled_vector(monkeypatch)
+    conn.rollback.side_effect = psycopg2.InterfaceError('connection already closed')
+
+    with pytest.raises(psycopg2.OperationalError):
+        with vector._get_cursor():
+            raise psycopg2.OperationalError('server closed the connection unexpectedly')
+
+    pool.putconn.assert_called_once_with(conn, close=True)
+
+
+def test_exhausted_pool_is_healthy():
+    pool = MagicMock(closed=False)
+    pool.getconn.side_effect = psycopg2.pool.PoolError('connection pool exhausted')
+
+    assert PGVector._check_connection_pool(pool)
+
+
+@pytest.fixture
+def fake_connect(monkeypatch):
+    connections = []
+
+    def connect(*args, **kwargs):
+        connections.append(MagicMock(closed=0))
+        return connections[-1]
+
+    monkeypatch.setattr(psycopg2.pool.psycopg2, 'connect', connect)
+    yield connections
+    VectorClientRegistry.clear()
+
+
+def test_pool_waits_for_connections(fake_connect):
+    vector = PGVector('Vector_index_3f6a2f2e_Node', PGVectorConfig(**VALID_CONFIG, max_connection=2))
+    lock = threading.Lock()
+    running = []
+    max_running = []
+    errors = []
+
+    def search():
+        try:
+            with vector._get_cursor():
+                with lock:
+                    running.append(1)
+                    max_running.append(len(running))
+                time.sleep(0.02)
+                with lock:
+                    running.pop()
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=search) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # more threads than connections wait for a connection instead of failing
+    assert errors == []
+    assert len(max_running) == 8
+    # at most max_connection connections are checked out at once
+    assert max(max_running) <= 2
+
+
+def test_pool_raises_after_timeout(fake_connect):
+    pool = BlockingConnectionPool(1, 1, timeout=0.05)
+    conn = pool.getconn()
+
+    with pytest.raises(psycopg2.pool.PoolError, match='exhausted'):
+        pool.getconn()
+
+    pool.putconn(conn)
+    assert pool.getconn() is conn
+
+
+def test_busy_pool_health_check_takes_no_connection(fake_connect):
+    pool = BlockingConnectionPool(1, 1)
+    conn = pool.getconn()
+    pool.getconn = MagicMock()
+
+    assert PGVector._check_connection_pool(pool)
+    pool.getconn.assert_not_called()
+    pool.putconn(conn)
@@ -0,0 +1,104 @@
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+
+from core.rag.datasource.vdb.vector_client_registry import VectorClientRegistry
+
+
+@pytest.fixture(autouse=True)
+def registry(monkeypatch):
+    VectorClientRegistry.clear()
+    yield VectorClientRegistry
+    VectorClientRegistry.clear()
+
+
+def test_clients_are_shared_per_config():
+    factory = MagicMock(side_effect=lambda: object())
+
+    client = VectorClientRegistry.get('pgvector', ('host-1',), factory)
+    assert VectorClientRegistry.get('pgvector', ('host-1',), factory) is client
+    assert VectorClientRegistry.get('pgvector', ('host-2',), factory) is not client
+    assert VectorClientRegistry.get('qdrant', ('host-1',), factory) is not client
+    assert factory.call_count == 3
+
+
+def test_concurrent_get_creates_one_client():
+    factory = MagicMock(side_effect=lambda: object())
+    clients = []
+
+    def get():
+        clients.append(VectorClientRegistry.get('pgvector', ('host',), factory))
+
+    threads = [threading.Thread(target=get) for _ in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert factory.call_count == 1
+    assert len({id(client) for client in clients}) == 1
+
+
+def test_slow_connect_does_not_block_other_clients():
+    connecting = threading.Event()
+    release = threading.Event()
+
+    def slow_factory():
+        connecting.set()
+        release.wait(5)
+        return object()
+
+    thread = threading.Thread(target=lambda: VectorClientRegistry.get('milvus', ('host-1',), slow_factory))
+    thread.start()
+    try:
+        assert connecting.wait(5)
+        other = threading.Thread(target=lambda: VectorClientRegistry.get('pgvector', ('host-2',), object))
+        other.start()
+        other.join(1)
+        # lookups of other keys complete while the slow client is still connecting
+        assert not other.is_alive()
+    finally:
+        release.set()
+        thread.join()
+
+
+def test_unhealthy_client_is_replaced(monkeypatch):
+    monkeypatch.setattr(VectorClientRegistry, 'health_check_interval', 0)
+    close = MagicMock()
+    health_check = MagicMock(return_value=True)
+
+    client = VectorClientRegistry.get('pgvector', ('host',), object, health_check=health_check, close=close)
+    assert VectorClientRegistry.get('pgvector', ('host',), object, health_check=health_check, close=close) is client
+
+    health_check.return_value = False
+    new_client = VectorClientRegistry.get('pgvector', ('host',), object, health_check=health_check, close=close)
+    assert new_client is not client
+    close.assert_called_once_with(client)
+
+
+def test_idle_client_is_evicted(monkeypatch):
+    close = MagicMock()
+    client = VectorClientRegistry.get('pgvector', ('host',), object, close=close)
+
+    monkeypatch.setattr(VectorClientRegistry, 'idle_timeout', 0)
+    VectorClientRegistry.get('qdrant', ('host',), object)
+
+    close.assert_called_once_with(client)
+
+
+def test_client_in_use_is_closed_once_released(monkeypatch):
+    monkeypatch.setattr(VectorClientRegistry, 'health_check_interval', 0)
+    close = MagicMock()
+    in_use = MagicMock(return_value=True)
+    health_check = MagicMock(return_value=False)
+
+    client = VectorClientRegistry.get('pgvector', ('host',), object, health_check=health_check, close=close,
+                                      in_use=in_use)
+    VectorClientRegistry.get('pgvector', ('host',), object, health_check=health_check, close=close,
+                             in_use=in_use)
+    close.assert_not_called()
+
+    in_use.return_value = False
+    VectorClientRegistry.get('qdrant', ('host',), object)
+    close.assert_called_once_with(client)
@@ -0,0 +1,115 @@
+from functools import partial
+
+import pytest
+from flask import Flask
+
+from core.rag.extractor.entity.extract_setting import ExtractSetting
+from core.rag.extractor.extract_processor import ExtractProcessor
+from core.rag.extractor.extractor_base import BaseExtractor
+from core.rag.extractor.text_extractor import TextExtractor
+from core.rag.models.document import Document
+from extensions.ext_storage import storage
+from models.model import UploadFile
+
+
+class FakeStorage:
+    def __init__(self, files: dict):
+        self.files = files
+        self.downloads = 0
+
+    def load(self, filename: str) -> bytes:
+        if filename not in self.files:
+            raise FileNotFoundError("File not found")
+        return self.files[filename]
+
+    def save(self, filename: str, data: bytes):
+        self.files[filename] = data
+
+    def download(self, filename: str, target_filepath: str):
+        self.downloads += 1
+        with open(target_filepath, 'wb') as f:
+            f.write(self.load(filename))
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config.update(ETL_TYPE='dify', UNSTRUCTURED_API_URL='', UNSTRUCTURED_API_KEY='', EXTRACT_CACHE_ENABLED=True)
+    with app.app_context():
+        yield app
+
+
+@pytest.fixture
+def fake_storage(monkeypatch):
+    fake_storage = FakeStorage({'upload_files/tenant-id/file.txt': b'hello world'})
+    for name in ['load', 'save', 'download']:
+        monkeypatch.setattr(storage, name, getattr(fake_storage, name))
+    return fake_storage
+
+
+def _extract(file_hash: str = 'file-hash'):
+    upload_file = UploadFile(tenant_id='tenant-id', key='upload_files/tenant-id/file.txt', hash=file_hash)
+    extract_setting = ExtractSetting(datasource_type='upload_file', upload_file=upload_file, document_model='text_model')
+    return ExtractProcessor.extract(extract_setting)
+
+
+def test_extract_is_cached_by_file_hash(app, fake_storage):
+    documents = _extract()
+    assert documents[0].page_content == 'hello world'
+    assert 'extract_cache/tenant-id/file-hash/TextExtractor.1.json' in fake_storage.files
+
+    cached_documents = _extract()
+    assert cached_documents == documents
+    assert fake_storage.downloads == 1
+
+    _extract(file_hash='changed-file-hash')
+    assert fake_storage.downloads == 2
+
+
+def test_extract_cache_is_invalidated_by_extractor_version(app, fake_storage, monkeypatch):
+    _extract()
+    monkeypatch.setattr(TextExtractor, 'version', '2')
+    _extract()
+    assert fake_storage.downloads == 2
+
+
+def test_extract_without_cache(app, fake_storage):
+    _extract(file_hash=None)
+    _extract(file_hash=None)
+    assert fake_storage.downloads == 2
+
+    app.config['EXTRACT_CACHE_ENABLED'] = False
+    _extract()
+    _extract()
+    assert fake_storage.downloads == 4
+    assert not any(key.startswith('extract_cache/') for key in fake_storage.files)
+
+
+class FakePagesExtractor(BaseExtractor):
+    def __init__(self, file_path: str, page_count: int):
+        self._page_count = page_count
+
+    def extract(self):
+        return list(self.extract_iter())
+
+    def extract_iter(self):
+        for page_number in range(self._page_count):
+            yield Document(page_content='x' * 100, metadata={'page': page_number})
+
+
+def test_large_extraction_is_streamed_without_cache(app, fake_storage, monkeypatch):
+    app.config['EXTRACT_CACHE_MAX_BYTES'] = 1000
+    monkeypatch.setattr(ExtractProcessor, '_get_extractor_factory',
+                        classmethod(lambda cls, *args: partial(FakePagesExtractor, page_count=2000)))
+    upload_file = UploadFile(tenant_id='tenant-id', key='upload_files/tenant-id/file.txt', hash='file-hash')
+    extract_setting = ExtractSetting(datasource_type='upload_file', upload_file=upload_file, document_model='text_model')
+
+    documents = ExtractProcessor.extract_iter(extract_setting)
+    pages = 0
+    for _ in documents:
+        pages += 1
+        # pages are not kept once the text exceeds the max bytes of cached files
+        assert len(documents.gi_frame.f_locals['documents']) <= 10
+
+    assert pages == 2000
+    assert not any(key.startswith('extract_cache/') for key in fake_storage.files)
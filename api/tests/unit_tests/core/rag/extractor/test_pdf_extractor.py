@@ -0,0 +1,71 @@
+import os
+
+import pytest
+
+from core.rag.extractor import pdf_extractor
+from core.rag.extractor.pdf_extractor import PdfExtractor
+
+
+def _write_pdf(path, page_count: int):
+    """
+    Write pdf with one line of text per page
+    """
+    objects = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        b'<< /Type /Pages /Kids [' + b' '.join(f'{4 + i * 2} 0 R'.encode() for i in range(page_count))
+        + b'] /Count ' + str(page_count).encode() + b' >>',
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>',
+    ]
+    for i in range(page_count):
+        content = f'BT /F1 12 Tf 72 720 Td (page {i}) Tj ET'.encode()
+        objects.append(f'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents {5 + i * 2} 0 R '
+                       f'/Resources << /Font << /F1 3 0 R >> >> >>'.encode())
+        objects.append(b'<< /Length ' + str(len(content)).encode() + b' >>\nstream\n' + content + b'\nendstream')
+
+    data = b'%PDF-1.4\n'
+    offsets = []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(len(data))
+        data += f'{number} 0 obj\n'.encode() + obj + b'\nendobj\n'
+    xref = len(data)
+    data += f'xref\n0 {len(objects) + 1}\n0000000000 65535 f \n'.encode()
+    data += b''.join(f'{offset:010d} 00000 n \n'.encode() for offset in offsets)
+    data += f'trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n'.encode()
+    path.write_bytes(data)
+
+
+@pytest.mark.parametrize('max_workers', [1, 2])
+def test_extract_pages_in_order(tmp_path, monkeypatch, max_workers):
+    monkeypatch.setattr(os, 'cpu_count', lambda: 2)
+    file_path = tmp_path / 'file.pdf'
+    _write_pdf(file_path, 25)
+
+    documents = list(PdfExtractor(str(file_path), max_workers=max_workers, batch_pages=4).extract_iter())
+
+    assert [document.metadata['page'] for document in documents] == list(range(25))
+    assert [document.page_content.strip() for document in documents] == [f'page {i}' for i in range(25)]
+
+
+def test_extract_iter_stops_early(tmp_path, monkeypatch):
+    monkeypatch.setattr(os, 'cpu_count', lambda: 2)
+    file_path = tmp_path / 'file.pdf'
+    _write_pdf(file_path, 50)
+
+    documents = PdfExtractor(str(file_path), max_workers=2, batch_pages=4).extract_iter()
+    first_document = next(documents)
+    documents.close()
+
+    assert first_document.page_content.strip() == 'page 0'
+
+
+def test_process_pool_is_shared(tmp_path, monkeypatch):
+    monkeypatch.setattr(os, 'cpu_count', lambda: 2)
+    file_path = tmp_path / 'file.pdf'
+    _write_pdf(file_path, 10)
+
+    list(PdfExtractor(str(file_path), max_workers=2, batch_pages=4).extract_iter())
+    executor = pdf_extractor._executor
+    list(PdfExtractor(str(file_path), max_workers=2, batch_pages=4).extract_iter())
+
+    assert executor is not None
+    assert pdf_extractor._executor is executor
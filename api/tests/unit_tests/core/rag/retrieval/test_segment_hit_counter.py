@@ -0,0 +1,105 @@
+from collections import defaultdict
+from unittest.mock import MagicMock
+
+import pytest
+from redis.exceptions import ResponseError
+from sqlalchemy.exc import OperationalError
+
+from core.rag.models.document import Document
+from core.rag.retrieval import segment_hit_counter
+from core.rag.retrieval.segment_hit_counter import SegmentHitCounter
+
+
+class FakeRedis:
+    def __init__(self):
+        self.hashes = {}
+
+    def pipeline(self):
+        return self
+
+    def execute(self):
+        pass
+
+    def hincrby(self, key, field, amount):
+        fields = self.hashes.setdefault(key, defaultdict(int))
+        fields[field if isinstance(field, bytes) else field.encode()] += amount
+
+    def rename(self, src, dst):
+        if src not in self.hashes:
+            raise ResponseError('no such key')
+        self.hashes[dst] = self.hashes.pop(src)
+
+    def hgetall(self, key):
+        return {field: str(value).encode() for field, value in self.hashes.get(key, {}).items()}
+
+    def delete(self, key):
+        self.hashes.pop(key, None)
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    redis = FakeRedis()
+    monkeypatch.setattr(segment_hit_counter, 'redis_client', redis)
+    monkeypatch.setattr(segment_hit_counter, 'db', MagicMock())
+    return redis
+
+
+def _documents(*doc_ids: str) -> list[Document]:
+    return [Document(page_content=doc_id, metadata={'doc_id': doc_id, 'dataset_id': 'dataset'}) for doc_id in doc_ids]
+
+
+def test_hits_are_coalesced_and_flushed_by_increment(redis, monkeypatch):
+    updates = []
+    monkeypatch.setattr(SegmentHitCounter, '_add_hit_count',
+                        staticmethod(lambda segments, increment: updates.append((sorted(segments), increment))))
+
+    SegmentHitCounter.incr(_documents('a', 'b'))
+    SegmentHitCounter.incr(_documents('a', 'c'))
+    SegmentHitCounter.incr([Document(page_content='d', metadata={'doc_id': 'd'})])
+
+    assert SegmentHitCounter.flush(batch_size=1) == 4
+    assert sorted(updates) == [
+        ([('', 'd')], 1),
+        ([('dataset', 'a')], 2),
+        ([('dataset', 'b')], 1),
+        ([('dataset', 'c')], 1),
+    ]
+    assert redis.hashes == {}
+    # nothing pending
+    assert SegmentHitCounter.flush() == 0
+
+
+def test_failed_flush_keeps_hits_pending(redis, monkeypatch):
+    def add_hit_count(segments, increment):
+        raise OperationalError('UPDATE document_segments', {}, Exception('database unavailable'))
+
+    monkeypatch.setattr(SegmentHitCounter, '_add_hit_count', staticmethod(add_hit_count))
+    SegmentHitCounter.incr(_documents('a', 'a'))
+
+    with pytest.raises(OperationalError, match='database unavailable'):
+        SegmentHitCounter.flush()
+
+    assert list(redis.hashes) == [SegmentHitCounter.pending_key]
+    assert redis.hgetall(SegmentHitCounter.pending_key) == {b'dataset:a': b'2'}
+
+
+def test_failed_flush_keeps_only_uncommitted_hits_pending(redis, monkeypatch):
+    updates = []
+
+    def add_hit_count(segments, increment):
+        if updates:
+            raise OperationalError('UPDATE document_segments', {}, Exception('database unavailable'))
+        updates.append(segments)
+
+    monkeypatch.setattr(SegmentHitCounter, '_add_hit_count', staticmethod(add_hit_count))
+    SegmentHitCounter.incr(_documents('a', 'b', 'c'))
+
+    with pytest.raises(OperationalError):
+        SegmentHitCounter.flush(batch_size=2)
+
+    # the first batch is committed, only hits of the failed batch are flushed again
+    committed = {f'{dataset_id}:{index_node_id}'.encode() for dataset_id, index_node_id in updates[0]}
+    assert len(committed) == 2
+    assert redis.hgetall(SegmentHitCounter.pending_key) == {
+        field: b'1' for field in [b'dataset:a', b'dataset:b', b'dataset:c'] if field not in committed
+    }
@@ -0,0 +1,101 @@
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+from flask import Flask
+
+from core.rag.models.document import Document
+from core.rerank import rerank_cache
+from core.rerank.rerank import RerankRunner
+from core.rerank.rerank_cache import RerankCache, _MemoryLRU
+
+
+@pytest.fixture
+def app(monkeypatch):
+    app = Flask(__name__)
+    app.config['RERANK_CACHE_ENABLED'] = True
+    app.config['RERANK_CACHE_MAX_MEMORY_MB'] = 1
+
+    redis_store = {}
+    monkeypatch.setattr(rerank_cache.redis_client, 'get', lambda key: redis_store.get(key))
+    monkeypatch.setattr(rerank_cache.redis_client, 'setex',
+                        lambda key, ttl, value: redis_store.__setitem__(key, value.encode()))
+    monkeypatch.setattr(RerankCache, '_memory_cache', None)
+    with app.app_context():
+        yield app
+
+
+def _documents(*contents: str) -> list[Document]:
+    return [
+        Document(page_content=content, metadata={
+            'doc_id': f'doc-{i}', 'doc_hash': f'hash-{content}', 'document_id': 'document', 'dataset_id': 'dataset'
+        })
+        for i, content in enumerate(contents)
+    ]
+
+
+def _model_instance() -> MagicMock:
+    def invoke_rerank(query, docs, score_threshold, top_n, user):
+        # longer texts score higher
+        results = sorted(
+            (SimpleNamespace(index=i, text=text, score=len(text) / 10) for i, text in enumerate(docs)),
+            key=lambda result: result.score, reverse=True
+        )
+        return SimpleNamespace(docs=results[:top_n])
+
+    model_instance = MagicMock(provider='cohere', model='rerank-english-v2.0')
+    model_instance.invoke_rerank.side_effect = invoke_rerank
+    return model_instance
+
+
+def test_repeated_rerank_is_served_from_cache(app):
+    model_instance = _model_instance()
+    runner = RerankRunner(model_instance)
+
+    first = runner.run('How to reset  password?', _documents('a', 'ccc', 'bb'), top_n=2)
+    # candidates in another order with a differently formatted query hit the same entry
+    second = runner.run('how to reset password?', _documents('bb', 'a', 'ccc'), top_n=2)
+
+    assert model_instance.invoke_rerank.call_count == 1
+    assert [(doc.page_content, doc.metadata['score']) for doc in first] == [('ccc', 0.3), ('bb', 0.2)]
+    assert [(doc.page_content, doc.metadata['score']) for doc in second] == [('ccc', 0.3), ('bb', 0.2)]
+    assert second[0].metadata['doc_id'] == 'doc-2'
+
+
+def test_changed_candidates_miss(app):
+    model_instance = _model_instance()
+    runner = RerankRunner(model_instance)
+
+    runner.run('query', _documents('a', 'bb'), top_n=2)
+    # edited segment, different top_n and different threshold all miss
+    runner.run('query', _documents('a', 'bbb'), top_n=2)
+    runner.run('query', _documents('a', 'bb'), top_n=1)
+    runner.run('query', _documents('a', 'bb'), score_threshold=0.5, top_n=2)
+
+    assert model_instance.invoke_rerank.call_count == 4
+
+
+def test_redis_tier_refills_memory(app):
+    model_instance = _model_instance()
+    RerankRunner(model_instance).run('query', _documents('a', 'bb'), top_n=2)
+    RerankCache._memory_cache.clear()
+
+    RerankRunner(model_instance).run('query', _documents('a', 'bb'), top_n=2)
+
+    assert model_instance.invoke_rerank.call_count == 1
+    assert RerankCache._memory_cache.size > 0
+
+
+def test_memory_lru_is_bounded_by_size():
+    lru = _MemoryLRU(max_bytes=20)
+    lru.set('a', '12345678')
+    lru.set('b', '12345678')
+    lru.get('a')
+    lru.set('c', '12345678')
+
+    assert lru.get('b') is None
+    assert lru.get('a') == '12345678'
+    assert lru.size <= 20
+
+    lru.set('d', 'x' * 100)
+    assert lru.get('d') is None
@@ -0,0 +1,82 @@
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+from flask import Flask
+
+from core.indexing_pipeline import IndexingPipeline, PipelineStage
+from extensions.ext_database import db
+
+
+@pytest.fixture
+def app(monkeypatch):
+    monkeypatch.setattr(db, 'session', MagicMock())
+    app = Flask(__name__)
+    with app.app_context():
+        yield app
+
+
+def test_items_flow_through_stages(app):
+    results = []
+    lock = threading.Lock()
+
+    def split(item):
+        yield from [item * 10 + i for i in range(3)]
+
+    def collect(item):
+        with lock:
+            results.append(item)
+
+    pipeline = IndexingPipeline(app, [
+        PipelineStage('split', split, workers=2),
+        PipelineStage('square', lambda item: [item * item], workers=3),
+        PipelineStage('collect', collect),
+    ], queue_size=2)
+    pipeline.run(range(20))
+
+    assert sorted(results) == sorted((item * 10 + i) ** 2 for item in range(20) for i in range(3))
+    assert pipeline.stats['split']['items'] == 20
+    assert pipeline.stats['square']['items'] == 60
+    assert pipeline.stats['collect']['items'] == 60
+    assert all(stats['max_queue_size'] <= 2 for stats in pipeline.stats.values())
+
+
+def test_slow_stage_holds_back_earlier_stages(app):
+    produced = []
+
+    def produce(item):
+        for i in range(100):
+            produced.append(i)
+            yield i
+
+    pipeline = IndexingPipeline(app, [
+        PipelineStage('produce', produce),
+        PipelineStage('consume', lambda item: time.sleep(0.001)),
+    ], queue_size=4)
+
+    thread = threading.Thread(target=pipeline.run, args=([None],))
+    thread.start()
+    time.sleep(0.02)
+    # items in flight are bounded by the queue while the consumer is slow
+    assert len(produced) < 100
+    thread.join()
+    assert len(produced) == 100
+
+
+def test_error_stops_pipeline(app):
+    processed = []
+
+    def fail(item):
+        if item == 5:
+            raise ValueError('failed item')
+        return [item]
+
+    pipeline = IndexingPipeline(app, [
+        PipelineStage('fail', fail, workers=2),
+        PipelineStage('process', lambda item: processed.append(item)),
+    ], queue_size=1)
+
+    with pytest.raises(ValueError, match='failed item'):
+        pipeline.run(range(1000))
+    assert len(processed) < 1000
@@ -0,0 +1,229 @@
+import threading
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+from flask import Flask
+
+from core.indexing_runner import DocumentIndexingState, DocumentIsPausedException, IndexingRunner
+from core.rag.models.document import Document
+from extensions.ext_database import db
+
+DB_LATENCY = 0.0001
+EMBEDDING_LATENCY = 0.0005
+VECTOR_LATENCY = 0.0001
+
+
+class FakeIndexProcessor:
+    """
+    Pages of paragraphs, split into one segment per paragraph
+    """
+
+    def __init__(self, runner: 'FakeIndexingRunner'):
+        self.runner = runner
+
+    def extract_iter(self, extract_setting, **kwargs):
+        for page in range(self.runner.pages_per_document):
+            if extract_setting.id in self.runner.failing_document_ids and page == 1:
+                raise ValueError('failed to parse page')
+            yield Document(page_content='\n\n'.join(f'page {page} paragraph {i} ' * 20 for i in range(3)),
+                           metadata={'page': page})
+
+    def transform(self, documents: list[Document], **kwargs) -> list[Document]:
+        nodes = []
+        for document in documents:
+            for paragraph in document.page_content.split('\n\n'):
+                metadata = dict(document.metadata, doc_id=str(uuid.uuid4()), doc_hash='hash')
+                nodes.append(Document(page_content=paragraph.strip(), metadata=metadata))
+        return nodes
+
+
+class FakeEmbeddingModel:
+    def get_num_tokens(self, model, credentials, texts: list[str]) -> int:
+        return sum(len(text.split()) for text in texts)
+
+
+class FakeVector:
+    def __init__(self, runner: 'FakeIndexingRunner'):
+        self.runner = runner
+
+    def embed_documents(self, documents: list[Document]) -> list[list[float]]:
+        time.sleep(EMBEDDING_LATENCY)
+        return [[0.0] * 4 for _ in documents]
+
+    def create_with_embeddings(self, documents: list[Document], embeddings: list[list[float]]):
+        time.sleep(VECTOR_LATENCY)
+        with self.runner.lock:
+            self.runner.vector_count += len(documents)
+
+
+class FakeDocStore:
+    def __init__(self, runner: 'FakeIndexingRunner', document_id: str):
+        self.runner = runner
+        self.document_id = document_id
+
+    def add_documents(self, documents: list[Document]):
+        time.sleep(DB_LATENCY)
+        with self.runner.lock:
+            self.runner.segments[self.document_id].extend(documents)
+
+
+class FakeIndexingRunner(IndexingRunner):
+    """
+    Indexing runner with fake extraction, database, embedding and vector store
+    """
+
+    def __init__(self, pages_per_document: int = 2):
+        super().__init__()
+        self.pages_per_document = pages_per_document
+        self.failing_document_ids = set()
+        self.paused_document_ids = set()
+        self.lock = threading.Lock()
+        self.statuses = defaultdict(list)
+        self.updates = defaultdict(dict)
+        self.errors = {}
+        self.segments = defaultdict(list)
+        self.keyword_count = 0
+        self.vector_count = 0
+
+    def _prepare_pipeline_document(self, state: DocumentIndexingState):
+        time.sleep(DB_LATENCY)
+        state.dataset = SimpleNamespace(id='dataset-id', tenant_id='tenant-id')
+        state.process_rule = {'mode': 'custom'}
+        state.index_processor = FakeIndexProcessor(self)
+        state.embedding_model_instance = SimpleNamespace(model='fake', credentials={},
+                                                         model_type_instance=FakeEmbeddingModel())
+        state.vector = FakeVector(self)
+        state.doc_store = FakeDocStore(self, state.document_id)
+        return SimpleNamespace(id=state.document_id, data_source_type='upload_file')
+
+    def _get_extract_setting(self, dataset_document):
+        return dataset_document
+
+    def _update_document_index_status(self, document_id, after_indexing_status, extra_update_params=None):
+        time.sleep(DB_LATENCY)
+        with self.lock:
+            if after_indexing_status:
+                self.statuses[document_id].append(after_indexing_status)
+            self.updates[document_id].update({
+                column.key: value for column, value in (extra_update_params or {}).items()
+            })
+
+    def _update_pipeline_segments(self, document_id, documents, update_params):
+        time.sleep(DB_LATENCY)
+
+    def _check_document_paused_status(self, document_id: str):
+        if document_id in self.paused_document_ids:
+            raise DocumentIsPausedException()
+
+    def _create_pipeline_keyword_index(self, state, documents):
+        time.sleep(DB_LATENCY)
+        with self.lock:
+            self.keyword_count += len(documents)
+
+    def _update_document_error(self, document_id: str, error: str):
+        self.errors[document_id] = error
+
+
+@pytest.fixture
+def app(monkeypatch):
+    monkeypatch.setattr(db, 'session', MagicMock())
+    app = Flask(__name__)
+    app.config['INDEXING_PIPELINE_ENABLED'] = True
+    with app.app_context():
+        yield app
+
+
+def _documents(count: int) -> list:
+    return [SimpleNamespace(id=f'document-{i}') for i in range(count)]
+
+
+def test_pipeline_indexes_documents(app):
+    runner = FakeIndexingRunner(pages_per_document=25)
+    documents = _documents(20)
+
+    runner.run(documents)
+
+    for document in documents:
+        assert runner.statuses[document.id] == ['splitting', 'indexing', 'completed']
+        # segments are saved in page order
+        pages = [segment.metadata['page'] for segment in runner.segments[document.id]]
+        assert pages == sorted(pages) and len(pages) == 25 * 3
+        assert runner.updates[document.id]['word_count'] > 0
+        assert runner.updates[document.id]['tokens'] == 25 * 3 * 20 * 4
+    assert runner.vector_count == runner.keyword_count == 20 * 25 * 3
+
+
+def test_failed_document_does_not_stop_others(app):
+    runner = FakeIndexingRunner()
+    documents = _documents(5)
+    runner.failing_document_ids.add('document-2')
+
+    runner.run(documents)
+
+    assert runner.errors == {'document-2': 'failed to parse page'}
+    assert 'completed' not in runner.statuses['document-2']
+    assert all(runner.statuses[document.id][-1] == 'completed' for document in documents if document.id != 'document-2')
+
+
+def test_paused_document_stops_run(app):
+    runner = FakeIndexingRunner()
+    runner.paused_document_ids.add('document-0')
+
+    with pytest.raises(DocumentIsPausedException, match='document-0'):
+        runner.run(_documents(50))
+    assert 'completed' not in runner.statuses['document-0']
+
+
+BENCHMARK_DOCUMENTS = 10000
+
+
+def _run_with_barriers(runner: FakeIndexingRunner, documents: list):
+    # extract, transform, save segments and load of each document in turn, as the indexing runner without pipeline
+    for document in documents:
+        state = DocumentIndexingState(document.id)
+        dataset_document = runner._prepare_pipeline_document(state)
+        text_docs = list(state.index_processor.extract_iter(dataset_document))
+        runner._update_document_index_status(document.id, 'splitting', {})
+        nodes = state.index_processor.transform(text_docs)
+        state.doc_store.add_documents(nodes)
+        runner._update_document_index_status(document.id, 'indexing', {})
+        runner._update_pipeline_segments(document.id, nodes, {})
+
+        def process_chunk(chunk, document=document, state=state):
+            runner._check_document_paused_status(document.id)
+            tokens = state.embedding_model_instance.model_type_instance.get_num_tokens(
+                'fake', {}, [node.page_content for node in chunk])
+            state.vector.create_with_embeddings(chunk, state.vector.embed_documents(chunk))
+            runner._update_pipeline_segments(document.id, chunk, {})
+            return tokens
+
+        with ThreadPoolExecutor(max_workers=10) as executor:
+            sum(executor.map(process_chunk, [nodes[i:i + 10] for i in range(0, len(nodes), 10)]))
+        runner._create_pipeline_keyword_index(state, nodes)
+        runner._update_document_index_status(document.id, 'completed', {})
+
+
+@pytest.mark.benchmark(group='indexing_runner')
+def test_benchmark_indexing_with_barriers(app, benchmark):
+    runner = FakeIndexingRunner()
+    documents = _documents(BENCHMARK_DOCUMENTS)
+
+    benchmark.pedantic(_run_with_barriers, args=(runner, documents), rounds=1)
+
+    assert runner.vector_count == BENCHMARK_DOCUMENTS * 2 * 3
+
+
+@pytest.mark.benchmark(group='indexing_runner')
+def test_benchmark_indexing_pipeline(app, benchmark):
+    runner = FakeIndexingRunner()
+    documents = _documents(BENCHMARK_DOCUMENTS)
+
+    stats = benchmark.pedantic(runner._run_pipeline, args=(documents,), rounds=1)
+
+    assert runner.vector_count == BENCHMARK_DOCUMENTS * 2 * 3
+    benchmark.extra_info['stages'] = stats
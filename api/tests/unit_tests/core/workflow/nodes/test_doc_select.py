@@ -0,0 +1,83 @@
+from unittest.mock import MagicMock
+
+from sqlalchemy.dialects import postgresql
+
+from core.app.entities.app_invoke_entities import InvokeFrom
+from core.workflow.entities.node_entities import SystemVariable
+from core.workflow.entities.variable_pool import VariablePool
+from core.workflow.nodes.base_node import UserFrom
+from core.workflow.nodes.doc_select import doc_select_node
+from core.workflow.nodes.doc_select.doc_select_node import DocSelectNode
+from extensions.ext_database import db
+from models.workflow import WorkflowNodeExecutionStatus
+
+
+def _build_node(doc_ids: list[str]) -> DocSelectNode:
+    return DocSelectNode(
+        tenant_id='tenant',
+        app_id='1',
+        workflow_id='1',
+        user_id='1',
+        user_from=UserFrom.ACCOUNT,
+        invoke_from=InvokeFrom.DEBUGGER,
+        config={
+            'id': 'doc-select',
+            'data': {
+                'title': 'Doc Select',
+                'type': 'doc-select',
+                'doc_ids': doc_ids
+            }
+        }
+    )
+
+
+def _file(file_id: str) -> dict:
+    return {'id': file_id, 'name': f'{file_id}.pdf', 'size': 1024, 'extension': 'pdf', 'mime_type': 'application/pdf'}
+
+
+def test_execute_doc_select(monkeypatch):
+    node = _build_node(['doc-1', 'doc-2', 'doc-3', 'doc-4'])
+
+    file_cache = MagicMock()
+    file_cache.get_many.return_value = {'doc-1': _file('file-1'), 'doc-2': None}
+    monkeypatch.setattr(doc_select_node, 'DocumentFileCache', MagicMock(return_value=file_cache))
+
+    query = MagicMock()
+    query.return_value.outerjoin.return_value.filter.return_value.all.return_value = [
+        ('doc-4', 'file-4', 'file-4.pdf', 1024, 'pdf', 'application/pdf'),
+    ]
+    monkeypatch.setattr(db.session, 'query', query)
+
+    pool = VariablePool(system_variables={SystemVariable.FILES: []}, user_inputs={})
+    result = node._run(pool)
+
+    assert result.status == WorkflowNodeExecutionStatus.SUCCEEDED
+    assert result.outputs['file_ids'] == ['file-1', 'file-4']
+    assert result.outputs['files'] == [_file('file-1'), _file('file-4')]
+
+    # only cache misses are queried, with a single query
+    assert query.call_count == 1
+    file_cache.set_many.assert_called_once_with({'doc-3': None, 'doc-4': _file('file-4')})
+    # the upload file primary key is compared without a cast
+    join_condition = str(query.return_value.outerjoin.call_args[0][1].compile(dialect=postgresql.dialect()))
+    assert 'upload_files.id = CAST(' in join_condition
+    assert 'CAST(upload_files.id' not in join_condition
+
+
+def test_execute_doc_select_all_cached(monkeypatch):
+    node = _build_node(['doc-2', 'doc-1'])
+
+    file_cache = MagicMock()
+    file_cache.get_many.return_value = {'doc-1': _file('file-1'), 'doc-2': _file('file-2')}
+    monkeypatch.setattr(doc_select_node, 'DocumentFileCache', MagicMock(return_value=file_cache))
+
+    query = MagicMock()
+    monkeypatch.setattr(db.session, 'query', query)
+
+    pool = VariablePool(system_variables={SystemVariable.FILES: []}, user_inputs={})
+    result = node._run(pool)
+
+    assert result.status == WorkflowNodeExecutionStatus.SUCCEEDED
+    assert result.outputs['file_ids'] == ['file-2', 'file-1']
+    query.assert_not_called()
+    file_cache.set_many.assert_not_called()
@@ -0,0 +1,86 @@
+from core.workflow.entities.node_entities import SystemVariable
+from core.workflow.entities.variable_pool import VariablePool
+
+
+def test_child_scope():
+    pool = VariablePool(system_variables={
+        SystemVariable.QUERY: 'hello'
+    }, user_inputs={})
+    pool.append_variable(node_id='iteration', variable_key_list=['item'], value='parent item')
+    pool.append_variable(node_id='llm', variable_key_list=['text'], value='parent text')
+
+    child = pool.create_child_scope()
+    child.append_variable(node_id='iteration', variable_key_list=['item'], value='child item')
+    child.append_variable(node_id='code', variable_key_list=['result'], value='child result')
+
+    # child reads fall back to parent
+    assert child.get_variable_value(['sys', 'query']) == 'hello'
+    assert child.get_variable_value(['llm', 'text']) == 'parent text'
+    assert child.get_variable_value(['iteration', 'item']) == 'child item'
+    assert child.get_variable_value(['code', 'result']) == 'child result'
+
+    # child writes are invisible to parent
+    assert pool.get_variable_value(['iteration', 'item']) == 'parent item'
+    assert pool.get_variable_value(['code', 'result']) is None
+
+
+def _build_deep_output(depth: int, width: int) -> dict:
+    if depth == 0:
+        return {f'key_{i}': f'value_{i}' for i in range(width)}
+
+    return {f'key_{i}': _build_deep_output(depth - 1, width) for i in range(width)}
+
+
+def test_nested_selector():
+    pool = VariablePool(system_variables={}, user_inputs={})
+    pool.append_variable(node_id='http', variable_key_list=['body'], value={
+        'data': {'items': [1, 2], 'name': 'dify'}
+    })
+
+    assert pool.get_variable_value(['http', 'body', 'data', 'name']) == 'dify'
+    assert pool.get_variable_value(['http', 'body', 'data', 'items']) == [1, 2]
+    assert pool.get_variable_value(['http', 'body', 'data', 'missing']) is None
+    assert pool.get_variable_value(['http', 'body', 'data', 'name', 'missing']) is None
+
+    # explicitly appended nested variable takes precedence
+    pool.append_variable(node_id='http', variable_key_list=['body', 'data', 'name'], value='override')
+    assert pool.get_variable_value(['http', 'body', 'data', 'name']) == 'override'
+
+
+def test_clear_node_variables_in_child_scope():
+    pool = VariablePool(system_variables={}, user_inputs={})
+    pool.append_variable(node_id='llm', variable_key_list=['text'], value='parent text')
+
+    child = pool.create_child_scope()
+    child.clear_node_variables('llm')
+    assert child.get_variable_value(['llm', 'text']) is None
+    assert pool.get_variable_value(['llm', 'text']) == 'parent text'
+
+
+def test_memory_footprint_stores_output_once():
+    output = _build_deep_output(depth=3, width=5)
+    pool = VariablePool(system_variables={}, user_inputs={})
+    pool.append_variable(node_id='tool', variable_key_list=['json'], value=output)
+    footprint = pool.get_memory_footprint()
+
+    empty_pool = VariablePool(system_variables={}, user_inputs={})
+    empty_pool.append_variable(node_id='tool', variable_key_list=['json'], value=None)
+
+    output_size = VariablePool._get_object_size(output, set())
+    assert footprint - empty_pool.get_memory_footprint() <= output_size
+
+    # child scopes do not copy parent variables
+    assert pool.create_child_scope().get_memory_footprint() < footprint
+
+
+def test_deep_output_append_and_lookup_benchmark(benchmark):
+    output = _build_deep_output(depth=4, width=6)
+    selectors = [['tool', 'json', f'key_{i}', 'key_1', 'key_2', 'key_3', 'key_4'] for i in range(6)]
+
+    def append_and_lookup():
+        pool = VariablePool(system_variables={}, user_inputs={})
+        pool.append_variable(node_id='tool', variable_key_list=['json'], value=output)
+        for selector in selectors:
+            pool.get_variable_value(selector)
+
+    benchmark(append_and_lookup)
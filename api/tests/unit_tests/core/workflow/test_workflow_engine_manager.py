@@ -0,0 +1,342 @@
+import json
+import threading
+import time
+from typing import Optional
+from unittest.mock import MagicMock
+
+import pytest
+from flask import Flask
+
+from core.app.entities.app_invoke_entities import InvokeFrom
+from core.workflow import workflow_engine_manager
+from core.workflow.callbacks.recording_workflow_callback import RecordingWorkflowCallback
+from core.workflow.entities.base_node_data_entities import BaseNodeData
+from core.workflow.entities.node_entities import NodeRunResult, NodeType
+from core.workflow.entities.variable_pool import VariablePool
+from core.workflow.entities.workflow_graph import WorkflowGraphCache
+from core.workflow.nodes.base_node import BaseNode, UserFrom
+from core.workflow.nodes.loop.entities import LoopNodeData
+from core.workflow.workflow_engine_manager import WorkflowEngineManager
+from extensions.ext_database import db
+from models.workflow import WorkflowNodeExecutionStatus
+
+
+class FakeNodeData(BaseNodeData):
+    sleep: float = 0
+    # selector of variable holding the seconds to sleep
+    sleep_selector: Optional[list[str]] = None
+    fail: bool = False
+    # fail when the first input equals this value
+    fail_on: Optional[str] = None
+    # selectors of variables joined into the text output
+    inputs: list[list[str]] = []
+    outputs: Optional[dict] = None
+
+
+class FakeNode(BaseNode):
+    """
+    Node sleeping for a while, with text output joined from its inputs
+    """
+    _node_data_cls = FakeNodeData
+    _node_type = NodeType.CODE
+
+    # node ids and inputs of node runs, in order of start
+    runs: list[tuple[str, list[str]]] = []
+    runs_lock = threading.Lock()
+
+    def _run(self, variable_pool: VariablePool) -> NodeRunResult:
+        node_data: FakeNodeData = self.node_data
+        inputs = [str(variable_pool.get_variable_value(selector)) for selector in node_data.inputs]
+        with self.runs_lock:
+            self.runs.append((self.node_id, inputs))
+
+        time.sleep(variable_pool.get_variable_value(node_data.sleep_selector)
+                   if node_data.sleep_selector else node_data.sleep)
+        if node_data.fail or (node_data.fail_on is not None and inputs and inputs[0] == node_data.fail_on):
+            raise ValueError(f'{self.node_id} failed')
+
+        return NodeRunResult(
+            status=WorkflowNodeExecutionStatus.SUCCEEDED,
+            outputs=node_data.outputs or {'text': '+'.join([*inputs, self.node_id])}
+        )
+
+    @classmethod
+    def _extract_variable_selector_to_variable_mapping(cls, node_data: BaseNodeData) -> dict[str, list[str]]:
+        return {}
+
+
+class FakeStartNode(FakeNode):
+    _node_type = NodeType.START
+
+
+class FakeEndNode(FakeNode):
+    _node_type = NodeType.END
+
+
+@pytest.fixture
+def app(monkeypatch):
+    monkeypatch.setattr(db, 'session', MagicMock())
+    monkeypatch.setattr(FakeNode, 'runs', [])
+    monkeypatch.setitem(workflow_engine_manager.node_classes, NodeType.START, FakeStartNode)
+    monkeypatch.setitem(workflow_engine_manager.node_classes, NodeType.CODE, FakeNode)
+    monkeypatch.setitem(workflow_engine_manager.node_classes, NodeType.END, FakeEndNode)
+    WorkflowGraphCache.clear()
+
+    app = Flask(__name__)
+    app.config.update({
+        'WORKFLOW_MAX_EXECUTION_STEPS': 50,
+        'WORKFLOW_MAX_EXECUTION_TIME': 600,
+        'WORKFLOW_CALL_MAX_DEPTH': 5,
+    })
+    with app.app_context():
+        yield app
+
+
+def _node(node_id: str, node_type: str = 'code', **data) -> dict:
+    return {'id': node_id, 'data': {'type': node_type, 'title': node_id, **data}}
+
+
+def _run(nodes: list[dict], edges: list[tuple[str, str]], max_parallelism: int = 4) -> RecordingWorkflowCallback:
+    workflow = MagicMock(id='workflow', tenant_id='tenant', app_id='app', type='workflow', graph=json.dumps({
+        'nodes': nodes,
+        'edges': [{'source': source, 'target': target} for source, target in edges]
+    }))
+    recorder = RecordingWorkflowCallback()
+    WorkflowEngineManager().run_workflow(
+        workflow=workflow,
+        user_id='user',
+        user_from=UserFrom.ACCOUNT,
+        invoke_from=InvokeFrom.DEBUGGER,
+        user_inputs={},
+        system_inputs={},
+        callbacks=[recorder],
+        max_parallelism=max_parallelism
+    )
+    return recorder
+
+
+def _events(recorder: RecordingWorkflowCallback, method: str) -> list:
+    return [event for event in recorder.events if event.method == method]
+
+
+def _node_events(recorder: RecordingWorkflowCallback) -> list[tuple[str, str]]:
+    methods = {
+        'on_workflow_node_execute_started': 'started',
+        'on_workflow_node_execute_succeeded': 'succeeded',
+        'on_workflow_node_execute_failed': 'failed',
+    }
+    return [(methods[event.method], event.kwargs['node_id']) for event in recorder.events if event.method in methods]
+
+
+def _assert_started_nodes_finished(recorder: RecordingWorkflowCallback) -> None:
+    node_events = _node_events(recorder)
+    started = [node_id for status, node_id in node_events if status == 'started']
+    finished = [node_id for status, node_id in node_events if status != 'started']
+    assert sorted(started) == sorted(finished)
+
+
+def test_parallel_branches_run_concurrently_and_join(app):
+    started_at = time.perf_counter()
+    recorder = _run(
+        nodes=[
+            _node('start', 'start'),
+            _node('branch-1', sleep=0.2),
+            _node('branch-2', sleep=0.2),
+            _node('join', inputs=[['branch-1', 'text'], ['branch-2', 'text']]),
+            _node('end', 'end', inputs=[['join', 'text']]),
+        ],
+        edges=[('start', 'branch-1'), ('start', 'branch-2'), ('branch-1', 'join'), ('branch-2', 'join'),
+               ('join', 'end')]
+    )
+    elapsed = time.perf_counter() - started_at
+
+    assert elapsed < 0.35
+    assert _events(recorder, 'on_workflow_run_succeeded')
+    node_events = _node_events(recorder)
+    assert node_events[:2] == [('started', 'start'), ('succeeded', 'start')]
+    # join starts after both branches finished
+    assert node_events.index(('started', 'join')) > max(node_events.index(('succeeded', 'branch-1')),
+                                                        node_events.index(('succeeded', 'branch-2')))
+    assert node_events[-2:] == [('started', 'end'), ('succeeded', 'end')]
+    succeeded = {
+        event.kwargs['node_id']: event.kwargs['outputs'] for event in _events(recorder, 'on_workflow_node_execute_succeeded')
+    }
+    # outputs of both branches are joined
+    assert succeeded['end'] == {'text': 'branch-1+branch-2+join+end'}
+    run_indexes = [event.kwargs['node_run_index'] for event in _events(recorder, 'on_workflow_node_execute_started')]
+    assert run_indexes == sorted(set(run_indexes))
+
+
+def test_step_limit(app):
+    app.config['WORKFLOW_MAX_EXECUTION_STEPS'] = 2
+
+    recorder = _run(
+        nodes=[_node('start', 'start'), _node('code-1'), _node('code-2'), _node('code-3'), _node('end', 'end')],
+        edges=[('start', 'code-1'), ('code-1', 'code-2'), ('code-2', 'code-3'), ('code-3', 'end')]
+    )
+
+    assert _events(recorder, 'on_workflow_run_failed')[0].kwargs['error'] == 'Max steps 2 reached.'
+    assert ('started', 'code-3') not in _node_events(recorder)
+    _assert_started_nodes_finished(recorder)
+
+
+def test_time_limit(app):
+    app.config['WORKFLOW_MAX_EXECUTION_TIME'] = 0.2
+
+    recorder = _run(
+        nodes=[_node('start', 'start'), _node('slow', sleep=0.5), _node('end', 'end')],
+        edges=[('start', 'slow'), ('slow', 'end')]
+    )
+
+    assert _events(recorder, 'on_workflow_run_failed')[0].kwargs['error'] == 'Max execution time 0.2s reached.'
+    # the running node gets a terminal event
+    failed = _events(recorder, 'on_workflow_node_execute_failed')
+    assert [event.kwargs['node_id'] for event in failed] == ['slow']
+    _assert_started_nodes_finished(recorder)
+
+
+def test_failing_branch_stops_run(app):
+    recorder = _run(
+        nodes=[
+            _node('start', 'start'),
+            _node('failing', fail=True),
+            _node('slow', sleep=0.2),
+            _node('join'),
+            _node('end', 'end'),
+        ],
+        edges=[('start', 'failing'), ('start', 'slow'), ('failing', 'join'), ('slow', 'join'), ('join', 'end')]
+    )
+
+    assert _events(recorder, 'on_workflow_run_failed')[0].kwargs['error'] == 'Node failing run failed: failing failed'
+    node_events = _node_events(recorder)
+    assert ('failed', 'failing') in node_events
+    # the other branch is drained before the run fails
+    assert ('succeeded', 'slow') in node_events
+    assert ('started', 'join') not in node_events
+    _assert_started_nodes_finished(recorder)
+
+
+def test_end_node_stops_other_branches(app):
+    recorder = _run(
+        nodes=[
+            _node('start', 'start'),
+            _node('end', 'end'),
+            _node('slow', sleep=0.2),
+            _node('after-slow'),
+        ],
+        edges=[('start', 'end'), ('start', 'slow'), ('slow', 'after-slow')]
+    )
+
+    assert _events(recorder, 'on_workflow_run_succeeded')
+    node_events = _node_events(recorder)
+    assert ('succeeded', 'end') in node_events
+    assert ('succeeded', 'slow') in node_events
+    assert ('started', 'after-slow') not in node_events
+    _assert_started_nodes_finished(recorder)
+
+
+def test_iteration_does_not_block_other_branches(app):
+    started_at = time.perf_counter()
+    recorder = _run(
+        nodes=[
+            _node('start', 'start', outputs={'items': [1, 2, 3]}),
+            _node('iteration', 'iteration', start_node_id='item', iterator_selector=['start', 'items'],
+                  output_selector=['item', 'text']),
+            _node('item', iteration_id='iteration', sleep=0.1, inputs=[['iteration', 'item']]),
+            _node('branch', sleep=0.3),
+            _node('end', 'end', inputs=[['iteration', 'output']]),
+        ],
+        edges=[('start', 'iteration'), ('start', 'branch'), ('iteration', 'end'),
+               ('branch', 'end')]
+    )
+    elapsed = time.perf_counter() - started_at
+
+    assert elapsed < 0.5
+    assert _events(recorder, 'on_workflow_run_succeeded')
+    iteration_started = _events(recorder, 'on_workflow_iteration_started')[0]
+    assert iteration_started.kwargs['predecessor_node_id'] == 'start'
+    end_outputs = _events(recorder, 'on_workflow_node_execute_succeeded')[-1].kwargs['outputs']
+    assert end_outputs == {'text': "['1+item', '2+item', '3+item']+end"}
+    run_indexes = [event.kwargs['node_run_index'] for event in recorder.events
+                   if event.method in ('on_workflow_node_execute_started', 'on_workflow_iteration_started')]
+    assert run_indexes == list(range(1, len(run_indexes) + 1))
+
+
+def _item_runs() -> list[str]:
+    return [inputs[0] for node_id, inputs in FakeNode.runs if node_id == 'item']
+
+
+def _run_parallel_iteration(items: list, **item_data) -> RecordingWorkflowCallback:
+    return _run(
+        nodes=[
+            _node('start', 'start', outputs={'items': items}),
+            _node('iteration', 'iteration', start_node_id='item', iterator_selector=['start', 'items'],
+                  output_selector=['item', 'text'], parallel=True, max_parallelism=2),
+            _node('item', iteration_id='iteration', sleep_selector=['iteration', 'item'],
+                  inputs=[['iteration', 'item']], **item_data),
+            _node('end', 'end', inputs=[['iteration', 'output']]),
+        ],
+        edges=[('start', 'iteration'), ('iteration', 'end')]
+    )
+
+
+def test_parallel_iteration_keeps_item_order(app):
+    started_at = time.perf_counter()
+    recorder = _run_parallel_iteration([0.2, 0.05, 0.1])
+    elapsed = time.perf_counter() - started_at
+
+    assert elapsed < 0.3
+    assert _events(recorder, 'on_workflow_run_succeeded')
+    end_outputs = _events(recorder, 'on_workflow_node_execute_succeeded')[-1].kwargs['outputs']
+    # items finish out of order, outputs follow the order of items
+    assert end_outputs == {'text': "['0.2+item', '0.05+item', '0.1+item']+end"}
+
+
+def test_parallel_iteration_emits_events_per_item(app):
+    recorder = _run_parallel_iteration([0.1, 0.05, 0.0])
+
+    iteration_events = [
+        (event.method, event.kwargs.get('index'), event.kwargs.get('node_id'))
+        for event in recorder.events
+        if event.method in ('on_workflow_iteration_next', 'on_workflow_node_execute_started',
+                            'on_workflow_node_execute_succeeded')
+        and event.kwargs['node_id'] in ('iteration', 'item')
+    ]
+    item_events = [('on_workflow_node_execute_started', None, 'item'),
+                   ('on_workflow_node_execute_succeeded', None, 'item')]
+    assert iteration_events == [
+        ('on_workflow_iteration_next', 0, 'iteration'), *item_events,
+        ('on_workflow_iteration_next', 1, 'iteration'), *item_events,
+        ('on_workflow_iteration_next', 2, 'iteration'), *item_events,
+        ('on_workflow_iteration_next', 3, 'iteration'),
+    ]
+    predecessors = [event.kwargs['predecessor_node_id'] for event in _events(recorder, 'on_workflow_node_execute_started')
+                    if event.kwargs['node_id'] == 'item']
+    assert predecessors == ['iteration'] * 3
+
+
+def test_parallel_iteration_failing_item_stops_other_items(app):
+    recorder = _run_parallel_iteration([0.1, 0.05, 0.3, 0.3, 0.3, 0.3], fail_on='0.05')
+
+    assert _events(recorder, 'on_workflow_run_failed')[0].kwargs['error'] == 'Node item run failed: item failed'
+    # no items are dispatched after the failing one finished
+    assert _item_runs() == ['0.1', '0.05']
+    indexes = [event.kwargs['index'] for event in _events(recorder, 'on_workflow_iteration_next')]
+    assert indexes == [0, 1]
+    _assert_started_nodes_finished(recorder)
+
+
+def test_parallel_iteration_step_limit(app):
+    app.config['WORKFLOW_MAX_EXECUTION_STEPS'] = 4
+
+    recorder = _run_parallel_iteration([0.0] * 10)
+
+    assert _events(recorder, 'on_workflow_run_failed')[0].kwargs['error'] == 'Max steps 4 reached.'
+    # steps are checked before dispatching items, not only on replay
+    assert len(_item_runs()) < 10
+    _assert_started_nodes_finished(recorder)
+
+
+def test_loop_node_data_has_no_parallel_mode():
+    assert 'parallel' not in LoopNodeData.__fields__
+    assert 'max_parallelism' not in LoopNodeData.__fields__
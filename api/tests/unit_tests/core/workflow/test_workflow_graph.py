@@ -0,0 +1,117 @@
+import json
+from unittest.mock import MagicMock
+
+import pytest
+
+from core.workflow.entities.node_entities import NodeType
+from core.workflow.entities.workflow_entities import WorkflowParallelRunState
+from core.workflow.entities.workflow_graph import WorkflowGraph, WorkflowGraphCache
+
+
+def _build_graph(node_count: int) -> dict:
+    nodes = [{'id': 'start', 'data': {'type': 'start', 'title': 'Start'}}]
+    edges = []
+    for i in range(node_count):
+        nodes.append({'id': f'code-{i}', 'data': {'type': 'code', 'title': f'Code {i}'}})
+        edges.append({'source': nodes[-2]['id'], 'target': nodes[-1]['id']})
+
+    nodes.append({'id': 'end', 'data': {'type': 'end', 'title': 'End'}})
+    edges.append({'source': nodes[-2]['id'], 'target': 'end'})
+    return {'nodes': nodes, 'edges': edges}
+
+
+def test_compile_graph():
+    graph = WorkflowGraph({
+        'nodes': [
+            {'id': 'start', 'data': {'type': 'start', 'title': 'Start'}},
+            {'id': 'if-else', 'data': {'type': 'if-else', 'title': 'If Else'}},
+            {'id': 'iteration', 'data': {'type': 'iteration', 'title': 'Iteration'}},
+            {'id': 'llm', 'data': {'type': 'llm', 'title': 'LLM', 'iteration_id': 'iteration'}},
+            {'id': 'end', 'data': {'type': 'end', 'title': 'End'}},
+        ],
+        'edges': [
+            {'source': 'start', 'target': 'if-else'},
+            {'source': 'if-else', 'sourceHandle': 'true', 'target': 'iteration'},
+            {'source': 'if-else', 'sourceHandle': 'false', 'target': 'end'},
+            {'source': 'iteration', 'target': 'end'},
+        ]
+    })
+
+    assert graph.start_node_id == 'start'
+    assert graph.get_node_type('iteration') == NodeType.ITERATION
+    assert graph.get_node_config('llm')['data']['iteration_id'] == 'iteration'
+    assert graph.get_next_edge('start')['target'] == 'if-else'
+    assert graph.get_next_edge('if-else', 'false')['target'] == 'end'
+    assert graph.get_next_edge('if-else', 'unknown') is None
+    assert graph.get_next_edge('end') is None
+    assert len(graph.get_outgoing_edges('if-else')) == 2
+    assert graph.get_iteration_nested_node_ids('iteration') == ['llm']
+
+
+def test_compile_invalid_graph():
+    with pytest.raises(ValueError):
+        WorkflowGraph({'nodes': []})
+
+    with pytest.raises(ValueError):
+        WorkflowGraph({'nodes': {}, 'edges': []})
+
+
+def test_graph_cache():
+    WorkflowGraphCache.clear()
+
+    workflow = MagicMock(id='workflow', graph=json.dumps(_build_graph(3)))
+    graph = WorkflowGraphCache.get(workflow)
+    assert WorkflowGraphCache.get(workflow) is graph
+
+    workflow.graph = json.dumps(_build_graph(4))
+    assert WorkflowGraphCache.get(workflow) is not graph
+
+
+def test_parallel_run_state_join_and_skip():
+    graph = WorkflowGraph({
+        'nodes': [
+            {'id': 'start', 'data': {'type': 'start', 'title': 'Start'}},
+            {'id': 'if-else', 'data': {'type': 'if-else', 'title': 'If Else'}},
+            {'id': 'llm-1', 'data': {'type': 'llm', 'title': 'LLM 1'}},
+            {'id': 'llm-2', 'data': {'type': 'llm', 'title': 'LLM 2'}},
+            {'id': 'http', 'data': {'type': 'http-request', 'title': 'HTTP'}},
+            {'id': 'aggregator', 'data': {'type': 'variable-aggregator', 'title': 'Aggregator'}},
+            {'id': 'answer', 'data': {'type': 'answer', 'title': 'Answer'}},
+        ],
+        'edges': [
+            {'source': 'start', 'target': 'if-else'},
+            {'source': 'if-else', 'sourceHandle': 'true', 'target': 'llm-1'},
+            {'source': 'if-else', 'sourceHandle': 'true', 'target': 'llm-2'},
+            {'source': 'if-else', 'sourceHandle': 'false', 'target': 'http'},
+            {'source': 'llm-1', 'target': 'aggregator'},
+            {'source': 'llm-2', 'target': 'aggregator'},
+            {'source': 'http', 'target': 'aggregator'},
+            {'source': 'aggregator', 'target': 'answer'},
+        ]
+    })
+
+    state = WorkflowParallelRunState(graph=graph, start_node_id='start')
+    assert state.complete_node('start') == ['if-else']
+    # http branch is skipped, both llm branches run in parallel
+    assert state.complete_node('if-else', 'true') == ['llm-1', 'llm-2']
+    # aggregator joins on both llm branches
+    assert state.complete_node('llm-1') == []
+    assert state.complete_node('llm-2') == ['aggregator']
+    assert state.complete_node('aggregator') == ['answer']
+
+
+@pytest.mark.parametrize('node_count', [10, 1000])
+def test_next_edge_lookup_benchmark(benchmark, node_count):
+    graph = WorkflowGraph(_build_graph(node_count))
+
+    def walk():
+        node_id = graph.start_node_id
+        steps = 0
+        # walk the first 10 steps, cost must not depend on graph size
+        while node_id and steps < 10:
+            edge = graph.get_next_edge(node_id)
+            node_id = edge.get('target') if edge else None
+            graph.get_node_config(node_id)
+            steps += 1
+
+    benchmark(walk)
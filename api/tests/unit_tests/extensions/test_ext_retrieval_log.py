@@ -0,0 +1,62 @@
+import threading
+
+import pytest
+from flask import Flask
+
+from core.rag.models.document import Document
+from extensions import ext_retrieval_log
+from extensions.ext_retrieval_log import RetrievalLogSink
+
+
+def _sink(monkeypatch, **config) -> tuple[RetrievalLogSink, list]:
+    app = Flask(__name__)
+    app.config.update({'RETRIEVAL_LOG_FLUSH_INTERVAL': 0.05, **config})
+    written = []
+    monkeypatch.setattr(RetrievalLogSink, '_write', staticmethod(lambda events: written.append(events)))
+    monkeypatch.setattr(ext_retrieval_log.db, 'session', type('Session', (), {'remove': lambda self: None})())
+    sink = RetrievalLogSink()
+    sink.init_app(app)
+    return sink, written
+
+
+def test_events_are_written_in_batches_and_flushed_on_shutdown(monkeypatch):
+    sink, written = _sink(monkeypatch, RETRIEVAL_LOG_BATCH_SIZE=100, RETRIEVAL_LOG_FLUSH_INTERVAL=60)
+
+    sink.add_queries('what is dify', ['dataset-1', 'dataset-2'], 'app', 'end_user', 'user')
+    sink.add_hits([Document(page_content='a', metadata={'doc_id': 'a', 'dataset_id': 'dataset-1'})])
+    assert written == []
+
+    sink.shutdown()
+
+    events = [event for batch in written for event in batch]
+    assert [kind for kind, _ in events] == ['query', 'query', 'hits']
+    assert [payload['dataset_id'] for kind, payload in events if kind == 'query'] == ['dataset-1', 'dataset-2']
+    assert events[2][1] == [('dataset-1', 'a')]
+
+
+def test_events_over_queue_size_are_dropped(monkeypatch):
+    sink, written = _sink(monkeypatch, RETRIEVAL_LOG_QUEUE_SIZE=2, RETRIEVAL_LOG_BATCH_SIZE=1)
+    writing, release = threading.Event(), threading.Event()
+    write = RetrievalLogSink._write
+
+    def blocked_write(events):
+        writing.set()
+        release.wait()
+        write(events)
+
+    monkeypatch.setattr(RetrievalLogSink, '_write', staticmethod(blocked_write))
+
+    sink.add_queries('query', ['dataset'], 'app', 'end_user', 'user')
+    writing.wait(1)
+    for i in range(10):
+        sink.add_queries(f'query {i}', ['dataset'], 'app', 'end_user', 'user')
+    release.set()
+    sink.shutdown()
+
+    # one event held by the blocked worker and two in queue
+    assert len(written) == 3
+
+
+def test_invalid_full_policy(monkeypatch):
+    with pytest.raises(ValueError):
+        _sink(monkeypatch, RETRIEVAL_LOG_FULL_POLICY='retry')